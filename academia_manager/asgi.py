@@ -3,6 +3,11 @@ ASGI config for academia_manager project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+The report views under /alunos/pagamentos/*/async/ are async and only avoid
+blocking a worker when served by an ASGI server, e.g.:
+
+    uvicorn academia_manager.asgi:application --workers 2
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 """
@@ -0,0 +1,65 @@
+# academia_manager/banco.py
+
+"""
+Perfis de configuração do SQLite (ver DATABASES em settings.py).
+
+- `padrao`: como o Django vem de fábrica (journal de rollback, transações
+  DEFERRED, conexão nova a cada requisição).
+- `producao`: WAL (leituras não bloqueiam a escrita e vice-versa),
+  synchronous=NORMAL (seguro com WAL; só o último commit pode se perder numa
+  queda de energia), espera de até BUSY_TIMEOUT_MS por um lock em vez de
+  falhar com "database is locked", mmap e cache de páginas maiores, transações
+  IMMEDIATE (a escrita pega o lock no BEGIN, então uma transação que lê e
+  depois grava não dá erro ao tentar "promover" o lock) e conexões
+  persistentes entre requisições.
+
+Os PRAGMAs rodam em cada conexão nova pelo `init_command` do backend.
+"""
+
+BUSY_TIMEOUT_MS = 5000
+
+PRAGMAS_PRODUCAO = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': BUSY_TIMEOUT_MS,
+    'mmap_size': 128 * 1024 * 1024,
+    'cache_size': -32000,  # negativo = em KiB (~32 MB)
+    'temp_store': 'MEMORY',
+}
+
+PERFIS = {
+    'padrao': {
+        'pragmas': {},
+        'transaction_mode': None,
+        'conn_max_age': 0,
+    },
+    'producao': {
+        'pragmas': PRAGMAS_PRODUCAO,
+        'transaction_mode': 'IMMEDIATE',
+        'conn_max_age': 600,
+    },
+}
+
+
+def init_command(pragmas):
+    return ';'.join(f'PRAGMA {nome}={valor}' for nome, valor in pragmas.items())
+
+
+def sqlite(nome, perfil='producao'):
+    """Configuração de um banco em DATABASES para o arquivo `nome` no perfil dado."""
+    if perfil not in PERFIS:
+        raise ValueError(f"Perfil de banco desconhecido: {perfil!r} (use {', '.join(PERFIS)}).")
+    dados = PERFIS[perfil]
+    opcoes = {'timeout': BUSY_TIMEOUT_MS / 1000}
+    if dados['pragmas']:
+        opcoes['init_command'] = init_command(dados['pragmas'])
+    if dados['transaction_mode']:
+        opcoes['transaction_mode'] = dados['transaction_mode']
+    return {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': nome,
+        'CONN_MAX_AGE': dados['conn_max_age'],
+        # Conexão persistente que caiu é descartada no início da requisição
+        'CONN_HEALTH_CHECKS': dados['conn_max_age'] > 0,
+        'OPTIONS': opcoes,
+    }
@@ -2,6 +2,8 @@ from pathlib import Path
 from django.urls import reverse_lazy
 import os
 
+from . import banco
+
 BASE_DIR = Path(__file__).resolve().parent.parent
 
 SECRET_KEY = 'django-insecure-h(#=%(+#%om_5%#%v#m38e@8#-(gth+n0nh05*0w#&*3ns=&m^'
@@ -25,11 +27,15 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # Primeiro da lista: mede a requisição inteira (consultas, tempo de banco e de template)
+    'alunos.instrumentacao.InstrumentacaoMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    # Grava a trilha de auditoria da requisição num INSERT só, no fim (ver alunos/auditoria.py)
+    'alunos.auditoria.AuditoriaMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -38,7 +44,9 @@ ROOT_URLCONF = 'academia_manager.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # DjangoTemplates com medição do tempo de renderização (ver alunos/instrumentacao.py)
+        'BACKEND': 'alunos.instrumentacao.TemplatesInstrumentados',
+        'NAME': 'django',
         'DIRS': [os.path.join(BASE_DIR, 'templates')], 
         'APP_DIRS': True, 
         'OPTIONS': {
@@ -53,11 +61,31 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'academia_manager.wsgi.application'
 
+# Perfil do SQLite (ver academia_manager/banco.py): "producao" liga WAL, busy_timeout,
+# transações IMMEDIATE e conexões persistentes; "padrao" é a configuração de fábrica.
+BANCO_PERFIL = os.environ.get('ACADEMIA_BANCO_PERFIL', 'producao')
+
 DATABASES = {
+    'default': banco.sqlite(BASE_DIR / 'db.sqlite3', BANCO_PERFIL),
+}
+
+# Cache em memória do processo (totais do histórico, indicadores da página inicial).
+# Com vários processos (ex: gunicorn com vários workers), use um backend
+# compartilhado (arquivo, Redis, Memcached) para que a invalidação valha para todos.
+CACHES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
-    }
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'academia-manager',
+        'OPTIONS': {'MAX_ENTRIES': 1000},
+    },
+    # Fragmentos de template (uma linha por aluno na lista): separado para uma lista
+    # grande não despejar os totais e indicadores do cache padrão
+    'fragmentos': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'academia-manager-fragmentos',
+        'TIMEOUT': 60 * 60 * 24,
+        'OPTIONS': {'MAX_ENTRIES': 20000},
+    },
 }
 
 AUTH_PASSWORD_VALIDATORS = [
@@ -99,4 +127,42 @@ MEDIA_ROOT = BASE_DIR / 'media'
 
 LOGIN_URL = '/login/'
 LOGIN_REDIRECT_URL = '/alunos/dashboard/'
-LOGOUT_REDIRECT_URL = '/login/'
\ No newline at end of file
+LOGOUT_REDIRECT_URL = '/login/'
+
+# Entra no ETag das telas com GET condicional (alunos/condicional.py): aumente quando
+# mudar os templates dessas telas, para os navegadores não reaproveitarem o HTML antigo
+VERSAO_PAGINAS = '1'
+
+# Lembretes de cobrança (ver alunos/lembretes.py). Troque o enviador pela
+# integração com o provedor de WhatsApp; EnviadorArquivo grava em LEMBRETES_ARQUIVO.
+LEMBRETES_ENVIADOR = 'alunos.lembretes.EnviadorConsole'
+LEMBRETES_POR_LOTE = 30
+LEMBRETES_INTERVALO = 60  # segundos entre um lote e outro
+
+# Fila de tarefas em segundo plano (ver alunos/tarefas.py): miniaturas, exclusão de
+# alunos, envio de lembretes e cobranças do admin. IMPORTANTE: com False, essas
+# operações só acontecem com `python manage.py processar_tarefas` rodando junto com o
+# servidor (ver README); sem ele, um aluno "excluído" continua no banco (com CPF e RG).
+# O dashboard e o log avisam quando há tarefas paradas na fila. True executa cada tarefa
+# logo após o commit, dentro da requisição, sem trabalhador (desenvolvimento).
+TAREFAS_SINCRONAS = False
+
+# Uma linha JSON por requisição com consultas, tempo de banco e de template (só com DEBUG;
+# em produção, troque o filtro por um handler de arquivo ou do agregador de logs)
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'filters': {
+        'so_em_debug': {'()': 'django.utils.log.RequireDebugTrue'},
+    },
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler', 'filters': ['so_em_debug']},
+    },
+    'loggers': {
+        'alunos.requisicoes': {
+            'handlers': ['console'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+    },
+}
@@ -0,0 +1,95 @@
+# alunos/acoes_lote.py
+
+"""
+Ações em lote sobre pagamentos (histórico e vencimentos): marcar como pagos,
+alterar o vencimento e excluir vários de uma vez.
+
+Cada ação é um único UPDATE ou DELETE sobre o conjunto escolhido, dentro de
+uma transação junto com o que depende dos pagamentos:
+- situação financeira dos alunos afetados: um UPDATE (situacao.py);
+- resumo mensal: triggers do banco, aplicados pelo próprio UPDATE/DELETE;
+- totais em cache: uma invalidação do grupo 'pagamentos' após o commit;
+- auditoria: um registro por pagamento alterado, com os valores anteriores
+  lidos na mesma consulta que já busca os alunos afetados (auditoria.py).
+Os sinais de Pagamento (um recálculo por linha) não são disparados.
+"""
+
+from django.db import transaction
+from django.db.models import QuerySet
+from django.utils import timezone
+
+from . import auditoria
+from .cache import invalidar
+from .exclusao_direta import apagar
+from .models import Pagamento
+from .situacao import atualizar_situacao
+
+ACAO_PAGAR = 'pagar'
+ACAO_VENCIMENTO = 'vencimento'
+ACAO_EXCLUIR = 'excluir'
+ACOES_CHOICES = [
+    (ACAO_PAGAR, 'Marcar como pagos'),
+    (ACAO_VENCIMENTO, 'Alterar vencimento'),
+    (ACAO_EXCLUIR, 'Excluir'),
+]
+
+
+def _pagamentos(pagamentos):
+    if not isinstance(pagamentos, QuerySet):
+        pagamentos = Pagamento.objects.filter(pk__in=list(pagamentos))
+    return pagamentos.order_by()
+
+
+def _aplicar(pagamentos, alterar, novos=None):
+    """
+    Executa `alterar(queryset, antes)` e atualiza os dependentes; devolve a
+    quantidade de pagamentos. `antes`: as linhas lidas antes da escrita;
+    `novos`: valores gravados pelo UPDATE (None num DELETE).
+    """
+    campos = list(novos) if novos is not None else Pagamento.campos_auditados
+    with transaction.atomic():
+        # Lidos antes da escrita: depois de um DELETE não há mais de onde tirar
+        antes = list(pagamentos.values('pk', *dict.fromkeys(['aluno_id', *campos])))
+        if not antes:
+            return 0
+        quantidade = alterar(pagamentos, antes)
+        if quantidade:
+            atualizar_situacao({linha['aluno_id'] for linha in antes})
+            invalidar('pagamentos')
+            if novos is None:
+                auditoria.registrar_exclusoes(Pagamento, antes, auditoria.ORIGEM_LOTE)
+            else:
+                auditoria.registrar_alteracoes(Pagamento, antes, novos, auditoria.ORIGEM_LOTE)
+    return quantidade
+
+
+def _atualizar(novos):
+    return lambda qs, antes: qs.update(**novos, atualizado_em=timezone.now())
+
+
+def marcar_pagos(pagamentos, data_pagamento, metodo_pagamento):
+    """Quita os pagamentos em aberto do conjunto (queryset ou pks); os já pagos não mudam."""
+    novos = {'pago': True, 'data_pagamento': data_pagamento, 'metodo_pagamento': metodo_pagamento}
+    return _aplicar(_pagamentos(pagamentos).filter(pago=False), _atualizar(novos), novos)
+
+
+def alterar_vencimento(pagamentos, data_vencimento):
+    novos = {'data_vencimento': data_vencimento}
+    return _aplicar(_pagamentos(pagamentos), _atualizar(novos), novos)
+
+
+def excluir_pagamentos(pagamentos):
+    # Nenhum modelo aponta para Pagamento, então o DELETE direto não deixa órfãos;
+    # o delete() do queryset carregaria cada linha para enviar os sinais (ver exclusao_direta.py).
+    # Apaga exatamente as linhas lidas, na mesma transação
+    return _aplicar(_pagamentos(pagamentos), lambda qs, antes: apagar(Pagamento, 'id', [linha['pk'] for linha in antes]))
+
+
+def aplicar_acao(acao, pagamentos, data_pagamento=None, metodo_pagamento=None, data_vencimento=None):
+    if acao == ACAO_PAGAR:
+        return marcar_pagos(pagamentos, data_pagamento, metodo_pagamento)
+    if acao == ACAO_VENCIMENTO:
+        return alterar_vencimento(pagamentos, data_vencimento)
+    if acao == ACAO_EXCLUIR:
+        return excluir_pagamentos(pagamentos)
+    raise ValueError(f"Ação em lote desconhecida: {acao!r}")
@@ -1,7 +1,12 @@
 # alunos/admin.py
 
-from django.contrib import admin
-from .models import Aluno, Modalidade # Garanta que Aluno e Modalidade estão importados
+from datetime import date
+
+from django.contrib import admin, messages
+from .models import LEMBRETE_ERRO, LEMBRETE_PENDENTE, Aluno, Lembrete, Modalidade, ModeloMensagem, RegistroAuditoria # Garanta que Aluno e Modalidade estão importados
+from .busca import filtrar_alunos
+from .cobranca import gerar_cobrancas_do_mes
+from .tarefas import enfileirar
 
 # 1. Atualiza a classe de customização para o Admin
 class AlunoAdmin(admin.ModelAdmin):
@@ -18,12 +23,70 @@ class AlunoAdmin(admin.ModelAdmin):
     # Adiciona um filtro lateral
     list_filter = ('ativo', 'data_matricula', 'sexo') # Adicionando 'sexo' ao filtro
     
-    # Adiciona uma caixa de busca
-    search_fields = ('nome', 'cpf', 'whatsapp') # Adicionando 'whatsapp' à busca
+    # Adiciona uma caixa de busca (a consulta em si usa o índice FTS5, ver get_search_results)
+    search_fields = ('nome', 'cpf', 'rg', 'whatsapp', 'bairro')
     
     # Define a ordem padrão
     ordering = ('-data_matricula',)
 
+    actions = ['gerar_mensalidade_mes_atual']
+
+    @admin.action(description="Gerar mensalidade do mês atual para os selecionados")
+    def gerar_mensalidade_mes_atual(self, request, queryset):
+        # Alunos inativos ou já cobrados no mês são ignorados (ver alunos/cobranca.py); roda na fila de tarefas
+        enfileirar(gerar_cobrancas_do_mes, mes=date.today(), alunos=list(queryset.values_list('pk', flat=True)))
+        self.message_user(
+            request, "Geração das mensalidades colocada na fila de tarefas; o resultado aparece em Tarefas.",
+            messages.SUCCESS,
+        )
+
+    def get_search_results(self, request, queryset, search_term):
+        # Mesma busca da lista de alunos: prefixo e sem acentos, sem LIKE '%...%'
+        return filtrar_alunos(queryset, search_term), False
+
+class ModalidadeAdmin(admin.ModelAdmin):
+    # Tabela de preços usada na cobrança mensal, editável direto na lista
+    list_display = ('nome', 'valor_mensal')
+    list_editable = ('valor_mensal',)
+
+class ModeloMensagemAdmin(admin.ModelAdmin):
+    # O primeiro modelo ativo (por nome) é o usado nos lembretes de cobrança
+    list_display = ('nome', 'ativo')
+    list_editable = ('ativo',)
+
+class LembreteAdmin(admin.ModelAdmin):
+    list_display = ('aluno', 'ciclo', 'telefone', 'status', 'tentativas', 'enviado_em')
+    list_filter = ('status', 'ciclo')
+    list_select_related = ('aluno',)
+    raw_id_fields = ('aluno',)
+    actions = ['reenviar']
+
+    @admin.action(description="Colocar de novo na fila os lembretes que falharam")
+    def reenviar(self, request, queryset):
+        quantidade = queryset.filter(status=LEMBRETE_ERRO).update(status=LEMBRETE_PENDENTE, tentativas=0)
+        self.message_user(request, f"{quantidade} lembrete(s) de volta na fila.", messages.SUCCESS)
+
+class RegistroAuditoriaAdmin(admin.ModelAdmin):
+    # Só leitura: a trilha de auditoria não se edita nem se apaga pelo admin
+    list_display = ('criado_em', 'usuario', 'acao', 'modelo', 'objeto_id', 'origem')
+    list_filter = ('acao', 'modelo', 'origem')
+    list_select_related = ('usuario',)
+    # Por id: a lista sem filtro percorre a chave primária em vez de ordenar a tabela
+    ordering = ('-id',)
+    show_full_result_count = False
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
 # 2. Registra os modelos
 admin.site.register(Aluno, AlunoAdmin)
-admin.site.register(Modalidade)
\ No newline at end of file
+admin.site.register(Modalidade, ModalidadeAdmin)
+admin.site.register(ModeloMensagem, ModeloMensagemAdmin)
+admin.site.register(Lembrete, LembreteAdmin)
+admin.site.register(RegistroAuditoria, RegistroAuditoriaAdmin)
@@ -0,0 +1,353 @@
+# alunos/api.py
+
+"""
+API JSON para o aplicativo (celular / offline) do balcão.
+
+Rotas (todas sob /alunos/api/):
+    GET  alunos/          lista paginada    POST alunos/          cadastra
+    GET  alunos/<pk>/     um aluno          PATCH/PUT/DELETE alunos/<pk>/
+e o mesmo para modalidades/ e pagamentos/.
+    GET  alunos/autocomplete/?q=jo   sugestões (id e nome) para o campo de aluno
+
+Listas:
+- paginação por cursor sobre a chave primária (alunos/paginacao.py):
+  `?limite=50&depois=<proximo>`; a resposta traz `resultados`, `proximo` e
+  `anterior`;
+- `?fields=nome,cpf` escolhe os campos (o `id` sempre vem);
+- filtros: ver FiltroApiAlunosForm e FiltroApiPagamentosForm em forms.py
+  (ativo, modalidade, busca, períodos, situação, atualizado_desde para
+  sincronização incremental).
+
+As linhas são lidas com `.values()` só com as colunas pedidas (o nome do
+aluno de um pagamento vem no mesmo SELECT, por JOIN) e serializadas como
+dicionários, sem instanciar modelos. As modalidades dos alunos da página vêm
+numa segunda consulta, como um prefetch_related. Cada página custa um número
+fixo de consultas, qualquer que seja o tamanho da base.
+
+A escrita passa pelos mesmos formulários das telas (mesmas validações e os
+mesmos sinais). DELETE de um aluno só o desativa e agenda a exclusão dos
+pagamentos em lotes pela fila de tarefas (arquivo.agendar_exclusao), como a
+tela de exclusão, e responde 202. Autenticação pela sessão (login normal do sistema); POST,
+PATCH, PUT e DELETE exigem o cabeçalho X-CSRFToken com o cookie csrftoken,
+que as respostas de leitura já enviam.
+"""
+
+import json
+from functools import wraps
+
+from django.db import transaction
+from django.db.models import F, ProtectedError
+from django.forms import modelform_factory
+from django.http import HttpResponse, JsonResponse
+from django.views.decorators.csrf import ensure_csrf_cookie
+
+from .arquivo import agendar_exclusao
+from .busca import filtrar_alunos, sugerir_alunos
+from .forms import AlunoForm, FiltroApiAlunosForm, FiltroApiPagamentosForm, ModalidadeForm, PagamentoForm
+from .models import Aluno, Modalidade, Pagamento
+from .paginacao import paginar
+
+LIMITE_PADRAO = 50
+LIMITE_MAXIMO = 200
+LIMITE_SUGESTOES = 10
+LIMITE_MAXIMO_SUGESTOES = 50
+# O navegador reaproveita a resposta ao apagar e redigitar as mesmas letras
+CACHE_CONTROL_SUGESTOES = 'private, max-age=30'
+# Sem separadores com espaço: respostas menores
+PARAMETROS_JSON = {'separators': (',', ':'), 'ensure_ascii': False}
+
+
+class ErroApi(Exception):
+    def __init__(self, status, mensagem, detalhes=None):
+        super().__init__(mensagem)
+        self.status = status
+        self.mensagem = mensagem
+        self.detalhes = detalhes
+
+
+def _filtrar_alunos(alunos, filtros):
+    if filtros['ativo'] is not None:
+        alunos = alunos.filter(ativo=filtros['ativo'])
+    if filtros['modalidade']:
+        alunos = alunos.filter(modalidades=filtros['modalidade'])
+    if filtros['matricula_de']:
+        alunos = alunos.filter(data_matricula__gte=filtros['matricula_de'])
+    if filtros['matricula_ate']:
+        alunos = alunos.filter(data_matricula__lte=filtros['matricula_ate'])
+    if filtros['atualizado_desde']:
+        alunos = alunos.filter(atualizado_em__gte=filtros['atualizado_desde'])
+    if filtros['q']:
+        alunos = filtrar_alunos(alunos, filtros['q'])
+    return alunos
+
+
+def _filtrar_pagamentos(pagamentos, filtros):
+    if filtros['aluno']:
+        pagamentos = pagamentos.filter(aluno_id=filtros['aluno'])
+    if filtros['pago'] is not None:
+        pagamentos = pagamentos.filter(pago=filtros['pago'])
+    if filtros['status']:
+        pagamentos = pagamentos.com_status(filtros['status'])
+    for campo, parametro in (('data_pagamento', 'pagamento'), ('data_vencimento', 'vencimento')):
+        if filtros[f'{parametro}_de']:
+            pagamentos = pagamentos.filter(**{f'{campo}__gte': filtros[f'{parametro}_de']})
+        if filtros[f'{parametro}_ate']:
+            pagamentos = pagamentos.filter(**{f'{campo}__lte': filtros[f'{parametro}_ate']})
+    if filtros['atualizado_desde']:
+        pagamentos = pagamentos.filter(atualizado_em__gte=filtros['atualizado_desde'])
+    return pagamentos
+
+
+def _modalidades_dos_alunos(linhas):
+    """Preenche `modalidades` (lista de ids) das linhas da página em uma consulta."""
+    por_aluno = {linha['id']: linha.setdefault('modalidades', []) for linha in linhas}
+    matriculas = (
+        Aluno.modalidades.through.objects.filter(aluno_id__in=list(por_aluno))
+        .order_by('aluno_id', 'modalidade_id').values_list('aluno_id', 'modalidade_id')
+    )
+    for aluno_id, modalidade_id in matriculas:
+        por_aluno[aluno_id].append(modalidade_id)
+
+
+class Recurso:
+    """
+    Um modelo exposto na API. `campos` mapeia o nome na API para a coluna (ou
+    caminho com JOIN) lida pelo `.values()`; None marca campos montados depois
+    da consulta por `complementos`.
+    """
+
+    def __init__(self, modelo, form, campos, filtro_form=None, filtrar=None, base=None, complementos=None):
+        self.modelo = modelo
+        self.form = form
+        self.campos = campos
+        self.filtro_form = filtro_form
+        self.filtrar = filtrar
+        self.base = base or (lambda: modelo.objects.all())
+        self.complementos = complementos or {}
+
+    def escolher_campos(self, parametro):
+        if not parametro:
+            return list(self.campos)
+        pedidos = [nome.strip() for nome in parametro.split(',') if nome.strip()]
+        desconhecidos = sorted(set(pedidos) - set(self.campos))
+        if desconhecidos:
+            raise ErroApi(400, "Campos desconhecidos.", {'fields': desconhecidos, 'disponiveis': list(self.campos)})
+        return ['id'] + [nome for nome in dict.fromkeys(pedidos) if nome != 'id']
+
+    def queryset(self, campos):
+        """Queryset de dicionários só com as colunas dos campos pedidos."""
+        simples, expressoes = [], {}
+        for nome in campos:
+            coluna = self.campos[nome]
+            if coluna == nome:
+                simples.append(nome)
+            elif coluna is not None:
+                expressoes[nome] = F(coluna)
+        return self.base().values(*simples, **expressoes)
+
+    def completar(self, linhas, campos):
+        """Campos montados fora da consulta principal (uma consulta a mais por campo, não por linha)."""
+        for nome, completar in self.complementos.items():
+            if nome in campos and linhas:
+                completar(linhas)
+        return linhas
+
+
+ALUNOS = Recurso(
+    Aluno, AlunoForm,
+    campos={
+        'id': 'id', 'nome': 'nome', 'cpf': 'cpf', 'rg': 'rg', 'sexo': 'sexo',
+        'data_nascimento': 'data_nascimento', 'whatsapp': 'whatsapp', 'email': 'email',
+        'rua': 'rua', 'numero': 'numero', 'bairro': 'bairro', 'cidade': 'cidade', 'estado': 'estado',
+        'data_matricula': 'data_matricula', 'ativo': 'ativo', 'valor_mensalidade': 'valor_mensalidade',
+        'modalidades': None,
+        'ultimo_pagamento': 'ultimo_pagamento', 'proximo_vencimento': 'proximo_vencimento',
+        'faturas_vencidas': 'faturas_vencidas', 'total_vencido': 'total_vencido',
+        'atualizado_em': 'atualizado_em',
+    },
+    filtro_form=FiltroApiAlunosForm, filtrar=_filtrar_alunos,
+    complementos={'modalidades': _modalidades_dos_alunos},
+)
+
+MODALIDADES = Recurso(
+    Modalidade, ModalidadeForm,
+    campos={'id': 'id', 'nome': 'nome', 'valor_mensal': 'valor_mensal'},
+)
+
+PAGAMENTOS = Recurso(
+    Pagamento, PagamentoForm,
+    campos={
+        'id': 'id', 'aluno': 'aluno', 'aluno_nome': 'aluno__nome', 'valor': 'valor',
+        'data_pagamento': 'data_pagamento', 'data_vencimento': 'data_vencimento',
+        'metodo_pagamento': 'metodo_pagamento', 'pago': 'pago', 'observacao': 'observacao',
+        'referencia': 'referencia', 'status': 'status', 'dias_em_atraso': 'dias_em_atraso',
+        'atualizado_em': 'atualizado_em',
+    },
+    filtro_form=FiltroApiPagamentosForm, filtrar=_filtrar_pagamentos,
+    # Situação e dias em atraso calculados no banco (PagamentoQuerySet.with_status)
+    base=lambda: Pagamento.objects.with_status(),
+)
+
+RECURSOS = {'alunos': ALUNOS, 'modalidades': MODALIDADES, 'pagamentos': PAGAMENTOS}
+
+
+# ----------------------------------------------------------
+# Respostas
+# ----------------------------------------------------------
+
+def _json(dados, status=200):
+    return JsonResponse(dados, status=status, safe=False, json_dumps_params=PARAMETROS_JSON)
+
+
+def _erro(status, mensagem, detalhes=None):
+    dados = {'erro': mensagem}
+    if detalhes:
+        dados['detalhes'] = detalhes
+    return _json(dados, status)
+
+
+def endpoint(view):
+    """Autenticação por sessão com resposta 401 em JSON (sem redirecionar ao login) e ErroApi -> JSON."""
+    @wraps(view)
+    def envolver(request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return _erro(401, "Autenticação necessária.")
+        try:
+            return view(request, *args, **kwargs)
+        except ErroApi as e:
+            return _erro(e.status, e.mensagem, e.detalhes)
+    return ensure_csrf_cookie(envolver)
+
+
+def _limite(parametro, padrao=LIMITE_PADRAO, maximo=LIMITE_MAXIMO):
+    if not parametro:
+        return padrao
+    try:
+        limite = int(parametro)
+    except ValueError:
+        raise ErroApi(400, "O limite deve ser um número inteiro.")
+    return max(1, min(limite, maximo))
+
+
+def _corpo(request):
+    try:
+        dados = json.loads(request.body or b'{}')
+    except (ValueError, UnicodeDecodeError):
+        raise ErroApi(400, "Corpo da requisição não é um JSON válido.")
+    if not isinstance(dados, dict):
+        raise ErroApi(400, "O corpo deve ser um objeto JSON.")
+    return dados
+
+
+def _valor_atual(instancia, nome):
+    """Valor do campo no formato aceito pelo formulário (ids em relações)."""
+    campo = instancia._meta.get_field(nome)
+    if campo.many_to_many:
+        return list(getattr(instancia, nome).values_list('pk', flat=True))
+    if campo.is_relation:
+        return getattr(instancia, campo.attname)
+    return getattr(instancia, nome)
+
+
+def _formulario(recurso, dados, instancia=None, parcial=False):
+    form_class = recurso.form
+    if parcial:
+        # PATCH: só os campos enviados; os declarados no formulário (sempre presentes)
+        # e não enviados mantêm o valor atual
+        campos = [nome for nome in form_class._meta.fields if nome in dados]
+        form_class = modelform_factory(recurso.modelo, form=recurso.form, fields=campos)
+        dados = dict(dados)
+        for nome in recurso.form.declared_fields:
+            if nome not in dados and nome in form_class.base_fields:
+                dados[nome] = _valor_atual(instancia, nome)
+    return form_class(dados, instance=instancia)
+
+
+def _detalhe_serializado(recurso, pk, campos):
+    linhas = recurso.completar(list(recurso.queryset(campos).filter(pk=pk)), campos)
+    if not linhas:
+        raise ErroApi(404, "Registro não encontrado.")
+    return linhas[0]
+
+
+# ----------------------------------------------------------
+# Views
+# ----------------------------------------------------------
+
+@endpoint
+def lista(request, recurso):
+    recurso = RECURSOS[recurso]
+    if request.method == 'POST':
+        form = _formulario(recurso, _corpo(request))
+        if not form.is_valid():
+            raise ErroApi(400, "Dados inválidos.", form.errors.get_json_data())
+        objeto = form.save()
+        return _json(_detalhe_serializado(recurso, objeto.pk, list(recurso.campos)), status=201)
+    if request.method not in ('GET', 'HEAD'):
+        raise ErroApi(405, "Método não permitido.")
+
+    campos = recurso.escolher_campos(request.GET.get('fields'))
+    queryset = recurso.queryset(campos)
+    if recurso.filtro_form:
+        filtros = recurso.filtro_form(request.GET)
+        if not filtros.is_valid():
+            raise ErroApi(400, "Filtros inválidos.", filtros.errors.get_json_data())
+        queryset = recurso.filtrar(queryset, filtros.cleaned_data)
+
+    pagina = paginar(
+        queryset, ['pk'],
+        depois=request.GET.get('depois'), antes=request.GET.get('antes'),
+        tamanho=_limite(request.GET.get('limite')),
+    )
+    return _json({
+        'resultados': recurso.completar(pagina.objetos, campos),
+        'proximo': pagina.cursor_proximo,
+        'anterior': pagina.cursor_anterior,
+    })
+
+
+@endpoint
+def detalhe(request, recurso, pk):
+    recurso = RECURSOS[recurso]
+    if request.method in ('GET', 'HEAD'):
+        return _json(_detalhe_serializado(recurso, pk, recurso.escolher_campos(request.GET.get('fields'))))
+
+    instancia = recurso.modelo.objects.filter(pk=pk).first()
+    if instancia is None:
+        raise ErroApi(404, "Registro não encontrado.")
+
+    if request.method == 'DELETE':
+        if recurso.modelo is Aluno:
+            # Marcação e tarefa na mesma transação; os pagamentos saem depois, em lotes
+            with transaction.atomic():
+                agendar_exclusao(instancia)
+            return HttpResponse(status=202)
+        try:
+            instancia.delete()
+        except ProtectedError:
+            raise ErroApi(409, "Registro em uso por outros cadastros.")
+        return HttpResponse(status=204)
+    if request.method not in ('PUT', 'PATCH'):
+        raise ErroApi(405, "Método não permitido.")
+
+    form = _formulario(recurso, _corpo(request), instancia, parcial=request.method == 'PATCH')
+    if not form.is_valid():
+        raise ErroApi(400, "Dados inválidos.", form.errors.get_json_data())
+    form.save()
+    return _json(_detalhe_serializado(recurso, pk, list(recurso.campos)))
+
+
+@endpoint
+def autocomplete_alunos(request):
+    """
+    Sugestões para o campo de aluno (AutocompleteAlunoWidget): os primeiros
+    alunos ativos cujas palavras começam pelo que foi digitado, pelo índice de
+    busca. Uma consulta, qualquer que seja o número de alunos.
+    """
+    if request.method not in ('GET', 'HEAD'):
+        raise ErroApi(405, "Método não permitido.")
+    limite = _limite(request.GET.get('limite'), LIMITE_SUGESTOES, LIMITE_MAXIMO_SUGESTOES)
+    sugestoes = sugerir_alunos(request.GET.get('q', ''), limite)
+    resposta = _json({'resultados': [{'id': pk, 'nome': nome} for pk, nome in sugestoes]})
+    resposta['Cache-Control'] = CACHE_CONTROL_SUGESTOES
+    return resposta
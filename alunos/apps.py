@@ -4,3 +4,10 @@ from django.apps import AppConfig
 class AlunosConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'alunos'
+
+    def ready(self):
+        # Registra os receivers de sinais (invalidação de cache etc.)
+        from django.db.models.signals import post_migrate
+        from . import signals
+
+        post_migrate.connect(signals.garantir_triggers_apos_migrate, sender=self)
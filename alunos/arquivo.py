@@ -0,0 +1,241 @@
+# alunos/arquivo.py
+
+"""
+Arquivo de dados frios: tira das tabelas principais o que as telas do dia a
+dia não usam mais, para que índices e varreduras fiquem do tamanho da
+academia de hoje e não do seu passado.
+
+- Pagamentos quitados com data de pagamento anterior a `anos` atrás vão para
+  `alunos_pagamentoarquivado`. O último pagamento quitado de cada aluno fica
+  (é o `ultimo_pagamento` da situação financeira).
+- Alunos inativos sem movimento há `anos` (sem pagamentos recentes nem
+  faturas em aberto) vão para `alunos_alunoarquivado`, com todos os seus
+  pagamentos.
+- Excluir um aluno não apaga mais os pagamentos dentro da requisição: o aluno
+  é desativado e marcado (`exclusao_agendada_em`), e os pagamentos são
+  apagados em lotes pela fila de tarefas (alunos/tarefas.py).
+
+Tudo é feito em lotes, cada um na sua própria transação, com INSERT em lote
+no arquivo e DELETE direto (exclusao_direta.py: sem carregar as linhas nem
+disparar os sinais de Pagamento) nas tabelas principais. O resumo mensal acompanha pelos triggers
+e passa a contar só os pagamentos não arquivados; o histórico soma o arquivo
+quando pedido (ver alunos/historico.py).
+"""
+
+from datetime import date, datetime, time
+
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Q
+from django.utils import timezone
+
+from . import auditoria
+from .cache import invalidar
+from .exclusao_direta import apagar
+from .models import Aluno, AlunoArquivado, Lembrete, Pagamento, PagamentoArquivado
+from .tarefas import PRIORIDADE_BAIXA, enfileirar, tarefa
+
+ANOS_PAGAMENTOS = 5
+ANOS_ALUNOS = 2
+TAMANHO_LOTE = 1000
+# Cada aluno leva todos os pagamentos junto: lotes menores
+TAMANHO_LOTE_ALUNOS = 100
+
+CAMPOS_PAGAMENTO = [
+    'id', 'aluno_id', 'valor', 'data_pagamento', 'data_vencimento', 'metodo_pagamento',
+    'pago', 'observacao', 'referencia', 'atualizado_em',
+]
+CAMPOS_ALUNO = [
+    'id', 'nome', 'rg', 'cpf', 'sexo', 'data_nascimento', 'whatsapp', 'email', 'rua', 'numero',
+    'bairro', 'cidade', 'estado', 'foto', 'data_matricula', 'valor_mensalidade', 'ultimo_pagamento',
+    'atualizado_em',
+]
+
+
+class ResultadoArquivo:
+    """Resumo de uma execução do arquivamento."""
+
+    def __init__(self):
+        self.pagamentos = 0
+        self.alunos = 0
+        self.pagamentos_de_alunos = 0
+        self.exclusoes = 0
+
+    def __str__(self):
+        return (
+            f"{self.pagamentos} pagamento(s) antigo(s) arquivado(s); "
+            f"{self.alunos} aluno(s) inativo(s) arquivado(s) com {self.pagamentos_de_alunos} pagamento(s); "
+            f"{self.exclusoes} exclusão(ões) pendente(s) concluída(s)"
+        )
+
+
+def data_corte(anos, hoje=None):
+    """A mesma data `anos` atrás (29/02 vira 28/02)."""
+    hoje = hoje or date.today()
+    try:
+        return hoje.replace(year=hoje.year - anos)
+    except ValueError:
+        return hoje.replace(year=hoje.year - anos, day=28)
+
+
+def _copiar_pagamentos(linhas, agora):
+    PagamentoArquivado.objects.bulk_create([
+        PagamentoArquivado(aluno_nome=linha.pop('aluno__nome'), arquivado_em=agora, **linha)
+        for linha in linhas
+    ])
+
+
+# ----------------------------------------------------------
+# Pagamentos antigos
+# ----------------------------------------------------------
+
+def pagamentos_arquivaveis(corte):
+    """Quitados antes do corte, exceto o pagamento mais recente de cada aluno."""
+    mais_recente = Pagamento.objects.filter(aluno_id=OuterRef('aluno_id'), pago=True).filter(
+        Q(data_pagamento__gt=OuterRef('data_pagamento'))
+        | Q(data_pagamento=OuterRef('data_pagamento'), pk__gt=OuterRef('pk'))
+    )
+    return Pagamento.objects.filter(pago=True, data_pagamento__lt=corte).filter(Exists(mais_recente))
+
+
+def arquivar_pagamentos(anos=ANOS_PAGAMENTOS, hoje=None, tamanho_lote=TAMANHO_LOTE):
+    """Move os pagamentos quitados mais antigos que `anos` para o arquivo. Devolve a quantidade."""
+    arquivaveis = pagamentos_arquivaveis(data_corte(anos, hoje)).order_by('pk')
+    total = ultimo_pk = 0
+    while True:
+        with transaction.atomic():
+            # Lido dentro da transação: nada muda entre a cópia e o DELETE
+            lote = list(arquivaveis.filter(pk__gt=ultimo_pk).values(*CAMPOS_PAGAMENTO, 'aluno__nome')[:tamanho_lote])
+            if not lote:
+                break
+            ultimo_pk = lote[-1]['id']
+            _copiar_pagamentos(lote, timezone.now())
+            apagar(Pagamento, 'id', [linha['id'] for linha in lote])
+        total += len(lote)
+    if total:
+        invalidar('pagamentos')
+    return total
+
+
+# ----------------------------------------------------------
+# Alunos inativos
+# ----------------------------------------------------------
+
+def alunos_arquivaveis(corte):
+    """Inativos sem alteração, sem pagamento e sem fatura em aberto desde o corte."""
+    corte_hora = timezone.make_aware(datetime.combine(corte, time.min))
+    pagamentos = Pagamento.objects.filter(aluno_id=OuterRef('pk'))
+    return (
+        Aluno.objects.filter(ativo=False, exclusao_agendada_em=None, atualizado_em__lt=corte_hora)
+        .exclude(Exists(pagamentos.filter(pago=False)))
+        .exclude(Exists(pagamentos.filter(Q(data_pagamento__gte=corte) | Q(data_vencimento__gte=corte))))
+    )
+
+
+def _apagar_alunos(pks):
+    """
+    Apaga os alunos e tudo que aponta para eles, na ordem que o CASCADE faria:
+    pagamentos, lembretes e matrículas (as únicas relações com Aluno). Nova
+    ForeignKey para Aluno precisa entrar aqui.
+    """
+    apagar(Pagamento, 'aluno', pks)
+    apagar(Lembrete, 'aluno', pks)
+    apagar(Aluno.modalidades.through, 'aluno', pks)
+    return apagar(Aluno, 'id', pks)
+
+
+def arquivar_alunos(anos=ANOS_ALUNOS, hoje=None, tamanho_lote=TAMANHO_LOTE_ALUNOS):
+    """Move os alunos inativos há mais de `anos`, com os pagamentos, para o arquivo. Devolve (alunos, pagamentos)."""
+    arquivaveis = alunos_arquivaveis(data_corte(anos, hoje)).order_by('pk')
+    alunos = pagamentos = ultimo_pk = 0
+    while True:
+        with transaction.atomic():
+            lote = list(arquivaveis.filter(pk__gt=ultimo_pk).values(*CAMPOS_ALUNO)[:tamanho_lote])
+            if not lote:
+                break
+            ultimo_pk = lote[-1]['id']
+            pks = [linha['id'] for linha in lote]
+            agora = timezone.now()
+
+            modalidades = {}
+            matriculas = (
+                Aluno.modalidades.through.objects.filter(aluno_id__in=pks)
+                .order_by('modalidade__nome').values_list('aluno_id', 'modalidade__nome')
+            )
+            for aluno_id, nome in matriculas:
+                modalidades.setdefault(aluno_id, []).append(nome)
+            AlunoArquivado.objects.bulk_create([
+                AlunoArquivado(modalidades=modalidades.get(linha['id'], []), arquivado_em=agora,
+                               **{**linha, 'foto': linha['foto'] or ''})
+                for linha in lote
+            ])
+
+            do_lote = list(Pagamento.objects.filter(aluno_id__in=pks).order_by('pk').values(*CAMPOS_PAGAMENTO, 'aluno__nome'))
+            _copiar_pagamentos(do_lote, agora)
+            _apagar_alunos(pks)
+        alunos += len(lote)
+        pagamentos += len(do_lote)
+    if alunos:
+        invalidar('alunos')
+        invalidar('pagamentos')
+    return alunos, pagamentos
+
+
+# ----------------------------------------------------------
+# Exclusão em segundo plano
+# ----------------------------------------------------------
+
+def excluir_em_lotes(pk, tamanho_lote=TAMANHO_LOTE):
+    """
+    Apaga os pagamentos de um aluno com exclusão agendada, um lote por
+    transação, e depois o próprio aluno. Pode ser repetida (retoma de onde parou).
+    """
+    if not Aluno.objects.filter(pk=pk).exclude(exclusao_agendada_em=None).exists():
+        return False
+    pagamentos = Pagamento.objects.filter(aluno_id=pk)
+    while True:
+        with transaction.atomic():
+            # Valores completos para a auditoria na mesma leitura que escolhe o lote
+            lote = list(pagamentos.order_by('pk').values('pk', *Pagamento.campos_auditados)[:tamanho_lote])
+            if not lote:
+                break
+            apagar(Pagamento, 'id', [linha['pk'] for linha in lote])
+            auditoria.registrar_exclusoes(Pagamento, lote, auditoria.ORIGEM_EXCLUSAO)
+    with transaction.atomic():
+        # Pagamento lançado depois da marcação (ex: pela API) sai junto
+        excluido = _apagar_alunos([pk]) > 0
+    invalidar('pagamentos')
+    invalidar('alunos')
+    return excluido
+
+
+@tarefa(prioridade=PRIORIDADE_BAIXA)
+def excluir_aluno(pk):
+    """Tarefa da fila pedida por agendar_exclusao (a auditoria leva o usuário que pediu)."""
+    return excluir_em_lotes(pk)
+
+
+def agendar_exclusao(aluno):
+    """
+    Desativa e marca o aluno na transação atual e coloca a exclusão em lotes
+    na fila de tarefas, gravada na mesma transação.
+    """
+    agora = timezone.now()
+    Aluno.objects.filter(pk=aluno.pk).update(ativo=False, exclusao_agendada_em=agora, atualizado_em=agora)
+    invalidar('alunos')
+    auditoria.ao_excluir(aluno)
+    enfileirar(excluir_aluno, pk=aluno.pk, chave=f'exclusao:{aluno.pk}')
+
+
+def retomar_exclusoes():
+    """Conclui as exclusões interrompidas (ex: o servidor reiniciou no meio). Devolve quantas."""
+    pendentes = Aluno.objects.exclude(exclusao_agendada_em=None).order_by('pk').values_list('pk', flat=True)
+    return sum(excluir_em_lotes(pk) for pk in list(pendentes))
+
+
+def arquivar(anos_pagamentos=ANOS_PAGAMENTOS, anos_alunos=ANOS_ALUNOS, hoje=None):
+    """Rotina completa (comando `arquivar`): exclusões pendentes, alunos inativos e pagamentos antigos."""
+    resultado = ResultadoArquivo()
+    resultado.exclusoes = retomar_exclusoes()
+    resultado.alunos, resultado.pagamentos_de_alunos = arquivar_alunos(anos_alunos, hoje)
+    resultado.pagamentos = arquivar_pagamentos(anos_pagamentos, hoje)
+    return resultado
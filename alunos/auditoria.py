@@ -0,0 +1,221 @@
+# alunos/auditoria.py
+
+"""
+Trilha de auditoria de alunos e pagamentos: quem criou, alterou ou excluiu
+o quê, campo a campo, e quando (RegistroAuditoria).
+
+Auditar não acrescenta consultas às gravações:
+- os valores anteriores vêm da própria leitura do objeto (`from_db` guarda os
+  campos auditados, ver models.guardar_originais); as operações em lote
+  aproveitam a consulta que já fazem antes do UPDATE/DELETE;
+- os registros ficam em memória e só entram na fila depois do commit da
+  transação que fez a alteração (transação desfeita não deixa registro);
+- a fila é gravada com um único INSERT em lote no fim da requisição
+  (AuditoriaMiddleware) ou do bloco `agrupar()` (tarefas em segundo plano).
+  Fora disso, cada transação grava os seus registros de uma vez.
+"""
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import partial
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.db import transaction
+from django.db.models.fields.files import FieldFile
+from django.utils import timezone
+
+from .models import AUDITORIA_ALTERACAO, AUDITORIA_CRIACAO, AUDITORIA_EXCLUSAO, RegistroAuditoria
+
+ORIGEM_LOTE = 'lote'
+ORIGEM_COBRANCA = 'cobranca'
+ORIGEM_IMPORTACAO = 'importacao'
+ORIGEM_EXCLUSAO = 'exclusao'
+
+_fila_atual = ContextVar('fila_auditoria', default=None)
+
+
+class Fila:
+    """Registros confirmados (transação já commitada) esperando o INSERT em lote."""
+
+    def __init__(self, usuario_id=None, request=None):
+        self.registros = []
+        self._usuario_id = usuario_id
+        self._request = request
+
+    @property
+    def usuario_id(self):
+        if self._request is not None:
+            # Só na primeira alteração: requisições que não gravam nada não carregam o usuário por isso
+            usuario = getattr(self._request, 'user', None)
+            self._usuario_id = usuario.pk if usuario is not None and usuario.is_authenticated else None
+            self._request = None
+        return self._usuario_id
+
+    def gravar(self):
+        registros, self.registros = self.registros, []
+        gravar(registros)
+
+
+def gravar(registros):
+    if registros:
+        # O Django divide em INSERTs de até 999 parâmetros (limite do SQLite)
+        RegistroAuditoria.objects.bulk_create(registros)
+
+
+def usuario_atual():
+    fila = _fila_atual.get()
+    return fila.usuario_id if fila is not None else None
+
+
+@contextmanager
+def agrupar(usuario_id=None):
+    """Acumula os registros do bloco e grava todos com um INSERT em lote na saída."""
+    fila = Fila(usuario_id)
+    token = _fila_atual.set(fila)
+    try:
+        yield fila
+    finally:
+        _fila_atual.reset(token)
+        fila.gravar()
+
+
+def _confirmar(registros):
+    # Roda depois do commit, no mesmo contexto (e thread) que gravou
+    fila = _fila_atual.get()
+    if fila is None:
+        gravar(registros)
+    else:
+        fila.registros.extend(registros)
+
+
+def registrar(registros):
+    """Enfileira RegistroAuditoria (não salvos) para depois do commit da transação atual."""
+    if not registros:
+        return
+    usuario_id = usuario_atual()
+    agora = timezone.now()
+    for registro in registros:
+        registro.criado_em = agora
+        if registro.usuario_id is None:
+            registro.usuario_id = usuario_id
+    # Fora de transação o callback roda na hora
+    transaction.on_commit(partial(_confirmar, registros))
+
+
+# ----------------------------------------------------------
+# Diferenças
+# ----------------------------------------------------------
+
+def _normalizar(valor):
+    # A foto chega como texto do banco ou como FieldFile depois de acessada
+    return valor.name if isinstance(valor, FieldFile) else valor
+
+
+def _comparavel(valor):
+    # Os formulários gravam '' onde o banco tinha NULL (observação, e-mail etc.): não é alteração
+    valor = _normalizar(valor)
+    return None if valor == '' else valor
+
+
+def valores(instancia):
+    """Valores atuais dos campos auditados carregados na instância."""
+    return {
+        campo: _normalizar(instancia.__dict__[campo])
+        for campo in instancia.campos_auditados if campo in instancia.__dict__
+    }
+
+
+def _registro(modelo, pk, acao, alteracoes, origem=''):
+    return RegistroAuditoria(
+        modelo=modelo._meta.model_name, objeto_id=pk, acao=acao, alteracoes=alteracoes, origem=origem,
+    )
+
+
+def _diferencas(antes, depois):
+    return {
+        campo: [_normalizar(antes.get(campo)), valor] for campo, valor in depois.items()
+        if campo not in antes or _comparavel(antes[campo]) != _comparavel(valor)
+    }
+
+
+def ao_salvar(instancia, criado, update_fields=None):
+    """post_save de Aluno e Pagamento."""
+    atuais = valores(instancia)
+    if update_fields is not None:
+        gravados = {instancia._meta.get_field(nome).attname for nome in update_fields}
+        atuais = {campo: valor for campo, valor in atuais.items() if campo in gravados}
+    if criado:
+        acao, alteracoes = AUDITORIA_CRIACAO, {campo: [None, valor] for campo, valor in atuais.items()}
+    else:
+        # Objeto montado sem vir do banco: sem valores anteriores, registra todos os campos
+        acao, alteracoes = AUDITORIA_ALTERACAO, _diferencas(getattr(instancia, '_originais', {}), atuais)
+    instancia._originais = {**getattr(instancia, '_originais', {}), **atuais}
+    if alteracoes:
+        registrar([_registro(type(instancia), instancia.pk, acao, alteracoes)])
+
+
+def ao_excluir(instancia, origem=''):
+    """post_delete de Aluno e Pagamento (também nas exclusões em cascata)."""
+    alteracoes = {campo: [valor, None] for campo, valor in valores(instancia).items()}
+    registrar([_registro(type(instancia), instancia.pk, AUDITORIA_EXCLUSAO, alteracoes, origem)])
+
+
+# Operações em lote: `linhas` são dicts de .values('pk', *campos_auditados)
+
+def registrar_criacoes(modelo, linhas, origem):
+    registrar([
+        _registro(modelo, linha.pop('pk'), AUDITORIA_CRIACAO,
+                  {campo: [None, _normalizar(valor)] for campo, valor in linha.items()}, origem)
+        for linha in map(dict, linhas)
+    ])
+
+
+def registrar_alteracoes(modelo, linhas, novos, origem):
+    """Um registro por linha em que algum dos `novos` valores muda alguma coisa."""
+    registros = []
+    for linha in linhas:
+        alteracoes = _diferencas(linha, novos)
+        if alteracoes:
+            registros.append(_registro(modelo, linha['pk'], AUDITORIA_ALTERACAO, alteracoes, origem))
+    registrar(registros)
+
+
+def registrar_exclusoes(modelo, linhas, origem):
+    registrar([
+        _registro(modelo, linha.pop('pk'), AUDITORIA_EXCLUSAO,
+                  {campo: [_normalizar(valor), None] for campo, valor in linha.items()}, origem)
+        for linha in map(dict, linhas)
+    ])
+
+
+class AuditoriaMiddleware:
+    """Grava os registros da requisição de uma vez, no fim. Depois do AuthenticationMiddleware."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        fila = Fila(request=request)
+        token = _fila_atual.set(fila)
+        try:
+            return self.get_response(request)
+        finally:
+            _fila_atual.reset(token)
+            fila.gravar()
+
+    async def __acall__(self, request):
+        fila = Fila(request=request)
+        token = _fila_atual.set(fila)
+        try:
+            return await self.get_response(request)
+        finally:
+            _fila_atual.reset(token)
+            if fila.registros:
+                await sync_to_async(fila.gravar)()
@@ -0,0 +1,172 @@
+# alunos/busca.py
+
+"""
+Busca textual de alunos com índice FTS5 do SQLite.
+
+A tabela virtual `alunos_aluno_busca` indexa nome, cpf, rg, whatsapp e bairro
+de `alunos_aluno` (tabela de conteúdo externo: o FTS guarda só o índice).
+O tokenizador `unicode61 remove_diacritics 2` remove acentos, então "joao"
+encontra "João". Triggers no banco mantêm o índice em dia em qualquer escrita,
+inclusive bulk_create e update().
+
+Em outros bancos (sem FTS5) a busca volta para o icontains em nome/CPF.
+"""
+
+import re
+import unicodedata
+
+from django.db import connection
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+TABELA_BUSCA = 'alunos_aluno_busca'
+TABELA_ALUNO = 'alunos_aluno'
+COLUNAS_BUSCA = ['nome', 'cpf', 'rg', 'whatsapp', 'bairro']
+
+_colunas = ', '.join(COLUNAS_BUSCA)
+_novos = ', '.join(f'new.{c}' for c in COLUNAS_BUSCA)
+_antigos = ', '.join(f'old.{c}' for c in COLUNAS_BUSCA)
+
+SQL_TABELA = (
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {TABELA_BUSCA} USING fts5("
+    f"{_colunas}, content='{TABELA_ALUNO}', content_rowid='id', "
+    f"tokenize='unicode61 remove_diacritics 2')"
+)
+
+# Com conteúdo externo, remover uma linha do índice exige os valores antigos
+SQL_TRIGGERS = {
+    f'{TABELA_BUSCA}_ai': (
+        f"CREATE TRIGGER IF NOT EXISTS {TABELA_BUSCA}_ai AFTER INSERT ON {TABELA_ALUNO} BEGIN "
+        f"INSERT INTO {TABELA_BUSCA}(rowid, {_colunas}) VALUES (new.id, {_novos}); END"
+    ),
+    f'{TABELA_BUSCA}_ad': (
+        f"CREATE TRIGGER IF NOT EXISTS {TABELA_BUSCA}_ad AFTER DELETE ON {TABELA_ALUNO} BEGIN "
+        f"INSERT INTO {TABELA_BUSCA}({TABELA_BUSCA}, rowid, {_colunas}) VALUES ('delete', old.id, {_antigos}); END"
+    ),
+    f'{TABELA_BUSCA}_au': (
+        f"CREATE TRIGGER IF NOT EXISTS {TABELA_BUSCA}_au AFTER UPDATE OF {_colunas} ON {TABELA_ALUNO} BEGIN "
+        f"INSERT INTO {TABELA_BUSCA}({TABELA_BUSCA}, rowid, {_colunas}) VALUES ('delete', old.id, {_antigos}); "
+        f"INSERT INTO {TABELA_BUSCA}(rowid, {_colunas}) VALUES (new.id, {_novos}); END"
+    ),
+}
+
+
+def busca_disponivel(conexao=None):
+    return (conexao or connection).vendor == 'sqlite'
+
+
+def garantir_indice_busca(conexao=None):
+    """
+    Cria a tabela FTS e os triggers se estiverem faltando e reconstrói o índice
+    quando algum trigger precisou ser recriado.
+
+    O SQLite descarta os triggers quando o Django recria `alunos_aluno` numa
+    migração (ex: AddField com default), por isso isto roda após cada migrate.
+    """
+    conexao = conexao or connection
+    if not busca_disponivel(conexao):
+        return
+    with conexao.cursor() as cursor:
+        cursor.execute(
+            "SELECT name FROM sqlite_master WHERE type IN ('table', 'trigger') AND name IN (%s, %s, %s, %s)",
+            [TABELA_BUSCA, *SQL_TRIGGERS],
+        )
+        existentes = {linha[0] for linha in cursor.fetchall()}
+        if existentes == {TABELA_BUSCA, *SQL_TRIGGERS}:
+            return
+        cursor.execute(SQL_TABELA)
+        for sql in SQL_TRIGGERS.values():
+            cursor.execute(sql)
+        cursor.execute(f"INSERT INTO {TABELA_BUSCA}({TABELA_BUSCA}) VALUES ('rebuild')")
+
+
+def remover_indice_busca(conexao=None):
+    conexao = conexao or connection
+    if not busca_disponivel(conexao):
+        return
+    with conexao.cursor() as cursor:
+        for nome in SQL_TRIGGERS:
+            cursor.execute(f'DROP TRIGGER IF EXISTS {nome}')
+        cursor.execute(f'DROP TABLE IF EXISTS {TABELA_BUSCA}')
+
+
+def normalizar(texto):
+    """Minúsculas e sem acentos ("João" -> "joao")."""
+    decomposto = unicodedata.normalize('NFKD', texto or '')
+    return ''.join(c for c in decomposto if not unicodedata.combining(c)).lower()
+
+
+def montar_consulta(termo):
+    """
+    Converte o texto digitado em uma expressão FTS5 segura: cada palavra vira
+    um prefixo entre aspas ("jo"* "silv"*) e todas precisam aparecer.
+    Pontuação é descartada, então CPF com ou sem máscara funciona igual.
+    """
+    termo = normalizar(termo)
+    # CPF/telefone digitados com máscara viram um único número
+    termo = re.sub(r'(?<=\d)[.\-/()](?=\d)', '', termo)
+    palavras = re.findall(r'\w+', termo)
+    return ' '.join(f'"{p}"*' for p in palavras)
+
+
+def filtrar_alunos(queryset, termo):
+    """Restringe o queryset aos alunos que casam com o termo (ordem do queryset mantida)."""
+    consulta = montar_consulta(termo)
+    if not consulta:
+        return queryset
+    if not busca_disponivel():
+        return queryset.filter(Q(nome__icontains=termo) | Q(cpf__icontains=termo))
+    return queryset.filter(pk__in=RawSQL(
+        f'SELECT rowid FROM {TABELA_BUSCA} WHERE {TABELA_BUSCA} MATCH %s', [consulta]
+    ))
+
+
+def buscar_alunos(termo, limite=20, apenas_ativos=True):
+    """Lista de alunos ordenada por relevância (bm25) para o termo."""
+    from .models import Aluno
+
+    consulta = montar_consulta(termo)
+    if not consulta:
+        return []
+    alunos = Aluno.objects.filter(ativo=True) if apenas_ativos else Aluno.objects.all()
+    if not busca_disponivel():
+        return list(filtrar_alunos(alunos, termo)[:limite])
+
+    filtro_ativo = f'AND {TABELA_ALUNO}.ativo' if apenas_ativos else ''
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'SELECT {TABELA_BUSCA}.rowid FROM {TABELA_BUSCA} '
+            f'JOIN {TABELA_ALUNO} ON {TABELA_ALUNO}.id = {TABELA_BUSCA}.rowid '
+            f'WHERE {TABELA_BUSCA} MATCH %s {filtro_ativo} ORDER BY {TABELA_BUSCA}.rank LIMIT %s',
+            [consulta, limite],
+        )
+        ids = [linha[0] for linha in cursor.fetchall()]
+    por_id = alunos.in_bulk(ids)
+    return [por_id[i] for i in ids if i in por_id]
+
+
+def sugerir_alunos(termo, limite=10, apenas_ativos=True):
+    """
+    Pares (id, nome) para o autocomplete, numa única consulta ao índice: cada
+    palavra digitada é um prefixo, sem diferenciar acentos. Ordem por
+    relevância e, no empate, por nome.
+    """
+    from .models import Aluno
+
+    consulta = montar_consulta(termo)
+    if not consulta:
+        return []
+    alunos = Aluno.objects.filter(ativo=True) if apenas_ativos else Aluno.objects.all()
+    if not busca_disponivel():
+        return list(filtrar_alunos(alunos, termo).order_by('nome').values_list('pk', 'nome')[:limite])
+
+    filtro_ativo = f'AND {TABELA_ALUNO}.ativo' if apenas_ativos else ''
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'SELECT {TABELA_ALUNO}.id, {TABELA_ALUNO}.nome FROM {TABELA_BUSCA} '
+            f'JOIN {TABELA_ALUNO} ON {TABELA_ALUNO}.id = {TABELA_BUSCA}.rowid '
+            f'WHERE {TABELA_BUSCA} MATCH %s {filtro_ativo} '
+            f'ORDER BY {TABELA_BUSCA}.rank, {TABELA_ALUNO}.nome LIMIT %s',
+            [consulta, limite],
+        )
+        return cursor.fetchall()
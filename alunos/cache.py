@@ -0,0 +1,46 @@
+# alunos/cache.py
+
+"""
+Chaves de cache versionadas por grupo de dados.
+
+Cada grupo ('pagamentos', 'alunos', ...) tem um número de versão guardado no
+cache. As chaves derivadas incluem essa versão, então invalidar o grupo é só
+incrementar o número: as entradas antigas deixam de ser lidas e expiram sozinhas.
+"""
+
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+
+
+def _chave_versao(grupo):
+    return f'versao:{grupo}'
+
+
+def versao(grupo):
+    """Versão atual do grupo. Começa em um valor baseado no relógio para que um
+    cache reiniciado nunca reutilize uma versão antiga."""
+    chave = _chave_versao(grupo)
+    atual = cache.get(chave)
+    if atual is None:
+        cache.add(chave, int(time.time() * 1000), timeout=None)
+        atual = cache.get(chave)
+    return atual
+
+
+def chave(grupo, *partes):
+    """Monta a chave de cache de um valor derivado do grupo."""
+    return ':'.join([grupo, f'v{versao(grupo)}', *(str(p) for p in partes)])
+
+
+def invalidar(grupo):
+    """Descarta todos os valores do grupo após o commit da transação atual."""
+    def _incrementar():
+        try:
+            cache.incr(_chave_versao(grupo))
+        except ValueError:
+            # Versão ainda não existia (ou expirou): qualquer valor novo serve
+            versao(grupo)
+
+    transaction.on_commit(_incrementar)
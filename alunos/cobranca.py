@@ -0,0 +1,153 @@
+# alunos/cobranca.py
+
+"""
+Cobrança mensal automática.
+
+Gera, para um mês de referência, uma mensalidade em aberto (`Pagamento` com
+pago=False) para cada aluno ativo. O valor vem do próprio aluno
+(`Aluno.valor_mensalidade`) ou, se estiver vazio, da soma das mensalidades das
+suas modalidades (`Modalidade.valor_mensal`).
+
+Pode ser executada várias vezes para o mesmo mês: a restrição única
+(aluno, referencia) impede duplicidade, e os alunos já cobrados nem chegam a
+ser lidos. A gravação é feita em lotes com bulk_create, cada lote na sua
+própria transação, para segurar o lock de escrita do SQLite só por instantes.
+"""
+
+import calendar
+from datetime import date
+
+from django.db import transaction
+from django.db.models import Count, Exists, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+from . import auditoria
+from .cache import invalidar
+from .models import Aluno, Pagamento
+from .situacao import atualizar_situacao
+from .tarefas import tarefa
+
+TAMANHO_LOTE = 1000
+DIA_VENCIMENTO_PADRAO = 10
+METODO_PADRAO = 'PIX'
+
+
+class ResultadoCobranca:
+    """Resumo de uma execução da cobrança."""
+
+    def __init__(self, referencia):
+        self.referencia = referencia
+        self.criadas = 0
+        self.valor_total = 0
+        self.sem_valor = []  # pks dos alunos sem preço definido (não cobrados)
+
+    def __str__(self):
+        texto = f"{self.criadas} mensalidade(s) de {self.referencia:%m/%Y} gerada(s), total R$ {self.valor_total:.2f}"
+        if self.sem_valor:
+            texto += f"; {len(self.sem_valor)} aluno(s) sem valor de mensalidade definido"
+        return texto
+
+
+def mes_referencia(data):
+    """Primeiro dia do mês da data (valor gravado em `Pagamento.referencia`)."""
+    return date(data.year, data.month, 1)
+
+
+def data_vencimento(referencia, dia=DIA_VENCIMENTO_PADRAO):
+    """Vencimento no dia pedido, limitado ao último dia do mês (ex: 31 -> 28/02)."""
+    ultimo_dia = calendar.monthrange(referencia.year, referencia.month)[1]
+    return referencia.replace(day=min(dia, ultimo_dia))
+
+
+def alunos_a_cobrar(referencia, alunos=None):
+    """
+    Alunos ativos ainda sem mensalidade no mês, com o valor já calculado pelo
+    banco: (pk, valor). O valor das modalidades vem de uma subconsulta para não
+    multiplicar linhas caso o queryset de origem já tenha JOINs. Sem mensalidade
+    própria, basta uma modalidade sem preço para o valor ficar None (sem valor),
+    em vez de cobrar só a parte com preço.
+    """
+    alunos = Aluno.objects.all() if alunos is None else alunos
+    Matricula = Aluno.modalidades.through
+    valor_modalidades = (
+        Matricula.objects.filter(aluno_id=OuterRef('pk'))
+        .values('aluno_id')
+        .annotate(soma=Sum('modalidade__valor_mensal'),
+                  sem_preco=Count('pk', filter=Q(modalidade__valor_mensal=None)))
+        .filter(sem_preco=0)
+        .values('soma')
+    )
+    ja_cobrados = Pagamento.objects.filter(aluno_id=OuterRef('pk'), referencia=referencia)
+    return (
+        alunos.filter(ativo=True)
+        .exclude(Exists(ja_cobrados))
+        .annotate(valor_cobranca=Coalesce('valor_mensalidade', Subquery(valor_modalidades)))
+        .order_by('pk')
+        .values_list('pk', 'valor_cobranca')
+    )
+
+
+def gerar_cobrancas(mes, alunos=None, dia=DIA_VENCIMENTO_PADRAO, metodo=METODO_PADRAO,
+                    tamanho_lote=TAMANHO_LOTE):
+    """
+    Gera as mensalidades do mês de `mes` (qualquer data do mês) para os alunos
+    ativos (ou só para o queryset `alunos`). Devolve um ResultadoCobranca.
+    """
+    referencia = mes_referencia(mes)
+    vencimento = data_vencimento(referencia, dia)
+    observacao = f"Mensalidade {referencia:%m/%Y}"
+    resultado = ResultadoCobranca(referencia)
+    pendentes = alunos_a_cobrar(referencia, alunos)
+
+    ultimo_pk = 0
+    while True:
+        # Leitura fora da transação: o lock de escrita só é pedido no INSERT
+        lote = list(pendentes.filter(pk__gt=ultimo_pk)[:tamanho_lote])
+        if not lote:
+            break
+        ultimo_pk = lote[-1][0]
+
+        novos = []
+        for pk, valor in lote:
+            if valor is None:
+                resultado.sem_valor.append(pk)
+                continue
+            novos.append(Pagamento(
+                aluno_id=pk, valor=valor, referencia=referencia,
+                data_vencimento=vencimento, metodo_pagamento=metodo,
+                pago=False, observacao=observacao,
+            ))
+        if not novos:
+            continue
+
+        do_lote = Pagamento.objects.filter(
+            referencia=referencia, aluno_id__gte=lote[0][0], aluno_id__lte=ultimo_pk,
+        )
+        with transaction.atomic():
+            antes = set(do_lote.values_list('pk', flat=True))
+            # ignore_conflicts cobre outra execução simultânea para o mesmo mês
+            Pagamento.objects.bulk_create(novos, ignore_conflicts=True)
+            # Com ignore_conflicts o bulk_create não devolve os ids: as criadas são as que não existiam antes
+            criadas = [
+                linha for linha in do_lote.values('pk', *Pagamento.campos_auditados)
+                if linha['pk'] not in antes
+            ]
+            # bulk_create não dispara os sinais: atualiza o próximo vencimento do lote de uma vez
+            atualizar_situacao([p.aluno_id for p in novos])
+            auditoria.registrar_criacoes(Pagamento, criadas, auditoria.ORIGEM_COBRANCA)
+        resultado.criadas += len(criadas)
+        # Só as criadas: as que outra execução já tinha gravado não entram no total
+        resultado.valor_total += sum(linha['valor'] for linha in criadas)
+
+    if resultado.criadas:
+        # bulk_create não dispara post_save: invalida os totais em cache aqui
+        invalidar('pagamentos')
+    return resultado
+
+
+@tarefa
+def gerar_cobrancas_do_mes(mes, alunos=None):
+    """Tarefa da fila: `mes` em ISO (AAAA-MM-DD); `alunos`, lista de pks (None: todos os ativos)."""
+    if alunos is not None:
+        alunos = Aluno.objects.filter(pk__in=alunos)
+    return gerar_cobrancas(date.fromisoformat(mes), alunos=alunos)
@@ -0,0 +1,172 @@
+# alunos/concorrencia.py
+
+"""
+Teste de estresse de leitura e escrita simultâneas no SQLite.
+
+Simula o balcão: threads "escritoras" registram pagamentos (cada uma numa
+transação que primeiro lê, para validar, e depois grava, como o formulário),
+enquanto threads "leitoras" somam o histórico. Cada thread abre a sua conexão
+com o backend sqlite3 do Django configurado pelo perfil escolhido
+(academia_manager/banco.py), num arquivo separado da base de verdade.
+Devolve operações por segundo e quantos "database is locked" apareceram.
+"""
+
+import os
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+
+from django.db import OperationalError
+from django.db.utils import ConnectionHandler
+
+from academia_manager import banco
+
+ESQUEMA = [
+    "CREATE TABLE IF NOT EXISTS pagamento ("
+    " id INTEGER PRIMARY KEY AUTOINCREMENT, aluno_id INTEGER NOT NULL,"
+    " valor DECIMAL NOT NULL, data_pagamento DATE NOT NULL, pago BOOL NOT NULL)",
+    "CREATE INDEX IF NOT EXISTS pagamento_data_idx ON pagamento (data_pagamento)",
+    "CREATE INDEX IF NOT EXISTS pagamento_aluno_idx ON pagamento (aluno_id)",
+]
+LINHAS_INICIAIS = 20000
+ALUNOS = 500
+
+
+class ResultadoEstresse:
+    def __init__(self, perfil, duracao):
+        self.perfil = perfil
+        self.duracao = duracao
+        self.leituras = 0
+        self.escritas = 0
+        self.bloqueios = 0  # "database is locked" / "database is busy"
+        self.outros_erros = []
+        self._lock = threading.Lock()
+
+    def somar(self, leituras=0, escritas=0, bloqueios=0):
+        with self._lock:
+            self.leituras += leituras
+            self.escritas += escritas
+            self.bloqueios += bloqueios
+
+    @property
+    def operacoes_por_segundo(self):
+        return (self.leituras + self.escritas) / self.duracao if self.duracao else 0
+
+    def __str__(self):
+        return (f"{self.perfil:<9} {self.leituras:>8} leituras {self.escritas:>7} escritas "
+                f"{self.operacoes_por_segundo:>9.1f} op/s {self.bloqueios:>5} bloqueios")
+
+
+def abrir_conexao(caminho, perfil):
+    """Conexão do Django com as opções do perfil (PRAGMAs, timeout, transaction_mode)."""
+    # Um ConnectionHandler próprio: não mexe nas conexões da aplicação
+    conexoes = ConnectionHandler({'default': banco.sqlite(caminho, perfil)})
+    wrapper = conexoes['default']
+    wrapper.ensure_connection()
+    return wrapper
+
+
+def _bloqueio(erro):
+    return 'locked' in str(erro) or 'busy' in str(erro)
+
+
+def preparar_arquivo(caminho, linhas=LINHAS_INICIAIS, seed=1):
+    aleatorio = random.Random(seed)
+    inicio = date.today() - timedelta(days=3 * 365)
+    with sqlite3.connect(caminho) as conexao:
+        for comando in ESQUEMA:
+            conexao.execute(comando)
+        conexao.executemany(
+            "INSERT INTO pagamento (aluno_id, valor, data_pagamento, pago) VALUES (?, ?, ?, ?)",
+            ((aleatorio.randint(1, ALUNOS), '120.00', inicio + timedelta(days=aleatorio.randint(0, 3 * 365)),
+              aleatorio.random() < 0.9) for _ in range(linhas)),
+        )
+    conexao.close()
+
+
+def _escritor(caminho, perfil, fim, resultado, seed):
+    aleatorio = random.Random(seed)
+    wrapper = abrir_conexao(caminho, perfil)
+    modo = wrapper.transaction_mode or 'DEFERRED'
+    escritas = bloqueios = 0
+    try:
+        with wrapper.cursor() as cursor:
+            while time.perf_counter() < fim:
+                aluno = aleatorio.randint(1, ALUNOS)
+                try:
+                    cursor.execute(f"BEGIN {modo}")
+                    # Validação do formulário: já existe pagamento deste aluno hoje?
+                    cursor.execute(
+                        "SELECT COUNT(*) FROM pagamento WHERE aluno_id = %s AND data_pagamento = %s",
+                        [aluno, date.today()],
+                    )
+                    cursor.fetchone()
+                    cursor.execute(
+                        "INSERT INTO pagamento (aluno_id, valor, data_pagamento, pago) VALUES (%s, %s, %s, %s)",
+                        [aluno, '120.00', date.today(), True],
+                    )
+                    cursor.execute("COMMIT")
+                    escritas += 1
+                except OperationalError as e:
+                    if wrapper.connection.in_transaction:
+                        cursor.execute("ROLLBACK")
+                    if not _bloqueio(e):
+                        raise
+                    bloqueios += 1
+    except Exception as e:
+        resultado.outros_erros.append(repr(e))
+    finally:
+        wrapper.close()
+        resultado.somar(escritas=escritas, bloqueios=bloqueios)
+
+
+def _leitor(caminho, perfil, fim, resultado, seed):
+    aleatorio = random.Random(seed)
+    wrapper = abrir_conexao(caminho, perfil)
+    leituras = bloqueios = 0
+    try:
+        with wrapper.cursor() as cursor:
+            while time.perf_counter() < fim:
+                # Totais de um mês do histórico
+                inicio = date.today() - timedelta(days=aleatorio.randint(0, 3 * 365))
+                try:
+                    cursor.execute(
+                        "SELECT pago, COUNT(*), SUM(valor) FROM pagamento "
+                        "WHERE data_pagamento BETWEEN %s AND %s GROUP BY pago",
+                        [inicio, inicio + timedelta(days=30)],
+                    )
+                    cursor.fetchall()
+                    leituras += 1
+                except OperationalError as e:
+                    if not _bloqueio(e):
+                        raise
+                    bloqueios += 1
+    except Exception as e:
+        resultado.outros_erros.append(repr(e))
+    finally:
+        wrapper.close()
+        resultado.somar(leituras=leituras, bloqueios=bloqueios)
+
+
+def estressar(perfil, leitores=4, escritores=4, duracao=5.0, pasta=None):
+    """Roda leitores e escritores por `duracao` segundos num arquivo novo e devolve o ResultadoEstresse."""
+    with tempfile.TemporaryDirectory(dir=pasta) as diretorio:
+        caminho = os.path.join(diretorio, f'estresse_{perfil}.sqlite3')
+        preparar_arquivo(caminho)
+        resultado = ResultadoEstresse(perfil, duracao)
+        fim = time.perf_counter() + duracao
+        threads = [
+            threading.Thread(target=_escritor, args=(caminho, perfil, fim, resultado, i))
+            for i in range(escritores)
+        ] + [
+            threading.Thread(target=_leitor, args=(caminho, perfil, fim, resultado, 1000 + i))
+            for i in range(leitores)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    return resultado
@@ -0,0 +1,145 @@
+# alunos/condicional.py
+
+"""
+GET condicional (ETag / Last-Modified) para as telas de lista e relatório.
+
+Cada tela registra um validador barato: uma agregação (quantidade e maior
+`atualizado_em`) sobre o mesmo conjunto filtrado que a página exibe. O ETag
+é um hash desses números, do usuário, do segredo CSRF (as páginas trazem
+formulários com o token, que muda a cada login), do dia de hoje (idade e
+dias em atraso mudam com a data) e de VERSAO_PAGINAS. Se o navegador manda de volta
+o mesmo ETag, a resposta é um 304 vazio: nem a consulta da página nem o
+template são executados.
+
+A quantidade cobre exclusões (o maior `atualizado_em` não muda quando uma
+linha some); `atualizado_em` é `auto_now`, e os UPDATE em lote do projeto
+o preenchem explicitamente (situação financeira, miniaturas).
+"""
+
+import hashlib
+from datetime import date, datetime, time
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.contrib import messages
+from django.db.models import Count, Max, Subquery
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.middleware.csrf import get_token
+from django.utils.http import http_date, quote_etag
+
+# Obriga o navegador a revalidar sempre (a resposta só é reaproveitada depois de um 304)
+CACHE_CONTROL = 'private, no-cache'
+
+
+class Validador:
+    """Partes do ETag e data da última modificação do conteúdo de uma página."""
+
+    def __init__(self, partes, datas=()):
+        self.partes = tuple(partes)
+        datas = [d for d in datas if d is not None]
+        self.ultima_modificacao = max(datas) if datas else None
+
+    def etag(self, request, usuario):
+        # get_token garante o segredo que a página vai usar (sem cookie, cria um agora)
+        get_token(request)
+        texto = repr((
+            getattr(settings, 'VERSAO_PAGINAS', ''), usuario.pk, request.META.get('CSRF_COOKIE'), date.today(),
+            request.get_full_path(), self.partes, self.ultima_modificacao,
+        ))
+        return quote_etag(hashlib.sha1(texto.encode()).hexdigest()[:20])
+
+    def timestamp(self):
+        if self.ultima_modificacao is None:
+            return None
+        # A página também muda na virada do dia, mesmo sem alteração nos dados
+        inicio_do_dia = timezone.make_aware(datetime.combine(date.today(), time.min))
+        return int(max(self.ultima_modificacao, inicio_do_dia).timestamp())
+
+
+def validador_de(queryset, relacionados=(), extras=()):
+    """
+    Validador de um conjunto filtrado em uma única consulta: quantidade e maior
+    `atualizado_em` das linhas e, para cada modelo em `relacionados` exibido
+    junto (ex: o nome do aluno no histórico), o maior `atualizado_em` da tabela
+    inteira, por subconsulta sobre o índice do campo.
+    """
+    agregados = {'quantidade': Count('pk'), 'linhas': Max('atualizado_em')}
+    for modelo in relacionados:
+        ultima = modelo.objects.order_by('-atualizado_em').values('atualizado_em')[:1]
+        agregados[modelo._meta.model_name] = Max(Subquery(ultima))
+    valores = queryset.order_by().aggregate(**agregados)
+    quantidade = valores.pop('quantidade')
+    return Validador([quantidade, *extras], valores.values())
+
+
+def _aplicavel(request, mensagens):
+    if request.method not in ('GET', 'HEAD'):
+        return False
+    # Na tela que exibe mensagens, as pendentes (ex: "Lembretes na fila") precisam ser
+    # mostradas e consumidas nesta resposta; len() não marca as mensagens como lidas
+    return not (mensagens and len(messages.get_messages(request)))
+
+
+def _preparar(calcular_validador, mensagens, request, usuario, args, kwargs):
+    """
+    None quando a requisição não usa GET condicional; senão (304 ou None, etag,
+    last_modified). Síncrona: consulta o banco, a sessão e o usuário.
+    """
+    if not _aplicavel(request, mensagens):
+        return None
+    validador = calcular_validador(request, *args, **kwargs)
+    if validador is None:
+        return None
+    etag = validador.etag(request, usuario)
+    ultima = validador.timestamp()
+    resposta = get_conditional_response(request, etag=etag, last_modified=ultima)
+    if resposta is not None:
+        resposta['Cache-Control'] = CACHE_CONTROL
+    return resposta, etag, ultima
+
+
+def _marcar(resposta, etag, ultima):
+    if resposta.status_code == 200 and not resposta.streaming:
+        resposta.setdefault('ETag', etag)
+        if ultima is not None:
+            resposta.setdefault('Last-Modified', http_date(ultima))
+        resposta['Cache-Control'] = CACHE_CONTROL
+    return resposta
+
+
+def pagina_condicional(calcular_validador, mensagens=False):
+    """
+    Decorator de view: `calcular_validador(request, *args, **kwargs)` devolve
+    um Validador (ou None para não usar GET condicional nesta requisição).
+    `mensagens=True` nas telas que exibem as mensagens do django.contrib.messages.
+    Funciona com views síncronas e assíncronas.
+    """
+    def decorator(view):
+        if iscoroutinefunction(view):
+            @wraps(view)
+            async def view_condicional(request, *args, **kwargs):
+                # Usuário já carregado pelo login_required (request.user aqui consultaria de novo)
+                usuario = await request.auser()
+                preparado = await sync_to_async(_preparar)(
+                    calcular_validador, mensagens, request, usuario, args, kwargs,
+                )
+                if preparado is None:
+                    return await view(request, *args, **kwargs)
+                resposta, etag, ultima = preparado
+                if resposta is not None:
+                    return resposta
+                return _marcar(await view(request, *args, **kwargs), etag, ultima)
+        else:
+            @wraps(view)
+            def view_condicional(request, *args, **kwargs):
+                preparado = _preparar(calcular_validador, mensagens, request, request.user, args, kwargs)
+                if preparado is None:
+                    return view(request, *args, **kwargs)
+                resposta, etag, ultima = preparado
+                if resposta is not None:
+                    return resposta
+                return _marcar(view(request, *args, **kwargs), etag, ultima)
+        return view_condicional
+    return decorator
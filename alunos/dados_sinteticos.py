@@ -0,0 +1,149 @@
+# alunos/dados_sinteticos.py
+
+"""
+Base sintética para testes de carga e benchmarks.
+
+Gera alunos com nomes, bairros, modalidades e datas de matrícula espalhadas
+pelos últimos anos e, para cada um, uma mensalidade por mês desde a matrícula
+(quase todas pagas; as recentes com parte em aberto e vencida). Tudo entra por
+bulk_create em lotes. Os triggers do índice de busca e do resumo mensal são
+desligados durante a carga e recriados no fim, com uma reconstrução única
+(bem mais rápido que atualizar o índice linha a linha).
+"""
+
+import random
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Max
+
+from .busca import garantir_indice_busca, remover_indice_busca
+from .cache import invalidar
+from .models import METODO_PAGAMENTO_CHOICES, Aluno, Modalidade, Pagamento
+from .resumo import garantir_resumo, remover_resumo
+from .situacao import atualizar_vencimentos_do_dia
+
+PRIMEIROS_NOMES = [
+    'João', 'José', 'Maria', 'Ana', 'Antônio', 'Francisco', 'Luís', 'Márcia', 'Cláudia', 'Sebastião',
+    'Conceição', 'Joana', 'Raimundo', 'Fábio', 'Célia', 'Andréa', 'Vitória', 'Mônica', 'Lúcia', 'Caio',
+]
+SOBRENOMES = [
+    'Silva', 'Santos', 'Oliveira', 'Souza', 'Conceição', 'Araújo', 'Gonçalves', 'Simões', 'Brandão',
+    'Magalhães', 'Assunção', 'Lopes', 'Barbosa', 'Ribeiro', 'Guimarães', 'Pereira', 'Nascimento',
+]
+BAIRROS = ['Centro', 'Catuaba', 'Mundo Novo', 'Leader', 'Félix Tomaz', 'Jacobina II', 'Peru', 'Inocoop']
+
+# Modalidades criadas se ainda não existirem (nome -> mensalidade)
+MODALIDADES = {
+    'Muay Thai': Decimal('120.00'),
+    'Jiu Jitsu': Decimal('150.00'),
+    'Musculação': Decimal('90.00'),
+    'Dança': Decimal('80.00'),
+}
+# PIX é o mais comum no balcão
+PESOS_METODOS = [6, 2, 2, 1]
+METODOS = [codigo for codigo, _ in METODO_PAGAMENTO_CHOICES]
+
+TAMANHO_LOTE = 2000
+DIA_VENCIMENTO = 10
+
+
+def _meses(inicio, fim):
+    """Primeiro dia de cada mês de `inicio` até `fim` (inclusive)."""
+    mes = inicio.replace(day=1)
+    while mes <= fim:
+        yield mes
+        mes = (mes + timedelta(days=32)).replace(day=1)
+
+
+def gerar_aluno(aleatorio, numero, hoje, anos):
+    primeiro = aleatorio.choice(PRIMEIROS_NOMES)
+    return Aluno(
+        nome=f"{primeiro} {aleatorio.choice(SOBRENOMES)} {aleatorio.choice(SOBRENOMES)}",
+        cpf=f"8{numero:010d}",
+        rg=f"8{numero:08d}",
+        sexo=aleatorio.choices('MFO', [48, 48, 4])[0],
+        data_nascimento=date(aleatorio.randint(1960, 2012), aleatorio.randint(1, 12), aleatorio.randint(1, 28)),
+        whatsapp=f"5574{aleatorio.randint(900000000, 999999999)}" if aleatorio.random() < 0.9 else None,
+        email=f"aluno{numero}@exemplo.com.br" if aleatorio.random() < 0.5 else None,
+        rua=f"Rua {aleatorio.choice(SOBRENOMES)}",
+        numero=str(aleatorio.randint(1, 999)),
+        bairro=aleatorio.choice(BAIRROS),
+        data_matricula=hoje - timedelta(days=aleatorio.randint(0, int(anos * 365))),
+        ativo=aleatorio.random() < 0.85,
+        # Alguns com desconto ou bolsa; os demais pagam a soma das modalidades
+        valor_mensalidade=Decimal(aleatorio.choice([50, 60, 70, 100])) if aleatorio.random() < 0.2 else None,
+    )
+
+
+def gerar_mensalidades(aleatorio, aluno, valor, hoje):
+    """Uma mensalidade por mês desde a matrícula; inativos param num mês qualquer."""
+    meses = list(_meses(aluno.data_matricula, hoje))
+    if not aluno.ativo and len(meses) > 1:
+        meses = meses[:aleatorio.randint(1, len(meses) - 1)]
+    for referencia in meses:
+        vencimento = referencia.replace(day=DIA_VENCIMENTO)
+        atraso = (hoje - vencimento).days
+        # Quanto mais antigo, mais provável que já tenha sido pago
+        chance = 0.97 if atraso > 60 else 0.85 if atraso > 0 else 0.35
+        pago = aleatorio.random() < chance
+        data_pagamento = referencia
+        if pago:
+            data_pagamento = min(hoje, vencimento + timedelta(days=aleatorio.randint(-7, 12)))
+        yield Pagamento(
+            aluno_id=aluno.pk, valor=valor, referencia=referencia, data_vencimento=vencimento,
+            data_pagamento=data_pagamento, pago=pago,
+            metodo_pagamento=aleatorio.choices(METODOS, PESOS_METODOS)[0],
+            observacao=f"Mensalidade {referencia:%m/%Y}",
+        )
+
+
+def gerar_dados(alunos, anos=3, seed=42, tamanho_lote=TAMANHO_LOTE, hoje=None, progresso=None):
+    """
+    Acrescenta `alunos` alunos (e as mensalidades deles) à base atual.
+    Devolve (alunos criados, pagamentos criados). `progresso(alunos, pagamentos)`
+    é chamado ao fim de cada lote.
+    """
+    aleatorio = random.Random(seed)
+    hoje = hoje or date.today()
+
+    modalidades = {}
+    for nome, valor in MODALIDADES.items():
+        modalidade, _ = Modalidade.objects.get_or_create(nome=nome, defaults={'valor_mensal': valor})
+        modalidades[modalidade.pk] = modalidade.valor_mensal or valor
+    Matricula = Aluno.modalidades.through
+
+    # Números de CPF/RG continuam depois dos alunos já existentes
+    inicio = (Aluno.objects.aggregate(maior=Max('pk'))['maior'] or 0) + 1
+    total_alunos = total_pagamentos = 0
+
+    remover_indice_busca()
+    remover_resumo()
+    try:
+        for numero_lote in range(0, alunos, tamanho_lote):
+            quantidade = min(tamanho_lote, alunos - numero_lote)
+            lote = [gerar_aluno(aleatorio, inicio + numero_lote + i, hoje, anos) for i in range(quantidade)]
+            with transaction.atomic():
+                criados = Aluno.objects.bulk_create(lote)
+                matriculas, pagamentos = [], []
+                for aluno in criados:
+                    escolhidas = aleatorio.sample(list(modalidades), aleatorio.choice([1, 1, 1, 2]))
+                    matriculas.extend(Matricula(aluno_id=aluno.pk, modalidade_id=pk) for pk in escolhidas)
+                    valor = aluno.valor_mensalidade or sum(modalidades[pk] for pk in escolhidas)
+                    pagamentos.extend(gerar_mensalidades(aleatorio, aluno, valor, hoje))
+                Matricula.objects.bulk_create(matriculas)
+                Pagamento.objects.bulk_create(pagamentos, batch_size=5000)
+            total_alunos += len(criados)
+            total_pagamentos += len(pagamentos)
+            if progresso:
+                progresso(total_alunos, total_pagamentos)
+    finally:
+        # Recria os triggers e reconstrói o índice de busca e o resumo de uma vez
+        garantir_indice_busca()
+        garantir_resumo()
+
+    atualizar_vencimentos_do_dia(hoje, todos=True)
+    invalidar('alunos')
+    invalidar('pagamentos')
+    return total_alunos, total_pagamentos
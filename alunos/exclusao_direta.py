@@ -0,0 +1,36 @@
+# alunos/exclusao_direta.py
+
+"""
+DELETE direto em lote, sem o Collector do Django.
+
+`queryset.delete()` carrega as linhas (e as de cada relação com on_delete)
+para enviar pre_delete/post_delete um objeto por vez: com milhares de
+pagamentos, isso é uma consulta e um sinal por linha. As ações em lote e o
+arquivo já fazem, de uma vez, o que os sinais fariam (situação financeira,
+cache, auditoria), e apagam as relações na ordem do CASCADE por conta
+própria. Por isso usam este DELETE explícito na tabela conhecida, em vez de
+`QuerySet._raw_delete` (API privada, sem garantia entre versões do Django).
+
+Os triggers do banco (resumo mensal, índice de busca) continuam valendo: são
+do SQLite, não do ORM.
+"""
+
+from django.db import connection
+
+# Abaixo do limite de 999 parâmetros por comando das versões antigas do SQLite
+PARAMETROS_POR_COMANDO = 900
+
+
+def apagar(modelo, campo, valores):
+    """DELETE FROM <tabela do modelo> WHERE <campo> IN (valores). Devolve quantas linhas saíram."""
+    valores = list(valores)
+    tabela = connection.ops.quote_name(modelo._meta.db_table)
+    coluna = connection.ops.quote_name(modelo._meta.get_field(campo).column)
+    total = 0
+    with connection.cursor() as cursor:
+        for inicio in range(0, len(valores), PARAMETROS_POR_COMANDO):
+            parte = valores[inicio:inicio + PARAMETROS_POR_COMANDO]
+            marcadores = ', '.join(['%s'] * len(parte))
+            cursor.execute(f'DELETE FROM {tabela} WHERE {coluna} IN ({marcadores})', parte)
+            total += cursor.rowcount
+    return total
@@ -0,0 +1,232 @@
+# alunos/exportacao.py
+
+"""
+Exportação de pagamentos e alunos em CSV ou XLSX por streaming.
+
+As linhas são lidas do banco em blocos (`.iterator()`) e enviadas ao navegador
+conforme são geradas, então o uso de memória é o mesmo para 100 ou 1 milhão
+de linhas e o download começa antes de a consulta terminar.
+
+O XLSX é montado à mão (é só um ZIP com alguns XMLs), escrevendo a planilha
+direto no ZIP em streaming, sem depender de bibliotecas externas.
+
+No CSV, texto que começa com =, +, -, @ (ou tabulação/retorno) ganha um
+apóstrofo na frente: o Excel e o LibreOffice tratariam a célula como fórmula
+(um nome ou observação digitados por qualquer pessoa viram código na planilha
+de quem exporta). No XLSX as células de texto nunca são fórmulas.
+"""
+
+import csv
+import io
+import re
+import zipfile
+from datetime import date
+from decimal import Decimal
+from xml.sax.saxutils import escape
+
+from django.http import StreamingHttpResponse
+
+from .models import METODO_PAGAMENTO_CHOICES, SEXO_CHOICES
+
+TAMANHO_BLOCO = 2000
+
+FORMATOS = ('csv', 'xlsx')
+
+# (cabeçalho, campo do values_list)
+COLUNAS_PAGAMENTOS = [
+    ('Aluno', 'aluno__nome'),
+    ('Valor', 'valor'),
+    ('Data do Pagamento', 'data_pagamento'),
+    ('Data de Vencimento', 'data_vencimento'),
+    ('Método', 'metodo_pagamento'),
+    ('Pago', 'pago'),
+    ('Observação', 'observacao'),
+]
+
+COLUNAS_ALUNOS = [
+    ('Nome', 'nome'),
+    ('CPF', 'cpf'),
+    ('RG', 'rg'),
+    ('Sexo', 'sexo'),
+    ('Data de Nascimento', 'data_nascimento'),
+    ('WhatsApp', 'whatsapp'),
+    ('Email', 'email'),
+    ('Rua', 'rua'),
+    ('Número', 'numero'),
+    ('Bairro', 'bairro'),
+    ('Cidade', 'cidade'),
+    ('Estado', 'estado'),
+    ('Data de Cadastro', 'data_matricula'),
+    ('Ativo', 'ativo'),
+]
+
+# Traduz códigos das choices para o texto exibido
+_DISPLAY = {
+    'metodo_pagamento': dict(METODO_PAGAMENTO_CHOICES),
+    'sexo': dict(SEXO_CHOICES),
+}
+
+
+def linhas(queryset, colunas):
+    """Gera as linhas (listas de valores Python) lendo o banco em blocos."""
+    campos = [campo for _, campo in colunas]
+    traducoes = [_DISPLAY.get(campo) for campo in campos]
+    for valores in queryset.values_list(*campos).iterator(chunk_size=TAMANHO_BLOCO):
+        yield [
+            traducao.get(valor, valor) if traducao else valor
+            for valor, traducao in zip(valores, traducoes)
+        ]
+
+
+# Início de célula que a planilha interpreta como fórmula
+_INICIO_FORMULA = ('=', '+', '-', '@', '\t', '\r')
+
+
+def _texto(valor):
+    if valor is None:
+        return ''
+    if isinstance(valor, bool):
+        return 'Sim' if valor else 'Não'
+    if isinstance(valor, date):
+        return valor.strftime('%d/%m/%Y')
+    return str(valor)
+
+
+# ==========================================================
+# CSV
+# ==========================================================
+class _Eco:
+    """Pseudo-arquivo: o csv.writer escreve e nós só repassamos a linha."""
+
+    def write(self, valor):
+        return valor
+
+
+def _texto_csv(valor):
+    texto = _texto(valor)
+    # Só texto livre: números negativos continuam números
+    if isinstance(valor, str) and texto.startswith(_INICIO_FORMULA):
+        return "'" + texto
+    return texto
+
+
+def _gerar_csv(cabecalho, linhas):
+    escritor = csv.writer(_Eco(), delimiter=';')
+    # BOM para o Excel abrir os acentos corretamente
+    yield '\ufeff' + escritor.writerow(cabecalho)
+    for linha in linhas:
+        yield escritor.writerow([_texto_csv(valor) for valor in linha])
+
+
+# ==========================================================
+# XLSX
+# ==========================================================
+_XML = '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+_NS_PLANILHA = 'http://schemas.openxmlformats.org/spreadsheetml/2006/main'
+_NS_REL = 'http://schemas.openxmlformats.org/package/2006/relationships'
+_NS_DOC = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships'
+
+_ARQUIVOS_FIXOS = {
+    '[Content_Types].xml': _XML + (
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '</Types>'
+    ),
+    '_rels/.rels': _XML + (
+        f'<Relationships xmlns="{_NS_REL}">'
+        f'<Relationship Id="rId1" Type="{_NS_DOC}/officeDocument" Target="xl/workbook.xml"/>'
+        '</Relationships>'
+    ),
+    'xl/workbook.xml': _XML + (
+        f'<workbook xmlns="{_NS_PLANILHA}" xmlns:r="{_NS_DOC}">'
+        '<sheets><sheet name="Planilha1" sheetId="1" r:id="rId1"/></sheets>'
+        '</workbook>'
+    ),
+    'xl/_rels/workbook.xml.rels': _XML + (
+        f'<Relationships xmlns="{_NS_REL}">'
+        f'<Relationship Id="rId1" Type="{_NS_DOC}/worksheet" Target="worksheets/sheet1.xml"/>'
+        '</Relationships>'
+    ),
+}
+
+# Caracteres de controle não são permitidos em XML
+_INVALIDOS_XML = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+
+class _SaidaZip(io.RawIOBase):
+    """Destino não posicionável do ZIP: acumula os bytes até serem enviados."""
+
+    def __init__(self):
+        self._partes = []
+        self._posicao = 0
+
+    def writable(self):
+        return True
+
+    def write(self, dados):
+        self._partes.append(bytes(dados))
+        self._posicao += len(dados)
+        return len(dados)
+
+    def tell(self):
+        return self._posicao
+
+    def coletar(self):
+        dados = b''.join(self._partes)
+        self._partes.clear()
+        return dados
+
+
+def _celula(valor):
+    if isinstance(valor, (int, float, Decimal)) and not isinstance(valor, bool):
+        return f'<c><v>{valor}</v></c>'
+    texto = escape(_INVALIDOS_XML.sub('', _texto(valor)))
+    return f'<c t="inlineStr"><is><t xml:space="preserve">{texto}</t></is></c>'
+
+
+def _linha_xml(valores):
+    return ('<row>' + ''.join(_celula(v) for v in valores) + '</row>').encode()
+
+
+def _gerar_xlsx(cabecalho, linhas, linhas_por_envio=500):
+    saida = _SaidaZip()
+    with zipfile.ZipFile(saida, 'w', compression=zipfile.ZIP_DEFLATED) as arquivo_zip:
+        for nome, conteudo in _ARQUIVOS_FIXOS.items():
+            arquivo_zip.writestr(nome, conteudo)
+        # Primeiro pedaço sai antes de a consulta ser percorrida
+        yield saida.coletar()
+
+        with arquivo_zip.open('xl/worksheets/sheet1.xml', 'w') as planilha:
+            planilha.write((_XML + f'<worksheet xmlns="{_NS_PLANILHA}"><sheetData>').encode())
+            planilha.write(_linha_xml(cabecalho))
+            for i, linha in enumerate(linhas, start=1):
+                planilha.write(_linha_xml(linha))
+                if i % linhas_por_envio == 0:
+                    yield saida.coletar()
+            planilha.write(b'</sheetData></worksheet>')
+    yield saida.coletar()
+
+
+# ==========================================================
+# RESPOSTAS HTTP
+# ==========================================================
+def resposta_exportacao(formato, nome_arquivo, queryset, colunas):
+    """StreamingHttpResponse com o queryset exportado no formato pedido."""
+    cabecalho = [titulo for titulo, _ in colunas]
+    if formato == 'xlsx':
+        resposta = StreamingHttpResponse(
+            _gerar_xlsx(cabecalho, linhas(queryset, colunas)),
+            content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+        )
+    else:
+        resposta = StreamingHttpResponse(
+            _gerar_csv(cabecalho, linhas(queryset, colunas)),
+            content_type='text/csv; charset=utf-8',
+        )
+    resposta['Content-Disposition'] = f'attachment; filename="{nome_arquivo}.{formato}"'
+    return resposta
@@ -1,7 +1,11 @@
+from datetime import date
+
 from django import forms
-from .models import Aluno, Modalidade, Pagamento
+from .acoes_lote import ACAO_PAGAR, ACAO_VENCIMENTO, ACOES_CHOICES
+from .models import Aluno, Modalidade, Pagamento, METODO_PAGAMENTO_CHOICES, STATUS_PAGAMENTO_CHOICES
 from django.contrib.auth.forms import AuthenticationForm
 from django.core.validators import RegexValidator
+from django.urls import reverse_lazy
 import re
 
 cpf_validator = RegexValidator(r'^\d{3}\.\d{3}\.\d{3}-\d{2}$', 'Formato de CPF inválido.')
@@ -40,7 +44,7 @@ class AlunoForm(forms.ModelForm):
             'foto', 'nome', 'data_nascimento', 'sexo',
             'cpf', 'rg', 'whatsapp',
             'rua', 'numero', 'bairro', 'cidade', 'estado',
-            'modalidades', 'ativo',
+            'modalidades', 'valor_mensalidade', 'ativo',
         ]
         
         # Define o tipo de input para campos de data e aplica o formato brasileiro
@@ -56,6 +60,7 @@ class AlunoForm(forms.ModelForm):
             'bairro': forms.TextInput(attrs={'class': 'form-control'}),
             'cidade': forms.TextInput(attrs={'class': 'form-control', 'readonly': 'readonly'}),
             'estado': forms.TextInput(attrs={'class': 'form-control', 'readonly': 'readonly'}),
+            'valor_mensalidade': forms.NumberInput(attrs={'class': 'form-control', 'step': '0.01', 'placeholder': 'Soma das modalidades'}),
         }
 
     def clean_whatsapp(self):
@@ -111,13 +116,42 @@ class AlunoForm(forms.ModelForm):
     
     
 # Formulário para Cadastro/Edição de Pagamentos
+class AutocompleteAlunoWidget(forms.Select):
+    """
+    <select> que traz só o aluno já escolhido (edição ou POST com erro); os
+    demais chegam pela busca do Select2 na rota de sugestões
+    (api.autocomplete_alunos). A página não depende mais do número de alunos.
+    """
+
+    def __init__(self, attrs=None):
+        padrao = {
+            'class': 'form-control',
+            'data-autocomplete-url': reverse_lazy('alunos:api_autocomplete_alunos'),
+        }
+        super().__init__(attrs={**padrao, **(attrs or {})})
+
+    def optgroups(self, name, value, attrs=None):
+        # self.choices é o ModelChoiceIterator do campo: sem percorrê-lo, busca só os ids do valor
+        campo = self.choices.field
+        ids = [v for v in value if v and str(v).isdigit()]
+        opcoes = []
+        if campo.empty_label is not None:
+            opcoes.append(self.create_option(name, '', campo.empty_label, not ids, 0))
+        if ids:
+            for aluno in self.choices.queryset.filter(pk__in=ids):
+                opcoes.append(self.create_option(
+                    name, aluno.pk, campo.label_from_instance(aluno), True, len(opcoes),
+                ))
+        return [(None, [opcao], opcao['index']) for opcao in opcoes]
+
+
 class PagamentoForm(forms.ModelForm):
-    # O aluno será selecionado via ForeignKey
+    # O aluno é escolhido pela busca (autocomplete); a validação é um único get(pk=...)
     aluno = forms.ModelChoiceField(
         queryset=Aluno.objects.filter(ativo=True).order_by('nome'),
         label='Aluno',
         empty_label="Selecione o Aluno",
-        widget=forms.Select(attrs={'class': 'form-control'})
+        widget=AutocompleteAlunoWidget(),
     )
 
     # Adicionando widgets de calendário para datas
@@ -174,6 +208,15 @@ class CadastroPagamentoForm(forms.ModelForm):
     pass
 
 
+# Formulário de upload para a importação de alunos em massa
+class ImportacaoAlunosForm(forms.Form):
+    arquivo = forms.FileField(
+        label='Arquivo CSV',
+        help_text='Colunas: nome, data_nascimento, sexo, cpf, rg, whatsapp, email, rua, numero, bairro, cidade, estado, modalidades, mensalidade, ativo.',
+        widget=forms.ClearableFileInput(attrs={'class': 'form-control', 'accept': '.csv'}),
+    )
+
+
 # NOVO: Formulário de Filtro de Histórico de Pagamentos
 class FiltroHistoricoForm(forms.Form):
     data_inicio = forms.DateField(
@@ -192,6 +235,31 @@ class FiltroHistoricoForm(forms.Form):
         }),
         required=False
     )
+    ordem = forms.ChoiceField(
+        label='Ordenar por',
+        choices=[
+            ('-data_pagamento', 'Pagamento (mais recentes)'),
+            ('data_pagamento', 'Pagamento (mais antigos)'),
+            ('-data_vencimento', 'Vencimento (mais recentes)'),
+            ('data_vencimento', 'Vencimento (mais antigos)'),
+            ('-valor', 'Maior valor'),
+            ('valor', 'Menor valor'),
+        ],
+        widget=forms.Select(attrs={'class': 'form-control'}),
+        required=False
+    )
+    status = forms.ChoiceField(
+        label='Situação',
+        choices=[('', 'Todas')] + STATUS_PAGAMENTO_CHOICES,
+        widget=forms.Select(attrs={'class': 'form-control'}),
+        required=False
+    )
+    # Pagamentos antigos movidos para o arquivo (ver alunos/arquivo.py)
+    arquivo = forms.BooleanField(
+        label='Incluir arquivados',
+        required=False,
+        widget=forms.CheckboxInput(attrs={'class': 'form-check-input'}),
+    )
 
     def clean(self):
         cleaned_data = super().clean()
@@ -202,4 +270,77 @@ class FiltroHistoricoForm(forms.Form):
             raise forms.ValidationError(
                 "A Data de Início não pode ser posterior à Data de Fim."
             )
-        return cleaned_data
\ No newline at end of file
+        return cleaned_data
+
+# Filtros da API JSON (alunos/api.py), lidos da query string
+class FiltroApiAlunosForm(forms.Form):
+    ativo = forms.NullBooleanField(required=False)
+    modalidade = forms.IntegerField(required=False, min_value=1)
+    q = forms.CharField(required=False)
+    matricula_de = forms.DateField(required=False)
+    matricula_ate = forms.DateField(required=False)
+    # Sincronização incremental do aplicativo: só o que mudou desde a última vez
+    atualizado_desde = forms.DateTimeField(required=False)
+
+
+class FiltroApiPagamentosForm(forms.Form):
+    aluno = forms.IntegerField(required=False, min_value=1)
+    pago = forms.NullBooleanField(required=False)
+    status = forms.ChoiceField(choices=[('', 'Todas')] + STATUS_PAGAMENTO_CHOICES, required=False)
+    pagamento_de = forms.DateField(required=False)
+    pagamento_ate = forms.DateField(required=False)
+    vencimento_de = forms.DateField(required=False)
+    vencimento_ate = forms.DateField(required=False)
+    atualizado_desde = forms.DateTimeField(required=False)
+
+
+class ModalidadeForm(forms.ModelForm):
+    class Meta:
+        model = Modalidade
+        fields = ['nome', 'valor_mensal']
+
+
+class AcoesLotePagamentosForm(forms.Form):
+    """Ação em lote sobre os pagamentos marcados no histórico ou nos vencimentos (ver acoes_lote.py)."""
+    acao = forms.ChoiceField(
+        label='Ação',
+        choices=[('', 'Ação para os selecionados...')] + ACOES_CHOICES,
+        widget=forms.Select(attrs={'class': 'form-select form-select-sm'}),
+    )
+    # Só confere que os ids existem (uma consulta); as ações trabalham sobre o queryset
+    pagamentos = forms.ModelMultipleChoiceField(
+        queryset=Pagamento.objects.only('pk'),
+        widget=forms.MultipleHiddenInput,
+        error_messages={'required': 'Selecione ao menos um pagamento.'},
+    )
+    data_pagamento = forms.DateField(
+        label='Pago em',
+        required=False,
+        initial=date.today,
+        widget=forms.DateInput(attrs={'type': 'date', 'class': 'form-control form-control-sm'}),
+    )
+    metodo_pagamento = forms.ChoiceField(
+        label='Método',
+        required=False,
+        choices=[('', 'Método...')] + METODO_PAGAMENTO_CHOICES,
+        widget=forms.Select(attrs={'class': 'form-select form-select-sm'}),
+    )
+    data_vencimento = forms.DateField(
+        label='Novo vencimento',
+        required=False,
+        widget=forms.DateInput(attrs={'type': 'date', 'class': 'form-control form-control-sm'}),
+    )
+    # Página para onde voltar (com os filtros e a página atuais)
+    proxima = forms.CharField(required=False, widget=forms.HiddenInput)
+
+    def clean(self):
+        cleaned_data = super().clean()
+        acao = cleaned_data.get('acao')
+        if acao == ACAO_PAGAR:
+            if not cleaned_data.get('metodo_pagamento'):
+                self.add_error('metodo_pagamento', 'Informe o método de pagamento.')
+            if not cleaned_data.get('data_pagamento'):
+                self.add_error('data_pagamento', 'Informe a data do pagamento.')
+        elif acao == ACAO_VENCIMENTO and not cleaned_data.get('data_vencimento'):
+            self.add_error('data_vencimento', 'Informe a nova data de vencimento.')
+        return cleaned_data
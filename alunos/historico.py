@@ -0,0 +1,156 @@
+# alunos/historico.py
+
+"""
+Consulta do histórico de pagamentos.
+
+Separa o histórico em duas consultas independentes:
+- a página de linhas (um único SELECT com JOIN no aluno, paginado por cursor);
+- os totais do período, lidos do resumo mensal (alunos/resumo.py) e guardados
+  em cache por filtro, para que trocar a ordenação ou a página não os recalcule.
+
+Com `incluir_arquivo=True` as duas somam também os pagamentos arquivados
+(alunos/arquivo.py): a página intercala as linhas das duas tabelas pelo mesmo
+cursor e os totais somam o arquivo aos do resumo.
+"""
+
+from datetime import date
+
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.db.models import Count, Sum, Value
+from django.db.models.functions import TruncMonth
+
+from . import cache as cache_versionado
+from .models import STATUS_PAGO, Pagamento, PagamentoArquivado
+from .paginacao import apaginar, paginar, paginar_varios
+from .resumo import totais_periodo
+
+PAGAMENTOS_POR_PAGINA = 50
+
+# Ordenações permitidas na tela (valor do parâmetro -> ordenação com desempate por pk)
+ORDENACOES_HISTORICO = {
+    '-data_pagamento': ['-data_pagamento', '-pk'],
+    'data_pagamento': ['data_pagamento', 'pk'],
+    '-data_vencimento': ['-data_vencimento', '-pk'],
+    'data_vencimento': ['data_vencimento', 'pk'],
+    '-valor': ['-valor', '-pk'],
+    'valor': ['valor', 'pk'],
+}
+ORDEM_PADRAO = '-data_pagamento'
+
+# Totais mudam só quando algum pagamento muda (a versão do grupo é incrementada)
+TEMPO_CACHE_TOTAIS = 60 * 60
+
+
+def filtrar_historico(data_inicio=None, data_fim=None, status=None):
+    """Queryset base do histórico, filtrado pelo período de pagamento e pela situação."""
+    pagamentos = Pagamento.objects.all()
+    if data_inicio:
+        pagamentos = pagamentos.filter(data_pagamento__gte=data_inicio)
+    if data_fim:
+        pagamentos = pagamentos.filter(data_pagamento__lte=data_fim)
+    if status:
+        pagamentos = pagamentos.com_status(status)
+    return pagamentos
+
+
+def filtrar_arquivo(data_inicio=None, data_fim=None, status=None):
+    """Pagamentos arquivados do período, com as mesmas anotações de with_status (todos estão quitados)."""
+    if status and status != STATUS_PAGO:
+        return PagamentoArquivado.objects.none()
+    arquivados = PagamentoArquivado.objects.all()
+    if data_inicio:
+        arquivados = arquivados.filter(data_pagamento__gte=data_inicio)
+    if data_fim:
+        arquivados = arquivados.filter(data_pagamento__lte=data_fim)
+    return arquivados.annotate(status=Value(STATUS_PAGO), dias_em_atraso=Value(0))
+
+
+def _somar_arquivo(totais, data_inicio, data_fim, status):
+    """Acrescenta aos totais (e à série mensal, se houver) os pagamentos arquivados do período."""
+    arquivados = filtrar_arquivo(data_inicio, data_fim, status).order_by()
+    if status:
+        soma = arquivados.aggregate(total=Sum('valor'), quantidade=Count('id'))
+        return {**totais, 'total': totais['total'] + (soma['total'] or 0),
+                'quantidade': totais['quantidade'] + soma['quantidade']}
+
+    meses = {dados['mes']: dict(dados) for dados in totais['meses']}
+    total, quantidade = totais['total'], totais['quantidade']
+    por_mes = arquivados.annotate(mes=TruncMonth('data_pagamento')).values('mes').annotate(
+        soma=Sum('valor'), qtd=Count('id'),
+    )
+    for linha in por_mes:
+        dados = meses.setdefault(linha['mes'], {'mes': linha['mes'], 'pago': 0, 'em_aberto': 0, 'quantidade': 0})
+        dados['pago'] += linha['soma']
+        dados['quantidade'] += linha['qtd']
+        total += linha['soma']
+        quantidade += linha['qtd']
+    return {'total': total, 'quantidade': quantidade, 'meses': [meses[mes] for mes in sorted(meses)]}
+
+
+def totais_historico(data_inicio=None, data_fim=None, status=None, incluir_arquivo=False):
+    """Soma, quantidade e série mensal do período (com cache por filtro)."""
+    partes = [data_inicio, data_fim]
+    if status:
+        # A situação depende do dia (vencido/vence em breve), então o dia entra na chave
+        partes += [status, date.today()]
+    if incluir_arquivo:
+        partes.append('arquivo')
+    chave = cache_versionado.chave('pagamentos', 'historico', *partes)
+    totais = cache.get(chave)
+    if totais is None:
+        if status:
+            # O resumo mensal só separa pago/em aberto: com situação, soma direto nos pagamentos
+            totais = filtrar_historico(data_inicio, data_fim, status).order_by().aggregate(
+                total=Sum('valor'), quantidade=Count('id'),
+            )
+            totais['total'] = totais['total'] or 0
+            totais['meses'] = []
+        else:
+            totais = totais_periodo(data_inicio, data_fim)
+        if incluir_arquivo:
+            totais = _somar_arquivo(totais, data_inicio, data_fim, status)
+        cache.set(chave, totais, TEMPO_CACHE_TOTAIS)
+    return totais
+
+
+async def atotais_historico(data_inicio=None, data_fim=None, status=None, incluir_arquivo=False):
+    """Versão assíncrona de `totais_historico` (mesma chave de cache)."""
+    if not status or incluir_arquivo:
+        # Várias leituras pequenas (resumo mensal, arquivo): roda a versão síncrona de uma vez
+        return await sync_to_async(totais_historico)(data_inicio, data_fim, status, incluir_arquivo)
+    chave = cache_versionado.chave('pagamentos', 'historico', data_inicio, data_fim, status, date.today())
+    totais = await cache.aget(chave)
+    if totais is None:
+        totais = await filtrar_historico(data_inicio, data_fim, status).order_by().aaggregate(
+            total=Sum('valor'), quantidade=Count('id'),
+        )
+        totais['total'] = totais['total'] or 0
+        totais['meses'] = []
+        await cache.aset(chave, totais, TEMPO_CACHE_TOTAIS)
+    return totais
+
+
+def pagina_historico(data_inicio=None, data_fim=None, ordem=ORDEM_PADRAO, depois=None, antes=None,
+                     tamanho=PAGAMENTOS_POR_PAGINA, status=None, incluir_arquivo=False):
+    """Uma página do histórico já com o aluno e a situação (calculada no banco) carregados."""
+    ordenacao = ORDENACOES_HISTORICO.get(ordem, ORDENACOES_HISTORICO[ORDEM_PADRAO])
+    pagamentos = filtrar_historico(data_inicio, data_fim, status).with_status().select_related('aluno')
+    if incluir_arquivo:
+        return paginar_varios(
+            [pagamentos, filtrar_arquivo(data_inicio, data_fim, status)],
+            ordenacao, depois=depois, antes=antes, tamanho=tamanho,
+        )
+    return paginar(pagamentos, ordenacao, depois=depois, antes=antes, tamanho=tamanho)
+
+
+async def apagina_historico(data_inicio=None, data_fim=None, ordem=ORDEM_PADRAO, depois=None, antes=None,
+                            tamanho=PAGAMENTOS_POR_PAGINA, status=None, incluir_arquivo=False):
+    """Versão assíncrona de `pagina_historico`."""
+    if incluir_arquivo:
+        return await sync_to_async(pagina_historico)(
+            data_inicio, data_fim, ordem, depois, antes, tamanho, status, incluir_arquivo,
+        )
+    ordenacao = ORDENACOES_HISTORICO.get(ordem, ORDENACOES_HISTORICO[ORDEM_PADRAO])
+    pagamentos = filtrar_historico(data_inicio, data_fim, status).with_status().select_related('aluno')
+    return await apaginar(pagamentos, ordenacao, depois=depois, antes=antes, tamanho=tamanho)
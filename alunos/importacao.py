@@ -0,0 +1,351 @@
+# alunos/importacao.py
+
+"""
+Importação de alunos em massa a partir de CSV.
+
+Cada linha passa pelas mesmas regras do AlunoForm (limpeza de CPF/RG/WhatsApp,
+validador de nome só com letras etc.), reescritas como checagens
+pré-compiladas em `ValidadorLinha`, e a checagem de CPF/RG/email duplicados
+é feita por lote: uma consulta por lote em vez de uma por linha. Os alunos
+válidos e as matrículas (tabela intermediária das modalidades) entram com o
+INSERT em lote de insercao_direta.
+"""
+
+import csv
+import io
+import re
+from datetime import date, datetime
+
+from django import forms
+from django.core.exceptions import ValidationError
+from django.core.validators import MaxLengthValidator, validate_email
+from django.db import transaction
+from django.db.models import Q
+from django.utils import formats, translation
+
+from . import auditoria
+from .busca import normalizar
+from .cache import invalidar
+from .insercao_direta import inserir
+from .models import ALPHABETIC_VALIDATOR, SEXO_CHOICES, Aluno, Modalidade
+
+TAMANHO_LOTE = 1000
+
+# Campos do Aluno que vêm do CSV (os demais ficam com o default do modelo)
+CAMPOS_IMPORTADOS = (
+    'nome', 'data_nascimento', 'sexo', 'cpf', 'rg', 'whatsapp', 'email',
+    'rua', 'numero', 'bairro', 'cidade', 'estado', 'valor_mensalidade', 'ativo',
+)
+
+# Cabeçalhos aceitos (já normalizados: minúsculas, sem acento, "_" no lugar de espaço)
+APELIDOS_COLUNAS = {
+    'nome_completo': 'nome',
+    'nascimento': 'data_nascimento',
+    'data_de_nascimento': 'data_nascimento',
+    'telefone': 'whatsapp',
+    'celular': 'whatsapp',
+    'e_mail': 'email',
+    'endereco': 'rua',
+    'modalidade': 'modalidades',
+    'mensalidade': 'valor_mensalidade',
+}
+
+VALORES_VERDADEIROS = {'1', 'sim', 's', 'true', 'ativo', 'x'}
+VALORES_FALSOS = {'0', 'nao', 'n', 'false', 'inativo'}
+
+
+# Mesmos caracteres que o AlunoForm.clean() tira de CPF, RG e WhatsApp
+_PONTUACAO_DOCUMENTO = re.compile(r'[.\-() ]')
+# Caminho rápido para dd/mm/aaaa; os demais formatos aceitos caem no strptime
+_DATA_BRASILEIRA = re.compile(r'(\d{1,2})/(\d{1,2})/(\d{4})')
+_CAMPOS_TEXTO_OPCIONAIS = ('rua', 'numero', 'bairro')
+
+
+class ValidadorLinha:
+    """
+    As regras do AlunoForm para uma linha do CSV, sem instanciar formulário.
+
+    Passar cada linha pelo ModelForm (BoundFields, full_clean do modelo)
+    custava perto de 1 ms e era quase todo o tempo da importação. Aqui as
+    expressões, limites de tamanho e mensagens são preparados uma vez por
+    importação. Deve ser criado dentro do translation.override da importação
+    (formatos de data e mensagens em português).
+    """
+
+    def __init__(self):
+        campos = Aluno._meta
+        self.limites = {
+            campo.name: campo.max_length for campo in campos.concrete_fields if campo.max_length
+        }
+        self.sexos = {valor for valor, _ in SEXO_CHOICES}
+        self.nome_valido = ALPHABETIC_VALIDATOR.regex.search
+        self.formatos_data = formats.get_format('DATE_INPUT_FORMATS')
+        self.campo_mensalidade = campos.get_field('valor_mensalidade').formfield()
+
+        self.obrigatorio = str(forms.Field.default_error_messages['required'])
+        self.escolha_invalida = str(forms.ChoiceField.default_error_messages['invalid_choice'])
+        self.data_invalida = str(forms.DateField.default_error_messages['invalid'])
+        self.nome_invalido = str(ALPHABETIC_VALIDATOR.message)
+        self.apenas_numeros = "O campo deve conter apenas números."
+        self.whatsapp_invalido = "Por favor, insira um WhatsApp válido com DDD (10 ou 11 dígitos)."
+
+    def validar(self, dados):
+        """
+        Devolve (valores, erros): os valores limpos de CAMPOS_IMPORTADOS e os
+        erros no formato de form.errors ({campo: [mensagens]}).
+        """
+        valores = {}
+        erros = {}
+
+        def texto(campo, obrigatorio=True):
+            valor = dados.get(campo) or ''
+            if not valor:
+                if obrigatorio:
+                    erros[campo] = [self.obrigatorio]
+                return None
+            if len(valor) > self.limites[campo]:
+                erros[campo] = self._tamanho(campo, valor)
+                return None
+            return valor
+
+        nome = texto('nome')
+        if nome is not None and not self.nome_valido(nome):
+            erros['nome'] = [self.nome_invalido]
+        valores['nome'] = nome
+
+        valores['data_nascimento'] = self._data(dados.get('data_nascimento') or '', erros)
+
+        sexo = dados.get('sexo') or ''
+        if sexo not in self.sexos:
+            erros['sexo'] = [self.escolha_invalida % {'value': sexo}]
+        valores['sexo'] = sexo
+
+        for campo in ('cpf', 'rg'):
+            documento = texto(campo)
+            if documento is not None:
+                documento = _PONTUACAO_DOCUMENTO.sub('', documento)
+                if not documento.isdigit():
+                    erros[campo] = [self.apenas_numeros]
+            valores[campo] = documento
+
+        whatsapp = texto('whatsapp', obrigatorio=False)
+        if whatsapp is not None:
+            whatsapp = ''.join(filter(str.isdigit, whatsapp))
+            if len(whatsapp) not in (10, 11):
+                erros['whatsapp'] = [self.whatsapp_invalido]
+        valores['whatsapp'] = whatsapp
+
+        email = texto('email', obrigatorio=False)
+        if email is not None:
+            try:
+                validate_email(email)
+            except ValidationError as e:
+                erros['email'] = e.messages
+        valores['email'] = email
+
+        for campo in _CAMPOS_TEXTO_OPCIONAIS:
+            valores[campo] = texto(campo, obrigatorio=False)
+        valores['cidade'] = texto('cidade')
+        valores['estado'] = texto('estado')
+
+        mensalidade = dados.get('valor_mensalidade') or ''
+        if mensalidade:
+            # Coluna rara: o DecimalField do formulário já cuida de dígitos e casas decimais
+            try:
+                mensalidade = self.campo_mensalidade.clean(mensalidade)
+            except ValidationError as e:
+                erros['valor_mensalidade'] = e.messages
+        valores['valor_mensalidade'] = mensalidade or None
+
+        # Como no BooleanField do formulário: só "false" desmarca
+        valores['ativo'] = dados.get('ativo') != 'false'
+        return valores, erros
+
+    def _tamanho(self, campo, valor):
+        try:
+            MaxLengthValidator(self.limites[campo])(valor)
+        except ValidationError as e:
+            return e.messages
+
+    def _data(self, valor, erros):
+        if not valor:
+            erros['data_nascimento'] = [self.obrigatorio]
+            return None
+        partes = _DATA_BRASILEIRA.fullmatch(valor)
+        if partes:
+            dia, mes, ano = map(int, partes.groups())
+            try:
+                return date(ano, mes, dia)
+            except ValueError:
+                pass
+        else:
+            for formato in self.formatos_data:
+                try:
+                    return datetime.strptime(valor, formato).date()
+                except ValueError:
+                    continue
+        erros['data_nascimento'] = [self.data_invalida]
+        return None
+
+
+class RelatorioImportacao:
+    """Resumo da importação: quantos entraram e os erros de cada linha recusada."""
+
+    def __init__(self):
+        self.total = 0
+        self.criados = 0
+        self.erros = []  # (número da linha no arquivo, {campo: [mensagens]})
+
+    def adicionar_erro(self, linha, campo, mensagem):
+        self.erros.append((linha, {campo: [mensagem]}))
+
+    @property
+    def recusados(self):
+        return len(self.erros)
+
+
+def _normalizar_cabecalho(nome):
+    chave = normalizar(nome).strip().replace(' ', '_').replace('-', '_')
+    return APELIDOS_COLUNAS.get(chave, chave)
+
+
+def _preparar_linha(dados):
+    """Ajusta valores de planilha para o que o formulário espera."""
+    ativo = normalizar(dados.get('ativo', '')).strip()
+    if ativo in VALORES_FALSOS:
+        dados['ativo'] = 'false'
+    elif ativo in VALORES_VERDADEIROS or not ativo:
+        dados['ativo'] = 'true'
+
+    sexo = (dados.get('sexo') or '').strip()
+    dados['sexo'] = sexo[:1].upper() if sexo else 'O'
+
+    # Campos com default no modelo não podem ficar vazios no formulário
+    dados['cidade'] = dados.get('cidade') or Aluno._meta.get_field('cidade').default
+    dados['estado'] = dados.get('estado') or Aluno._meta.get_field('estado').default
+    return dados
+
+
+def ler_csv(arquivo):
+    """Lê bytes ou texto de um CSV (',' ou ';') e gera (número da linha, dicionário)."""
+    conteudo = arquivo.read() if hasattr(arquivo, 'read') else arquivo
+    if isinstance(conteudo, bytes):
+        try:
+            conteudo = conteudo.decode('utf-8-sig')
+        except UnicodeDecodeError:
+            # Planilhas salvas pelo Excel em português costumam vir em latin-1
+            conteudo = conteudo.decode('latin-1')
+
+    primeira_linha = conteudo.split('\n', 1)[0]
+    delimitador = ';' if primeira_linha.count(';') > primeira_linha.count(',') else ','
+    leitor = csv.reader(io.StringIO(conteudo), delimiter=delimitador)
+
+    cabecalho = [_normalizar_cabecalho(c) for c in next(leitor, [])]
+    for numero, valores in enumerate(leitor, start=2):
+        if not any(v.strip() for v in valores):
+            continue
+        yield numero, dict(zip(cabecalho, (v.strip() for v in valores)))
+
+
+def importar_alunos(linhas, tamanho_lote=TAMANHO_LOTE):
+    """
+    Importa as linhas (pares (número, dicionário), ver `ler_csv`) em lotes.
+    Linhas inválidas ou duplicadas são recusadas e descritas no relatório;
+    as demais são gravadas mesmo que outras falhem.
+    """
+    relatorio = RelatorioImportacao()
+    modalidades = {normalizar(nome): pk for pk, nome in Modalidade.objects.values_list('pk', 'nome')}
+    # Valores já vistos no próprio arquivo (duplicados entre lotes)
+    vistos = {'cpf': set(), 'rg': set(), 'email': set()}
+
+    lote = []
+    # Formatos de data brasileiros (dd/mm/aaaa) como no cadastro
+    with translation.override('pt-br'):
+        validador = ValidadorLinha()
+        for numero, dados in linhas:
+            relatorio.total += 1
+            lote.append((numero, dados))
+            if len(lote) >= tamanho_lote:
+                _importar_lote(lote, validador, modalidades, vistos, relatorio)
+                lote = []
+        if lote:
+            _importar_lote(lote, validador, modalidades, vistos, relatorio)
+    if relatorio.criados:
+        # O INSERT direto não dispara post_save: invalida os indicadores aqui
+        invalidar('alunos')
+    return relatorio
+
+
+def _importar_lote(lote, validador, modalidades, vistos, relatorio):
+    validos = []
+    for numero, dados in lote:
+        valores, erros = validador.validar(_preparar_linha(dict(dados)))
+        if erros:
+            relatorio.erros.append((numero, erros))
+            continue
+
+        nomes = [n for n in (dados.get('modalidades') or '').replace('|', ',').split(',') if n.strip()]
+        ids = [modalidades.get(normalizar(n).strip()) for n in nomes]
+        if not ids:
+            relatorio.adicionar_erro(numero, 'modalidades', "Informe ao menos uma modalidade.")
+            continue
+        if None in ids:
+            desconhecidas = [n.strip() for n, i in zip(nomes, ids) if i is None]
+            relatorio.adicionar_erro(numero, 'modalidades', f"Modalidade(s) desconhecida(s): {', '.join(desconhecidas)}.")
+            continue
+
+        aluno = Aluno(**valores)
+        aluno._limpar_whatsapp()
+        validos.append((numero, aluno, set(ids)))
+
+    if not validos:
+        return
+
+    # Uma consulta para checar CPF/RG/email de todo o lote contra o banco
+    cpfs = {a.cpf for _, a, _ in validos}
+    rgs = {a.rg for _, a, _ in validos}
+    emails = {a.email for _, a, _ in validos if a.email}
+    existentes = {'cpf': set(), 'rg': set(), 'email': set()}
+    for cpf, rg, email in Aluno.objects.filter(
+        Q(cpf__in=cpfs) | Q(rg__in=rgs) | Q(email__in=emails)
+    ).values_list('cpf', 'rg', 'email'):
+        existentes['cpf'].add(cpf)
+        existentes['rg'].add(rg)
+        existentes['email'].add(email)
+
+    novos = []
+    for numero, aluno, ids in validos:
+        duplicado = None
+        for campo in ('cpf', 'rg', 'email'):
+            valor = getattr(aluno, campo)
+            if valor and (valor in existentes[campo] or valor in vistos[campo]):
+                duplicado = campo
+                break
+        if duplicado:
+            relatorio.adicionar_erro(numero, duplicado, f"{duplicado.upper()} já cadastrado.")
+            continue
+        for campo in ('cpf', 'rg', 'email'):
+            if getattr(aluno, campo):
+                vistos[campo].add(getattr(aluno, campo))
+        novos.append((aluno, ids))
+
+    if not novos:
+        return
+
+    alunos = [aluno for aluno, _ in novos]
+    with transaction.atomic():
+        inserir(Aluno, CAMPOS_IMPORTADOS, [
+            tuple(getattr(aluno, campo) for campo in CAMPOS_IMPORTADOS) for aluno in alunos
+        ])
+        # O executemany não devolve os ids: uma consulta pelo CPF (único) traz todos
+        pks = dict(Aluno.objects.filter(cpf__in=[aluno.cpf for aluno in alunos]).values_list('cpf', 'pk'))
+        for aluno in alunos:
+            aluno.pk = pks[aluno.cpf]
+            aluno._state.adding = False
+        inserir(Aluno.modalidades.through, ('aluno', 'modalidade'), [
+            (aluno.pk, modalidade_id) for aluno, ids in novos for modalidade_id in ids
+        ])
+        auditoria.registrar_criacoes(
+            Aluno, [{'pk': aluno.pk, **auditoria.valores(aluno)} for aluno in alunos], auditoria.ORIGEM_IMPORTACAO,
+        )
+    relatorio.criados += len(alunos)
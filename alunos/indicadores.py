@@ -0,0 +1,105 @@
+# alunos/indicadores.py
+
+"""
+Indicadores (KPIs) da página inicial.
+
+Os números ficam no cache sob uma chave que inclui a versão dos grupos
+'alunos' e 'pagamentos' (ver alunos/cache.py) e a data de hoje. Qualquer
+escrita em Aluno ou Pagamento incrementa a versão do grupo pelos sinais, e a
+virada do dia troca a chave; não há tempo de expiração "chutado".
+
+Depois de uma invalidação, só uma requisição recalcula (trava com cache.add);
+as demais recebem o último valor calculado em vez de repetir as consultas.
+"""
+
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.db.models import Sum
+
+from .cache import versao
+from .models import Aluno, Pagamento, ResumoMensal
+from .resumo import resumo_disponivel
+
+# A chave já muda a cada escrita e a cada dia; o tempo só limpa entradas velhas
+TEMPO_CACHE = 24 * 60 * 60
+# Se quem pegou a trava morrer no meio do cálculo, outro assume depois disso
+TEMPO_TRAVA = 30
+CHAVE_ULTIMO = 'indicadores:ultimo'
+# Cache frio (sem último valor): quanto esperar pelo cálculo de outra requisição
+ESPERA_MAXIMA = 2.0
+INTERVALO_ESPERA = 0.05
+
+
+def _chave(hoje):
+    return f"indicadores:v{versao('alunos')}:v{versao('pagamentos')}:{hoje.isoformat()}"
+
+
+def calcular_indicadores(hoje=None):
+    """
+    Calcula os indicadores direto no banco (sem cache). A receita do mês é a do
+    mês de calendário inteiro (como no resumo mensal), incluindo pagamentos
+    lançados com data posterior a hoje.
+    """
+    hoje = hoje or date.today()
+    inicio_mes = hoje.replace(day=1)
+    proximo_mes = (inicio_mes + timedelta(days=32)).replace(day=1)
+
+    if resumo_disponivel():
+        # Receita do mês e valores em aberto vêm de poucas linhas do resumo mensal
+        receita_mes = ResumoMensal.objects.filter(mes=inicio_mes, pago=True).aggregate(
+            soma=Sum('total_centavos'))['soma'] or 0
+        a_receber = ResumoMensal.objects.filter(pago=False).aggregate(
+            soma=Sum('total_centavos'))['soma'] or 0
+        receita_mes = Decimal(receita_mes).scaleb(-2)
+        a_receber = Decimal(a_receber).scaleb(-2)
+    else:
+        receita_mes = Pagamento.objects.filter(
+            pago=True, data_pagamento__gte=inicio_mes, data_pagamento__lt=proximo_mes,
+        ).aggregate(soma=Sum('valor'))['soma'] or Decimal('0')
+        a_receber = Pagamento.objects.filter(pago=False).aggregate(soma=Sum('valor'))['soma'] or Decimal('0')
+
+    return {
+        'alunos_ativos': Aluno.objects.filter(ativo=True).count(),
+        'novas_matriculas': Aluno.objects.filter(data_matricula__gte=inicio_mes).count(),
+        'receita_mes': receita_mes,
+        'a_receber': a_receber,
+        # Usa o índice parcial de pagamentos em aberto por vencimento
+        'vencidos': Pagamento.objects.filter(pago=False, data_vencimento__lt=hoje).count(),
+        'calculado_em': time.time(),
+    }
+
+
+def indicadores(hoje=None):
+    """Indicadores do dia, do cache sempre que possível."""
+    hoje = hoje or date.today()
+    chave = _chave(hoje)
+    valor = cache.get(chave)
+    if valor is not None:
+        return valor
+
+    trava = f'{chave}:trava'
+    if cache.add(trava, 1, TEMPO_TRAVA):
+        try:
+            valor = calcular_indicadores(hoje)
+            cache.set(chave, valor, TEMPO_CACHE)
+            cache.set(CHAVE_ULTIMO, valor, TEMPO_CACHE)
+        finally:
+            cache.delete(trava)
+        return valor
+
+    # Outra requisição está recalculando: devolve o valor anterior, se houver
+    ultimo = cache.get(CHAVE_ULTIMO)
+    if ultimo is not None:
+        return ultimo
+
+    prazo = time.monotonic() + ESPERA_MAXIMA
+    while time.monotonic() < prazo:
+        time.sleep(INTERVALO_ESPERA)
+        valor = cache.get(chave)
+        if valor is not None:
+            return valor
+    # Quem tinha a trava demorou demais: calcula sem gravar
+    return calcular_indicadores(hoje)
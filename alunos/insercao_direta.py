@@ -0,0 +1,43 @@
+# alunos/insercao_direta.py
+
+"""
+INSERT direto em lote, sem o bulk_create do Django.
+
+O bulk_create prepara cada campo de cada objeto (pre_save, get_db_prep_save):
+num aluno são mais de 20 campos, e isso custava mais que a própria gravação no
+SQLite. Na importação quase todos os campos saem do default do modelo e são
+iguais em todas as linhas; aqui eles são preparados uma vez, a partir de uma
+instância vazia, e só os campos informados são preparados linha a linha.
+
+Como em exclusao_direta, os triggers do banco (resumo mensal, índice de
+busca) continuam valendo, e nenhum sinal do ORM é enviado (o bulk_create
+também não envia).
+"""
+
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+def inserir(modelo, campos, linhas):
+    """
+    INSERT INTO <tabela do modelo> com executemany. `linhas` são tuplas com os
+    valores de `campos`, na mesma ordem; as demais colunas (exceto o pk)
+    recebem o valor de um `modelo()` novo: default ou auto_now.
+    """
+    # A conexão de verdade: `django.db.connection` é um proxy resolvido a cada acesso
+    conexao = connections[DEFAULT_DB_ALIAS]
+    variaveis = [modelo._meta.get_field(campo) for campo in campos]
+    fixos = [
+        campo for campo in modelo._meta.concrete_fields
+        if not campo.primary_key and campo not in variaveis
+    ]
+    molde = modelo()
+    valores_fixos = tuple(campo.get_db_prep_save(campo.pre_save(molde, True), conexao) for campo in fixos)
+
+    tabela = conexao.ops.quote_name(modelo._meta.db_table)
+    colunas = ', '.join(conexao.ops.quote_name(campo.column) for campo in variaveis + fixos)
+    marcadores = ', '.join(['%s'] * (len(variaveis) + len(fixos)))
+    with conexao.cursor() as cursor:
+        cursor.executemany(f'INSERT INTO {tabela} ({colunas}) VALUES ({marcadores})', [
+            tuple(campo.get_db_prep_save(valor, conexao) for campo, valor in zip(variaveis, linha)) + valores_fixos
+            for linha in linhas
+        ])
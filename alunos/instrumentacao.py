@@ -0,0 +1,189 @@
+# alunos/instrumentacao.py
+
+"""
+Métricas de banco e de template por requisição.
+
+O middleware conta as consultas SQL, o tempo gasto no banco, as consultas
+repetidas (mesmo SQL com os mesmos parâmetros, e mesmo SQL com parâmetros
+diferentes: o sinal típico de um N+1 como `{{ pagamento.aluno.nome }}` numa
+lista) e o tempo de renderização dos templates. O resultado vai no cabeçalho
+`Server-Timing` (aparece na aba Rede do navegador) e numa linha de log em JSON
+no logger `alunos.requisicoes`.
+
+As consultas são medidas por um execute_wrapper instalado em cada conexão
+(inclusive as abertas pelas threads do ORM assíncrono); as métricas da
+requisição atual ficam numa ContextVar, que acompanha a requisição também
+dentro de sync_to_async.
+"""
+
+import json
+import logging
+import time
+from collections import Counter
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.template.backends.django import DjangoTemplates
+
+logger = logging.getLogger('alunos.requisicoes')
+
+# Quantas consultas repetidas aparecem no log (as mais frequentes)
+AMOSTRA_REPETIDAS = 3
+
+_metricas_atuais = ContextVar('metricas_requisicao', default=None)
+
+
+class Metricas:
+    """Números coletados durante uma requisição."""
+
+    def __init__(self):
+        self.inicio = time.perf_counter()
+        self.consultas = 0
+        self.tempo_banco = 0.0
+        self.tempo_template = 0.0
+        self._exatas = Counter()
+        self._sql = Counter()
+
+    def registrar_consulta(self, sql, params, duracao):
+        self.consultas += 1
+        self.tempo_banco += duracao
+        self._sql[sql] += 1
+        try:
+            self._exatas[(sql, repr(params))] += 1
+        except Exception:
+            pass
+
+    @property
+    def duplicadas(self):
+        """Execuções além da primeira do mesmo SQL com os mesmos parâmetros."""
+        return sum(n - 1 for n in self._exatas.values() if n > 1)
+
+    @property
+    def similares(self):
+        """Execuções além da primeira do mesmo SQL (parâmetros quaisquer)."""
+        return sum(n - 1 for n in self._sql.values() if n > 1)
+
+    def mais_repetidas(self, quantidade=AMOSTRA_REPETIDAS):
+        return [(sql, n) for sql, n in self._sql.most_common(quantidade) if n > 1]
+
+    def server_timing(self, total):
+        return ', '.join([
+            f'db;dur={self.tempo_banco * 1000:.1f};desc="{self.consultas} consultas"',
+            f'dup;desc="{self.duplicadas} repetidas, {self.similares} similares"',
+            f'tpl;dur={self.tempo_template * 1000:.1f}',
+            f'total;dur={total * 1000:.1f}',
+        ])
+
+
+def _medir_consulta(execute, sql, params, many, context):
+    metricas = _metricas_atuais.get()
+    if metricas is None:
+        return execute(sql, params, many, context)
+    inicio = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metricas.registrar_consulta(sql, params, time.perf_counter() - inicio)
+
+
+def instalar(conexao):
+    if _medir_consulta not in conexao.execute_wrappers:
+        conexao.execute_wrappers.append(_medir_consulta)
+
+
+def _ao_conectar(sender, connection, **kwargs):
+    instalar(connection)
+
+
+# Conexões abertas daqui em diante (cada thread tem a sua)
+connection_created.connect(_ao_conectar, dispatch_uid='alunos.instrumentacao')
+
+
+class TemplateInstrumentado:
+    """Mede o tempo de `render` do template de página (includes entram no mesmo tempo)."""
+
+    def __init__(self, template):
+        self.template = template
+        self.origin = template.origin
+
+    def render(self, context=None, request=None):
+        metricas = _metricas_atuais.get()
+        if metricas is None:
+            return self.template.render(context, request)
+        inicio = time.perf_counter()
+        try:
+            return self.template.render(context, request)
+        finally:
+            metricas.tempo_template += time.perf_counter() - inicio
+
+
+class TemplatesInstrumentados(DjangoTemplates):
+    """Backend DjangoTemplates que registra o tempo de renderização (ver settings.TEMPLATES)."""
+
+    def from_string(self, template_code):
+        return TemplateInstrumentado(super().from_string(template_code))
+
+    def get_template(self, template_name):
+        return TemplateInstrumentado(super().get_template(template_name))
+
+
+class InstrumentacaoMiddleware:
+    """Deve ser o primeiro da lista para que o total inclua os demais middlewares."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        metricas, token = self._iniciar()
+        try:
+            response = self.get_response(request)
+        finally:
+            _metricas_atuais.reset(token)
+        return self._finalizar(request, response, metricas)
+
+    async def __acall__(self, request):
+        metricas, token = self._iniciar()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _metricas_atuais.reset(token)
+        return self._finalizar(request, response, metricas)
+
+    @staticmethod
+    def _iniciar():
+        # Conexões desta thread que já estavam abertas antes do middleware carregar
+        for conexao in connections.all(initialized_only=True):
+            instalar(conexao)
+        metricas = Metricas()
+        return metricas, _metricas_atuais.set(metricas)
+
+    @staticmethod
+    def _finalizar(request, response, metricas):
+        total = time.perf_counter() - metricas.inicio
+        response['Server-Timing'] = metricas.server_timing(total)
+        # Respostas em streaming (exportações) ainda vão consultar o banco depois daqui
+        dados = {
+            'metodo': request.method,
+            'caminho': request.path,
+            'status': response.status_code,
+            'consultas': metricas.consultas,
+            'banco_ms': round(metricas.tempo_banco * 1000, 1),
+            'repetidas': metricas.duplicadas,
+            'similares': metricas.similares,
+            'template_ms': round(metricas.tempo_template * 1000, 1),
+            'total_ms': round(total * 1000, 1),
+            'streaming': response.streaming,
+        }
+        if metricas.similares:
+            dados['sql_repetido'] = [{'sql': sql[:200], 'vezes': n} for sql, n in metricas.mais_repetidas()]
+        logger.info(json.dumps(dados, ensure_ascii=False))
+        return response
@@ -0,0 +1,293 @@
+# alunos/lembretes.py
+
+"""
+Lembretes de cobrança para alunos com mensalidades vencidas.
+
+Em vez de um link de WhatsApp por linha na tela de vencidos, os lembretes
+passam por uma caixa de saída no banco (`Lembrete`):
+
+1. `enfileirar_lembretes` lê os pagamentos vencidos em uma única consulta,
+   agrupada por aluno (quem tem três faturas vencidas recebe uma só mensagem,
+   com o total), monta o texto a partir de um `ModeloMensagem` e grava os
+   lembretes em lote. A restrição única (aluno, ciclo) impede repetir o
+   lembrete no mesmo ciclo, mesmo rodando duas vezes.
+2. `processar_fila` esvazia a fila em lotes de tamanho fixo com uma pausa
+   entre eles (limite de envio do provedor), usando o enviador configurado em
+   `settings.LEMBRETES_ENVIADOR`. Falhas voltam para a fila até
+   MAX_TENTATIVAS; depois disso ficam marcadas como erro.
+3. `enviar_lembretes` é a versão para a fila de tarefas (alunos/tarefas.py),
+   pedida pela tela de vencidos: envia um lote e agenda o próximo para
+   depois do intervalo, em vez de deixar o trabalhador parado esperando.
+   Com TAREFAS_SINCRONAS não há agendamento: envia tudo como `processar_fila`,
+   com a pausa entre os lotes.
+"""
+
+import json
+import logging
+import sys
+import time
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Exists, F, Min, OuterRef, Sum
+from django.template import engines
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import (
+    LEMBRETE_ENVIADO, LEMBRETE_ERRO, LEMBRETE_PENDENTE, Lembrete, ModeloMensagem, Pagamento,
+)
+from .tarefas import enfileirar, sincronas, tarefa
+
+logger = logging.getLogger(__name__)
+
+TAMANHO_LOTE = 1000
+# Padrões do envio: 30 mensagens a cada 60 segundos
+ENVIOS_POR_LOTE = 30
+INTERVALO_ENVIO = 60
+MAX_TENTATIVAS = 3
+ENVIADOR_PADRAO = 'alunos.lembretes.EnviadorConsole'
+# Chave da tarefa de envio: um envio na fila e um executando por vez
+CHAVE_ENVIO = 'lembretes'
+
+# Usado enquanto nenhum ModeloMensagem ativo for cadastrado (e como texto inicial da migração)
+TEXTO_PADRAO = (
+    "Olá, {{ nome }}. Tudo bem? "
+    "{% if faturas == 1 %}A sua mensalidade da academia CT AÇÃO de R${{ total }} venceu no dia {{ vencimento }}."
+    "{% else %}Você tem {{ faturas }} mensalidades da academia CT AÇÃO em aberto, no total de R${{ total }} "
+    "(a mais antiga venceu no dia {{ vencimento }}).{% endif %} "
+    "Por favor, regularize para evitar interrupção dos serviços. Obrigada!"
+)
+
+
+def whatsapp_valido(numero):
+    """Mesma regra da tela de vencidos: DDI 55 + DDD + número."""
+    return bool(numero) and len(numero) >= 12 and numero.startswith('55')
+
+
+def compilar_modelo(texto):
+    """Compila o texto uma vez por rodada; mensagens de WhatsApp não são HTML."""
+    return engines['django'].from_string('{% autoescape off %}' + texto + '{% endautoescape %}')
+
+
+def _formatar_valor(valor):
+    return f"{valor:.2f}".replace('.', ',')
+
+
+class ResultadoLembretes:
+    """Resumo de uma rodada de enfileiramento."""
+
+    def __init__(self, ciclo):
+        self.ciclo = ciclo
+        self.enfileirados = 0
+        self.sem_whatsapp = []  # pks dos alunos devedores sem número válido
+
+    def __str__(self):
+        texto = f"{self.enfileirados} lembrete(s) colocado(s) na fila"
+        if self.sem_whatsapp:
+            texto += f"; {len(self.sem_whatsapp)} aluno(s) sem WhatsApp válido"
+        return texto
+
+
+def devedores_sem_lembrete(ciclo, hoje=None):
+    """
+    Uma linha por aluno ativo com pagamentos vencidos e ainda sem lembrete no
+    ciclo: (aluno_id, nome, whatsapp, faturas, total, vencimento mais antigo).
+    """
+    ja_lembrados = Lembrete.objects.filter(aluno_id=OuterRef('aluno_id'), ciclo=ciclo)
+    return (
+        Pagamento.objects.vencidos(hoje)
+        .filter(aluno__ativo=True)
+        .exclude(Exists(ja_lembrados))
+        .order_by('aluno_id')
+        .values('aluno_id')
+        .annotate(faturas=Count('id'), total=Sum('valor'), vencimento=Min('data_vencimento'))
+        .values_list('aluno_id', 'aluno__nome', 'aluno__whatsapp', 'faturas', 'total', 'vencimento')
+    )
+
+
+def enfileirar_lembretes(hoje=None, ciclo=None, modelo=None, tamanho_lote=TAMANHO_LOTE):
+    """
+    Coloca na fila um lembrete por aluno com pagamentos vencidos. O ciclo
+    padrão é o dia de hoje. Devolve um ResultadoLembretes.
+    """
+    hoje = hoje or date.today()
+    ciclo = ciclo or hoje
+    if modelo is None:
+        modelo = ModeloMensagem.objects.filter(ativo=True).first()
+    template = compilar_modelo(modelo.texto if modelo else TEXTO_PADRAO)
+    resultado = ResultadoLembretes(ciclo)
+
+    novos = []
+    for aluno_id, nome, whatsapp, faturas, total, vencimento in devedores_sem_lembrete(ciclo, hoje):
+        if not whatsapp_valido(whatsapp):
+            resultado.sem_whatsapp.append(aluno_id)
+            continue
+        texto = template.render({
+            'nome': nome,
+            'faturas': faturas,
+            'total': _formatar_valor(total),
+            'vencimento': vencimento.strftime('%d/%m/%Y'),
+            'dias_em_atraso': (hoje - vencimento).days,
+        })
+        novos.append(Lembrete(aluno_id=aluno_id, modelo=modelo, ciclo=ciclo, telefone=whatsapp, texto=texto))
+
+    do_ciclo = Lembrete.objects.filter(ciclo=ciclo)
+    antes = do_ciclo.count()
+    for inicio in range(0, len(novos), tamanho_lote):
+        with transaction.atomic():
+            # ignore_conflicts cobre outra rodada simultânea no mesmo ciclo
+            Lembrete.objects.bulk_create(novos[inicio:inicio + tamanho_lote], ignore_conflicts=True)
+    resultado.enfileirados = do_ciclo.count() - antes
+    return resultado
+
+
+# ----------------------------------------------------------
+# Enviadores
+# ----------------------------------------------------------
+
+class EnviadorBase:
+    """
+    Interface dos enviadores. `enviar_lote` devolve, na mesma ordem dos
+    lembretes, None para cada envio bem-sucedido ou a mensagem de erro.
+    Provedores com API de envio em lote podem sobrescrever só `enviar_lote`.
+    """
+
+    def enviar(self, lembrete):
+        raise NotImplementedError
+
+    def enviar_lote(self, lembretes):
+        erros = []
+        for lembrete in lembretes:
+            try:
+                self.enviar(lembrete)
+            except Exception as e:
+                erros.append(str(e) or e.__class__.__name__)
+            else:
+                erros.append(None)
+        return erros
+
+
+class EnviadorConsole(EnviadorBase):
+    """Escreve as mensagens na saída padrão (desenvolvimento)."""
+
+    def __init__(self, saida=None):
+        self.saida = saida or sys.stdout
+
+    def enviar(self, lembrete):
+        self.saida.write(f"Para: {lembrete.telefone}\n{lembrete.texto}\n{'-' * 40}\n")
+
+
+class EnviadorArquivo(EnviadorBase):
+    """Acrescenta uma linha JSON por mensagem em settings.LEMBRETES_ARQUIVO."""
+
+    def __init__(self, caminho=None):
+        self.caminho = caminho or getattr(settings, 'LEMBRETES_ARQUIVO', 'lembretes_enviados.jsonl')
+
+    def enviar_lote(self, lembretes):
+        with open(self.caminho, 'a', encoding='utf-8') as arquivo:
+            for lembrete in lembretes:
+                arquivo.write(json.dumps(
+                    {'id': lembrete.pk, 'telefone': lembrete.telefone, 'texto': lembrete.texto},
+                    ensure_ascii=False,
+                ) + '\n')
+        return [None] * len(lembretes)
+
+
+class EnviadorMemoria(EnviadorBase):
+    """Guarda as mensagens em `EnviadorMemoria.caixa` (testes)."""
+
+    caixa = []
+
+    def enviar(self, lembrete):
+        EnviadorMemoria.caixa.append(lembrete)
+
+
+def obter_enviador():
+    return import_string(getattr(settings, 'LEMBRETES_ENVIADOR', ENVIADOR_PADRAO))()
+
+
+# ----------------------------------------------------------
+# Envio
+# ----------------------------------------------------------
+
+class ResultadoEnvio:
+    def __init__(self):
+        self.enviados = 0
+        self.falhas = 0
+
+    def __str__(self):
+        return f"{self.enviados} lembrete(s) enviado(s), {self.falhas} falha(s)"
+
+
+def _registrar_lote(lote, erros):
+    """Grava o resultado do lote com um UPDATE para os enviados e um bulk_update para as falhas."""
+    enviados = [l.pk for l, erro in zip(lote, erros) if erro is None]
+    falhas = []
+    for lembrete, erro in zip(lote, erros):
+        if erro is None:
+            continue
+        lembrete.tentativas += 1
+        lembrete.erro = erro
+        lembrete.status = LEMBRETE_ERRO if lembrete.tentativas >= MAX_TENTATIVAS else LEMBRETE_PENDENTE
+        falhas.append(lembrete)
+
+    with transaction.atomic():
+        if enviados:
+            Lembrete.objects.filter(pk__in=enviados).update(
+                status=LEMBRETE_ENVIADO, enviado_em=timezone.now(), tentativas=F('tentativas') + 1, erro='',
+            )
+        if falhas:
+            Lembrete.objects.bulk_update(falhas, ['status', 'tentativas', 'erro'])
+    return len(enviados), len(falhas)
+
+
+def processar_fila(enviador=None, tamanho_lote=None, intervalo=None, limite=None, dormir=None):
+    """
+    Envia os lembretes pendentes em lotes de `tamanho_lote`, esperando
+    `intervalo` segundos entre um lote e outro. Cada lembrete é tentado no
+    máximo uma vez por execução; `limite` encerra depois de tantos envios.
+    """
+    enviador = enviador or obter_enviador()
+    dormir = dormir or time.sleep
+    tamanho_lote = tamanho_lote or getattr(settings, 'LEMBRETES_POR_LOTE', ENVIOS_POR_LOTE)
+    intervalo = getattr(settings, 'LEMBRETES_INTERVALO', INTERVALO_ENVIO) if intervalo is None else intervalo
+    resultado = ResultadoEnvio()
+
+    ultimo_pk = 0
+    while limite is None or resultado.enviados + resultado.falhas < limite:
+        tamanho = tamanho_lote if limite is None else min(tamanho_lote, limite - resultado.enviados - resultado.falhas)
+        # Fila por ordem de chegada, pelo índice parcial dos pendentes
+        lote = list(
+            Lembrete.objects.filter(status=LEMBRETE_PENDENTE, pk__gt=ultimo_pk).order_by('pk')[:tamanho]
+        )
+        if not lote:
+            break
+        if ultimo_pk:
+            dormir(intervalo)
+        ultimo_pk = lote[-1].pk
+
+        try:
+            erros = enviador.enviar_lote(lote)
+        except Exception as e:
+            logger.exception("Falha no envio do lote de lembretes")
+            erros = [str(e) or e.__class__.__name__] * len(lote)
+        enviados, falhas = _registrar_lote(lote, erros)
+        resultado.enviados += enviados
+        resultado.falhas += falhas
+    return resultado
+
+
+@tarefa
+def enviar_lembretes():
+    """Tarefa da fila: envia um lote e, se ainda houver pendentes, agenda o próximo lote."""
+    if sincronas():
+        # Sem trabalhador, o "próximo lote" rodaria na hora, sem a pausa (e aninhado a cada lote)
+        return processar_fila()
+    tamanho_lote = getattr(settings, 'LEMBRETES_POR_LOTE', ENVIOS_POR_LOTE)
+    resultado = processar_fila(intervalo=0, limite=tamanho_lote)
+    if Lembrete.objects.filter(status=LEMBRETE_PENDENTE).exists():
+        intervalo = getattr(settings, 'LEMBRETES_INTERVALO', INTERVALO_ENVIO)
+        enfileirar(enviar_lembretes, chave=CHAVE_ENVIO, executar_em=timezone.now() + timedelta(seconds=intervalo))
+    return resultado
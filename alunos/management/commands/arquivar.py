@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from alunos.arquivo import ANOS_ALUNOS, ANOS_PAGAMENTOS, arquivar
+
+
+class Command(BaseCommand):
+    help = (
+        "Move para as tabelas de arquivo os pagamentos quitados antigos e os alunos inativos há muito "
+        "tempo, em lotes, e conclui exclusões de alunos que ficaram pela metade. Pode ser repetido."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--anos-pagamentos', type=int, default=ANOS_PAGAMENTOS,
+                            help='Arquiva pagamentos quitados há mais deste número de anos.')
+        parser.add_argument('--anos-alunos', type=int, default=ANOS_ALUNOS,
+                            help='Arquiva alunos inativos sem movimento há mais deste número de anos.')
+
+    def handle(self, *args, **options):
+        if options['anos_pagamentos'] < 1 or options['anos_alunos'] < 1:
+            raise CommandError("Os prazos devem ser de pelo menos 1 ano.")
+        resultado = arquivar(options['anos_pagamentos'], options['anos_alunos'])
+        self.stdout.write(self.style.SUCCESS(f"{resultado}."))
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from alunos.situacao import TAMANHO_LOTE, atualizar_vencimentos_do_dia
+
+
+class Command(BaseCommand):
+    help = ("Tarefa diária: recalcula a situação financeira dos alunos cujo vencimento em aberto "
+            "já passou (agende para logo após a meia-noite).")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--todos', action='store_true',
+                            help='Recalcula todos os alunos (ex: depois de importar pagamentos por fora).')
+        parser.add_argument('--lote', type=int, default=TAMANHO_LOTE,
+                            help='Alunos atualizados por transação.')
+
+    def handle(self, *args, **options):
+        total = atualizar_vencimentos_do_dia(todos=options['todos'], tamanho_lote=options['lote'])
+        self.stdout.write(self.style.SUCCESS(f"Situação financeira atualizada para {total} aluno(s)."))
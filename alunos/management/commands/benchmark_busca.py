@@ -0,0 +1,72 @@
+import random
+import statistics
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Q
+
+from alunos.busca import filtrar_alunos
+from alunos.dados_sinteticos import BAIRROS, PRIMEIROS_NOMES, SOBRENOMES
+from alunos.models import Aluno
+from alunos.paginacao import paginar
+
+
+TERMOS = ['joao', 'João', 'silva', 'conceicao', 'mar', 'sebast', '1234']
+
+
+class Command(BaseCommand):
+    help = (
+        "Compara a busca antiga (LIKE '%termo%' em nome/CPF) com o índice FTS5 "
+        "em uma base sintética. Os alunos gerados são descartados ao final (rollback)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--alunos', type=int, default=100_000)
+        parser.add_argument('--repeticoes', type=int, default=20)
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        random.seed(options['seed'])
+        with transaction.atomic():
+            self._gerar(options['alunos'])
+            self.stdout.write(f"{'termo':<12} {'LIKE ms':>9} {'FTS ms':>9} {'LIKE n':>8} {'FTS n':>8}")
+            for termo in TERMOS:
+                like, n_like = self._medir(self._consulta_like, termo, options['repeticoes'])
+                fts, n_fts = self._medir(filtrar_alunos, termo, options['repeticoes'])
+                self.stdout.write(f"{termo:<12} {like:>9.2f} {fts:>9.2f} {n_like:>8} {n_fts:>8}")
+            transaction.set_rollback(True)
+
+    def _gerar(self, quantidade):
+        inicio = time.perf_counter()
+        lote = []
+        for i in range(quantidade):
+            lote.append(Aluno(
+                nome=f"{random.choice(PRIMEIROS_NOMES)} {random.choice(SOBRENOMES)} {random.choice(SOBRENOMES)}",
+                cpf=f"9{i:010d}",
+                rg=f"9{i:08d}",
+                whatsapp=f"5574{random.randint(900000000, 999999999)}",
+                bairro=random.choice(BAIRROS),
+                data_nascimento=date(random.randint(1960, 2010), random.randint(1, 12), random.randint(1, 28)),
+            ))
+            if len(lote) == 5000:
+                Aluno.objects.bulk_create(lote)
+                lote = []
+        Aluno.objects.bulk_create(lote)
+        self.stdout.write(f"{quantidade} alunos gerados em {time.perf_counter() - inicio:.1f}s\n")
+
+    @staticmethod
+    def _consulta_like(queryset, termo):
+        return queryset.filter(Q(nome__icontains=termo) | Q(cpf__icontains=termo))
+
+    @staticmethod
+    def _medir(filtro, termo, repeticoes):
+        """Mediana (ms) da primeira página da lista + contagem total de resultados."""
+        tempos = []
+        for _ in range(repeticoes):
+            inicio = time.perf_counter()
+            list(paginar(filtro(Aluno.objects.filter(ativo=True), termo), ['nome', 'pk']))
+            tempos.append((time.perf_counter() - inicio) * 1000)
+        total = filtro(Aluno.objects.filter(ativo=True), termo).count()
+        return statistics.median(tempos), total
@@ -0,0 +1,115 @@
+import asyncio
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test import AsyncClient, Client, override_settings
+from django.urls import reverse
+
+
+def _verificar(resposta):
+    if resposta.status_code != 200:
+        raise CommandError(f"Resposta inesperada: HTTP {resposta.status_code}.")
+
+
+RELATORIOS = {
+    'historico': ('alunos:historico_pagamentos', 'alunos:historico_pagamentos_async'),
+    'vencimentos': ('alunos:vencimentos_pagamentos', 'alunos:vencimentos_pagamentos_async'),
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Compara as telas de relatório síncronas (WSGI, uma thread por requisição) "
+        "com as assíncronas (ASGI, um único event loop) sob requisições simultâneas, "
+        "usando os dados do banco configurado."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--usuario', help='Usuário usado nas requisições (padrão: primeiro superusuário).')
+        parser.add_argument('--requisicoes', type=int, default=200)
+        parser.add_argument('--simultaneas', type=int, default=20)
+        parser.add_argument('--relatorio', choices=list(RELATORIOS), action='append',
+                            help='Relatório a medir (pode repetir; padrão: todos).')
+        parser.add_argument('--com-cache', action='store_true',
+                            help='Mantém o cache entre as requisições (padrão: limpa antes de cada rodada).')
+
+    def handle(self, *args, **options):
+        if options['usuario']:
+            usuario = User.objects.filter(username=options['usuario']).first()
+        else:
+            usuario = User.objects.filter(is_superuser=True).order_by('pk').first()
+        if usuario is None:
+            raise CommandError("Usuário não encontrado. Informe --usuario ou crie um superusuário.")
+
+        total, simultaneas = options['requisicoes'], options['simultaneas']
+        # Os clientes de teste usam o host "testserver"
+        with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+            self._comparar(usuario, options, total, simultaneas)
+
+    def _comparar(self, usuario, options, total, simultaneas):
+        self.stdout.write(f"{total} requisições, {simultaneas} simultâneas\n")
+        self.stdout.write(f"{'relatório':<12} {'modo':<6} {'total s':>8} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8}")
+        for nome in options['relatorio'] or RELATORIOS:
+            url_sync, url_async = (reverse(url) for url in RELATORIOS[nome])
+            for modo, medir in (('WSGI', self._medir_wsgi), ('ASGI', self._medir_asgi)):
+                if not options['com_cache']:
+                    cache.clear()
+                url = url_sync if modo == 'WSGI' else url_async
+                duracao, tempos = medir(usuario, url, total, simultaneas)
+                self.stdout.write(self._linha(nome, modo, duracao, tempos))
+
+    @staticmethod
+    def _linha(nome, modo, duracao, tempos):
+        tempos = sorted(tempos)
+        p95 = tempos[min(len(tempos) - 1, int(len(tempos) * 0.95))]
+        return (f"{nome:<12} {modo:<6} {duracao:>8.2f} {len(tempos) / duracao:>8.1f} "
+                f"{statistics.median(tempos):>8.1f} {p95:>8.1f}")
+
+    @staticmethod
+    def _medir_wsgi(usuario, url, total, simultaneas):
+        def trabalhador(quantidade):
+            cliente = Client()
+            cliente.force_login(usuario)
+            tempos = []
+            try:
+                for _ in range(quantidade):
+                    inicio = time.perf_counter()
+                    resposta = cliente.get(url)
+                    tempos.append((time.perf_counter() - inicio) * 1000)
+                    _verificar(resposta)
+            finally:
+                # Cada thread abre a sua conexão com o banco
+                connections.close_all()
+            return tempos
+
+        porcoes = [total // simultaneas + (1 if i < total % simultaneas else 0) for i in range(simultaneas)]
+        inicio = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=simultaneas) as executor:
+            tempos = [t for lista in executor.map(trabalhador, porcoes) for t in lista]
+        return time.perf_counter() - inicio, tempos
+
+    @staticmethod
+    def _medir_asgi(usuario, url, total, simultaneas):
+        async def rodar():
+            cliente = AsyncClient()
+            await cliente.aforce_login(usuario)
+            limite = asyncio.Semaphore(simultaneas)
+
+            async def requisicao():
+                async with limite:
+                    inicio = time.perf_counter()
+                    resposta = await cliente.get(url)
+                    _verificar(resposta)
+                    return (time.perf_counter() - inicio) * 1000
+
+            inicio = time.perf_counter()
+            tempos = await asyncio.gather(*(requisicao() for _ in range(total)))
+            return time.perf_counter() - inicio, list(tempos)
+
+        return asyncio.run(rodar())
@@ -0,0 +1,162 @@
+import json
+import logging
+import statistics
+import time
+import tracemalloc
+from datetime import datetime
+
+import django
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from alunos.models import Aluno, Modalidade, Pagamento
+from alunos.urls import app_name, urlpatterns
+
+# Argumentos das rotas que precisam de um objeto ou formato
+ARGUMENTOS = {
+    'exportar_alunos': lambda aluno, pagamento: {'formato': 'csv'},
+    'exportar_pagamentos': lambda aluno, pagamento: {'formato': 'csv'},
+    'editar_aluno': lambda aluno, pagamento: {'pk': aluno.pk},
+    'excluir_aluno': lambda aluno, pagamento: {'pk': aluno.pk},
+    'editar_pagamento': lambda aluno, pagamento: {'pk': pagamento.pk},
+    'excluir_pagamento': lambda aluno, pagamento: {'pk': pagamento.pk},
+    'api_aluno': lambda aluno, pagamento: {'pk': aluno.pk},
+    'api_modalidade': lambda aluno, pagamento: {'pk': Modalidade.objects.order_by('pk').values_list('pk', flat=True).first()},
+    'api_pagamento': lambda aluno, pagamento: {'pk': pagamento.pk},
+    # GET só redireciona: a tarefa não precisa existir
+    'reexecutar_tarefa': lambda aluno, pagamento: {'pk': 1},
+}
+
+
+def _percentil(valores, p):
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(len(ordenados) * p))]
+
+
+class Command(BaseCommand):
+    help = (
+        "Faz GET em todas as rotas de alunos/urls.py com o cliente de teste e mede "
+        "latência (p50/p95), número de consultas e pico de memória. Salva o resultado "
+        "em JSON e, com --comparar, mostra a diferença para uma execução anterior."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--usuario', help='Usuário usado nas requisições (padrão: primeiro superusuário).')
+        parser.add_argument('--repeticoes', type=int, default=20)
+        parser.add_argument('--rota', action='append', help='Mede só esta rota (pode repetir).')
+        parser.add_argument('--sem-cache', action='store_true', help='Limpa o cache antes de cada requisição.')
+        parser.add_argument('--saida', default=None,
+                            help='Arquivo JSON do resultado (padrão: benchmark_views_<data>.json).')
+        parser.add_argument('--comparar', help='JSON de uma execução anterior para comparar.')
+
+    def handle(self, *args, **options):
+        if options['usuario']:
+            usuario = User.objects.filter(username=options['usuario']).first()
+        else:
+            usuario = User.objects.filter(is_superuser=True).order_by('pk').first()
+        if usuario is None:
+            raise CommandError("Usuário não encontrado. Informe --usuario ou crie um superusuário.")
+        aluno = Aluno.objects.order_by('pk').first()
+        pagamento = Pagamento.objects.order_by('pk').first()
+        if aluno is None or pagamento is None:
+            raise CommandError("A base está vazia. Gere dados com `python manage.py gerar_dados`.")
+
+        anterior = None
+        if options['comparar']:
+            with open(options['comparar'], encoding='utf-8') as arquivo:
+                anterior = json.load(arquivo)['rotas']
+
+        nomes = [padrao.name for padrao in urlpatterns if padrao.name]
+        desconhecidas = set(options['rota'] or []) - set(nomes)
+        if desconhecidas:
+            raise CommandError(f"Rota(s) desconhecida(s): {', '.join(sorted(desconhecidas))}.")
+
+        cliente = Client()
+        cliente.force_login(usuario)
+        rotas = {}
+        self.stdout.write(f"{'rota':<30} {'status':>6} {'p50 ms':>8} {'p95 ms':>8} {'SQL':>5} {'pico KB':>9}")
+        # Sem a linha de log por requisição do middleware de instrumentação no meio da tabela
+        log_requisicoes = logging.getLogger('alunos.requisicoes')
+        log_requisicoes.disabled = True
+        try:
+            # Os clientes de teste usam o host "testserver"
+            with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+                for nome in options['rota'] or nomes:
+                    argumentos = ARGUMENTOS.get(nome, lambda a, p: None)(aluno, pagamento)
+                    url = reverse(f'{app_name}:{nome}', kwargs=argumentos)
+                    rotas[nome] = self._medir(cliente, url, options['repeticoes'], options['sem_cache'])
+                    self.stdout.write(self._linha(nome, rotas[nome], (anterior or {}).get(nome)))
+        finally:
+            log_requisicoes.disabled = False
+
+        resultado = {
+            'gerado_em': datetime.now().isoformat(timespec='seconds'),
+            'django': django.get_version(),
+            'banco': connection.vendor,
+            'alunos': Aluno.objects.count(),
+            'pagamentos': Pagamento.objects.count(),
+            'repeticoes': options['repeticoes'],
+            'sem_cache': options['sem_cache'],
+            'rotas': rotas,
+        }
+        saida = options['saida'] or f"benchmark_views_{datetime.now():%Y%m%d_%H%M%S}.json"
+        with open(saida, 'w', encoding='utf-8') as arquivo:
+            json.dump(resultado, arquivo, ensure_ascii=False, indent=2)
+        self.stdout.write(self.style.SUCCESS(f"Resultado salvo em {saida}."))
+
+    @staticmethod
+    def _requisicao(cliente, url):
+        resposta = cliente.get(url)
+        if resposta.streaming:
+            # Exportações: mede a geração do arquivo inteiro
+            for _ in resposta.streaming_content:
+                pass
+        return resposta
+
+    def _medir(self, cliente, url, repeticoes, sem_cache):
+        # Aquecimento (templates compilados, conexão aberta, cache preenchido)
+        self._requisicao(cliente, url)
+
+        tempos = []
+        for _ in range(repeticoes):
+            if sem_cache:
+                cache.clear()
+            inicio = time.perf_counter()
+            self._requisicao(cliente, url)
+            tempos.append((time.perf_counter() - inicio) * 1000)
+
+        # Consultas e memória numa requisição à parte: o tracemalloc deixa tudo mais lento
+        if sem_cache:
+            cache.clear()
+        tracemalloc.start()
+        try:
+            with CaptureQueriesContext(connection) as consultas:
+                resposta = self._requisicao(cliente, url)
+            pico = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+        return {
+            'url': url,
+            'status': resposta.status_code,
+            'p50_ms': round(statistics.median(tempos), 2),
+            'p95_ms': round(_percentil(tempos, 0.95), 2),
+            'media_ms': round(statistics.fmean(tempos), 2),
+            'consultas': len(consultas),
+            'memoria_pico_kb': round(pico / 1024, 1),
+        }
+
+    @staticmethod
+    def _linha(nome, dados, anterior):
+        linha = (f"{nome:<30} {dados['status']:>6} {dados['p50_ms']:>8.1f} {dados['p95_ms']:>8.1f} "
+                 f"{dados['consultas']:>5} {dados['memoria_pico_kb']:>9.0f}")
+        if anterior:
+            variacao = (dados['p50_ms'] - anterior['p50_ms']) / anterior['p50_ms'] * 100 if anterior['p50_ms'] else 0
+            linha += f"  p50 {variacao:+.0f}%, SQL {dados['consultas'] - anterior['consultas']:+d}"
+        return linha
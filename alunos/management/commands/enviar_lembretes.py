@@ -0,0 +1,34 @@
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from alunos.lembretes import enfileirar_lembretes, processar_fila
+
+
+class Command(BaseCommand):
+    help = "Envia os lembretes de cobrança da fila em lotes, respeitando o intervalo entre lotes."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--enfileirar', action='store_true',
+                            help='Antes de enviar, coloca na fila os lembretes dos alunos com pagamentos vencidos.')
+        parser.add_argument('--ciclo', help='Ciclo dos lembretes enfileirados, AAAA-MM-DD (padrão: hoje).')
+        parser.add_argument('--lote', type=int, help='Mensagens por lote (padrão: settings.LEMBRETES_POR_LOTE).')
+        parser.add_argument('--intervalo', type=float,
+                            help='Segundos entre lotes (padrão: settings.LEMBRETES_INTERVALO).')
+        parser.add_argument('--max', type=int, dest='limite', help='Envia no máximo esta quantidade.')
+
+    def handle(self, *args, **options):
+        if options['enfileirar']:
+            ciclo = None
+            if options['ciclo']:
+                try:
+                    ciclo = datetime.strptime(options['ciclo'], '%Y-%m-%d').date()
+                except ValueError:
+                    raise CommandError("Ciclo inválido. Use o formato AAAA-MM-DD.")
+            self.stdout.write(f"{enfileirar_lembretes(ciclo=ciclo)}.")
+
+        resultado = processar_fila(
+            tamanho_lote=options['lote'], intervalo=options['intervalo'], limite=options['limite'],
+        )
+        estilo = self.style.WARNING if resultado.falhas else self.style.SUCCESS
+        self.stdout.write(estilo(f"{resultado}."))
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from academia_manager.banco import PERFIS
+from alunos.concorrencia import estressar
+
+
+class Command(BaseCommand):
+    help = (
+        "Compara os perfis do SQLite (academia_manager/banco.py) com leituras e escritas "
+        "simultâneas num arquivo temporário: operações por segundo e erros de \"database is locked\"."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--perfil', choices=list(PERFIS), action='append',
+                            help='Perfil a medir (pode repetir; padrão: todos).')
+        parser.add_argument('--leitores', type=int, default=4)
+        parser.add_argument('--escritores', type=int, default=4)
+        parser.add_argument('--duracao', type=float, default=5.0, help='Segundos por perfil.')
+
+    def handle(self, *args, **options):
+        if options['duracao'] <= 0 or options['leitores'] + options['escritores'] <= 0:
+            raise CommandError("Informe uma duração positiva e ao menos uma thread.")
+
+        self.stdout.write(f"{options['leitores']} leitores, {options['escritores']} escritores, "
+                          f"{options['duracao']:g}s por perfil\n")
+        for perfil in options['perfil'] or PERFIS:
+            resultado = estressar(perfil, options['leitores'], options['escritores'], options['duracao'])
+            self.stdout.write(str(resultado))
+            for erro in resultado.outros_erros:
+                self.stderr.write(f"  {erro}")
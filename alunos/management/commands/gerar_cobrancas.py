@@ -0,0 +1,39 @@
+from datetime import date, datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from alunos.cobranca import DIA_VENCIMENTO_PADRAO, METODO_PADRAO, TAMANHO_LOTE, gerar_cobrancas
+from alunos.models import METODO_PAGAMENTO_CHOICES
+
+
+class Command(BaseCommand):
+    help = "Gera a mensalidade em aberto do mês para todos os alunos ativos (pode ser repetido sem duplicar)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--mes', help='Mês de referência no formato AAAA-MM (padrão: mês atual).')
+        parser.add_argument('--dia', type=int, default=DIA_VENCIMENTO_PADRAO, help='Dia do vencimento.')
+        parser.add_argument('--metodo', default=METODO_PADRAO,
+                            choices=[codigo for codigo, _ in METODO_PAGAMENTO_CHOICES])
+        parser.add_argument('--lote', type=int, default=TAMANHO_LOTE,
+                            help='Mensalidades gravadas por transação.')
+
+    def handle(self, *args, **options):
+        if options['mes']:
+            try:
+                mes = datetime.strptime(options['mes'], '%Y-%m').date()
+            except ValueError:
+                raise CommandError("Mês inválido. Use o formato AAAA-MM (ex: 2025-03).")
+        else:
+            mes = date.today()
+        if not 1 <= options['dia'] <= 31:
+            raise CommandError("O dia do vencimento deve estar entre 1 e 31.")
+
+        resultado = gerar_cobrancas(
+            mes, dia=options['dia'], metodo=options['metodo'], tamanho_lote=options['lote'],
+        )
+        self.stdout.write(self.style.SUCCESS(f"{resultado}."))
+        if resultado.sem_valor:
+            self.stderr.write(
+                "Alunos sem valor (defina a mensalidade do aluno ou das modalidades): "
+                + ', '.join(str(pk) for pk in resultado.sem_valor[:50])
+            )
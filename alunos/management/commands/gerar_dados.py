@@ -0,0 +1,35 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from alunos.dados_sinteticos import TAMANHO_LOTE, gerar_dados
+
+
+class Command(BaseCommand):
+    help = (
+        "Acrescenta alunos sintéticos (com modalidades e uma mensalidade por mês desde a "
+        "matrícula) à base configurada. Ex: --alunos 100000 --anos 3 gera ~2 milhões de pagamentos."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--alunos', type=int, default=1000)
+        parser.add_argument('--anos', type=float, default=3, help='Matrículas espalhadas pelos últimos N anos.')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--lote', type=int, default=TAMANHO_LOTE, help='Alunos gravados por transação.')
+
+    def handle(self, *args, **options):
+        if options['alunos'] <= 0 or options['anos'] <= 0:
+            raise CommandError("--alunos e --anos devem ser positivos.")
+
+        inicio = time.perf_counter()
+
+        def progresso(alunos, pagamentos):
+            self.stdout.write(f"{alunos} alunos, {pagamentos} pagamentos ({time.perf_counter() - inicio:.0f}s)")
+
+        alunos, pagamentos = gerar_dados(
+            options['alunos'], anos=options['anos'], seed=options['seed'],
+            tamanho_lote=options['lote'], progresso=progresso,
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"{alunos} alunos e {pagamentos} pagamentos gerados em {time.perf_counter() - inicio:.1f}s."
+        ))
@@ -0,0 +1,86 @@
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from alunos import miniaturas_processo
+from alunos.miniaturas import precisa_gerar
+from alunos.models import Aluno
+
+
+def _gravar(prontos):
+    """
+    Grava as variantes de [(pk, nome_foto, miniaturas)] em um UPDATE em lote,
+    só dos alunos cuja foto ainda é a processada (como em processar_aluno).
+    Devolve quantos foram ignorados porque a foto mudou no meio do caminho.
+    """
+    with transaction.atomic():
+        atuais = dict(Aluno.objects.filter(pk__in=[pk for pk, _, _ in prontos]).values_list('pk', 'foto'))
+        agora = timezone.now()
+        alunos = [
+            Aluno(pk=pk, miniaturas=miniaturas, atualizado_em=agora)
+            for pk, nome, miniaturas in prontos if atuais.get(pk) == nome
+        ]
+        Aluno.objects.bulk_update(alunos, ['miniaturas', 'atualizado_em'])
+    return len(prontos) - len(alunos)
+
+
+class Command(BaseCommand):
+    help = "Gera as miniaturas (avatar/perfil) das fotos de alunos que ainda não as têm, usando vários processos."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processos', type=int, default=os.cpu_count() or 2,
+                            help='Quantidade de processos para redimensionar as fotos.')
+        parser.add_argument('--todas', action='store_true',
+                            help='Regera as variantes mesmo para fotos que já as têm.')
+        parser.add_argument('--lote', type=int, default=200,
+                            help='Quantidade de alunos gravados por UPDATE em lote.')
+
+    def handle(self, *args, **options):
+        pendentes = []
+        alunos = Aluno.objects.exclude(foto='').exclude(foto__isnull=True).only('foto', 'miniaturas')
+        for aluno in alunos.iterator(chunk_size=2000):
+            if options['todas'] or precisa_gerar(aluno):
+                pendentes.append((aluno.pk, aluno.foto.name))
+
+        if not pendentes:
+            self.stdout.write(self.style.SUCCESS("Nenhuma foto pendente."))
+            return
+
+        self.stdout.write(f"Gerando miniaturas de {len(pendentes)} foto(s) com {options['processos']} processo(s)...")
+        inicio = time.perf_counter()
+        prontos, erros, trocadas = [], 0, 0
+
+        # spawn em qualquer sistema: os filhos não herdam conexões abertas e se comportam
+        # como no macOS e no Windows (entrada dos processos em alunos/miniaturas_processo.py)
+        pool = ProcessPoolExecutor(
+            max_workers=options['processos'], mp_context=multiprocessing.get_context('spawn'),
+            initializer=miniaturas_processo.iniciar, initargs=(str(settings.MEDIA_ROOT),),
+        )
+        with pool as executor:
+            futuros = [executor.submit(miniaturas_processo.processar, pk, nome) for pk, nome in pendentes]
+            for futuro in as_completed(futuros):
+                pk, nome, miniaturas, erro = futuro.result()
+                if erro:
+                    erros += 1
+                    self.stderr.write(f"Aluno {pk} ({nome}): {erro}")
+                    continue
+                prontos.append((pk, nome, miniaturas))
+                if len(prontos) >= options['lote']:
+                    trocadas += _gravar(prontos)
+                    prontos = []
+        if prontos:
+            trocadas += _gravar(prontos)
+
+        duracao = time.perf_counter() - inicio
+        self.stdout.write(self.style.SUCCESS(
+            f"{len(pendentes) - erros - trocadas} foto(s) processada(s) em {duracao:.1f}s ({erros} erro(s))."
+        ))
+        if trocadas:
+            # A foto nova já tem a sua própria tarefa na fila (miniaturas.agendar)
+            self.stdout.write(f"{trocadas} foto(s) trocada(s) durante o processamento; variantes antigas descartadas.")
@@ -0,0 +1,31 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from alunos.importacao import TAMANHO_LOTE, importar_alunos, ler_csv
+
+
+class Command(BaseCommand):
+    help = "Importa alunos de um arquivo CSV em lotes, com as mesmas validações do cadastro."
+
+    def add_arguments(self, parser):
+        parser.add_argument('arquivo', help='Caminho do arquivo CSV.')
+        parser.add_argument('--lote', type=int, default=TAMANHO_LOTE,
+                            help='Quantidade de linhas validadas e gravadas por lote.')
+
+    def handle(self, *args, **options):
+        try:
+            with open(options['arquivo'], 'rb') as arquivo:
+                inicio = time.perf_counter()
+                relatorio = importar_alunos(ler_csv(arquivo), tamanho_lote=options['lote'])
+        except OSError as e:
+            raise CommandError(f"Não foi possível ler o arquivo: {e}")
+
+        for linha, erros in relatorio.erros:
+            detalhes = '; '.join(f"{campo}: {' '.join(msgs)}" for campo, msgs in erros.items())
+            self.stderr.write(f"Linha {linha}: {detalhes}")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{relatorio.criados} de {relatorio.total} aluno(s) importado(s) em "
+            f"{time.perf_counter() - inicio:.1f}s ({relatorio.recusados} recusado(s))."
+        ))
@@ -0,0 +1,48 @@
+import signal
+
+from django.core.management.base import BaseCommand, CommandError
+
+from alunos.tarefas import INTERVALO_CONSULTA, PRAZO_RESERVA, Trabalhador
+
+
+class Command(BaseCommand):
+    help = (
+        "Executa as tarefas em segundo plano da fila (alunos/tarefas.py). Vários trabalhadores podem "
+        "rodar ao mesmo tempo; SIGTERM/Ctrl+C termina as tarefas em andamento antes de sair."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=2,
+                            help='Tarefas em paralelo em threads (0 executa no próprio processo).')
+        parser.add_argument('--processos', type=int, default=0,
+                            help='Tarefas em paralelo em processos separados (tarefas pesadas de CPU).')
+        parser.add_argument('--intervalo', type=float, default=INTERVALO_CONSULTA,
+                            help='Segundos entre consultas à fila quando não há tarefa pronta.')
+        parser.add_argument('--prazo', type=int, default=PRAZO_RESERVA,
+                            help='Segundos de reserva de cada tarefa (renovada enquanto ela roda).')
+        parser.add_argument('--uma-vez', action='store_true',
+                            help='Sai quando não houver mais tarefa pronta (cron).')
+
+    def handle(self, *args, **options):
+        if options['threads'] < 0 or options['processos'] < 0:
+            raise CommandError("--threads e --processos não podem ser negativos.")
+        if options['prazo'] < 2 or options['intervalo'] <= 0:
+            raise CommandError("Use --prazo de pelo menos 2 segundos e --intervalo positivo.")
+
+        trabalhador = Trabalhador(
+            threads=options['threads'], processos=options['processos'],
+            intervalo=options['intervalo'], prazo=options['prazo'],
+        )
+
+        def parar(*_):
+            trabalhador.parar.set()
+
+        anteriores = {sinal: signal.signal(sinal, parar) for sinal in (signal.SIGTERM, signal.SIGINT)}
+        self.stdout.write(f"Trabalhador {trabalhador.nome} processando a fila de tarefas.")
+        try:
+            trabalhador.executar(uma_vez=options['uma_vez'])
+        finally:
+            for sinal, anterior in anteriores.items():
+                signal.signal(sinal, anterior)
+        estilo = self.style.WARNING if trabalhador.falhas else self.style.SUCCESS
+        self.stdout.write(estilo(f"{trabalhador}."))
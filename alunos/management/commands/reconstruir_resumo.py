@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from alunos.cache import invalidar
+from alunos.models import ResumoMensal
+from alunos.resumo import garantir_resumo, reconstruir_resumo, resumo_disponivel
+
+
+class Command(BaseCommand):
+    help = "Recalcula do zero o resumo mensal de pagamentos (e recria os triggers, se faltarem)."
+
+    def handle(self, *args, **options):
+        if not resumo_disponivel(connection):
+            raise CommandError("O resumo mensal só é mantido no SQLite.")
+        garantir_resumo(connection)
+        reconstruir_resumo(connection)
+        invalidar('pagamentos')
+        self.stdout.write(self.style.SUCCESS(
+            f"Resumo reconstruído: {ResumoMensal.objects.count()} linha(s)."
+        ))
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.8 on 2026-10-17 07:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('alunos', '0006_alter_pagamento_pago'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='aluno',
+            index=models.Index(condition=models.Q(('ativo', True)), fields=['nome', 'id'], name='aluno_ativo_nome_idx'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.8 on 2026-10-17 07:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('alunos', '0007_aluno_ativo_nome_idx'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='pagamento',
+            index=models.Index(condition=models.Q(('pago', False)), fields=['data_vencimento', 'id'], name='pagamento_aberto_venc_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pagamento',
+            index=models.Index(fields=['data_pagamento', 'id'], name='pagamento_data_pag_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pagamento',
+            index=models.Index(fields=['data_vencimento', 'id'], name='pagamento_data_venc_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pagamento',
+            index=models.Index(fields=['valor', 'id'], name='pagamento_valor_idx'),
+        ),
+    ]
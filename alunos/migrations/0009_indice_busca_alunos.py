@@ -0,0 +1,23 @@
+from django.db import migrations
+
+
+def criar_indice(apps, schema_editor):
+    from alunos.busca import garantir_indice_busca
+    garantir_indice_busca(schema_editor.connection)
+
+
+def remover_indice(apps, schema_editor):
+    from alunos.busca import remover_indice_busca
+    remover_indice_busca(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('alunos', '0008_indices_pagamento'),
+    ]
+
+    operations = [
+        # Tabela FTS5 + triggers de sincronização (só no SQLite)
+        migrations.RunPython(criar_indice, remover_indice),
+    ]
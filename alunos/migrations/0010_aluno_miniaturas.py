@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-17 07:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('alunos', '0009_indice_busca_alunos'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='aluno',
+            name='miniaturas',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.8 on 2026-10-17 07:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('alunos', '0010_aluno_miniaturas'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='aluno',
+            name='valor_mensalidade',
+            field=models.DecimalField(blank=True, decimal_places=2, help_text='Deixe vazio para cobrar a soma das mensalidades das modalidades.', max_digits=10, null=True, verbose_name='Mensalidade (R$)'),
+        ),
+        migrations.AddField(
+            model_name='modalidade',
+            name='valor_mensal',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True, verbose_name='Mensalidade (R$)'),
+        ),
+        migrations.AddField(
+            model_name='pagamento',
+            name='referencia',
+            field=models.DateField(blank=True, editable=False, null=True, verbose_name='Mês de Referência'),
+        ),
+        migrations.AddConstraint(
+            model_name='pagamento',
+            constraint=models.UniqueConstraint(fields=('aluno', 'referencia'), name='pagamento_aluno_referencia_unico'),
+        ),
+    ]
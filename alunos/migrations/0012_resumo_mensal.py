@@ -0,0 +1,42 @@
+# Generated by Django 5.2.8 on 2026-10-17 07:47
+
+from django.db import migrations, models
+
+
+def criar_resumo(apps, schema_editor):
+    from alunos.resumo import garantir_resumo
+    garantir_resumo(schema_editor.connection)
+
+
+def remover_resumo(apps, schema_editor):
+    from alunos.resumo import remover_resumo
+    remover_resumo(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('alunos', '0011_cobranca_mensal'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResumoMensal',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('mes', models.DateField(verbose_name='Mês')),
+                ('metodo_pagamento', models.CharField(choices=[('PIX', 'PIX'), ('CARTAO', 'Cartão de Crédito/Débito'), ('DINHEIRO', 'Dinheiro'), ('TRANSFERENCIA', 'Transferência Bancária')], max_length=20)),
+                ('pago', models.BooleanField()),
+                ('quantidade', models.IntegerField(default=0)),
+                ('total_centavos', models.BigIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Resumo Mensal',
+                'verbose_name_plural': 'Resumos Mensais',
+                'ordering': ['mes', 'metodo_pagamento', 'pago'],
+                'constraints': [models.UniqueConstraint(fields=('mes', 'metodo_pagamento', 'pago'), name='resumo_mensal_chave_unica')],
+            },
+        ),
+            # Triggers que mantêm o resumo a cada escrita em pagamentos + carga inicial (só no SQLite)
+        migrations.RunPython(criar_resumo, remover_resumo),
+    ]
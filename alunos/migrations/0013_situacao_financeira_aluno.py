@@ -0,0 +1,52 @@
+# Generated by Django 5.2.8 on 2026-10-17 07:50
+
+from datetime import date
+
+from django.db import migrations, models
+
+
+def calcular_situacao(apps, schema_editor):
+    from alunos.situacao import expressoes_situacao
+    Aluno = apps.get_model('alunos', 'Aluno')
+    Pagamento = apps.get_model('alunos', 'Pagamento')
+    Aluno.objects.update(**expressoes_situacao(Pagamento, date.today()))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('alunos', '0012_resumo_mensal'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='aluno',
+            name='faturas_vencidas',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='aluno',
+            name='proximo_vencimento',
+            field=models.DateField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='aluno',
+            name='total_vencido',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=10),
+        ),
+        migrations.AddField(
+            model_name='aluno',
+            name='ultimo_pagamento',
+            field=models.DateField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='aluno',
+            index=models.Index(condition=models.Q(('ativo', True), ('faturas_vencidas__gt', 0)), fields=['total_vencido', 'id'], name='aluno_devedor_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='aluno',
+            index=models.Index(fields=['proximo_vencimento'], name='aluno_proximo_venc_idx'),
+        ),
+        # Preenche a situação dos alunos já cadastrados
+        migrations.RunPython(calcular_situacao, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 5.2.8 on 2026-10-17 07:55
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def criar_modelo_padrao(apps, schema_editor):
+    from alunos.lembretes import TEXTO_PADRAO
+    ModeloMensagem = apps.get_model('alunos', 'ModeloMensagem')
+    ModeloMensagem.objects.get_or_create(nome='Cobrança', defaults={'texto': TEXTO_PADRAO})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('alunos', '0013_situacao_financeira_aluno'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ModeloMensagem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nome', models.CharField(max_length=50, unique=True)),
+                ('texto', models.TextField()),
+                ('ativo', models.BooleanField(default=True)),
+            ],
+            options={
+                'verbose_name': 'Modelo de Mensagem',
+                'verbose_name_plural': 'Modelos de Mensagem',
+                'ordering': ['nome'],
+            },
+        ),
+        migrations.CreateModel(
+            name='Lembrete',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ciclo', models.DateField()),
+                ('telefone', models.CharField(max_length=15)),
+                ('texto', models.TextField()),
+                ('status', models.CharField(choices=[('PENDENTE', 'Na fila'), ('ENVIADO', 'Enviado'), ('ERRO', 'Falhou')], default='PENDENTE', max_length=10)),
+                ('tentativas', models.PositiveSmallIntegerField(default=0)),
+                ('erro', models.TextField(blank=True)),
+                ('criado_em', models.DateTimeField(auto_now_add=True)),
+                ('enviado_em', models.DateTimeField(blank=True, null=True)),
+                ('aluno', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='lembretes', to='alunos.aluno')),
+                ('modelo', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='alunos.modelomensagem')),
+            ],
+            options={
+                'verbose_name': 'Lembrete',
+                'verbose_name_plural': 'Lembretes',
+                'ordering': ['-ciclo', 'id'],
+                'indexes': [models.Index(condition=models.Q(('status', 'PENDENTE')), fields=['id'], name='lembrete_pendente_idx')],
+                'constraints': [models.UniqueConstraint(fields=('aluno', 'ciclo'), name='lembrete_aluno_ciclo_unico')],
+            },
+        ),
+        migrations.RunPython(criar_modelo_padrao, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.8 on 2026-10-17 08:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('alunos', '0014_lembretes_cobranca'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='aluno',
+            name='atualizado_em',
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+        migrations.AddField(
+            model_name='pagamento',
+            name='atualizado_em',
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+    ]
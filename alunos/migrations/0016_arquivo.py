@@ -0,0 +1,71 @@
+# Generated by Django 5.2.8 on 2026-10-17 08:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('alunos', '0015_atualizado_em'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AlunoArquivado',
+            fields=[
+                ('id', models.IntegerField(primary_key=True, serialize=False)),
+                ('nome', models.CharField(max_length=150)),
+                ('rg', models.CharField(max_length=12)),
+                ('cpf', models.CharField(db_index=True, max_length=14, verbose_name='CPF')),
+                ('sexo', models.CharField(choices=[('M', 'Masculino'), ('F', 'Feminino'), ('O', 'Outro')], default='O', max_length=1)),
+                ('data_nascimento', models.DateField()),
+                ('whatsapp', models.CharField(blank=True, max_length=15, null=True)),
+                ('email', models.EmailField(blank=True, max_length=100, null=True)),
+                ('rua', models.CharField(blank=True, max_length=100, null=True)),
+                ('numero', models.CharField(blank=True, max_length=100, null=True)),
+                ('bairro', models.CharField(blank=True, max_length=50, null=True)),
+                ('cidade', models.CharField(max_length=50)),
+                ('estado', models.CharField(max_length=2)),
+                ('foto', models.CharField(blank=True, max_length=100)),
+                ('modalidades', models.JSONField(default=list)),
+                ('data_matricula', models.DateField()),
+                ('valor_mensalidade', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('ultimo_pagamento', models.DateField(blank=True, null=True)),
+                ('atualizado_em', models.DateTimeField()),
+                ('arquivado_em', models.DateTimeField()),
+            ],
+            options={
+                'verbose_name': 'Aluno Arquivado',
+                'verbose_name_plural': 'Alunos Arquivados',
+                'ordering': ['nome'],
+            },
+        ),
+        migrations.AddField(
+            model_name='aluno',
+            name='exclusao_agendada_em',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.CreateModel(
+            name='PagamentoArquivado',
+            fields=[
+                ('id', models.IntegerField(primary_key=True, serialize=False)),
+                ('aluno_id', models.IntegerField(db_index=True)),
+                ('aluno_nome', models.CharField(max_length=150)),
+                ('valor', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('data_pagamento', models.DateField()),
+                ('data_vencimento', models.DateField()),
+                ('metodo_pagamento', models.CharField(choices=[('PIX', 'PIX'), ('CARTAO', 'Cartão de Crédito/Débito'), ('DINHEIRO', 'Dinheiro'), ('TRANSFERENCIA', 'Transferência Bancária')], max_length=20)),
+                ('pago', models.BooleanField(default=True)),
+                ('observacao', models.TextField(blank=True, null=True)),
+                ('referencia', models.DateField(blank=True, null=True)),
+                ('atualizado_em', models.DateTimeField()),
+                ('arquivado_em', models.DateTimeField()),
+            ],
+            options={
+                'verbose_name': 'Pagamento Arquivado',
+                'verbose_name_plural': 'Pagamentos Arquivados',
+                'ordering': ['-data_pagamento'],
+                'indexes': [models.Index(fields=['data_pagamento', 'id'], name='pag_arquivado_data_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.8 on 2026-10-17 08:44
+
+import django.core.serializers.json
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('alunos', '0016_arquivo'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RegistroAuditoria',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('modelo', models.CharField(max_length=20)),
+                ('objeto_id', models.BigIntegerField()),
+                ('acao', models.CharField(choices=[('CRIACAO', 'Criação'), ('ALTERACAO', 'Alteração'), ('EXCLUSAO', 'Exclusão')], max_length=10)),
+                ('alteracoes', models.JSONField(encoder=django.core.serializers.json.DjangoJSONEncoder)),
+                ('origem', models.CharField(blank=True, max_length=20)),
+                ('criado_em', models.DateTimeField(default=django.utils.timezone.now)),
+                ('usuario', models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Registro de Auditoria',
+                'verbose_name_plural': 'Registros de Auditoria',
+                'ordering': ['-criado_em', '-id'],
+                'indexes': [models.Index(fields=['modelo', 'objeto_id', 'criado_em'], name='auditoria_objeto_idx'), models.Index(fields=['usuario', 'criado_em'], name='auditoria_usuario_idx')],
+            },
+        ),
+    ]
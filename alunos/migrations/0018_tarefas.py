@@ -0,0 +1,47 @@
+# Generated by Django 5.2.8 on 2026-10-17 08:50
+
+import django.core.serializers.json
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('alunos', '0017_auditoria'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tarefa',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('funcao', models.CharField(max_length=200)),
+                ('argumentos', models.JSONField(blank=True, default=dict, encoder=django.core.serializers.json.DjangoJSONEncoder)),
+                ('prioridade', models.SmallIntegerField(default=0)),
+                ('status', models.CharField(choices=[('PENDENTE', 'Na fila'), ('EXECUTANDO', 'Executando'), ('CONCLUIDA', 'Concluída'), ('FALHOU', 'Falhou')], default='PENDENTE', max_length=10)),
+                ('chave', models.CharField(blank=True, max_length=100, null=True)),
+                ('executar_em', models.DateTimeField(default=django.utils.timezone.now)),
+                ('tentativas', models.PositiveSmallIntegerField(default=0)),
+                ('max_tentativas', models.PositiveSmallIntegerField(default=3)),
+                ('trabalhador', models.CharField(blank=True, max_length=100)),
+                ('reservada_ate', models.DateTimeField(blank=True, null=True)),
+                ('resultado', models.TextField(blank=True)),
+                ('erro', models.TextField(blank=True)),
+                ('criada_em', models.DateTimeField(auto_now_add=True)),
+                ('iniciada_em', models.DateTimeField(blank=True, null=True)),
+                ('concluida_em', models.DateTimeField(blank=True, null=True)),
+                ('usuario', models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Tarefa',
+                'verbose_name_plural': 'Tarefas',
+                'ordering': ['-id'],
+                'indexes': [models.Index(condition=models.Q(('status', 'PENDENTE')), fields=['-prioridade', 'executar_em', 'id'], name='tarefa_fila_idx'), models.Index(condition=models.Q(('status', 'EXECUTANDO')), fields=['reservada_ate'], name='tarefa_reserva_idx'), models.Index(fields=['status', 'id'], name='tarefa_status_idx')],
+                'constraints': [models.UniqueConstraint(condition=models.Q(('status', 'PENDENTE')), fields=('chave',), name='tarefa_chave_na_fila_unica')],
+            },
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.8 on 2026-10-17 09:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('alunos', '0018_tarefas'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='alunoarquivado',
+            name='id',
+            field=models.BigIntegerField(primary_key=True, serialize=False),
+        ),
+        migrations.AlterField(
+            model_name='pagamentoarquivado',
+            name='aluno_id',
+            field=models.BigIntegerField(db_index=True),
+        ),
+        migrations.AlterField(
+            model_name='pagamentoarquivado',
+            name='id',
+            field=models.BigIntegerField(primary_key=True, serialize=False),
+        ),
+    ]
@@ -0,0 +1,104 @@
+# alunos/miniaturas.py
+
+"""
+Miniaturas das fotos dos alunos.
+
+A foto original (muitas vezes 4-8 MB vinda da câmera do celular) continua
+guardada, mas as telas usam variantes pequenas em WebP e JPEG, sem EXIF, já
+giradas conforme a orientação da câmera. As variantes são geradas fora do
+ciclo da requisição, pela fila de tarefas (alunos/tarefas.py), e registradas
+em `Aluno.miniaturas`.
+"""
+
+import os
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.utils import timezone
+from PIL import Image, ImageOps
+
+from .tarefas import enfileirar, tarefa
+
+PASTA_MINIATURAS = 'alunos_fotos/miniaturas'
+
+# Tamanho de exibição (px CSS); a imagem é gerada com o dobro para telas de alta densidade
+VARIANTES = {
+    'avatar': {'largura': 50, 'altura': 50, 'recortar': True},
+    'perfil': {'largura': 200, 'altura': 200, 'recortar': False},
+}
+ESCALA = 2
+
+FORMATOS = {
+    'webp': ('WEBP', {'quality': 80, 'method': 4}),
+    'jpeg': ('JPEG', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+
+
+def _abrir_imagem(nome_foto):
+    """Abre a foto já decodificada em escala reduzida e na orientação correta."""
+    maior = max(max(v['largura'], v['altura']) for v in VARIANTES.values()) * ESCALA
+    with default_storage.open(nome_foto) as arquivo:
+        imagem = Image.open(arquivo)
+        # Em JPEG, o draft decodifica direto numa escala menor (muito mais rápido em fotos grandes)
+        imagem.draft('RGB', (maior, maior))
+        imagem = ImageOps.exif_transpose(imagem)
+        imagem.load()
+    return imagem.convert('RGB')
+
+
+def gerar_variantes(nome_foto):
+    """
+    Gera todas as variantes da foto e devolve o dicionário a ser salvo em
+    `Aluno.miniaturas`. Não acessa o banco, então pode rodar em outro processo.
+    """
+    imagem = _abrir_imagem(nome_foto)
+    base = os.path.splitext(os.path.basename(nome_foto))[0]
+    resultado = {'origem': nome_foto}
+
+    for nome, config in VARIANTES.items():
+        caixa = (config['largura'] * ESCALA, config['altura'] * ESCALA)
+        if config['recortar']:
+            variante = ImageOps.fit(imagem, caixa, Image.LANCZOS)
+        else:
+            variante = imagem.copy()
+            variante.thumbnail(caixa, Image.LANCZOS)
+
+        dados = {
+            'largura': max(1, variante.width // ESCALA),
+            'altura': max(1, variante.height // ESCALA),
+        }
+        for extensao, (formato, opcoes) in FORMATOS.items():
+            buffer = BytesIO()
+            # Salvar sem o parâmetro exif descarta os metadados (GPS, câmera etc.)
+            variante.save(buffer, formato, **opcoes)
+            caminho = f'{PASTA_MINIATURAS}/{base}_{nome}.{extensao}'
+            if default_storage.exists(caminho):
+                default_storage.delete(caminho)
+            dados[extensao] = default_storage.save(caminho, ContentFile(buffer.getvalue()))
+        resultado[nome] = dados
+
+    return resultado
+
+
+def precisa_gerar(aluno):
+    """True se a foto atual ainda não tem variantes (foto nova ou trocada)."""
+    return bool(aluno.foto) and (aluno.miniaturas or {}).get('origem') != aluno.foto.name
+
+
+@tarefa
+def processar_aluno(pk):
+    """Gera e registra as variantes de um aluno (tarefa da fila)."""
+    from .models import Aluno
+
+    aluno = Aluno.objects.filter(pk=pk).only('foto', 'miniaturas').first()
+    if aluno is None or not precisa_gerar(aluno):
+        return
+    miniaturas = gerar_variantes(aluno.foto.name)
+    # Só grava se a foto não foi trocada enquanto as variantes eram geradas
+    Aluno.objects.filter(pk=pk, foto=aluno.foto.name).update(miniaturas=miniaturas, atualizado_em=timezone.now())
+
+
+def agendar(aluno):
+    """Coloca a geração das variantes na fila de tarefas (uma por aluno na fila)."""
+    enfileirar(processar_aluno, pk=aluno.pk, chave=f'miniaturas:{aluno.pk}')
@@ -0,0 +1,29 @@
+# alunos/miniaturas_processo.py
+
+"""
+Pontos de entrada dos processos do comando `gerar_miniaturas`.
+
+Com spawn (padrão no macOS e no Windows, e o usado pelo comando), o processo
+novo importa este módulo para achar as funções antes de rodar o initializer.
+Nada do Django é importado no topo: o setup vem primeiro e alunos/miniaturas.py
+(que carrega os modelos pela fila de tarefas) depois.
+"""
+
+import os
+
+
+def iniciar(media_root):
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'academia_manager.settings')
+    import django
+    django.setup()
+    from django.conf import settings
+    # As fotos ficam onde o processo principal as procura (ex: MEDIA_ROOT trocado nos testes)
+    settings.MEDIA_ROOT = media_root
+
+
+def processar(pk, nome_foto):
+    from .miniaturas import gerar_variantes
+    try:
+        return pk, nome_foto, gerar_variantes(nome_foto), None
+    except Exception as e:  # foto corrompida ou ausente não interrompe o lote
+        return pk, nome_foto, None, str(e)
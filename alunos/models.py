@@ -4,7 +4,10 @@ from django.db import models
 from django.utils import timezone
 from django.core.validators import RegexValidator 
 from django.conf import settings
-from datetime import date
+from django.core.serializers.json import DjangoJSONEncoder
+from datetime import date, timedelta
+from decimal import Decimal
+from types import SimpleNamespace
 
 # Validação para garantir que o nome contenha apenas letras e espaços
 ALPHABETIC_VALIDATOR = RegexValidator(
@@ -32,6 +35,15 @@ def calcular_idade(data_nascimento):
     today = date.today()
     return today.year - data_nascimento.year - ((today.month, today.day) < (data_nascimento.month, data_nascimento.day))
 
+def guardar_originais(instancia):
+    """
+    Guarda os valores lidos do banco dos campos auditados: a auditoria compara
+    com eles ao salvar, sem reler a linha (ver alunos/auditoria.py).
+    """
+    instancia._originais = {
+        campo: instancia.__dict__[campo] for campo in instancia.campos_auditados if campo in instancia.__dict__
+    }
+
 class Aluno(models.Model):
     # DADOS PESSOAIS
     # Nome: Obrigatório, apenas letras (usando o validador definido)
@@ -69,6 +81,8 @@ class Aluno(models.Model):
         null=True,                 # Permite que o campo seja nulo no banco de dados
         blank=True                 # Permite que o campo seja opcional no formulário
     )
+    # Variantes reduzidas da foto (geradas em segundo plano, ver alunos/miniaturas.py)
+    miniaturas = models.JSONField(default=dict, blank=True, editable=False)
 
     # MATRÍCULA
     # Modalidade: Obrigatório, aceita múltiplas opções (ManyToMany)
@@ -76,17 +90,73 @@ class Aluno(models.Model):
     modalidades = models.ManyToManyField('Modalidade') # Usaremos um modelo separado para Multi-Seleção
     data_matricula = models.DateField(default=timezone.now, verbose_name="Data de Cadastro")
     ativo = models.BooleanField(default=True)
+    # Mensalidade própria do aluno (desconto, bolsa etc.). Vazio: soma das modalidades
+    valor_mensalidade = models.DecimalField(
+        max_digits=10, decimal_places=2, blank=True, null=True,
+        verbose_name="Mensalidade (R$)",
+        help_text="Deixe vazio para cobrar a soma das mensalidades das modalidades.",
+    )
+
+    # SITUAÇÃO FINANCEIRA (calculada a partir dos pagamentos, ver alunos/situacao.py)
+    ultimo_pagamento = models.DateField(blank=True, null=True, editable=False)
+    proximo_vencimento = models.DateField(blank=True, null=True, editable=False)
+    faturas_vencidas = models.PositiveIntegerField(default=0, editable=False)
+    total_vencido = models.DecimalField(max_digits=10, decimal_places=2, default=0, editable=False)
+    # Última alteração (validador do GET condicional das telas, ver alunos/condicional.py)
+    atualizado_em = models.DateTimeField(auto_now=True, db_index=True)
+    # Exclusão pedida e ainda em andamento (pagamentos apagados em lotes, ver alunos/arquivo.py)
+    exclusao_agendada_em = models.DateTimeField(blank=True, null=True, editable=False)
+
+    # Campos com alteração registrada na auditoria (ver alunos/auditoria.py); os calculados ficam de fora
+    campos_auditados = (
+        'nome', 'rg', 'cpf', 'sexo', 'data_nascimento', 'whatsapp', 'email', 'rua', 'numero', 'bairro',
+        'cidade', 'estado', 'foto', 'data_matricula', 'ativo', 'valor_mensalidade',
+    )
 
     class Meta:
         verbose_name = "Aluno"
         verbose_name_plural = "Alunos"
         ordering = ['nome']
+        indexes = [
+            # Índice parcial (só alunos ativos) para a lista paginada por cursor em (nome, id)
+            models.Index(fields=['nome', 'id'], condition=models.Q(ativo=True), name='aluno_ativo_nome_idx'),
+            # Lista de devedores ordenada pelo total vencido (só alunos com faturas vencidas)
+            models.Index(fields=['total_vencido', 'id'], condition=models.Q(ativo=True, faturas_vencidas__gt=0),
+                         name='aluno_devedor_idx'),
+            # Tarefa diária: quem tem vencimento em aberto que já passou
+            models.Index(fields=['proximo_vencimento'], name='aluno_proximo_venc_idx'),
+        ]
 
     @property
     def idade(self):
         """Propriedade para obter a idade do aluno."""
         return calcular_idade(self.data_nascimento)
 
+    def _variante_foto(self, nome):
+        """URLs (WebP/JPEG) e dimensões de uma variante da foto, se já foi gerada."""
+        dados = (self.miniaturas or {}).get(nome)
+        if not dados or not self.foto or self.miniaturas.get('origem') != self.foto.name:
+            return None
+        from django.core.files.storage import default_storage
+        return {
+            'webp': default_storage.url(dados['webp']),
+            'jpeg': default_storage.url(dados['jpeg']),
+            'largura': dados['largura'],
+            'altura': dados['altura'],
+        }
+
+    @property
+    def foto_avatar(self):
+        return self._variante_foto('avatar')
+
+    @property
+    def foto_perfil(self):
+        return self._variante_foto('perfil')
+
+    @property
+    def em_debito(self):
+        return self.faturas_vencidas > 0
+
     @property
     def status_display(self):
         """Retorna o status como texto para exibição."""
@@ -143,6 +213,12 @@ class Aluno(models.Model):
     #        return f"https://wa.me/{numero_puro}" 
     #    return None
       
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instancia = super().from_db(db, field_names, values)
+        guardar_originais(instancia)
+        return instancia
+
     def save(self, *args, **kwargs):
         """Sobrescreve o save para garantir que o whatsapp seja limpo antes de ir para o banco."""
         self._limpar_whatsapp()
@@ -161,6 +237,9 @@ class Modalidade(models.Model):
     # Remova 'choices=MODALIDADE_CHOICES' daqui. 
     # Usaremos apenas um CharField para o nome.
     nome = models.CharField(max_length=50, unique=True) 
+    # Preço mensal usado na cobrança automática (ver alunos/cobranca.py)
+    valor_mensal = models.DecimalField(max_digits=10, decimal_places=2, blank=True, null=True,
+                                       verbose_name="Mensalidade (R$)")
     
     def __str__(self):
         # A representação será apenas o nome
@@ -183,6 +262,101 @@ STATUS_ALUNO_CHOICES = [
     ('SUSPENSO', 'Suspenso'),
 ]
 
+# Situação de um pagamento (ver Pagamento.status_vencimento e PagamentoQuerySet.with_status)
+STATUS_PAGO = 'PAGO'
+STATUS_VENCIDO = 'VENCIDO'
+STATUS_VENCE_EM_BREVE = 'VENCE EM BREVE'
+STATUS_PENDENTE = 'Pendente'
+STATUS_PAGAMENTO_CHOICES = [
+    (STATUS_PAGO, 'Pago'),
+    (STATUS_VENCIDO, 'Vencido'),
+    (STATUS_VENCE_EM_BREVE, 'Vence em breve'),
+    (STATUS_PENDENTE, 'Pendente'),
+]
+# "Vence em breve": vencimento de hoje até daqui a este número de dias
+DIAS_VENCE_EM_BREVE = 5
+
+
+class DiasDesde(models.Func):
+    """Dias inteiros de uma data até `hoje` (positivo se a data já passou)."""
+    output_field = models.IntegerField()
+    # julianday(hoje) - julianday(data) no SQLite
+    template = 'CAST(julianday(%(expressions)s) AS INTEGER)'
+    arg_joiner = ') - julianday('
+
+    def __init__(self, expressao, hoje, **extra):
+        super().__init__(models.Value(hoje, output_field=models.DateField()), expressao, **extra)
+
+    def as_postgresql(self, compiler, connection, **extra_context):
+        # No PostgreSQL date - date já é o número de dias
+        return self.as_sql(compiler, connection, template='(%(expressions)s)', arg_joiner=' - ', **extra_context)
+
+
+class PagamentoQuerySet(models.QuerySet):
+    """
+    Versão em SQL das propriedades status_vencimento/dias_vencido, para filtrar,
+    ordenar e contar por situação no banco em vez de carregar as linhas.
+    """
+
+    def with_status(self, hoje=None):
+        """Anota `status` (mesmos valores de status_vencimento) e `dias_em_atraso` (como dias_vencido)."""
+        hoje = hoje or date.today()
+        return self.annotate(
+            status=models.Case(
+                models.When(pago=True, then=models.Value(STATUS_PAGO)),
+                models.When(data_vencimento__lt=hoje, then=models.Value(STATUS_VENCIDO)),
+                models.When(data_vencimento__lte=hoje + timedelta(days=DIAS_VENCE_EM_BREVE),
+                            then=models.Value(STATUS_VENCE_EM_BREVE)),
+                default=models.Value(STATUS_PENDENTE),
+                output_field=models.CharField(),
+            ),
+            dias_em_atraso=models.Case(
+                models.When(data_vencimento__lt=hoje, then=DiasDesde(models.F('data_vencimento'), hoje)),
+                default=models.Value(0),
+                output_field=models.IntegerField(),
+            ),
+        )
+
+    def com_status(self, status, hoje=None):
+        """
+        Filtra pela situação com condições diretas nas colunas (equivalentes ao
+        Case de with_status), para o banco poder usar os índices de vencimento.
+        """
+        hoje = hoje or date.today()
+        if status == STATUS_PAGO:
+            return self.filter(pago=True)
+        if status == STATUS_VENCIDO:
+            return self.vencidos(hoje)
+        if status == STATUS_VENCE_EM_BREVE:
+            return self.vencendo_em(DIAS_VENCE_EM_BREVE, hoje)
+        if status == STATUS_PENDENTE:
+            return self.filter(pago=False, data_vencimento__gt=hoje + timedelta(days=DIAS_VENCE_EM_BREVE))
+        raise ValueError(f"Situação de pagamento desconhecida: {status!r}")
+
+    def vencidos(self, hoje=None):
+        """Em aberto com vencimento anterior a hoje."""
+        return self.filter(pago=False, data_vencimento__lt=hoje or date.today())
+
+    def vencendo_em(self, dias, hoje=None):
+        """Em aberto que vencem de hoje até daqui a `dias` dias (inclusive)."""
+        hoje = hoje or date.today()
+        return self.filter(pago=False, data_vencimento__gte=hoje, data_vencimento__lte=hoje + timedelta(days=dias))
+
+    def _por_status(self, hoje):
+        return self.with_status(hoje).order_by().values_list('status').annotate(quantidade=models.Count('id'))
+
+    def contagem_por_status(self, hoje=None):
+        """{status: quantidade} em um único GROUP BY (situações sem pagamentos vêm com 0)."""
+        contagem = dict.fromkeys((codigo for codigo, _ in STATUS_PAGAMENTO_CHOICES), 0)
+        contagem.update(self._por_status(hoje))
+        return contagem
+
+    async def acontagem_por_status(self, hoje=None):
+        contagem = dict.fromkeys((codigo for codigo, _ in STATUS_PAGAMENTO_CHOICES), 0)
+        contagem.update([linha async for linha in self._por_status(hoje)])
+        return contagem
+
+
 class Pagamento(models.Model):
     # Relacionamento: Um pagamento pertence a um Aluno
     aluno = models.ForeignKey(Aluno, on_delete=models.CASCADE, related_name='pagamentos')
@@ -196,27 +370,61 @@ class Pagamento(models.Model):
     # Status (Ex: Pago, Estornado, Pendente)
     pago = models.BooleanField(default=False)
     observacao = models.TextField(blank=True, null=True)
+    # Mês cobrado (sempre o dia 1º) nas mensalidades geradas automaticamente; vazio nos lançamentos avulsos
+    referencia = models.DateField(blank=True, null=True, editable=False, verbose_name="Mês de Referência")
+    atualizado_em = models.DateTimeField(auto_now=True, db_index=True)
 
     def __str__(self):
         return f"Pagamento de R${self.valor} para {self.aluno.nome}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instancia = super().from_db(db, field_names, values)
+        # Guarda o aluno original: se o pagamento mudar de aluno, os dois têm a situação recalculada
+        instancia._aluno_id_original = instancia.__dict__.get('aluno_id')
+        guardar_originais(instancia)
+        return instancia
+
+    objects = PagamentoQuerySet.as_manager()
+
+    # Ver PagamentoArquivado
+    arquivado = False
+
+    # Ver Aluno.campos_auditados
+    campos_auditados = (
+        'aluno_id', 'valor', 'data_pagamento', 'data_vencimento', 'metodo_pagamento', 'pago',
+        'observacao', 'referencia',
+    )
+
     @property
     def status_vencimento(self):
         """Verifica se o pagamento está vencido ou próximo do vencimento."""
         hoje = date.today()
         if self.pago:
-            return 'PAGO'
+            return STATUS_PAGO
         elif self.data_vencimento < hoje:
-            return 'VENCIDO'
-        elif (self.data_vencimento - hoje).days <= 5: # Vence em 5 dias ou menos
-            return 'VENCE EM BREVE'
+            return STATUS_VENCIDO
+        elif (self.data_vencimento - hoje).days <= DIAS_VENCE_EM_BREVE: # Vence em 5 dias ou menos
+            return STATUS_VENCE_EM_BREVE
         else:
-            return 'Pendente'
+            return STATUS_PENDENTE
 
     class Meta:
         ordering = ['-data_vencimento']
         verbose_name = "Pagamento"
         verbose_name_plural = "Pagamentos"
+        indexes = [
+            # Pagamentos em aberto por vencimento (tela de vencidos): índice parcial só com pago=False
+            models.Index(fields=['data_vencimento', 'id'], condition=models.Q(pago=False), name='pagamento_aberto_venc_idx'),
+            # Histórico: filtro por período de pagamento e ordenações da tela
+            models.Index(fields=['data_pagamento', 'id'], name='pagamento_data_pag_idx'),
+            models.Index(fields=['data_vencimento', 'id'], name='pagamento_data_venc_idx'),
+            models.Index(fields=['valor', 'id'], name='pagamento_valor_idx'),
+        ]
+        constraints = [
+            # Uma mensalidade por aluno e mês: rodar a cobrança de novo não duplica nada
+            models.UniqueConstraint(fields=['aluno', 'referencia'], name='pagamento_aluno_referencia_unico'),
+        ]
 
     @property
     def esta_vencido(self):
@@ -233,4 +441,289 @@ class Pagamento(models.Model):
         return 0 # Se não estiver vencido, retorna 0
 
     def __str__(self):
-        return f"Pagamento de R${self.valor} por {self.aluno.nome}"
\ No newline at end of file
+        return f"Pagamento de R${self.valor} por {self.aluno.nome}"
+
+
+class AlunoArquivado(models.Model):
+    """
+    Aluno inativo há muito tempo, retirado de `alunos_aluno` (ver alunos/arquivo.py).
+    Mantém a chave primária original; as modalidades ficam como lista de nomes.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    nome = models.CharField(max_length=150)
+    rg = models.CharField(max_length=12)
+    cpf = models.CharField(max_length=14, db_index=True, verbose_name="CPF")
+    sexo = models.CharField(max_length=1, choices=SEXO_CHOICES, default='O')
+    data_nascimento = models.DateField()
+    whatsapp = models.CharField(max_length=15, blank=True, null=True)
+    email = models.EmailField(max_length=100, blank=True, null=True)
+    rua = models.CharField(max_length=100, blank=True, null=True)
+    numero = models.CharField(max_length=100, blank=True, null=True)
+    bairro = models.CharField(max_length=50, blank=True, null=True)
+    cidade = models.CharField(max_length=50)
+    estado = models.CharField(max_length=2)
+    foto = models.CharField(max_length=100, blank=True)
+    modalidades = models.JSONField(default=list)
+    data_matricula = models.DateField()
+    valor_mensalidade = models.DecimalField(max_digits=10, decimal_places=2, blank=True, null=True)
+    ultimo_pagamento = models.DateField(blank=True, null=True)
+    atualizado_em = models.DateTimeField()
+    arquivado_em = models.DateTimeField()
+
+    class Meta:
+        verbose_name = "Aluno Arquivado"
+        verbose_name_plural = "Alunos Arquivados"
+        ordering = ['nome']
+
+    def __str__(self):
+        return self.nome
+
+
+class PagamentoArquivado(models.Model):
+    """
+    Pagamento quitado antigo, retirado de `alunos_pagamento` (ver alunos/arquivo.py).
+    Mantém a chave primária original, o que permite paginar o histórico sobre as
+    duas tabelas com o mesmo cursor; o nome do aluno é copiado porque ele pode
+    também ter sido arquivado.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    aluno_id = models.BigIntegerField(db_index=True)
+    aluno_nome = models.CharField(max_length=150)
+    valor = models.DecimalField(max_digits=10, decimal_places=2)
+    data_pagamento = models.DateField()
+    data_vencimento = models.DateField()
+    metodo_pagamento = models.CharField(max_length=20, choices=METODO_PAGAMENTO_CHOICES)
+    pago = models.BooleanField(default=True)
+    observacao = models.TextField(blank=True, null=True)
+    referencia = models.DateField(blank=True, null=True)
+    atualizado_em = models.DateTimeField()
+    arquivado_em = models.DateTimeField()
+
+    # Mesma interface que o histórico usa de Pagamento
+    arquivado = True
+
+    class Meta:
+        verbose_name = "Pagamento Arquivado"
+        verbose_name_plural = "Pagamentos Arquivados"
+        ordering = ['-data_pagamento']
+        indexes = [
+            models.Index(fields=['data_pagamento', 'id'], name='pag_arquivado_data_idx'),
+        ]
+
+    def __str__(self):
+        return f"Pagamento arquivado de R${self.valor} para {self.aluno_nome}"
+
+    @property
+    def aluno(self):
+        # Só o que a tabela do histórico exibe, sem consultar o aluno (que pode estar arquivado)
+        return SimpleNamespace(pk=self.aluno_id, nome=self.aluno_nome)
+
+
+class ResumoMensal(models.Model):
+    """
+    Totais de pagamentos por mês (de data_pagamento), método e situação.
+    Mantido por triggers no banco a cada escrita em Pagamento (ver alunos/resumo.py).
+    """
+    mes = models.DateField(verbose_name="Mês")  # sempre o dia 1º
+    metodo_pagamento = models.CharField(max_length=20, choices=METODO_PAGAMENTO_CHOICES)
+    pago = models.BooleanField()
+    quantidade = models.IntegerField(default=0)
+    # Em centavos para que somar e subtrair deltas seja exato
+    total_centavos = models.BigIntegerField(default=0)
+
+    class Meta:
+        verbose_name = "Resumo Mensal"
+        verbose_name_plural = "Resumos Mensais"
+        ordering = ['mes', 'metodo_pagamento', 'pago']
+        constraints = [
+            models.UniqueConstraint(fields=['mes', 'metodo_pagamento', 'pago'], name='resumo_mensal_chave_unica'),
+        ]
+
+    def __str__(self):
+        return f"{self.mes:%m/%Y} {self.metodo_pagamento} {'pago' if self.pago else 'em aberto'}: {self.total}"
+
+    @property
+    def total(self):
+        return Decimal(self.total_centavos).scaleb(-2)
+
+
+class ModeloMensagem(models.Model):
+    """
+    Texto dos lembretes de cobrança, editável no admin. Usa a sintaxe de
+    template do Django com as variáveis: nome, faturas, total, vencimento
+    (o vencimento em aberto mais antigo) e dias_em_atraso.
+    """
+    nome = models.CharField(max_length=50, unique=True)
+    texto = models.TextField()
+    ativo = models.BooleanField(default=True)
+
+    class Meta:
+        verbose_name = "Modelo de Mensagem"
+        verbose_name_plural = "Modelos de Mensagem"
+        ordering = ['nome']
+
+    def __str__(self):
+        return self.nome
+
+
+LEMBRETE_PENDENTE = 'PENDENTE'
+LEMBRETE_ENVIADO = 'ENVIADO'
+LEMBRETE_ERRO = 'ERRO'
+LEMBRETE_STATUS_CHOICES = (
+    (LEMBRETE_PENDENTE, 'Na fila'),
+    (LEMBRETE_ENVIADO, 'Enviado'),
+    (LEMBRETE_ERRO, 'Falhou'),
+)
+
+
+class Lembrete(models.Model):
+    """
+    Caixa de saída dos lembretes de cobrança (ver alunos/lembretes.py).
+    Um lembrete por aluno em cada ciclo, com todas as faturas vencidas dele.
+    """
+    aluno = models.ForeignKey(Aluno, on_delete=models.CASCADE, related_name='lembretes')
+    modelo = models.ForeignKey(ModeloMensagem, on_delete=models.SET_NULL, blank=True, null=True)
+    # Dia da rodada de cobrança; a restrição única impede dois lembretes no mesmo ciclo
+    ciclo = models.DateField()
+    telefone = models.CharField(max_length=15)
+    texto = models.TextField()
+    status = models.CharField(max_length=10, choices=LEMBRETE_STATUS_CHOICES, default=LEMBRETE_PENDENTE)
+    tentativas = models.PositiveSmallIntegerField(default=0)
+    erro = models.TextField(blank=True)
+    criado_em = models.DateTimeField(auto_now_add=True)
+    enviado_em = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        verbose_name = "Lembrete"
+        verbose_name_plural = "Lembretes"
+        ordering = ['-ciclo', 'id']
+        indexes = [
+            # Fila de envio: só os pendentes, na ordem de chegada
+            models.Index(fields=['id'], condition=models.Q(status='PENDENTE'), name='lembrete_pendente_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['aluno', 'ciclo'], name='lembrete_aluno_ciclo_unico'),
+        ]
+
+    def __str__(self):
+        return f"Lembrete {self.ciclo:%d/%m/%Y} para {self.aluno_id}"
+
+
+AUDITORIA_CRIACAO = 'CRIACAO'
+AUDITORIA_ALTERACAO = 'ALTERACAO'
+AUDITORIA_EXCLUSAO = 'EXCLUSAO'
+AUDITORIA_ACOES_CHOICES = (
+    (AUDITORIA_CRIACAO, 'Criação'),
+    (AUDITORIA_ALTERACAO, 'Alteração'),
+    (AUDITORIA_EXCLUSAO, 'Exclusão'),
+)
+
+
+class RegistroAuditoriaQuerySet(models.QuerySet):
+    def do_objeto(self, modelo, pk):
+        """Histórico de um aluno ou pagamento (índice auditoria_objeto_idx)."""
+        return self.filter(modelo=modelo._meta.model_name, objeto_id=pk)
+
+    def do_usuario(self, usuario):
+        """Tudo o que um usuário alterou (índice auditoria_usuario_idx)."""
+        return self.filter(usuario_id=getattr(usuario, 'pk', usuario))
+
+
+class RegistroAuditoria(models.Model):
+    """
+    Uma criação, alteração ou exclusão de Aluno ou Pagamento, campo a campo
+    (ver alunos/auditoria.py). A tabela só recebe INSERT.
+    """
+    # model_name: 'aluno' ou 'pagamento'
+    modelo = models.CharField(max_length=20)
+    objeto_id = models.BigIntegerField()
+    acao = models.CharField(max_length=10, choices=AUDITORIA_ACOES_CHOICES)
+    # {campo: [antes, depois]}; na criação "antes" é null, na exclusão "depois" é null
+    alteracoes = models.JSONField(encoder=DjangoJSONEncoder)
+    # Vazio nas telas de edição; 'lote', 'cobranca', 'importacao' ou 'exclusao' nas operações em massa
+    origem = models.CharField(max_length=20, blank=True)
+    # Sem chave estrangeira no banco: excluir o usuário não mexe nos registros
+    usuario = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.DO_NOTHING, db_constraint=False,
+        blank=True, null=True, related_name='+',
+    )
+    criado_em = models.DateTimeField(default=timezone.now)
+
+    objects = RegistroAuditoriaQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = "Registro de Auditoria"
+        verbose_name_plural = "Registros de Auditoria"
+        ordering = ['-criado_em', '-id']
+        indexes = [
+            models.Index(fields=['modelo', 'objeto_id', 'criado_em'], name='auditoria_objeto_idx'),
+            models.Index(fields=['usuario', 'criado_em'], name='auditoria_usuario_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_acao_display()} de {self.modelo} {self.objeto_id} em {self.criado_em:%d/%m/%Y %H:%M}"
+
+
+TAREFA_PENDENTE = 'PENDENTE'
+TAREFA_EXECUTANDO = 'EXECUTANDO'
+TAREFA_CONCLUIDA = 'CONCLUIDA'
+TAREFA_FALHOU = 'FALHOU'
+TAREFA_STATUS_CHOICES = (
+    (TAREFA_PENDENTE, 'Na fila'),
+    (TAREFA_EXECUTANDO, 'Executando'),
+    (TAREFA_CONCLUIDA, 'Concluída'),
+    (TAREFA_FALHOU, 'Falhou'),
+)
+
+
+class Tarefa(models.Model):
+    """
+    Tarefa da fila em segundo plano, executada pelo comando `processar_tarefas`
+    (ver alunos/tarefas.py).
+    """
+    # Caminho da função marcada com @tarefa, ex: 'alunos.miniaturas.processar_aluno'
+    funcao = models.CharField(max_length=200)
+    argumentos = models.JSONField(default=dict, blank=True, encoder=DjangoJSONEncoder)
+    # Maior primeiro
+    prioridade = models.SmallIntegerField(default=0)
+    status = models.CharField(max_length=10, choices=TAREFA_STATUS_CHOICES, default=TAREFA_PENDENTE)
+    # No máximo uma tarefa na fila por chave (ex: 'miniaturas:42'), e uma executando por vez
+    chave = models.CharField(max_length=100, blank=True, null=True)
+    executar_em = models.DateTimeField(default=timezone.now)
+    tentativas = models.PositiveSmallIntegerField(default=0)
+    max_tentativas = models.PositiveSmallIntegerField(default=3)
+    # Reserva do trabalhador que está executando; vencida, a tarefa volta para a fila
+    trabalhador = models.CharField(max_length=100, blank=True)
+    reservada_ate = models.DateTimeField(blank=True, null=True)
+    # Quem pediu (a auditoria das alterações feitas pela tarefa leva este usuário)
+    usuario = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.DO_NOTHING, db_constraint=False,
+        blank=True, null=True, related_name='+',
+    )
+    resultado = models.TextField(blank=True)
+    erro = models.TextField(blank=True)
+    criada_em = models.DateTimeField(auto_now_add=True)
+    iniciada_em = models.DateTimeField(blank=True, null=True)
+    concluida_em = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        verbose_name = "Tarefa"
+        verbose_name_plural = "Tarefas"
+        ordering = ['-id']
+        indexes = [
+            # Próxima tarefa a executar: só as da fila, na ordem em que são reservadas
+            models.Index(fields=['-prioridade', 'executar_em', 'id'], condition=models.Q(status='PENDENTE'),
+                         name='tarefa_fila_idx'),
+            # Reservas vencidas (trabalhador que morreu no meio)
+            models.Index(fields=['reservada_ate'], condition=models.Q(status='EXECUTANDO'),
+                         name='tarefa_reserva_idx'),
+            # Listas da tela de tarefas, das mais recentes para as mais antigas
+            models.Index(fields=['status', 'id'], name='tarefa_status_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['chave'], condition=models.Q(status='PENDENTE'),
+                                    name='tarefa_chave_na_fila_unica'),
+        ]
+
+    def __str__(self):
+        return f"{self.funcao} #{self.pk} ({self.get_status_display()})"
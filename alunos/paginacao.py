@@ -0,0 +1,191 @@
+# alunos/paginacao.py
+
+"""
+Paginação por cursor (keyset) para listas grandes.
+
+Em vez de OFFSET (que obriga o banco a percorrer todas as linhas anteriores),
+cada página começa a partir dos valores de ordenação da última linha vista.
+Assim a página 200 custa o mesmo que a página 1, desde que exista um índice
+cobrindo a ordenação usada.
+"""
+
+import base64
+import json
+
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+
+TAMANHO_PAGINA_PADRAO = 25
+
+
+class Pagina:
+    """Resultado de uma página: os objetos e os cursores para navegar."""
+
+    def __init__(self, objetos, tem_anterior, tem_proxima, cursor_anterior=None, cursor_proximo=None):
+        self.objetos = objetos
+        self.tem_anterior = tem_anterior
+        self.tem_proxima = tem_proxima
+        self.cursor_anterior = cursor_anterior
+        self.cursor_proximo = cursor_proximo
+
+    def __iter__(self):
+        return iter(self.objetos)
+
+    def __len__(self):
+        return len(self.objetos)
+
+    def __bool__(self):
+        return bool(self.objetos)
+
+
+def _normalizar_ordenacao(modelo, ordenacao):
+    """Converte ['-nome', 'pk'] em [('nome', True), ('id', False)] (campo, descendente)."""
+    campos = []
+    for item in ordenacao:
+        descendente = item.startswith('-')
+        nome = item.lstrip('-')
+        if nome == 'pk':
+            nome = modelo._meta.pk.name
+        campos.append((nome, descendente))
+    return campos
+
+
+def _assinatura(campos):
+    return ','.join(('-' if desc else '') + nome for nome, desc in campos)
+
+
+def _valor(objeto, nome):
+    if isinstance(objeto, dict):
+        return objeto[nome]
+    return getattr(objeto, nome)
+
+
+def codificar_cursor(campos, objeto):
+    """Gera o token opaco (base64 de JSON) com os valores de ordenação do objeto."""
+    dados = {
+        'o': _assinatura(campos),
+        'v': [_valor(objeto, nome) for nome, _ in campos],
+    }
+    bruto = json.dumps(dados, cls=DjangoJSONEncoder, separators=(',', ':'))
+    return base64.urlsafe_b64encode(bruto.encode()).decode().rstrip('=')
+
+
+def decodificar_cursor(modelo, campos, token):
+    """
+    Converte o token de volta em valores Python.
+    Retorna None se o token for inválido ou pertencer a outra ordenação
+    (ex: o usuário trocou a ordenação da tabela).
+    """
+    if not token:
+        return None
+    try:
+        bruto = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        dados = json.loads(bruto)
+        if dados.get('o') != _assinatura(campos) or len(dados.get('v', [])) != len(campos):
+            return None
+        return [
+            modelo._meta.get_field(nome).to_python(valor)
+            for (nome, _), valor in zip(campos, dados['v'])
+        ]
+    except (ValueError, TypeError, AttributeError, ValidationError):
+        return None
+
+
+def _filtro_keyset(campos, valores, para_frente):
+    """
+    Monta a condição "linha vem depois (ou antes) do cursor" para a ordenação dada.
+
+    Para (a, b) ascendente, "depois de (x, y)" é: a > x OU (a = x E b > y).
+    O limite extra a >= x deixa o banco posicionar o índice direto no cursor.
+    """
+    condicao = Q()
+    iguais = Q()
+    for (nome, descendente), valor in zip(campos, valores):
+        crescente = (not descendente) == para_frente
+        condicao |= iguais & Q(**{f'{nome}__{"gt" if crescente else "lt"}': valor})
+        iguais &= Q(**{nome: valor})
+
+    nome, descendente = campos[0]
+    crescente = (not descendente) == para_frente
+    limite = Q(**{f'{nome}__{"gte" if crescente else "lte"}': valores[0]})
+    return limite & condicao
+
+
+def _preparar(queryset, ordenacao, depois, antes, tamanho):
+    """Monta a consulta da página (ainda não executada) e o que é preciso para montar a Pagina."""
+    modelo = queryset.model
+    campos = _normalizar_ordenacao(modelo, ordenacao)
+    ordem = [('-' if desc else '') + nome for nome, desc in campos]
+    ordem_inversa = [('' if desc else '-') + nome for nome, desc in campos]
+
+    valores_antes = decodificar_cursor(modelo, campos, antes)
+    valores_depois = None if valores_antes else decodificar_cursor(modelo, campos, depois)
+
+    if valores_antes:
+        consulta = (
+            queryset.filter(_filtro_keyset(campos, valores_antes, para_frente=False))
+            .order_by(*ordem_inversa)[:tamanho + 1]
+        )
+    else:
+        if valores_depois:
+            queryset = queryset.filter(_filtro_keyset(campos, valores_depois, para_frente=True))
+        consulta = queryset.order_by(*ordem)[:tamanho + 1]
+    return consulta, campos, valores_antes, valores_depois
+
+
+def _montar_pagina(linhas, campos, valores_antes, valores_depois, tamanho):
+    if valores_antes:
+        tem_anterior = len(linhas) > tamanho
+        objetos = linhas[:tamanho][::-1]
+        tem_proxima = True
+    else:
+        tem_proxima = len(linhas) > tamanho
+        objetos = linhas[:tamanho]
+        tem_anterior = valores_depois is not None
+
+    return Pagina(
+        objetos,
+        tem_anterior=tem_anterior and bool(objetos),
+        tem_proxima=tem_proxima and bool(objetos),
+        cursor_anterior=codificar_cursor(campos, objetos[0]) if objetos and tem_anterior else None,
+        cursor_proximo=codificar_cursor(campos, objetos[-1]) if objetos and tem_proxima else None,
+    )
+
+
+def paginar(queryset, ordenacao, depois=None, antes=None, tamanho=TAMANHO_PAGINA_PADRAO):
+    """
+    Retorna uma Pagina do queryset ordenado por `ordenacao`.
+
+    `ordenacao` deve terminar em um campo único (normalmente 'pk') para que o
+    cursor identifique exatamente uma linha. `depois` e `antes` são os tokens
+    recebidos da página anterior; tokens inválidos voltam para a primeira página.
+    Sempre executa uma única consulta com LIMIT, nunca OFFSET.
+    """
+    consulta, *estado = _preparar(queryset, ordenacao, depois, antes, tamanho)
+    return _montar_pagina(list(consulta), *estado, tamanho)
+
+
+def paginar_varios(querysets, ordenacao, depois=None, antes=None, tamanho=TAMANHO_PAGINA_PADRAO):
+    """
+    Uma Pagina sobre a união de querysets de modelos com os mesmos campos de
+    ordenação e chaves que não se repetem entre eles (ex: pagamentos e
+    pagamentos arquivados). Cada queryset traz até `tamanho + 1` linhas a
+    partir do cursor, pelo seu próprio índice, e as listas são intercaladas
+    aqui: uma consulta por queryset, sem UNION (que não aceita select_related
+    nem anotações diferentes em cada lado).
+    """
+    linhas = []
+    for queryset in querysets:
+        consulta, campos, valores_antes, valores_depois = _preparar(queryset, ordenacao, depois, antes, tamanho)
+        linhas.extend(consulta)
+    # Ordenações estáveis do último campo para o primeiro; para trás, na ordem inversa como no _preparar
+    for nome, descendente in reversed(campos):
+        linhas.sort(key=lambda objeto: _valor(objeto, nome), reverse=descendente != bool(valores_antes))
+    return _montar_pagina(linhas[:tamanho + 1], campos, valores_antes, valores_depois, tamanho)
+
+
+async def apaginar(queryset, ordenacao, depois=None, antes=None, tamanho=TAMANHO_PAGINA_PADRAO):
+    """Versão assíncrona de `paginar` (mesma consulta, lida com aiterator)."""
+    consulta, *estado = _preparar(queryset, ordenacao, depois, antes, tamanho)
+    return _montar_pagina([objeto async for objeto in consulta.aiterator()], *estado, tamanho)
@@ -0,0 +1,195 @@
+# alunos/resumo.py
+
+"""
+Resumo mensal de pagamentos (tabela `alunos_resumomensal`).
+
+Guarda quantidade e soma (em centavos) por mês de data_pagamento, método e
+situação (pago/em aberto). Triggers em `alunos_pagamento` aplicam o delta de
+cada INSERT, UPDATE (valor, data, método, pago) e DELETE, então o resumo fica
+certo inclusive com bulk_create, update() e exclusões em cascata.
+
+Os totais de um período somam algumas linhas do resumo para os meses
+completos e só consultam `alunos_pagamento` nas pontas (meses parciais).
+Em bancos sem os triggers (fora do SQLite) os totais vêm direto dos pagamentos.
+"""
+
+import calendar
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import connection, transaction
+from django.db.models import Count, Sum
+
+TABELA_RESUMO = 'alunos_resumomensal'
+TABELA_PAGAMENTO = 'alunos_pagamento'
+
+_MES = "date({p}.data_pagamento, 'start of month')"
+_CENTAVOS = "CAST(round({p}.valor * 100) AS INTEGER)"
+
+
+def _somar(p, sinal):
+    """Upsert que soma (+1, +valor) ou subtrai (-1, -valor) a linha do pagamento `p` (new/old)."""
+    return (
+        f"INSERT INTO {TABELA_RESUMO} (mes, metodo_pagamento, pago, quantidade, total_centavos) "
+        f"VALUES ({_MES.format(p=p)}, {p}.metodo_pagamento, {p}.pago, {sinal}1, {sinal}{_CENTAVOS.format(p=p)}) "
+        f"ON CONFLICT (mes, metodo_pagamento, pago) DO UPDATE SET "
+        f"quantidade = quantidade + excluded.quantidade, "
+        f"total_centavos = total_centavos + excluded.total_centavos; "
+    )
+
+
+def _limpar(p):
+    """Remove a linha que ficou zerada (mês/método sem mais pagamentos)."""
+    return (
+        f"DELETE FROM {TABELA_RESUMO} WHERE mes = {_MES.format(p=p)} "
+        f"AND metodo_pagamento = {p}.metodo_pagamento AND pago = {p}.pago AND quantidade = 0; "
+    )
+
+
+SQL_TRIGGERS = {
+    f'{TABELA_RESUMO}_ai': (
+        f"CREATE TRIGGER IF NOT EXISTS {TABELA_RESUMO}_ai AFTER INSERT ON {TABELA_PAGAMENTO} BEGIN "
+        f"{_somar('new', '+')}END"
+    ),
+    f'{TABELA_RESUMO}_ad': (
+        f"CREATE TRIGGER IF NOT EXISTS {TABELA_RESUMO}_ad AFTER DELETE ON {TABELA_PAGAMENTO} BEGIN "
+        f"{_somar('old', '-')}{_limpar('old')}END"
+    ),
+    f'{TABELA_RESUMO}_au': (
+        f"CREATE TRIGGER IF NOT EXISTS {TABELA_RESUMO}_au "
+        f"AFTER UPDATE OF valor, data_pagamento, metodo_pagamento, pago ON {TABELA_PAGAMENTO} BEGIN "
+        f"{_somar('old', '-')}{_somar('new', '+')}{_limpar('old')}END"
+    ),
+}
+
+SQL_RECONSTRUIR = (
+    f"INSERT INTO {TABELA_RESUMO} (mes, metodo_pagamento, pago, quantidade, total_centavos) "
+    f"SELECT {_MES.format(p='p')}, p.metodo_pagamento, p.pago, COUNT(*), SUM({_CENTAVOS.format(p='p')}) "
+    f"FROM {TABELA_PAGAMENTO} p GROUP BY 1, 2, 3"
+)
+
+
+def resumo_disponivel(conexao=None):
+    return (conexao or connection).vendor == 'sqlite'
+
+
+def reconstruir_resumo(conexao=None):
+    """Recalcula o resumo inteiro a partir dos pagamentos (uma única transação)."""
+    conexao = conexao or connection
+    if not resumo_disponivel(conexao):
+        return
+    with transaction.atomic(using=conexao.alias), conexao.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {TABELA_RESUMO}')
+        cursor.execute(SQL_RECONSTRUIR)
+
+
+def garantir_resumo(conexao=None):
+    """
+    Cria os triggers que estiverem faltando e, nesse caso, reconstrói o resumo
+    (escritas feitas sem os triggers não foram contadas). Roda após cada
+    migrate, pois o SQLite descarta os triggers ao recriar `alunos_pagamento`.
+    """
+    conexao = conexao or connection
+    if not resumo_disponivel(conexao):
+        return
+    with conexao.cursor() as cursor:
+        cursor.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'trigger' AND name IN (%s, %s, %s)",
+            list(SQL_TRIGGERS),
+        )
+        if {linha[0] for linha in cursor.fetchall()} == set(SQL_TRIGGERS):
+            return
+        for sql in SQL_TRIGGERS.values():
+            cursor.execute(sql)
+    reconstruir_resumo(conexao)
+
+
+def remover_resumo(conexao=None):
+    conexao = conexao or connection
+    if not resumo_disponivel(conexao):
+        return
+    with conexao.cursor() as cursor:
+        for nome in SQL_TRIGGERS:
+            cursor.execute(f'DROP TRIGGER IF EXISTS {nome}')
+
+
+def _fim_do_mes(data):
+    return data.replace(day=calendar.monthrange(data.year, data.month)[1])
+
+
+def _dividir_periodo(data_inicio, data_fim):
+    """
+    Separa o período em meses completos e pontas. Devolve ((primeiro, ultimo), pontas):
+    primeiro/ultimo são os dias 1º do primeiro e do último mês completo (None = sem
+    limite) ou None se não houver mês completo; pontas são intervalos de datas
+    que não cobrem um mês inteiro e precisam ser somados nos pagamentos.
+    """
+    primeiro = ultimo = None
+    if data_inicio:
+        primeiro = data_inicio if data_inicio.day == 1 else _fim_do_mes(data_inicio) + timedelta(days=1)
+    if data_fim:
+        ultimo = data_fim.replace(day=1) if data_fim == _fim_do_mes(data_fim) else \
+            (data_fim.replace(day=1) - timedelta(days=1)).replace(day=1)
+
+    if primeiro and ultimo and primeiro > ultimo:
+        return None, [(data_inicio, data_fim)]
+
+    pontas = []
+    if data_inicio and data_inicio != primeiro:
+        pontas.append((data_inicio, primeiro - timedelta(days=1)))
+    if data_fim and data_fim != _fim_do_mes(data_fim):
+        pontas.append((data_fim.replace(day=1), data_fim))
+    return (primeiro, ultimo), pontas
+
+
+def totais_periodo(data_inicio=None, data_fim=None):
+    """
+    Quantidade e soma dos pagamentos com data_pagamento no período, e a série
+    por mês (meses inteiros que tocam o período) para gráficos e tabelas:
+    {'total', 'quantidade', 'meses': [{'mes', 'pago', 'em_aberto', 'quantidade'}]}.
+    """
+    from .models import Pagamento, ResumoMensal
+
+    if data_inicio and data_fim and data_inicio > data_fim:
+        return {'total': Decimal('0.00'), 'quantidade': 0, 'meses': []}
+
+    if not resumo_disponivel():
+        pagamentos = Pagamento.objects.all()
+        if data_inicio:
+            pagamentos = pagamentos.filter(data_pagamento__gte=data_inicio)
+        if data_fim:
+            pagamentos = pagamentos.filter(data_pagamento__lte=data_fim)
+        totais = pagamentos.order_by().aggregate(total=Sum('valor'), quantidade=Count('id'))
+        return {'total': totais['total'] or Decimal('0.00'), 'quantidade': totais['quantidade'], 'meses': []}
+
+    completos, pontas = _dividir_periodo(data_inicio, data_fim)
+
+    # Uma leitura de algumas linhas do resumo cobre todos os meses tocados pelo período
+    linhas = ResumoMensal.objects.order_by('mes')
+    if data_inicio:
+        linhas = linhas.filter(mes__gte=data_inicio.replace(day=1))
+    if data_fim:
+        linhas = linhas.filter(mes__lte=data_fim.replace(day=1))
+
+    meses = {}
+    quantidade = centavos = 0
+    for mes, pago, qtd, soma in linhas.values_list('mes', 'pago', 'quantidade', 'total_centavos'):
+        dados = meses.setdefault(mes, {'mes': mes, 'pago': 0, 'em_aberto': 0, 'quantidade': 0})
+        dados['pago' if pago else 'em_aberto'] += soma
+        dados['quantidade'] += qtd
+        if completos and (completos[0] is None or mes >= completos[0]) and (completos[1] is None or mes <= completos[1]):
+            quantidade += qtd
+            centavos += soma
+
+    total = Decimal(centavos).scaleb(-2)
+    for inicio, fim in pontas:
+        parcial = Pagamento.objects.filter(data_pagamento__range=(inicio, fim)).order_by().aggregate(
+            total=Sum('valor'), quantidade=Count('id'),
+        )
+        total += parcial['total'] or 0
+        quantidade += parcial['quantidade']
+
+    for dados in meses.values():
+        dados['pago'] = Decimal(dados['pago']).scaleb(-2)
+        dados['em_aberto'] = Decimal(dados['em_aberto']).scaleb(-2)
+    return {'total': total.quantize(Decimal('0.01')), 'quantidade': quantidade, 'meses': list(meses.values())}
@@ -0,0 +1,72 @@
+# alunos/signals.py
+
+from django.db import connections
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from . import auditoria, miniaturas
+from .busca import garantir_indice_busca
+from .cache import invalidar
+from .models import Aluno, Pagamento
+from .resumo import garantir_resumo
+from .situacao import atualizar_situacao
+
+
+@receiver(post_save, sender=Pagamento)
+@receiver(post_delete, sender=Pagamento)
+def invalidar_cache_pagamentos(sender, **kwargs):
+    """Qualquer mudança em pagamentos invalida os totais em cache."""
+    invalidar('pagamentos')
+
+
+@receiver(post_save, sender=Pagamento)
+@receiver(post_delete, sender=Pagamento)
+def atualizar_situacao_aluno(sender, instance, raw=False, **kwargs):
+    """Recalcula a situação financeira do aluno (e do anterior, se o pagamento mudou de aluno)."""
+    if raw:
+        return
+    alunos = {instance.aluno_id, getattr(instance, '_aluno_id_original', None)} - {None}
+    atualizar_situacao(alunos)
+    instance._aluno_id_original = instance.aluno_id
+
+
+@receiver(post_save, sender=Aluno)
+@receiver(post_delete, sender=Aluno)
+def invalidar_cache_alunos(sender, **kwargs):
+    """Cadastro, edição ou exclusão de aluno invalida os indicadores em cache."""
+    invalidar('alunos')
+
+
+@receiver(post_save, sender=Aluno)
+def agendar_miniaturas(sender, instance, raw=False, **kwargs):
+    """Foto nova ou trocada: gera as variantes reduzidas em segundo plano."""
+    if raw:
+        return
+    if miniaturas.precisa_gerar(instance):
+        miniaturas.agendar(instance)
+    elif not instance.foto and instance.miniaturas:
+        # Foto removida: descarta a referência às variantes antigas
+        Aluno.objects.filter(pk=instance.pk).update(miniaturas={}, atualizado_em=timezone.now())
+        instance.miniaturas = {}
+
+
+@receiver(post_save, sender=Aluno)
+@receiver(post_save, sender=Pagamento)
+def auditar_gravacao(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    """Diferença campo a campo contra os valores lidos do banco (ver alunos/auditoria.py)."""
+    if raw:
+        return
+    auditoria.ao_salvar(instance, created, update_fields)
+
+
+@receiver(post_delete, sender=Aluno)
+@receiver(post_delete, sender=Pagamento)
+def auditar_exclusao(sender, instance, **kwargs):
+    auditoria.ao_excluir(instance)
+
+
+def garantir_triggers_apos_migrate(sender, using, **kwargs):
+    """Recria triggers (busca e resumo mensal) que o SQLite tenha descartado ao recriar tabelas."""
+    garantir_indice_busca(connections[using])
+    garantir_resumo(connections[using])
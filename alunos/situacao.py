@@ -0,0 +1,83 @@
+# alunos/situacao.py
+
+"""
+Situação financeira guardada no próprio aluno.
+
+Campos mantidos em `Aluno`:
+- ultimo_pagamento: maior data_pagamento entre os pagamentos quitados;
+- proximo_vencimento: menor vencimento em aberto a partir de hoje;
+- faturas_vencidas / total_vencido: pagamentos em aberto com vencimento antes de hoje.
+
+São recalculados por um único UPDATE com subconsultas para o conjunto de
+alunos afetado (nunca linha a linha em Python): pelos sinais de Pagamento, ao
+fim das escritas em lote e, uma vez por dia, para quem cruzou a data de hoje
+(proximo_vencimento passou a ser uma fatura vencida).
+"""
+
+from datetime import date
+from decimal import Decimal
+
+from django.db.models import Count, DecimalField, IntegerField, OuterRef, QuerySet, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+TAMANHO_LOTE = 2000
+
+
+def expressoes_situacao(modelo_pagamento, hoje):
+    """Expressões do UPDATE (recebem o modelo para servir também à migração de dados)."""
+    pagamentos = modelo_pagamento.objects.filter(aluno_id=OuterRef('pk')).order_by()
+    abertos = pagamentos.filter(pago=False)
+    vencidos = abertos.filter(data_vencimento__lt=hoje).values('aluno_id')
+    return {
+        'ultimo_pagamento': Subquery(
+            pagamentos.filter(pago=True).order_by('-data_pagamento').values('data_pagamento')[:1]
+        ),
+        'proximo_vencimento': Subquery(
+            abertos.filter(data_vencimento__gte=hoje).order_by('data_vencimento').values('data_vencimento')[:1]
+        ),
+        'faturas_vencidas': Coalesce(
+            Subquery(vencidos.annotate(n=Count('id')).values('n'), output_field=IntegerField()),
+            Value(0),
+        ),
+        'total_vencido': Coalesce(
+            Subquery(vencidos.annotate(s=Sum('valor')).values('s'),
+                     output_field=DecimalField(max_digits=10, decimal_places=2)),
+            Value(Decimal('0.00')),
+            output_field=DecimalField(max_digits=10, decimal_places=2),
+        ),
+    }
+
+
+def atualizar_situacao(alunos, hoje=None):
+    """
+    Recalcula a situação dos alunos do queryset (ou iterável de pks) em um
+    único UPDATE. Devolve a quantidade de alunos atualizados.
+    """
+    from .models import Aluno, Pagamento
+
+    if not isinstance(alunos, QuerySet):
+        alunos = Aluno.objects.filter(pk__in=list(alunos))
+    return alunos.order_by().update(
+        **expressoes_situacao(Pagamento, hoje or date.today()), atualizado_em=timezone.now(),
+    )
+
+
+def atualizar_vencimentos_do_dia(hoje=None, todos=False, tamanho_lote=TAMANHO_LOTE):
+    """
+    Tarefa diária: recalcula quem tem um vencimento em aberto que já passou
+    (ou todos os alunos, com todos=True), em lotes para não segurar o lock
+    de escrita do SQLite por muito tempo.
+    """
+    from .models import Aluno
+
+    hoje = hoje or date.today()
+    alunos = Aluno.objects.all() if todos else Aluno.objects.filter(proximo_vencimento__lt=hoje)
+    total = 0
+    ultimo_pk = 0
+    while True:
+        pks = list(alunos.filter(pk__gt=ultimo_pk).order_by('pk').values_list('pk', flat=True)[:tamanho_lote])
+        if not pks:
+            return total
+        ultimo_pk = pks[-1]
+        total += atualizar_situacao(Aluno.objects.filter(pk__in=pks), hoje)
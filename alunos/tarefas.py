@@ -0,0 +1,339 @@
+# alunos/tarefas.py
+
+"""
+Fila de tarefas em segundo plano guardada no próprio banco (Tarefa), sem
+Redis nem outro broker.
+
+A função da tarefa (de módulo, com argumentos que cabem em JSON) é marcada
+com `@tarefa` e pedida com `enfileirar(funcao, **argumentos)`. A linha é
+gravada na transação atual: se a alteração que pediu a tarefa for desfeita,
+a tarefa some junto. Quem executa é o comando `processar_tarefas`.
+
+- Reserva: o trabalhador escolhe as próximas tarefas (maior prioridade,
+  depois `executar_em` e id, pelo índice parcial da fila) e as reserva com um
+  UPDATE condicional em `status = PENDENTE`: dois trabalhadores nunca ficam
+  com a mesma tarefa. A reserva vale até `reservada_ate` e é renovada
+  enquanto a tarefa roda; se o trabalhador morrer, a tarefa volta para a fila
+  quando o prazo vence.
+- Falha: nova tentativa depois de ESPERA_BASE * 2^(tentativas - 1) segundos
+  (no máximo ESPERA_MAXIMA), até `max_tentativas`; depois fica como FALHOU,
+  com o traceback, na tela de tarefas, que permite executar de novo.
+- Chave: no máximo uma tarefa na fila por chave (pedir de novo não duplica)
+  e uma executando por vez (a da fila espera a atual terminar).
+- settings.TAREFAS_SINCRONAS: executa logo depois do commit, no próprio
+  processo (testes e desenvolvimento sem trabalhador). `executar_em` e `chave`
+  são ignorados: tarefa que se reagenda deve consultar `sincronas()` e fazer
+  o trabalho todo de uma vez (ver lembretes.enviar_lembretes).
+"""
+
+import json
+import logging
+import multiprocessing
+import os
+import socket
+import threading
+import time
+import traceback
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from datetime import timedelta
+from functools import partial
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import IntegrityError, close_old_connections, transaction
+from django.db.models import Exists, F, OuterRef
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from . import auditoria, tarefas_processo
+from .models import TAREFA_CONCLUIDA, TAREFA_EXECUTANDO, TAREFA_FALHOU, TAREFA_PENDENTE, Tarefa
+
+logger = logging.getLogger(__name__)
+
+PRIORIDADE_ALTA = 10
+PRIORIDADE_NORMAL = 0
+PRIORIDADE_BAIXA = -10
+MAX_TENTATIVAS = 3
+# Espera antes de cada nova tentativa, em segundos: 30, 60, 120... até 1 hora
+ESPERA_BASE = 30
+ESPERA_MAXIMA = 3600
+# Validade da reserva, em segundos; renovada na metade do prazo enquanto a tarefa roda
+PRAZO_RESERVA = 300
+# Pausa entre consultas à fila quando não há nada para fazer
+INTERVALO_CONSULTA = 1.0
+# Concluídas mais antigas que isso são apagadas pelo trabalhador
+DIAS_HISTORICO = 7
+# Tarefa pronta há mais que isso (segundos) sem ser reservada: nenhum trabalhador rodando
+ATRASO_ALERTA = 10 * 60
+AVISO_SEM_TRABALHADOR = (
+    "Há tarefas esperando há mais de %d minutos na fila: o trabalhador "
+    "(python manage.py processar_tarefas) está rodando?"
+)
+
+
+def tarefa(funcao=None, *, prioridade=PRIORIDADE_NORMAL, max_tentativas=MAX_TENTATIVAS):
+    """Marca uma função de módulo como executável pela fila (`@tarefa` ou `@tarefa(prioridade=...)`)."""
+    def marcar(f):
+        f.tarefa = {'prioridade': prioridade, 'max_tentativas': max_tentativas}
+        return f
+    return marcar(funcao) if funcao is not None else marcar
+
+
+def _caminho(funcao):
+    if not hasattr(funcao, 'tarefa'):
+        raise ValueError(f"{funcao!r} não está marcada com @tarefa.")
+    return f'{funcao.__module__}.{funcao.__qualname__}'
+
+
+def resolver(caminho):
+    funcao = import_string(caminho)
+    # Uma linha da tabela não escolhe qualquer função do projeto, só as marcadas
+    if not hasattr(funcao, 'tarefa'):
+        raise ValueError(f"{caminho} não está marcada com @tarefa.")
+    return funcao
+
+
+def sincronas():
+    return getattr(settings, 'TAREFAS_SINCRONAS', False)
+
+
+def enfileirar(funcao, *, prioridade=None, chave=None, executar_em=None, **argumentos):
+    """
+    Grava a tarefa na transação atual e devolve a Tarefa (sem pk se já havia
+    uma na fila com a mesma chave; None com TAREFAS_SINCRONAS). O usuário da
+    requisição vai junto para a auditoria do que a tarefa alterar.
+    """
+    caminho = _caminho(funcao)
+    # Ida e volta pelo JSON também no modo síncrono: os argumentos chegam como chegariam ao trabalhador
+    argumentos = json.loads(json.dumps(argumentos, cls=DjangoJSONEncoder))
+    usuario_id = auditoria.usuario_atual()
+    if sincronas():
+        transaction.on_commit(partial(executar, caminho, argumentos, usuario_id))
+        return None
+
+    nova = Tarefa(
+        funcao=caminho, argumentos=argumentos, chave=chave, usuario_id=usuario_id,
+        prioridade=funcao.tarefa['prioridade'] if prioridade is None else prioridade,
+        max_tentativas=funcao.tarefa['max_tentativas'],
+    )
+    if executar_em is not None:
+        nova.executar_em = executar_em
+    if chave is None:
+        nova.save()
+    else:
+        # INSERT OR IGNORE: a tarefa que já está na fila com esta chave atende o pedido
+        Tarefa.objects.bulk_create([nova], ignore_conflicts=True)
+    if paradas().exists():
+        logger.warning(AVISO_SEM_TRABALHADOR, ATRASO_ALERTA // 60)
+    return nova
+
+
+def paradas(agora=None):
+    """Tarefas prontas há mais de ATRASO_ALERTA que nenhum trabalhador reservou."""
+    limite = (agora or timezone.now()) - timedelta(seconds=ATRASO_ALERTA)
+    return Tarefa.objects.filter(status=TAREFA_PENDENTE, executar_em__lt=limite)
+
+
+def executar(caminho, argumentos, usuario_id=None):
+    """Executa o corpo da tarefa; o resultado volta como texto (atravessa processos)."""
+    with auditoria.agrupar(usuario_id):
+        resultado = resolver(caminho)(**argumentos)
+    return '' if resultado is None else str(resultado)
+
+
+def _executar_no_pool(caminho, argumentos, usuario_id):
+    # Thread ou processo do pool: cada um com a sua conexão, descartada se ficar inutilizável
+    close_old_connections()
+    try:
+        return executar(caminho, argumentos, usuario_id)
+    finally:
+        close_old_connections()
+
+
+# ----------------------------------------------------------
+# Reserva e conclusão
+# ----------------------------------------------------------
+
+def fila(agora=None):
+    """Tarefas prontas para executar, na ordem de reserva."""
+    executando = Tarefa.objects.filter(status=TAREFA_EXECUTANDO, chave=OuterRef('chave'))
+    return (
+        Tarefa.objects.filter(status=TAREFA_PENDENTE, executar_em__lte=agora or timezone.now())
+        .exclude(Exists(executando))
+        .order_by('-prioridade', 'executar_em', 'id')
+    )
+
+
+def reservar(trabalhador, quantidade, prazo=PRAZO_RESERVA):
+    """Reserva até `quantidade` tarefas para `trabalhador` e devolve as reservadas."""
+    agora = timezone.now()
+    candidatas = list(fila(agora).values_list('pk', flat=True)[:quantidade])
+    if not candidatas:
+        return []
+    # Compare-and-set: só passam para este trabalhador as que ainda estavam na fila
+    reservadas = Tarefa.objects.filter(pk__in=candidatas, status=TAREFA_PENDENTE).update(
+        status=TAREFA_EXECUTANDO, trabalhador=trabalhador, reservada_ate=agora + timedelta(seconds=prazo),
+        iniciada_em=agora, tentativas=F('tentativas') + 1,
+    )
+    if not reservadas:
+        return []
+    return list(
+        Tarefa.objects.filter(pk__in=candidatas, status=TAREFA_EXECUTANDO, trabalhador=trabalhador, iniciada_em=agora)
+        .order_by('-prioridade', 'executar_em', 'id')
+    )
+
+
+def espera(tentativas):
+    """Segundos até a próxima tentativa depois de `tentativas` falhas."""
+    return min(ESPERA_BASE * 2 ** (tentativas - 1), ESPERA_MAXIMA)
+
+
+def concluir(tarefa, trabalhador, resultado):
+    # Filtrado pelo trabalhador: quem perdeu a reserva não sobrescreve o novo dono
+    Tarefa.objects.filter(pk=tarefa.pk, status=TAREFA_EXECUTANDO, trabalhador=trabalhador).update(
+        status=TAREFA_CONCLUIDA, resultado=resultado, erro='', reservada_ate=None, concluida_em=timezone.now(),
+    )
+
+
+def falhar(tarefa, trabalhador, erro):
+    """Volta para a fila com espera exponencial ou, sem tentativas restantes, fica como FALHOU."""
+    agora = timezone.now()
+    minha = Tarefa.objects.filter(pk=tarefa.pk, status=TAREFA_EXECUTANDO, trabalhador=trabalhador)
+    if tarefa.tentativas < tarefa.max_tentativas:
+        try:
+            with transaction.atomic():
+                if minha.update(
+                    status=TAREFA_PENDENTE, erro=erro, trabalhador='', reservada_ate=None,
+                    executar_em=agora + timedelta(seconds=espera(tarefa.tentativas)),
+                ):
+                    return
+        except IntegrityError:
+            # Já há outra tarefa na fila com a mesma chave: ela faz o trabalho
+            pass
+    minha.update(status=TAREFA_FALHOU, erro=erro, reservada_ate=None, concluida_em=agora)
+
+
+def renovar(trabalhador, pks, prazo=PRAZO_RESERVA):
+    if pks:
+        Tarefa.objects.filter(pk__in=pks, status=TAREFA_EXECUTANDO, trabalhador=trabalhador).update(
+            reservada_ate=timezone.now() + timedelta(seconds=prazo),
+        )
+
+
+def liberar_vencidas():
+    """Trata como falha as tarefas com a reserva vencida (trabalhador que parou no meio). Devolve quantas."""
+    vencidas = list(Tarefa.objects.filter(status=TAREFA_EXECUTANDO, reservada_ate__lt=timezone.now()))
+    for vencida in vencidas:
+        falhar(vencida, vencida.trabalhador, f"Reserva de {vencida.trabalhador} vencida antes do fim da tarefa.")
+    return len(vencidas)
+
+
+def limpar(dias=DIAS_HISTORICO):
+    limite = timezone.now() - timedelta(days=dias)
+    return Tarefa.objects.filter(status=TAREFA_CONCLUIDA, concluida_em__lt=limite).delete()[0]
+
+
+def reexecutar(pk):
+    """Coloca de novo na fila uma tarefa que falhou. False se não deu (não falhou ou a chave já está na fila)."""
+    try:
+        with transaction.atomic():
+            return bool(Tarefa.objects.filter(pk=pk, status=TAREFA_FALHOU).update(
+                status=TAREFA_PENDENTE, tentativas=0, executar_em=timezone.now(), trabalhador='', concluida_em=None,
+            ))
+    except IntegrityError:
+        return False
+
+
+# ----------------------------------------------------------
+# Trabalhador
+# ----------------------------------------------------------
+
+class Trabalhador:
+    """
+    Laço do comando `processar_tarefas`: reserva tarefas para as vagas livres
+    do pool (threads ou processos), registra o resultado de cada uma e, a cada
+    metade do prazo de reserva, renova as reservas em andamento, libera as
+    vencidas e apaga as concluídas antigas. Com `threads=0` e sem processos,
+    executa no próprio laço (testes).
+    """
+
+    def __init__(self, threads=2, processos=0, intervalo=INTERVALO_CONSULTA, prazo=PRAZO_RESERVA, nome=None):
+        self.threads = threads
+        self.processos = processos
+        self.intervalo = intervalo
+        self.prazo = prazo
+        self.nome = nome or f'{socket.gethostname()}:{os.getpid()}'
+        self.vagas = processos or threads or 1
+        self.parar = threading.Event()
+        self.concluidas = 0
+        self.falhas = 0
+
+    def __str__(self):
+        return f"{self.concluidas} tarefa(s) concluída(s), {self.falhas} com falha"
+
+    def _criar_pool(self):
+        if self.processos:
+            # spawn: cada processo abre as suas conexões (fork herdaria as do processo principal)
+            return ProcessPoolExecutor(
+                self.processos, mp_context=multiprocessing.get_context('spawn'), initializer=tarefas_processo.iniciar,
+            )
+        if self.threads:
+            return ThreadPoolExecutor(self.threads, thread_name_prefix='tarefas')
+        return None
+
+    def _registrar(self, tarefa, funcao_resultado):
+        try:
+            resultado = funcao_resultado()
+        except Exception:
+            self.falhas += 1
+            logger.exception("Tarefa %s #%s falhou (tentativa %s)", tarefa.funcao, tarefa.pk, tarefa.tentativas)
+            falhar(tarefa, self.nome, traceback.format_exc())
+        else:
+            self.concluidas += 1
+            logger.info("Tarefa %s #%s concluída: %s", tarefa.funcao, tarefa.pk, resultado)
+            concluir(tarefa, self.nome, resultado)
+
+    def _manutencao(self, em_andamento):
+        renovar(self.nome, [tarefa.pk for tarefa in em_andamento], self.prazo)
+        liberar_vencidas()
+        limpar()
+
+    def executar(self, uma_vez=False):
+        """Processa a fila até `parar` ser acionado (ou, com `uma_vez`, até não haver tarefa pronta)."""
+        pool = self._criar_pool()
+        em_andamento = {}
+        ultima_manutencao = None
+        try:
+            while True:
+                agora = time.monotonic()
+                if ultima_manutencao is None or agora - ultima_manutencao >= self.prazo / 2:
+                    self._manutencao(em_andamento.values())
+                    ultima_manutencao = agora
+
+                livres = 0 if self.parar.is_set() else self.vagas - len(em_andamento)
+                reservadas = reservar(self.nome, livres, self.prazo) if livres > 0 else []
+                for tarefa in reservadas:
+                    if pool is None:
+                        self._registrar(tarefa, partial(executar, tarefa.funcao, tarefa.argumentos, tarefa.usuario_id))
+                    else:
+                        executor = tarefas_processo.executar if self.processos else _executar_no_pool
+                        futuro = pool.submit(executor, tarefa.funcao, tarefa.argumentos, tarefa.usuario_id)
+                        em_andamento[futuro] = tarefa
+
+                if em_andamento:
+                    prontos, _ = wait(em_andamento, timeout=self.intervalo, return_when=FIRST_COMPLETED)
+                    for futuro in prontos:
+                        self._registrar(em_andamento.pop(futuro), futuro.result)
+                elif not reservadas:
+                    if uma_vez or self.parar.is_set():
+                        break
+                    self.parar.wait(self.intervalo)
+        finally:
+            if pool is not None:
+                pool.shutdown(wait=True)
+        return self
+
+
+def processar_pendentes():
+    """Executa no próprio processo as tarefas prontas e devolve o Trabalhador (contagens)."""
+    return Trabalhador(threads=0).executar(uma_vez=True)
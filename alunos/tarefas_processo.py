@@ -0,0 +1,19 @@
+# alunos/tarefas_processo.py
+
+"""
+Ponto de entrada dos processos do trabalhador (`processar_tarefas --processos`).
+
+Com spawn, o processo novo importa o módulo da função enviada antes de rodar
+o initializer. Por isso nada do Django é importado no topo deste módulo: o
+setup vem primeiro e a fila (alunos/tarefas.py, que carrega os modelos) depois.
+"""
+
+
+def iniciar():
+    import django
+    django.setup()
+
+
+def executar(caminho, argumentos, usuario_id):
+    from .tarefas import _executar_no_pool
+    return _executar_no_pool(caminho, argumentos, usuario_id)
@@ -1,3 +1,2456 @@
-from django.test import TestCase
+import csv
+import json
+import os
+import re
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+import zipfile
+from xml.etree import ElementTree
+from datetime import date, timedelta
+from decimal import Decimal
+from io import BytesIO, StringIO
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from PIL import Image
+
+from django.contrib.auth.models import User
+from django.core.cache import cache, caches
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.forms import modelform_factory
+from django.http import HttpResponse
+from django.test import Client, RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone, translation
+
+from .busca import buscar_alunos, filtrar_alunos, garantir_indice_busca, sugerir_alunos
+from .cache import invalidar
+from academia_manager import banco
+
+from .cobranca import data_vencimento, gerar_cobrancas
+from .concorrencia import abrir_conexao, estressar
+from .dados_sinteticos import gerar_dados
+from .forms import AlunoForm, PagamentoForm
+from .historico import pagina_historico, totais_historico
+from .importacao import ValidadorLinha, _normalizar_cabecalho, _preparar_linha, importar_alunos, ler_csv
+from . import acoes_lote, arquivo, auditoria, exclusao_direta, indicadores as modulo_indicadores, tarefas
+from .instrumentacao import InstrumentacaoMiddleware
+from .lembretes import CHAVE_ENVIO, EnviadorMemoria, enfileirar_lembretes, enviar_lembretes, processar_fila
+from .models import (
+    STATUS_PAGO, STATUS_PENDENTE, STATUS_VENCE_EM_BREVE, STATUS_VENCIDO,
+    LEMBRETE_ENVIADO, LEMBRETE_ERRO, LEMBRETE_PENDENTE,
+    TAREFA_CONCLUIDA, TAREFA_EXECUTANDO, TAREFA_FALHOU, TAREFA_PENDENTE,
+    Aluno, AlunoArquivado, Lembrete, Modalidade, ModeloMensagem, Pagamento, PagamentoArquivado, RegistroAuditoria, ResumoMensal,
+    Tarefa,
+)
+from .paginacao import paginar
+from .resumo import reconstruir_resumo, totais_periodo
+from .situacao import atualizar_situacao, atualizar_vencimentos_do_dia
+
+
+def criar_alunos(quantidade, inicio=0, **extras):
+    """Cria alunos em lote com CPF/RG únicos para os testes."""
+    alunos = [
+        Aluno(**{
+            'nome': f"Aluno {i:05d}",
+            'cpf': f"{i:011d}",
+            'rg': f"{i:09d}",
+            'data_nascimento': date(1990, 1, 1),
+            **extras,
+        })
+        for i in range(inicio, inicio + quantidade)
+    ]
+    return Aluno.objects.bulk_create(alunos)
+
+
+def criar_pagamentos(alunos, por_aluno=1, **extras):
+    """Cria pagamentos em lote, um por mês para cada aluno."""
+    pagamentos = []
+    for i, aluno in enumerate(alunos):
+        for mes in range(por_aluno):
+            dados = {
+                'valor': Decimal('100.00') + i,
+                'data_pagamento': date(2025, 1, 10) + timedelta(days=30 * mes + i % 7),
+                'data_vencimento': date(2025, 1, 10) + timedelta(days=30 * mes),
+                'metodo_pagamento': 'PIX',
+                'pago': True,
+            }
+            dados.update(extras)
+            pagamentos.append(Pagamento(aluno=aluno, **dados))
+    return Pagamento.objects.bulk_create(pagamentos)
+
+
+class ListaAlunosPaginacaoTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = User.objects.create_user('recepcao', password='senha')
+        # Nomes repetidos garantem que o desempate por pk seja exercitado
+        criar_alunos(120)
+        Aluno.objects.filter(pk__lte=Aluno.objects.order_by('pk')[10].pk).update(nome="Aluno Repetido")
+
+    def setUp(self):
+        self.client.force_login(self.usuario)
+
+    def _percorrer(self, **params):
+        """Navega por todas as páginas e devolve (pks, consultas por página)."""
+        url = reverse('alunos:lista_alunos')
+        pks, consultas = [], []
+        while True:
+            with CaptureQueriesContext(connection) as ctx:
+                resposta = self.client.get(url, params)
+            pagina = resposta.context['pagina']
+            pks.extend(aluno.pk for aluno in pagina)
+            consultas.append([q['sql'] for q in ctx.captured_queries])
+            if not pagina.tem_proxima:
+                return pks, consultas
+            params['depois'] = pagina.cursor_proximo
+
+    def test_percorre_todos_os_alunos_em_ordem(self):
+        pks, _ = self._percorrer()
+        esperado = list(Aluno.objects.filter(ativo=True).order_by('nome', 'pk').values_list('pk', flat=True))
+        self.assertEqual(pks, esperado)
+
+    def test_numero_de_consultas_constante_e_sem_offset(self):
+        _, consultas = self._percorrer()
+        self.assertGreater(len(consultas), 3)
+        self.assertEqual({len(c) for c in consultas}, {len(consultas[0])})
+        for sqls in consultas:
+            for sql in sqls:
+                self.assertNotIn('OFFSET', sql.upper())
+
+    def test_plano_usa_indice_em_qualquer_profundidade(self):
+        qs = Aluno.objects.filter(ativo=True)
+        primeira = paginar(qs, ['nome', 'pk'])
+        profunda = primeira
+        for _ in range(3):
+            profunda = paginar(qs, ['nome', 'pk'], depois=profunda.cursor_proximo)
+
+        with CaptureQueriesContext(connection) as ctx:
+            paginar(qs, ['nome', 'pk'])
+            paginar(qs, ['nome', 'pk'], depois=profunda.cursor_proximo)
+        for consulta in ctx.captured_queries:
+            with connection.cursor() as cursor:
+                cursor.execute('EXPLAIN QUERY PLAN ' + consulta['sql'])
+                plano = ' '.join(str(linha[-1]) for linha in cursor.fetchall())
+            self.assertIn('aluno_ativo_nome_idx', plano)
+            self.assertNotIn('TEMP B-TREE', plano)
+
+    def test_pagina_anterior_retorna_mesmos_alunos(self):
+        qs = Aluno.objects.filter(ativo=True)
+        primeira = paginar(qs, ['nome', 'pk'], tamanho=10)
+        segunda = paginar(qs, ['nome', 'pk'], depois=primeira.cursor_proximo, tamanho=10)
+        voltando = paginar(qs, ['nome', 'pk'], antes=segunda.cursor_anterior, tamanho=10)
+        self.assertEqual([a.pk for a in voltando], [a.pk for a in primeira])
+        self.assertFalse(voltando.tem_anterior)
+        self.assertTrue(voltando.tem_proxima)
+
+    def test_busca_combina_com_cursor(self):
+        pks, _ = self._percorrer(q='Aluno 0001')
+        self.assertEqual(len(pks), Aluno.objects.filter(nome__icontains='Aluno 0001').count())
+
+    def test_cursor_invalido_volta_para_primeira_pagina(self):
+        resposta = self.client.get(reverse('alunos:lista_alunos'), {'depois': 'lixo'})
+        self.assertEqual(resposta.status_code, 200)
+        self.assertFalse(resposta.context['pagina'].tem_anterior)
+
+
+class HistoricoPagamentosTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = User.objects.create_user('recepcao', password='senha')
+        cls.alunos = criar_alunos(60)
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.usuario)
+
+    def _consultas(self, params=None):
+        with CaptureQueriesContext(connection) as ctx:
+            resposta = self.client.get(reverse('alunos:historico_pagamentos'), params or {})
+        self.assertEqual(resposta.status_code, 200)
+        return resposta, [q['sql'] for q in ctx.captured_queries]
+
+    def test_numero_de_consultas_nao_cresce_com_as_linhas(self):
+        criar_pagamentos(self.alunos[:5])
+        _, poucas = self._consultas()
+        cache.clear()
+        criar_pagamentos(self.alunos[5:])
+        _, muitas = self._consultas()
+        self.assertEqual(len(poucas), len(muitas))
+
+    def test_trocar_ordenacao_nao_refaz_o_aggregate(self):
+        criar_pagamentos(self.alunos, por_aluno=2)
+        resposta, sqls = self._consultas()
+        # Sem filtro de datas os totais vêm só do resumo mensal, sem varrer os pagamentos
+        self.assertEqual(sum('alunos_resumomensal' in sql for sql in sqls), 1)
+        self.assertFalse(any('SUM(' in sql for sql in sqls))
+        self.assertEqual(resposta.context['quantidade_pagamentos'], 120)
+
+        resposta, sqls = self._consultas({'ordem': '-valor'})
+        self.assertFalse(any('alunos_resumomensal' in sql for sql in sqls))
+        valores = [p.valor for p in resposta.context['pagina']]
+        self.assertEqual(valores, sorted(valores, reverse=True))
+
+    def test_totais_respeitam_periodo_e_sao_invalidados(self):
+        criar_pagamentos(self.alunos[:3])
+        params = {'data_inicio': '2025-01-01', 'data_fim': '2025-12-31'}
+        resposta, _ = self._consultas(params)
+        self.assertEqual(resposta.context['total_recebido'], Decimal('303.00'))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Pagamento.objects.create(
+                aluno=self.alunos[0], valor=Decimal('50.00'), data_pagamento=date(2025, 6, 1),
+                data_vencimento=date(2025, 6, 1), metodo_pagamento='PIX', pago=True,
+            )
+        resposta, _ = self._consultas(params)
+        self.assertEqual(resposta.context['total_recebido'], Decimal('353.00'))
+
+    def test_navega_por_todas_as_paginas(self):
+        criar_pagamentos(self.alunos, por_aluno=2)
+        params = {'ordem': 'data_vencimento'}
+        vistos = []
+        while True:
+            resposta, _ = self._consultas(params)
+            pagina = resposta.context['pagina']
+            vistos.extend(p.pk for p in pagina)
+            if not pagina.tem_proxima:
+                break
+            params['depois'] = pagina.cursor_proximo
+        self.assertEqual(vistos, list(
+            Pagamento.objects.order_by('data_vencimento', 'pk').values_list('pk', flat=True)
+        ))
+
+
+class PlanoConsultasTests(TestCase):
+    """
+    Roda EXPLAIN QUERY PLAN em todas as consultas das telas e falha se alguma
+    tabela do app for lida por varredura completa (SCAN sem índice).
+    """
+
+    # Tabelas de apoio com poucas linhas, lidas inteiras de propósito (ex: checkboxes)
+    TABELAS_PEQUENAS = {'alunos_modalidade'}
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = User.objects.create_user('recepcao', password='senha')
+        alunos = criar_alunos(30)
+        criar_alunos(10, inicio=100, ativo=False)
+        criar_pagamentos(alunos[:15], por_aluno=3)
+        criar_pagamentos(alunos[15:], por_aluno=2, pago=False)
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.usuario)
+
+    def _varreduras(self, url, params=None):
+        with CaptureQueriesContext(connection) as ctx:
+            resposta = self.client.get(url, params or {})
+        self.assertEqual(resposta.status_code, 200)
+
+        varreduras = []
+        for consulta in ctx.captured_queries:
+            sql = consulta['sql']
+            if not sql.startswith('SELECT') or 'alunos_' not in sql:
+                continue
+            with connection.cursor() as cursor:
+                cursor.execute('EXPLAIN QUERY PLAN ' + sql)
+                for linha in cursor.fetchall():
+                    detalhe = str(linha[-1])
+                    tabela = detalhe.split()[1] if detalhe.startswith('SCAN ') else ''
+                    if tabela.startswith('alunos_') and tabela not in self.TABELAS_PEQUENAS \
+                            and 'INDEX' not in detalhe:
+                        varreduras.append((detalhe, sql))
+        return varreduras
+
+    def assertSemVarredura(self, url, params=None):
+        varreduras = self._varreduras(url, params)
+        self.assertEqual(varreduras, [], f"Varredura completa em {url} {params or ''}")
+
+    def test_lista_alunos(self):
+        self.assertSemVarredura(reverse('alunos:lista_alunos'))
+
+    def test_historico_em_todas_as_ordenacoes(self):
+        from .historico import ORDENACOES_HISTORICO
+        url = reverse('alunos:historico_pagamentos')
+        periodo = {'data_inicio': '2025-01-01', 'data_fim': '2025-02-28'}
+        for ordem in ORDENACOES_HISTORICO:
+            cache.clear()
+            self.assertSemVarredura(url, {'ordem': ordem})
+            cache.clear()
+            self.assertSemVarredura(url, {'ordem': ordem, **periodo})
+
+    def test_vencimentos(self):
+        self.assertSemVarredura(reverse('alunos:vencimentos_pagamentos'))
+
+    def test_cadastro_e_edicao(self):
+        pagamento = Pagamento.objects.first()
+        self.assertSemVarredura(reverse('alunos:cadastro_pagamento'))
+        self.assertSemVarredura(reverse('alunos:editar_pagamento', args=[pagamento.pk]))
+        self.assertSemVarredura(reverse('alunos:editar_aluno', args=[pagamento.aluno_id]))
+
+
+class BuscaAlunosTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = User.objects.create_superuser('admin', password='senha')
+        cls.joao = Aluno.objects.create(
+            nome='João da Silva', cpf='12345678901', rg='1111', bairro='Catuaba',
+            whatsapp='74991234567', data_nascimento=date(1990, 1, 1),
+        )
+        cls.joana = Aluno.objects.create(
+            nome='Joana Silveira', cpf='98765432100', rg='2222', bairro='Centro',
+            data_nascimento=date(1992, 5, 1),
+        )
+        cls.inativo = Aluno.objects.create(
+            nome='João Inativo', cpf='55555555555', rg='3333', ativo=False,
+            data_nascimento=date(1980, 5, 1),
+        )
+
+    def _nomes(self, termo):
+        return set(filtrar_alunos(Aluno.objects.all(), termo).values_list('nome', flat=True))
+
+    def test_ignora_acentos_e_usa_prefixo(self):
+        self.assertEqual(self._nomes('joao'), {'João da Silva', 'João Inativo'})
+        self.assertEqual(self._nomes('JO SILV'), {'João da Silva', 'Joana Silveira'})
+        self.assertEqual(self._nomes('catu'), {'João da Silva'})
+
+    def test_cpf_com_ou_sem_mascara(self):
+        self.assertEqual(self._nomes('123.456.789-01'), {'João da Silva'})
+        self.assertEqual(self._nomes('98765'), {'Joana Silveira'})
+
+    def test_caracteres_especiais_nao_quebram_a_consulta(self):
+        self.assertEqual(self._nomes('"joao" (*'), {'João da Silva', 'João Inativo'})
+
+    def test_indice_acompanha_update_e_delete(self):
+        Aluno.objects.filter(pk=self.joana.pk).update(nome='Mariana Souza')
+        self.assertEqual(self._nomes('joana'), set())
+        self.assertEqual(self._nomes('mari'), {'Mariana Souza'})
+        Aluno.objects.filter(pk=self.joana.pk).delete()
+        self.assertEqual(self._nomes('mari'), set())
+
+    def test_recria_triggers_descartados(self):
+        with connection.cursor() as cursor:
+            cursor.execute('DROP TRIGGER alunos_aluno_busca_ai')
+        criar_alunos(1, nome='Zeca Pagodinho')
+        garantir_indice_busca()
+        self.assertEqual(self._nomes('zeca'), {'Zeca Pagodinho'})
+
+    def test_busca_ranqueada_so_com_ativos(self):
+        resultado = buscar_alunos('silva')
+        self.assertEqual(resultado[0], self.joao)
+        self.assertNotIn(self.inativo, buscar_alunos('joao'))
+
+    def test_lista_e_admin_usam_a_busca(self):
+        self.client.force_login(self.usuario)
+        resposta = self.client.get(reverse('alunos:lista_alunos'), {'q': 'joao'})
+        self.assertEqual([a.pk for a in resposta.context['pagina']], [self.joao.pk])
+        resposta = self.client.get(reverse('admin:alunos_aluno_changelist'), {'q': 'joao'})
+        self.assertEqual(resposta.context['cl'].result_count, 2)
+
+
+def foto_de_camera(largura=1200, altura=800):
+    """JPEG com EXIF de orientação (girada 90°) e GPS, como sai de um celular."""
+    exif = Image.Exif()
+    exif[0x0112] = 6  # Orientation: girar 90° no sentido horário
+    exif[0x010F] = 'CameraFake'
+    buffer = BytesIO()
+    Image.new('RGB', (largura, altura), 'red').save(buffer, 'JPEG', exif=exif)
+    return SimpleUploadedFile('camera.jpg', buffer.getvalue(), content_type='image/jpeg')
+
+
+class MiniaturasTests(TestCase):
+    def setUp(self):
+        self.media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media, ignore_errors=True)
+        ajuste = override_settings(MEDIA_ROOT=self.media, TAREFAS_SINCRONAS=True)
+        ajuste.enable()
+        self.addCleanup(ajuste.disable)
+
+    def _criar_aluno(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            aluno = Aluno.objects.create(
+                nome='Aluno Foto', cpf='11122233344', rg='123', data_nascimento=date(1990, 1, 1),
+                foto=foto_de_camera(),
+            )
+        aluno.refresh_from_db()
+        return aluno
+
+    def test_upload_gera_variantes_reduzidas_sem_exif(self):
+        aluno = self._criar_aluno()
+        self.assertEqual(aluno.miniaturas['origem'], aluno.foto.name)
+
+        avatar = aluno.foto_avatar
+        self.assertEqual((avatar['largura'], avatar['altura']), (50, 50))
+        # Foto retrato após aplicar a orientação do EXIF (800x1200 -> cabe em 200x200)
+        perfil = aluno.miniaturas['perfil']
+        self.assertEqual((perfil['largura'], perfil['altura']), (133, 200))
+
+        for variante in ('avatar', 'perfil'):
+            for formato in ('webp', 'jpeg'):
+                with default_storage.open(aluno.miniaturas[variante][formato]) as arquivo:
+                    imagem = Image.open(arquivo)
+                    self.assertEqual(len(imagem.getexif()), 0)
+                    self.assertLessEqual(max(imagem.size), 400)
+
+    def test_lista_usa_avatar_com_dimensoes(self):
+        aluno = self._criar_aluno()
+        usuario = User.objects.create_user('recepcao', password='senha')
+        self.client.force_login(usuario)
+        resposta = self.client.get(reverse('alunos:lista_alunos'))
+        self.assertContains(resposta, aluno.foto_avatar['webp'])
+        self.assertContains(resposta, 'width="50" height="50"')
+        self.assertNotContains(resposta, aluno.foto.url + '"')
+
+    def test_trocar_foto_regenera_e_remover_limpa(self):
+        aluno = self._criar_aluno()
+        antiga = aluno.miniaturas['origem']
+        with self.captureOnCommitCallbacks(execute=True):
+            aluno.foto = foto_de_camera(600, 600)
+            aluno.save()
+        aluno.refresh_from_db()
+        self.assertNotEqual(aluno.miniaturas['origem'], antiga)
+
+        aluno.foto = None
+        aluno.save()
+        aluno.refresh_from_db()
+        self.assertEqual(aluno.miniaturas, {})
+        self.assertIsNone(aluno.foto_avatar)
+
+    def test_comando_preenche_fotos_existentes(self):
+        aluno = self._criar_aluno()
+        Aluno.objects.filter(pk=aluno.pk).update(miniaturas={})
+        from .management.commands import gerar_miniaturas
+        pool = mock.Mock(wraps=gerar_miniaturas.ProcessPoolExecutor)
+        saida = StringIO()
+        with mock.patch.object(gerar_miniaturas, 'ProcessPoolExecutor', pool):
+            call_command('gerar_miniaturas', processos=1, stdout=saida, stderr=saida)
+        # Processos spawn (padrão no macOS e no Windows): importam o comando antes do django.setup()
+        self.assertEqual(pool.call_args.kwargs['mp_context'].get_start_method(), 'spawn')
+        self.assertIn('1 foto(s) processada(s)', saida.getvalue())
+        aluno.refresh_from_db()
+        self.assertEqual(aluno.miniaturas['origem'], aluno.foto.name)
+
+
+    def test_comando_nao_grava_variantes_de_foto_trocada(self):
+        aluno = self._criar_aluno()
+        Aluno.objects.filter(pk=aluno.pk).update(miniaturas={})
+        from .management.commands import gerar_miniaturas
+        as_completed = gerar_miniaturas.as_completed
+
+        def foto_trocada_no_meio(futuros):
+            # A foto muda enquanto o pool gera as variantes da antiga
+            Aluno.objects.filter(pk=aluno.pk).update(foto='alunos/fotos/outra.jpg')
+            yield from as_completed(futuros)
+
+        saida = StringIO()
+        with mock.patch.object(gerar_miniaturas, 'as_completed', foto_trocada_no_meio):
+            call_command('gerar_miniaturas', processos=1, stdout=saida)
+        aluno.refresh_from_db()
+        self.assertEqual(aluno.miniaturas, {})
+        self.assertIn('1 foto(s) trocada(s)', saida.getvalue())
+
+
+class ExportacaoTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = User.objects.create_user('contador', password='senha')
+        cls.alunos = criar_alunos(30)
+        criar_alunos(5, inicio=100, ativo=False)
+        criar_pagamentos(cls.alunos, por_aluno=3)
+
+    def setUp(self):
+        self.client.force_login(self.usuario)
+
+    def _csv(self, resposta):
+        self.assertTrue(resposta.streaming)
+        conteudo = b''.join(resposta.streaming_content).decode('utf-8-sig')
+        return list(csv.reader(conteudo.splitlines(), delimiter=';'))
+
+    def test_csv_de_pagamentos_respeita_filtro(self):
+        url = reverse('alunos:exportar_pagamentos', args=['csv'])
+        linhas = self._csv(self.client.get(url, {'data_inicio': '2025-02-01', 'data_fim': '2025-02-28'}))
+        esperado = Pagamento.objects.filter(data_pagamento__range=(date(2025, 2, 1), date(2025, 2, 28)))
+        self.assertEqual(linhas[0][0], 'Aluno')
+        self.assertEqual(len(linhas) - 1, esperado.count())
+        self.assertEqual(linhas[1][4], 'PIX')
+        self.assertEqual(linhas[1][5], 'Sim')
+
+    def test_csv_de_alunos_usa_busca_e_inativos(self):
+        url = reverse('alunos:exportar_alunos', args=['csv'])
+        self.assertEqual(len(self._csv(self.client.get(url))) - 1, 30)
+        self.assertEqual(len(self._csv(self.client.get(url, {'incluir_inativos': '1'}))) - 1, 35)
+        self.assertEqual(len(self._csv(self.client.get(url, {'q': 'Aluno 0001'}))) - 1, 10)
+
+    def test_csv_de_alunos_usa_a_situacao_da_lista(self):
+        Aluno.objects.filter(pk__in=[a.pk for a in self.alunos[:3]]).update(faturas_vencidas=1, total_vencido=50)
+        lista = self.client.get(reverse('alunos:lista_alunos'), {'situacao': 'devedores'})
+        self.assertContains(lista, reverse('alunos:exportar_alunos', args=['csv']) + '?situacao=devedores')
+        linhas = self._csv(self.client.get(reverse('alunos:exportar_alunos', args=['csv']), {'situacao': 'devedores'}))
+        self.assertEqual({linha[0] for linha in linhas[1:]}, {a.nome for a in self.alunos[:3]})
+
+    def test_csv_neutraliza_formulas(self):
+        Aluno.objects.filter(pk=self.alunos[0].pk).update(nome='=HYPERLINK("http://x","clique")', bairro='-Centro')
+        Pagamento.objects.filter(aluno=self.alunos[0]).update(observacao='@SUM(1+1)')
+        linhas = self._csv(self.client.get(reverse('alunos:exportar_alunos', args=['csv']), {'q': 'Centro'}))
+        aluno = next(linha for linha in linhas if 'HYPERLINK' in linha[0])
+        self.assertEqual(aluno[0], '\'=HYPERLINK("http://x","clique")')
+        self.assertEqual(aluno[9], "'-Centro")
+        linhas = self._csv(self.client.get(reverse('alunos:exportar_pagamentos', args=['csv'])))
+        self.assertIn("'@SUM(1+1)", [linha[6] for linha in linhas])
+        # Valores numéricos não mudam
+        self.assertFalse([linha for linha in linhas[1:] if linha[1].startswith("'")])
+
+    def test_xlsx_e_uma_planilha_valida(self):
+        resposta = self.client.get(reverse('alunos:exportar_pagamentos', args=['xlsx']))
+        arquivo = zipfile.ZipFile(BytesIO(b''.join(resposta.streaming_content)))
+        self.assertIsNone(arquivo.testzip())
+        planilha = ElementTree.fromstring(arquivo.read('xl/worksheets/sheet1.xml'))
+        ns = {'s': 'http://schemas.openxmlformats.org/spreadsheetml/2006/main'}
+        linhas = planilha.findall('.//s:row', ns)
+        self.assertEqual(len(linhas), Pagamento.objects.count() + 1)
+        self.assertEqual(linhas[0].find('.//s:t', ns).text, 'Aluno')
+
+    def test_primeiro_bloco_sai_antes_da_consulta(self):
+        for formato in ('csv', 'xlsx'):
+            resposta = self.client.get(reverse('alunos:exportar_pagamentos', args=[formato]))
+            conteudo = iter(resposta.streaming_content)
+            with CaptureQueriesContext(connection) as ctx:
+                self.assertTrue(next(conteudo))
+            self.assertEqual(len(ctx.captured_queries), 0)
+            b''.join(conteudo)
+
+    def test_formato_invalido(self):
+        resposta = self.client.get(reverse('alunos:exportar_pagamentos', args=['pdf']))
+        self.assertEqual(resposta.status_code, 404)
+
+
+CABECALHO_IMPORTACAO = 'Nome;Data de Nascimento;Sexo;CPF;RG;WhatsApp;Email;Bairro;Modalidades\n'
+
+
+def csv_importacao(linhas):
+    """Monta um CSV no formato exportado pelo Excel (';' e acentos)."""
+    return (CABECALHO_IMPORTACAO + '\n'.join(';'.join(linha) for linha in linhas)).encode('utf-8-sig')
+
+
+def linha_importacao(i, **extras):
+    dados = {
+        'nome': f"Aluno Importado {chr(65 + i % 26)}",
+        'data_nascimento': '15/03/1995',
+        'sexo': 'F',
+        'cpf': f"{i:03d}.456.789-{i % 100:02d}",
+        'rg': f"{i:09d}",
+        'whatsapp': f"(11) 9{i:04d}-1234",
+        'email': f"aluno{i}@exemplo.com",
+        'bairro': 'Centro',
+        'modalidades': 'Muay Thai, Jiu Jitsu',
+    }
+    dados.update(extras)
+    return list(dados.values())
+
+
+class ImportacaoAlunosTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = User.objects.create_user('secretaria', password='senha')
+        cls.muay_thai = Modalidade.objects.create(nome='Muay Thai')
+        cls.jiu_jitsu = Modalidade.objects.create(nome='Jiu Jitsu')
+        Modalidade.objects.create(nome='Musculação')
+
+    def _importar(self, linhas, **kwargs):
+        return importar_alunos(ler_csv(csv_importacao(linhas)), **kwargs)
+
+    def test_importa_com_modalidades_e_normaliza_documentos(self):
+        relatorio = self._importar([
+            linha_importacao(1),
+            linha_importacao(2, modalidades='musculacao'),
+        ])
+        self.assertEqual((relatorio.total, relatorio.criados, relatorio.erros), (2, 2, []))
+
+        aluno = Aluno.objects.get(rg='000000001')
+        self.assertEqual(aluno.cpf, '00145678901')
+        self.assertEqual(aluno.whatsapp, '5511900011234')
+        self.assertEqual(aluno.data_nascimento, date(1995, 3, 15))
+        self.assertTrue(aluno.ativo)
+        self.assertEqual(set(aluno.modalidades.all()), {self.muay_thai, self.jiu_jitsu})
+        self.assertEqual(Aluno.objects.get(rg='000000002').modalidades.get().nome, 'Musculação')
+        # Triggers do FTS também cobrem o INSERT direto
+        self.assertEqual(buscar_alunos('importado'), list(Aluno.objects.order_by('pk')))
+
+    def test_linhas_invalidas_vao_para_o_relatorio(self):
+        relatorio = self._importar([
+            linha_importacao(1, nome='Aluno 123'),
+            linha_importacao(2, data_nascimento='31/02/1990'),
+            linha_importacao(3, modalidades='Boxe'),
+            linha_importacao(4, whatsapp='1234'),
+            linha_importacao(5),
+        ])
+        self.assertEqual(relatorio.criados, 1)
+        erros = dict(relatorio.erros)
+        self.assertEqual(sorted(erros), [2, 3, 4, 5])
+        self.assertIn('nome', erros[2])
+        self.assertIn('data_nascimento', erros[3])
+        self.assertIn('Boxe', erros[4]['modalidades'][0])
+        self.assertIn('whatsapp', erros[5])
+
+    def test_duplicados_no_banco_e_no_arquivo(self):
+        existente = criar_alunos(1, inicio=900, email='ja@exemplo.com')[0]
+        relatorio = self._importar([
+            linha_importacao(1, cpf=existente.cpf),
+            linha_importacao(2, rg=existente.rg),
+            linha_importacao(3, email='ja@exemplo.com'),
+            linha_importacao(4),
+            linha_importacao(5, cpf=linha_importacao(4)[3]),
+        ], tamanho_lote=3)
+        self.assertEqual(relatorio.criados, 1)
+        self.assertEqual(
+            [(linha, list(erros)) for linha, erros in relatorio.erros],
+            [(2, ['cpf']), (3, ['rg']), (4, ['email']), (6, ['cpf'])],
+        )
+
+    def test_validador_segue_as_regras_do_formulario(self):
+        # O ValidadorLinha reescreve as regras do AlunoForm: os dois devem recusar as mesmas linhas
+        Formulario = modelform_factory(Aluno, form=AlunoForm, fields=[
+            'nome', 'data_nascimento', 'sexo', 'cpf', 'rg', 'whatsapp', 'email',
+            'rua', 'numero', 'bairro', 'cidade', 'estado', 'modalidades', 'valor_mensalidade', 'ativo',
+        ])
+        variacoes = [
+            {}, {'nome': ''}, {'nome': 'Aluno 123'}, {'nome': 'José Ávila'}, {'nome': 'A' * 151},
+            {'data_nascimento': ''}, {'data_nascimento': '31/02/1990'}, {'data_nascimento': '5/3/1995'},
+            {'data_nascimento': '15/03/95'}, {'data_nascimento': '1995-03-15'}, {'data_nascimento': '15.03.1995'},
+            {'sexo': 'X'}, {'cpf': ''}, {'cpf': '123.abc.789-00'}, {'cpf': '1' * 15}, {'rg': '12.345.678-9'},
+            {'rg': '12 345 678'}, {'rg': '1' * 13}, {'whatsapp': ''}, {'whatsapp': '1234'},
+            {'whatsapp': '(11) 91234-12345'}, {'email': ''}, {'email': 'sem-arroba'}, {'bairro': 'B' * 51},
+            {'estado': 'Bahia'}, {'valor_mensalidade': '99.90'}, {'valor_mensalidade': '1,5'},
+            {'valor_mensalidade': '12345678901'}, {'ativo': 'inativo'},
+        ]
+        with translation.override('pt-br'):
+            validador = ValidadorLinha()
+            for i, variacao in enumerate(variacoes):
+                dados = _preparar_linha({
+                    **dict(zip(map(_normalizar_cabecalho, CABECALHO_IMPORTACAO.strip().split(';')), linha_importacao(i))),
+                    **variacao,
+                })
+                with self.subTest(variacao):
+                    form = Formulario({**dados, 'modalidades': [self.muay_thai.pk]})
+                    valores, erros = validador.validar(dados)
+                    self.assertEqual(set(erros), set(form.errors))
+                    if not erros:
+                        for campo, valor in valores.items():
+                            self.assertEqual(valor, form.cleaned_data[campo], campo)
+
+    def test_consultas_por_lote_nao_crescem_com_as_linhas(self):
+        def consultas(quantidade):
+            Aluno.objects.all().delete()
+            linhas = [linha_importacao(i) for i in range(quantidade)]
+            with CaptureQueriesContext(connection) as ctx:
+                relatorio = self._importar(linhas, tamanho_lote=20)
+            self.assertEqual(relatorio.criados, quantidade)
+            return len(ctx.captured_queries)
+
+        # O custo cresce por lote (número fixo de consultas), nunca por linha
+        um_lote, dois_lotes = consultas(20), consultas(40)
+        self.assertEqual(consultas(100), um_lote + 4 * (dois_lotes - um_lote))
+        self.assertLessEqual(dois_lotes - um_lote, 6)
+
+    def test_pagina_de_upload(self):
+        self.client.force_login(self.usuario)
+        arquivo = SimpleUploadedFile('alunos.csv', csv_importacao([
+            linha_importacao(1), linha_importacao(2, nome=''),
+        ]))
+        resposta = self.client.post(reverse('alunos:importar_alunos'), {'arquivo': arquivo})
+        self.assertEqual(resposta.status_code, 200)
+        self.assertEqual(resposta.context['relatorio'].criados, 1)
+        self.assertContains(resposta, '1 de 2 aluno(s) importado(s)')
+        self.assertEqual(Aluno.objects.count(), 1)
+
+    def test_comando(self):
+        with tempfile.NamedTemporaryFile(suffix='.csv') as arquivo:
+            arquivo.write(csv_importacao([linha_importacao(i) for i in range(5)]))
+            arquivo.flush()
+            saida = StringIO()
+            call_command('importar_alunos', arquivo.name, lote=2, stdout=saida, stderr=StringIO())
+        self.assertIn('5 de 5', saida.getvalue())
+        self.assertEqual(Aluno.objects.count(), 5)
+
+
+class CobrancaMensalTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.muay_thai = Modalidade.objects.create(nome='Muay Thai', valor_mensal=Decimal('120.00'))
+        cls.jiu_jitsu = Modalidade.objects.create(nome='Jiu Jitsu', valor_mensal=Decimal('150.00'))
+        cls.danca = Modalidade.objects.create(nome='Dança')  # sem preço definido
+        cls.alunos = criar_alunos(30)
+        Matricula = Aluno.modalidades.through
+        Matricula.objects.bulk_create(
+            [Matricula(aluno=a, modalidade=cls.muay_thai) for a in cls.alunos]
+            + [Matricula(aluno=a, modalidade=cls.jiu_jitsu) for a in cls.alunos[:10]]
+        )
+        cls.bolsista = cls.alunos[0]
+        Aluno.objects.filter(pk=cls.bolsista.pk).update(valor_mensalidade=Decimal('50.00'))
+        cls.sem_preco = criar_alunos(1, inicio=500)[0]
+        cls.sem_preco.modalidades.add(cls.danca)
+        criar_alunos(3, inicio=600, ativo=False)
+
+    def test_uma_mensalidade_por_aluno_ativo_com_valor_correto(self):
+        resultado = gerar_cobrancas(date(2025, 3, 18))
+        self.assertEqual(resultado.criadas, 30)
+        self.assertEqual(resultado.sem_valor, [self.sem_preco.pk])
+
+        mensalidades = Pagamento.objects.filter(referencia=date(2025, 3, 1))
+        self.assertEqual(mensalidades.count(), 30)
+        self.assertFalse(mensalidades.filter(pago=True).exists())
+        self.assertEqual(mensalidades.get(aluno=self.bolsista).valor, Decimal('50.00'))
+        self.assertEqual(mensalidades.get(aluno=self.alunos[1]).valor, Decimal('270.00'))
+        self.assertEqual(mensalidades.get(aluno=self.alunos[20]).valor, Decimal('120.00'))
+        self.assertEqual(mensalidades.get(aluno=self.alunos[20]).data_vencimento, date(2025, 3, 10))
+        self.assertEqual(resultado.valor_total, sum(p.valor for p in mensalidades))
+
+    def test_pode_rodar_de_novo_sem_duplicar(self):
+        gerar_cobrancas(date(2025, 3, 1), tamanho_lote=7)
+        novo = criar_alunos(1, inicio=700, valor_mensalidade=Decimal('99.00'))[0]
+        with CaptureQueriesContext(connection) as ctx:
+            resultado = gerar_cobrancas(date(2025, 3, 31), tamanho_lote=7)
+        self.assertEqual(resultado.criadas, 1)
+        self.assertEqual(Pagamento.objects.filter(referencia=date(2025, 3, 1)).count(), 31)
+        self.assertEqual(Pagamento.objects.get(aluno=novo).valor, Decimal('99.00'))
+        # Já cobrados nem são lidos: uma leitura que acha o novo aluno, o INSERT e a leitura final vazia
+        self.assertLessEqual(len(ctx.captured_queries), 8)
+
+        # Outro mês gera outra rodada
+        self.assertEqual(gerar_cobrancas(date(2025, 4, 1)).criadas, 31)
+
+    def test_restricao_unica_protege_execucoes_simultaneas(self):
+        gerar_cobrancas(date(2025, 3, 1))
+        duplicada = Pagamento(aluno=self.alunos[5], valor=1, referencia=date(2025, 3, 1),
+                              data_vencimento=date(2025, 3, 10), metodo_pagamento='PIX')
+        self.assertEqual(Pagamento.objects.bulk_create([duplicada], ignore_conflicts=True)[0].pk, None)
+        self.assertEqual(Pagamento.objects.filter(aluno=self.alunos[5]).count(), 1)
+
+    def test_modalidade_sem_preco_deixa_o_aluno_sem_valor(self):
+        # Muay Thai tem preço, Dança não: não cobra só os 120,00
+        self.alunos[20].modalidades.add(self.danca)
+        resultado = gerar_cobrancas(date(2025, 3, 1))
+        self.assertEqual(sorted(resultado.sem_valor), sorted([self.alunos[20].pk, self.sem_preco.pk]))
+        self.assertFalse(Pagamento.objects.filter(aluno=self.alunos[20]).exists())
+        # Com mensalidade própria o preço das modalidades não importa
+        self.assertTrue(Pagamento.objects.filter(aluno=self.bolsista).exists())
+
+    def test_total_conta_so_as_mensalidades_criadas(self):
+        atomic = transaction.atomic
+        concorrente = []
+
+        def outra_execucao_antes(*args, **kwargs):
+            # Outra execução grava a mensalidade de um aluno entre a leitura do lote e a transação do INSERT
+            if not concorrente:
+                concorrente.append(Pagamento.objects.create(
+                    aluno=self.alunos[20], valor=Decimal('120.00'), referencia=date(2025, 3, 1),
+                    data_vencimento=date(2025, 3, 10), metodo_pagamento='PIX',
+                ))
+            return atomic(*args, **kwargs)
+
+        with mock.patch.object(transaction, 'atomic', side_effect=outra_execucao_antes):
+            resultado = gerar_cobrancas(date(2025, 3, 1))
+        self.assertEqual(resultado.criadas, 29)
+        criadas = Pagamento.objects.filter(referencia=date(2025, 3, 1)).exclude(pk=concorrente[0].pk)
+        self.assertEqual(resultado.valor_total, sum(p.valor for p in criadas))
+
+    def test_vencimento_limitado_ao_fim_do_mes(self):
+        self.assertEqual(data_vencimento(date(2025, 2, 1), 31), date(2025, 2, 28))
+        self.assertEqual(data_vencimento(date(2024, 2, 1), 30), date(2024, 2, 29))
+
+    def test_comando_e_acao_do_admin(self):
+        saida = StringIO()
+        call_command('gerar_cobrancas', mes='2025-05', dia=5, stdout=saida, stderr=StringIO())
+        self.assertIn('30 mensalidade(s) de 05/2025', saida.getvalue())
+        self.assertTrue(Pagamento.objects.filter(referencia=date(2025, 5, 1), data_vencimento=date(2025, 5, 5)).exists())
+
+        admin = User.objects.create_superuser('admin', password='senha')
+        self.client.force_login(admin)
+        selecionados = [self.alunos[0].pk, self.alunos[1].pk]
+        self.client.post(reverse('admin:alunos_aluno_changelist'), {
+            'action': 'gerar_mensalidade_mes_atual', '_selected_action': selecionados,
+        })
+        referencia = date.today().replace(day=1)
+        self.assertFalse(Pagamento.objects.filter(referencia=referencia).exists())
+        tarefas.processar_pendentes()
+        self.assertEqual(
+            set(Pagamento.objects.filter(referencia=referencia).values_list('aluno_id', flat=True)),
+            set(selecionados),
+        )
+
+
+class ResumoMensalTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.alunos = criar_alunos(20)
+
+    def _resumo(self):
+        return {
+            (r.mes, r.metodo_pagamento, r.pago): (r.quantidade, r.total)
+            for r in ResumoMensal.objects.all()
+        }
+
+    def _conferir(self):
+        """O resumo mantido por delta tem que bater com a reconstrução do zero."""
+        incremental = self._resumo()
+        reconstruir_resumo()
+        self.assertEqual(incremental, self._resumo())
+        return incremental
+
+    def test_deltas_de_insercao_edicao_e_exclusao(self):
+        pagamento = Pagamento.objects.create(
+            aluno=self.alunos[0], valor=Decimal('99.90'), data_pagamento=date(2025, 3, 5),
+            data_vencimento=date(2025, 3, 10), metodo_pagamento='PIX', pago=False,
+        )
+        self.assertEqual(self._conferir(), {(date(2025, 3, 1), 'PIX', False): (1, Decimal('99.90'))})
+
+        pagamento.pago = True
+        pagamento.valor = Decimal('89.91')
+        pagamento.data_pagamento = date(2025, 4, 2)
+        pagamento.save()
+        self.assertEqual(self._conferir(), {(date(2025, 4, 1), 'PIX', True): (1, Decimal('89.91'))})
+
+        pagamento.delete()
+        self.assertEqual(self._conferir(), {})
+
+    def test_escritas_em_lote_tambem_contam(self):
+        criar_pagamentos(self.alunos, por_aluno=3)
+        Pagamento.objects.filter(aluno__in=self.alunos[:5]).update(pago=False, metodo_pagamento='DINHEIRO')
+        Pagamento.objects.filter(aluno__in=self.alunos[15:]).delete()
+        # Exclusão em cascata a partir do aluno
+        self.alunos[10].delete()
+        resumo = self._conferir()
+        self.assertEqual(sum(q for q, _ in resumo.values()), Pagamento.objects.count())
+
+    def test_totais_do_periodo_com_meses_parciais(self):
+        criar_pagamentos(self.alunos, por_aluno=4)
+        for inicio, fim in [
+            (None, None),
+            (date(2025, 1, 1), date(2025, 3, 31)),
+            (date(2025, 1, 15), date(2025, 3, 12)),
+            (date(2025, 2, 11), date(2025, 2, 13)),
+            (date(2025, 2, 14), None),
+            (None, date(2025, 2, 10)),
+        ]:
+            pagamentos = Pagamento.objects.all()
+            if inicio:
+                pagamentos = pagamentos.filter(data_pagamento__gte=inicio)
+            if fim:
+                pagamentos = pagamentos.filter(data_pagamento__lte=fim)
+            totais = totais_periodo(inicio, fim)
+            self.assertEqual(totais['quantidade'], pagamentos.count(), (inicio, fim))
+            self.assertEqual(totais['total'], sum(p.valor for p in pagamentos), (inicio, fim))
+
+    def test_periodo_de_meses_inteiros_nao_varre_pagamentos(self):
+        criar_pagamentos(self.alunos, por_aluno=4)
+        with CaptureQueriesContext(connection) as ctx:
+            totais = totais_periodo(date(2025, 1, 1), date(2025, 2, 28))
+        self.assertEqual(len(ctx.captured_queries), 1)
+        self.assertNotIn('alunos_pagamento', ctx.captured_queries[0]['sql'])
+        self.assertEqual([m['mes'] for m in totais['meses']], [date(2025, 1, 1), date(2025, 2, 1)])
+
+    def test_comando_reconstruir(self):
+        criar_pagamentos(self.alunos)
+        ResumoMensal.objects.all().delete()
+        call_command('reconstruir_resumo', stdout=StringIO())
+        self.assertEqual(self._resumo(), {(date(2025, 1, 1), 'PIX', True): (20, sum(
+            (p.valor for p in Pagamento.objects.all()), Decimal('0')))})
+
+
+class IndicadoresTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = User.objects.create_user('gerente', password='senha')
+        cls.hoje = date.today()
+        cls.alunos = criar_alunos(12)
+        criar_alunos(3, inicio=100, ativo=False)
+        Aluno.objects.filter(pk__in=[a.pk for a in cls.alunos[:4]]).update(data_matricula=cls.hoje.replace(day=1))
+        Aluno.objects.exclude(pk__in=[a.pk for a in cls.alunos[:4]]).update(data_matricula=date(2020, 1, 1))
+        criar_pagamentos(cls.alunos[:5], data_pagamento=cls.hoje, valor=Decimal('100.00'))
+        criar_pagamentos(cls.alunos[5:8], pago=False, data_vencimento=cls.hoje - timedelta(days=3),
+                         valor=Decimal('80.00'))
+        criar_pagamentos(cls.alunos[8:9], pago=False, data_vencimento=cls.hoje, valor=Decimal('80.00'))
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.usuario)
+
+    def _dashboard(self):
+        with CaptureQueriesContext(connection) as ctx:
+            resposta = self.client.get(reverse('alunos:dashboard'))
+        self.assertEqual(resposta.status_code, 200)
+        consultas = [q['sql'] for q in ctx.captured_queries
+                     if 'alunos_aluno' in q['sql'] or 'alunos_pagamento' in q['sql'] or 'alunos_resumomensal' in q['sql']]
+        return resposta.context['indicadores'], consultas
+
+    def test_receita_do_mes_igual_com_e_sem_resumo(self):
+        inicio_mes = self.hoje.replace(day=1)
+        proximo_mes = (inicio_mes + timedelta(days=32)).replace(day=1)
+        # Lançado para o último dia do mês conta; o do mês seguinte não
+        criar_pagamentos(self.alunos[9:10], data_pagamento=proximo_mes - timedelta(days=1), valor=Decimal('30.00'))
+        criar_pagamentos(self.alunos[10:11], data_pagamento=proximo_mes, valor=Decimal('40.00'))
+        com_resumo = modulo_indicadores.calcular_indicadores(self.hoje)['receita_mes']
+        with mock.patch.object(modulo_indicadores, 'resumo_disponivel', return_value=False):
+            sem_resumo = modulo_indicadores.calcular_indicadores(self.hoje)['receita_mes']
+        self.assertEqual(com_resumo, Decimal('530.00'))
+        self.assertEqual(sem_resumo, com_resumo)
+
+    def test_valores_e_cache(self):
+        valores, consultas = self._dashboard()
+        self.assertEqual(valores['alunos_ativos'], 12)
+        self.assertEqual(valores['novas_matriculas'], 4)
+        self.assertEqual(valores['receita_mes'], Decimal('500.00'))
+        self.assertEqual(valores['a_receber'], Decimal('320.00'))
+        self.assertEqual(valores['vencidos'], 3)
+        self.assertTrue(consultas)
+
+        # Segunda visita: nenhum acesso às tabelas de alunos/pagamentos
+        _, consultas = self._dashboard()
+        self.assertEqual(consultas, [])
+
+    def test_sinais_invalidam_com_precisao(self):
+        self._dashboard()
+        with self.captureOnCommitCallbacks(execute=True):
+            Pagamento.objects.filter(aluno=self.alunos[5]).get().delete()
+        valores, consultas = self._dashboard()
+        self.assertTrue(consultas)
+        self.assertEqual(valores['vencidos'], 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            aluno = self.alunos[0]
+            aluno.ativo = False
+            aluno.save()
+        valores, _ = self._dashboard()
+        self.assertEqual(valores['alunos_ativos'], 11)
+
+    def test_virada_do_dia_troca_a_chave(self):
+        modulo_indicadores.indicadores(self.hoje)
+        with CaptureQueriesContext(connection) as ctx:
+            amanha = modulo_indicadores.indicadores(self.hoje + timedelta(days=1))
+        self.assertTrue(ctx.captured_queries)
+        self.assertEqual(amanha['vencidos'], 4)
+
+    def test_trava_evita_recalculo_simultaneo(self):
+        chamadas = []
+
+        def calculo_lento(hoje=None):
+            chamadas.append(hoje)
+            time.sleep(0.2)
+            return {'alunos_ativos': 1}
+
+        resultados = []
+        with mock.patch.object(modulo_indicadores, 'calcular_indicadores', calculo_lento):
+            threads = [
+                threading.Thread(target=lambda: resultados.append(modulo_indicadores.indicadores(self.hoje)))
+                for _ in range(8)
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        self.assertEqual(len(chamadas), 1)
+        self.assertEqual(resultados, [{'alunos_ativos': 1}] * 8)
+
+    def test_durante_recalculo_serve_o_ultimo_valor(self):
+        anterior = modulo_indicadores.indicadores(self.hoje)
+        with self.captureOnCommitCallbacks(execute=True):
+            Pagamento.objects.filter(aluno=self.alunos[6]).update(pago=True)
+            invalidar('pagamentos')
+        # Simula outra requisição segurando a trava do recálculo
+        cache.add(f'{modulo_indicadores._chave(self.hoje)}:trava', 1)
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(modulo_indicadores.indicadores(self.hoje), anterior)
+        self.assertFalse(any('alunos_pagamento' in q['sql'] for q in ctx.captured_queries))
+
+
+class SituacaoFinanceiraTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = User.objects.create_user('financeiro', password='senha')
+        cls.hoje = date.today()
+        cls.alunos = criar_alunos(40)
+
+    def _pagamento(self, aluno, dias, pago=False, valor='100.00'):
+        return Pagamento.objects.create(
+            aluno=aluno, valor=Decimal(valor), data_pagamento=self.hoje,
+            data_vencimento=self.hoje + timedelta(days=dias), metodo_pagamento='PIX', pago=pago,
+        )
+
+    def _situacao(self, aluno):
+        aluno.refresh_from_db()
+        return aluno.ultimo_pagamento, aluno.proximo_vencimento, aluno.faturas_vencidas, aluno.total_vencido
+
+    def test_mantida_a_cada_mudanca_de_pagamento(self):
+        aluno, outro = self.alunos[:2]
+        vencido = self._pagamento(aluno, -10, valor='80.00')
+        self._pagamento(aluno, -3, valor='70.50')
+        futuro = self._pagamento(aluno, 5)
+        self.assertEqual(self._situacao(aluno), (None, futuro.data_vencimento, 2, Decimal('150.50')))
+
+        vencido.pago = True
+        vencido.save()
+        self.assertEqual(self._situacao(aluno), (self.hoje, futuro.data_vencimento, 1, Decimal('70.50')))
+
+        # Pagamento transferido para outro aluno: os dois são recalculados
+        futuro.aluno = outro
+        futuro.save()
+        self.assertEqual(self._situacao(aluno)[1], None)
+        self.assertEqual(self._situacao(outro), (None, futuro.data_vencimento, 0, Decimal('0')))
+
+        futuro.delete()
+        self.assertEqual(self._situacao(outro), (None, None, 0, Decimal('0')))
+
+    def test_tarefa_diaria_move_quem_cruzou_a_data(self):
+        aluno = self.alunos[0]
+        pagamento = self._pagamento(aluno, 0)
+        self.assertEqual(self._situacao(aluno)[1:], (pagamento.data_vencimento, 0, Decimal('0')))
+
+        amanha = self.hoje + timedelta(days=1)
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(atualizar_vencimentos_do_dia(amanha), 1)
+        self.assertEqual(self._situacao(aluno)[1:], (None, 1, Decimal('100.00')))
+        # Nenhum outro aluno é tocado na segunda rodada do mesmo dia
+        self.assertEqual(atualizar_vencimentos_do_dia(amanha), 0)
+        self.assertLessEqual(len(ctx.captured_queries), 3)
+
+    def test_cobranca_em_lote_atualiza_proximo_vencimento(self):
+        Aluno.objects.filter(pk__in=[a.pk for a in self.alunos]).update(valor_mensalidade=Decimal('90.00'))
+        proximo_mes = (self.hoje.replace(day=1) + timedelta(days=32)).replace(day=1)
+        gerar_cobrancas(proximo_mes)
+        self.assertEqual(
+            set(Aluno.objects.values_list('proximo_vencimento', flat=True)),
+            {proximo_mes.replace(day=10)},
+        )
+
+    def test_lista_de_devedores_usa_indice_sem_join(self):
+        devedores = self.alunos[:30]
+        criar_pagamentos(devedores, pago=False, data_vencimento=self.hoje - timedelta(days=15))
+        atualizar_situacao(Aluno.objects.all())
+        self.client.force_login(self.usuario)
+
+        url = reverse('alunos:lista_alunos')
+        vistos, params = [], {'situacao': 'devedores'}
+        while True:
+            with CaptureQueriesContext(connection) as ctx:
+                resposta = self.client.get(url, params)
+            pagina = resposta.context['pagina']
+            vistos.extend(pagina)
+            sql_alunos = [q['sql'] for q in ctx.captured_queries if 'FROM "alunos_aluno"' in q['sql']]
+            self.assertTrue(sql_alunos)
+            self.assertFalse(any('alunos_pagamento' in sql for sql in sql_alunos))
+            if not pagina.tem_proxima:
+                break
+            params['depois'] = pagina.cursor_proximo
+
+        self.assertEqual({a.pk for a in vistos}, {a.pk for a in devedores})
+        totais = [a.total_vencido for a in vistos]
+        self.assertEqual(totais, sorted(totais, reverse=True))
+
+        consulta = Aluno.objects.filter(ativo=True, faturas_vencidas__gt=0).order_by('-total_vencido', '-pk')[:26]
+        with connection.cursor() as cursor:
+            sql, params = consulta.query.sql_with_params()
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+            plano = ' '.join(str(linha[-1]) for linha in cursor.fetchall())
+        self.assertIn('aluno_devedor_idx', plano)
+        self.assertNotIn('TEMP B-TREE', plano)
+
+    def test_comando(self):
+        self._pagamento(self.alunos[0], -1)
+        Aluno.objects.update(faturas_vencidas=0, total_vencido=0)
+        call_command('atualizar_situacao', todos=True, stdout=StringIO())
+        self.assertEqual(self._situacao(self.alunos[0])[2], 1)
+
+
+class StatusPagamentoTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = User.objects.create_user('cobranca', password='senha')
+        cls.hoje = date.today()
+        cls.alunos = criar_alunos(30)
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.usuario)
+
+    def _criar(self, deslocamentos, pago=False):
+        return Pagamento.objects.bulk_create([
+            Pagamento(
+                aluno=self.alunos[i % len(self.alunos)], valor=Decimal('50.00'),
+                data_pagamento=self.hoje, data_vencimento=self.hoje + timedelta(days=dias),
+                metodo_pagamento='PIX', pago=pago,
+            )
+            for i, dias in enumerate(deslocamentos)
+        ])
+
+    def test_sql_concorda_com_as_propriedades_nas_viradas_de_dia(self):
+        deslocamentos = range(-6, 8)
+        self._criar(deslocamentos)
+        self._criar(deslocamentos, pago=True)
+
+        for pagamento in Pagamento.objects.with_status(self.hoje):
+            with self.subTest(vencimento=pagamento.data_vencimento, pago=pagamento.pago):
+                self.assertEqual(pagamento.status, pagamento.status_vencimento)
+                self.assertEqual(pagamento.dias_em_atraso, pagamento.dias_vencido)
+
+        # com_status (filtro direto nas colunas) seleciona as mesmas linhas que o Case anotado
+        for status in (STATUS_PAGO, STATUS_VENCIDO, STATUS_VENCE_EM_BREVE, STATUS_PENDENTE):
+            anotados = set(Pagamento.objects.with_status(self.hoje).filter(status=status).values_list('pk', flat=True))
+            filtrados = set(Pagamento.objects.com_status(status, self.hoje).values_list('pk', flat=True))
+            self.assertEqual(anotados, filtrados, status)
+
+    def test_contagem_por_status_em_uma_consulta(self):
+        self._criar([-3, -1, 0, 2, 5, 6, 30])
+        self._criar([-2], pago=True)
+        with self.assertNumQueries(1):
+            contagem = Pagamento.objects.contagem_por_status(self.hoje)
+        self.assertEqual(contagem, {
+            STATUS_PAGO: 1, STATUS_VENCIDO: 2, STATUS_VENCE_EM_BREVE: 3, STATUS_PENDENTE: 2,
+        })
+
+    def test_pagina_de_vencidos_exclui_o_vencimento_de_hoje_e_pagina(self):
+        self._criar([0, 3])
+        self._criar([-d for d in range(1, 61)])
+        url = reverse('alunos:vencimentos_pagamentos')
+
+        resposta = self.client.get(url)
+        self.assertEqual(resposta.status_code, 200)
+        pagina = resposta.context['pagina']
+        self.assertTrue(pagina.tem_proxima)
+        self.assertEqual(resposta.context['contagem'][STATUS_VENCIDO], 60)
+        self.assertEqual(resposta.context['total_aberto'], Decimal('3000.00'))
+        # Do vencimento mais antigo para o mais recente, com os dias em atraso calculados no banco
+        self.assertEqual(next(iter(pagina)).dias_em_atraso, 60)
+
+        vistos = []
+        params = {}
+        while True:
+            pagina = self.client.get(url, params).context['pagina']
+            vistos.extend(pagina)
+            if not pagina.tem_proxima:
+                break
+            params = {'status': STATUS_VENCIDO, 'depois': pagina.cursor_proximo}
+        self.assertEqual(len(vistos), 60)
+        self.assertTrue(all(p.data_vencimento < self.hoje for p in vistos))
+
+        resposta = self.client.get(url, {'status': STATUS_VENCE_EM_BREVE})
+        self.assertEqual([p.data_vencimento for p in resposta.context['pagina']],
+                         [self.hoje, self.hoje + timedelta(days=3)])
+
+    def test_historico_filtra_por_status(self):
+        self._criar([-4, -1, 1, 20])
+        self._criar([-10], pago=True)
+        resposta = self.client.get(reverse('alunos:historico_pagamentos'), {'status': STATUS_VENCIDO})
+        self.assertEqual(resposta.status_code, 200)
+        self.assertEqual(resposta.context['quantidade_pagamentos'], 2)
+        self.assertEqual({p.status for p in resposta.context['pagamentos']}, {STATUS_VENCIDO})
+
+
+class EnviadorComFalha(EnviadorMemoria):
+    """Recusa os números terminados em 9."""
+
+    def enviar(self, lembrete):
+        if lembrete.telefone.endswith('9'):
+            raise ConnectionError("número indisponível")
+        super().enviar(lembrete)
+
+
+@override_settings(LEMBRETES_ENVIADOR='alunos.lembretes.EnviadorMemoria')
+class LembretesCobrancaTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = User.objects.create_user('secretaria', password='senha')
+        cls.hoje = date.today()
+        cls.alunos = criar_alunos(12)
+        for i, aluno in enumerate(cls.alunos):
+            aluno.whatsapp = f"557499999{i:04d}"
+        cls.alunos[10].whatsapp = '12345'
+        cls.alunos[11].ativo = False
+        Aluno.objects.bulk_update(cls.alunos, ['whatsapp', 'ativo'])
+
+    def setUp(self):
+        EnviadorMemoria.caixa = []
+
+    def _vencido(self, aluno, dias, valor='100.00', pago=False):
+        return Pagamento.objects.create(
+            aluno=aluno, valor=Decimal(valor), data_pagamento=self.hoje,
+            data_vencimento=self.hoje - timedelta(days=dias), metodo_pagamento='PIX', pago=pago,
+        )
+
+    @override_settings(TAREFAS_SINCRONAS=True, LEMBRETES_POR_LOTE=2, LEMBRETES_INTERVALO=60)
+    def test_envio_sincrono_respeita_o_intervalo(self):
+        for aluno in self.alunos[:5]:
+            self._vencido(aluno, 3)
+        enfileirar_lembretes(self.hoje)
+        with mock.patch('alunos.lembretes.time.sleep') as dormir, \
+                self.captureOnCommitCallbacks(execute=True) as chamadas:
+            tarefas.enfileirar(enviar_lembretes, chave=CHAVE_ENVIO)
+        self.assertEqual(len(EnviadorMemoria.caixa), 5)
+        # Três lotes de até 2, com a pausa entre eles; nenhuma tarefa se reagendando
+        self.assertEqual([c.args for c in dormir.call_args_list], [(60,), (60,)])
+        self.assertEqual(len(chamadas), 1)
+        self.assertFalse(Tarefa.objects.exists())
+
+    def test_um_lembrete_por_aluno_por_ciclo(self):
+        for dias, valor in ((40, '100.00'), (10, '80.50'), (3, '120.00')):
+            self._vencido(self.alunos[0], dias, valor)
+        self._vencido(self.alunos[1], 2)
+        self._vencido(self.alunos[2], 5, pago=True)
+        self._vencido(self.alunos[3], 0)  # vence hoje: ainda não está vencido
+        self._vencido(self.alunos[10], 5)  # sem WhatsApp válido
+        self._vencido(self.alunos[11], 5)  # inativo
+
+        with CaptureQueriesContext(connection) as ctx:
+            resultado = enfileirar_lembretes(self.hoje)
+        # Os pagamentos vencidos são lidos uma vez, já agrupados por aluno, e gravados em um INSERT
+        sqls = [q['sql'] for q in ctx.captured_queries]
+        self.assertEqual(sum('FROM "alunos_pagamento"' in sql for sql in sqls), 1)
+        self.assertEqual(sum(sql.startswith('INSERT') for sql in sqls), 1)
+        self.assertEqual(resultado.enfileirados, 2)
+        self.assertEqual(resultado.sem_whatsapp, [self.alunos[10].pk])
+
+        lembrete = Lembrete.objects.get(aluno=self.alunos[0])
+        self.assertEqual(lembrete.telefone, self.alunos[0].whatsapp)
+        self.assertIn("3 mensalidades", lembrete.texto)
+        self.assertIn("R$300,50", lembrete.texto)
+        self.assertIn((self.hoje - timedelta(days=40)).strftime('%d/%m/%Y'), lembrete.texto)
+        self.assertIn("venceu no dia", Lembrete.objects.get(aluno=self.alunos[1]).texto)
+
+        # Rodar de novo no mesmo ciclo não duplica; no ciclo seguinte volta a lembrar
+        self.assertEqual(enfileirar_lembretes(self.hoje).enfileirados, 0)
+        self.assertEqual(enfileirar_lembretes(self.hoje, ciclo=self.hoje + timedelta(days=7)).enfileirados, 2)
+
+    def test_texto_vem_do_modelo_cadastrado(self):
+        ModeloMensagem.objects.update(ativo=False)
+        modelo = ModeloMensagem.objects.create(nome='Curto', texto="{{ nome }}: R${{ total }} há {{ dias_em_atraso }} dias")
+        self._vencido(self.alunos[0], 4, '59.90')
+        enfileirar_lembretes(self.hoje)
+        lembrete = Lembrete.objects.get()
+        self.assertEqual(lembrete.modelo, modelo)
+        self.assertEqual(lembrete.texto, f"{self.alunos[0].nome}: R$59,90 há 4 dias")
+
+    def test_fila_em_lotes_com_intervalo_e_novas_tentativas(self):
+        for aluno in self.alunos[:10]:
+            self._vencido(aluno, 3)
+        enfileirar_lembretes(self.hoje)
+        pausas = []
+
+        resultado = processar_fila(enviador=EnviadorComFalha(), tamanho_lote=4, intervalo=2, dormir=pausas.append)
+        # Só o número terminado em 9 falha; cada lembrete é tentado uma vez por execução
+        self.assertEqual((resultado.enviados, resultado.falhas), (9, 1))
+        self.assertEqual(pausas, [2, 2])
+        self.assertEqual(len(EnviadorMemoria.caixa), 9)
+        self.assertEqual(Lembrete.objects.filter(status=LEMBRETE_ENVIADO, enviado_em__isnull=False).count(), 9)
+        falha = Lembrete.objects.get(status=LEMBRETE_PENDENTE)
+        self.assertEqual((falha.tentativas, falha.erro), (1, "número indisponível"))
+
+        for _ in range(2):
+            processar_fila(enviador=EnviadorComFalha(), dormir=pausas.append)
+        falha.refresh_from_db()
+        self.assertEqual((falha.status, falha.tentativas), (LEMBRETE_ERRO, 3))
+        self.assertEqual(processar_fila(dormir=pausas.append).enviados, 0)
+
+    def test_limite_e_comando(self):
+        for aluno in self.alunos[:5]:
+            self._vencido(aluno, 3)
+        enfileirar_lembretes(self.hoje)
+        self.assertEqual(processar_fila(limite=2, intervalo=0).enviados, 2)
+        call_command('enviar_lembretes', intervalo=0, stdout=StringIO())
+        self.assertEqual(len(EnviadorMemoria.caixa), 5)
+
+    def test_botao_da_tela_de_vencidos(self):
+        self._vencido(self.alunos[0], 3)
+        self.client.force_login(self.usuario)
+        url = reverse('alunos:enfileirar_lembretes')
+        self.assertRedirects(self.client.get(url), reverse('alunos:vencimentos_pagamentos'))
+        self.assertFalse(Lembrete.objects.exists())
+
+        resposta = self.client.post(url, follow=True)
+        self.assertContains(resposta, "1 lembrete(s) colocado(s) na fila")
+        self.assertContains(resposta, "1 lembrete(s) aguardando envio")
+        self.assertNotContains(resposta, "web.whatsapp.com")
+
+        # O envio vai pela fila de tarefas
+        self.assertEqual(Tarefa.objects.get().funcao, 'alunos.lembretes.enviar_lembretes')
+        tarefas.processar_pendentes()
+        self.assertEqual(len(EnviadorMemoria.caixa), 1)
+        self.assertFalse(Lembrete.objects.filter(status=LEMBRETE_PENDENTE).exists())
+
+
+class RelatoriosAsyncTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = User.objects.create_user('gerencia', password='senha')
+        cls.hoje = date.today()
+        alunos = criar_alunos(30)
+        criar_pagamentos(alunos, por_aluno=3)
+        criar_pagamentos(alunos[:20], pago=False, data_vencimento=cls.hoje - timedelta(days=3),
+                         referencia=cls.hoje.replace(day=1))
+
+    def setUp(self):
+        cache.clear()
+
+    async def _comparar(self, nome_sync, nome_async, params):
+        await sync_to_async(self.client.force_login)(self.usuario)
+        await self.async_client.aforce_login(self.usuario)
+        sincrona = await sync_to_async(self.client.get)(reverse(nome_sync), params)
+        assincrona = await self.async_client.get(reverse(nome_async), params)
+        self.assertEqual(assincrona.status_code, 200)
+        return sincrona.context, assincrona.context
+
+    async def test_historico_igual_a_versao_sincrona(self):
+        for params in ({}, {'ordem': '-valor'}, {'status': STATUS_VENCIDO}):
+            with self.subTest(params=params):
+                sincrono, assincrono = await self._comparar(
+                    'alunos:historico_pagamentos', 'alunos:historico_pagamentos_async', params,
+                )
+                self.assertEqual([p.pk for p in assincrono['pagamentos']], [p.pk for p in sincrono['pagamentos']])
+                self.assertEqual(assincrono['total_recebido'], sincrono['total_recebido'])
+                self.assertEqual(assincrono['quantidade_pagamentos'], sincrono['quantidade_pagamentos'])
+                self.assertEqual(assincrono['filtros_querystring'], sincrono['filtros_querystring'])
+
+    async def test_vencimentos_igual_a_versao_sincrona(self):
+        sincrono, assincrono = await self._comparar(
+            'alunos:vencimentos_pagamentos', 'alunos:vencimentos_pagamentos_async', {},
+        )
+        self.assertEqual([p.pk for p in assincrono['pagina']], [p.pk for p in sincrono['pagina']])
+        self.assertEqual(assincrono['total_aberto'], sincrono['total_aberto'])
+        self.assertEqual(assincrono['contagem'], sincrono['contagem'])
+        self.assertEqual(assincrono['contagem'][STATUS_VENCIDO], 20)
+
+    async def test_exige_login(self):
+        resposta = await self.async_client.get(reverse('alunos:historico_pagamentos_async'))
+        self.assertEqual(resposta.status_code, 302)
+
+
+# Máximo de consultas SQL por rota de alunos/urls.py (GET de um usuário logado).
+# Toda rota nova precisa entrar aqui; o número não pode crescer com o volume de dados.
+ORCAMENTO_CONSULTAS = {
+    'dashboard': 8,
+    'lista_alunos': 4,
+    'exportar_alunos': 3,
+    'cadastro_aluno': 3,
+    'importar_alunos': 2,
+    'aluno_manager': 2,
+    'editar_aluno': 5,
+    'excluir_aluno': 1,
+    'pagamentos_manager': 2,
+    'cadastro_pagamento': 2,
+    'editar_pagamento': 5,
+    'historico_pagamentos': 5,
+    'historico_pagamentos_async': 5,
+    'vencimentos_pagamentos_async': 8,
+    'exportar_pagamentos': 3,
+    'vencimentos_pagamentos': 8,
+    'enfileirar_lembretes': 2,
+    'excluir_pagamento': 3,
+    'acoes_lote_pagamentos': 2,
+    'tarefas': 8,
+    'reexecutar_tarefa': 2,
+    'api_alunos': 4,
+    'api_autocomplete_alunos': 2,
+    'api_aluno': 4,
+    'api_modalidades': 3,
+    'api_modalidade': 3,
+    'api_pagamentos': 3,
+    'api_pagamento': 3,
+}
+
+
+class OrcamentoConsultasTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = User.objects.create_user('auditoria', password='senha')
+        cls.modalidade = Modalidade.objects.create(nome='Muay Thai', valor_mensal=Decimal('120.00'))
+
+    def setUp(self):
+        self.client.force_login(self.usuario)
+
+    def _aumentar_volume(self, quantidade, inicio):
+        alunos = criar_alunos(quantidade, inicio=inicio, whatsapp='5574999990000')
+        Aluno.modalidades.through.objects.bulk_create([
+            Aluno.modalidades.through(aluno_id=aluno.pk, modalidade_id=self.modalidade.pk) for aluno in alunos
+        ])
+        criar_pagamentos(alunos, por_aluno=3)
+        criar_pagamentos(alunos, pago=False, data_vencimento=date.today() - timedelta(days=4),
+                         referencia=date.today().replace(day=1))
+        atualizar_situacao([aluno.pk for aluno in alunos])
+        return alunos
+
+    def _url(self, nome, aluno, pagamento):
+        argumentos = {
+            'exportar_alunos': {'formato': 'csv'},
+            'exportar_pagamentos': {'formato': 'csv'},
+            'editar_aluno': {'pk': aluno.pk},
+            'excluir_aluno': {'pk': aluno.pk},
+            'editar_pagamento': {'pk': pagamento.pk},
+            'excluir_pagamento': {'pk': pagamento.pk},
+            'api_aluno': {'pk': aluno.pk},
+            'api_modalidade': {'pk': self.modalidade.pk},
+            'api_pagamento': {'pk': pagamento.pk},
+            # GET só redireciona: a tarefa não precisa existir
+            'reexecutar_tarefa': {'pk': 1},
+        }
+        return reverse(f'alunos:{nome}', kwargs=argumentos.get(nome))
+
+    def _consultas_por_rota(self):
+        aluno = Aluno.objects.order_by('pk').first()
+        pagamento = Pagamento.objects.order_by('pk').first()
+        consultas = {}
+        for nome in ORCAMENTO_CONSULTAS:
+            cache.clear()
+            with CaptureQueriesContext(connection) as ctx:
+                resposta = self.client.get(self._url(nome, aluno, pagamento))
+                if resposta.streaming:
+                    b''.join(resposta.streaming_content)
+            self.assertIn(resposta.status_code, (200, 302), nome)
+            consultas[nome] = len(ctx)
+        return consultas
+
+    def test_todas_as_rotas_tem_orcamento(self):
+        from .urls import urlpatterns
+        self.assertEqual({padrao.name for padrao in urlpatterns}, set(ORCAMENTO_CONSULTAS))
+
+    def test_orcamento_nao_cresce_com_o_volume(self):
+        self._aumentar_volume(5, inicio=0)
+        poucos = self._consultas_por_rota()
+        self._aumentar_volume(60, inicio=5)
+        muitos = self._consultas_por_rota()
+        for nome, limite in ORCAMENTO_CONSULTAS.items():
+            with self.subTest(rota=nome):
+                self.assertLessEqual(muitos[nome], limite)
+                self.assertEqual(muitos[nome], poucos[nome])
+
+
+class InstrumentacaoTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = User.objects.create_user('suporte', password='senha')
+        criar_pagamentos(criar_alunos(5), pago=False, data_vencimento=date.today() - timedelta(days=2))
+
+    def setUp(self):
+        cache.clear()
+
+    @staticmethod
+    def _metricas(resposta):
+        return {
+            item.split(';')[0].strip(): item for item in resposta['Server-Timing'].split(',')
+        }
+
+    def test_server_timing_e_log(self):
+        self.client.force_login(self.usuario)
+        with self.assertLogs('alunos.requisicoes', 'INFO') as logs:
+            resposta = self.client.get(reverse('alunos:vencimentos_pagamentos'))
+        metricas = self._metricas(resposta)
+        self.assertIn('desc="8 consultas"', metricas['db'])
+        self.assertRegex(metricas['tpl'], r'tpl;dur=\d+\.\d')
+        self.assertIn('total', metricas)
+
+        dados = json.loads(logs.records[-1].getMessage())
+        self.assertEqual((dados['caminho'], dados['status'], dados['consultas']),
+                         (reverse('alunos:vencimentos_pagamentos'), 200, 8))
+        self.assertGreater(dados['template_ms'], 0)
+
+    async def test_conta_as_consultas_das_views_assincronas(self):
+        await self.async_client.aforce_login(self.usuario)
+        resposta = await self.async_client.get(reverse('alunos:vencimentos_pagamentos_async'))
+        self.assertIn('desc="8 consultas"', self._metricas(resposta)['db'])
+
+    def test_aponta_consultas_repetidas(self):
+        def view_com_n_mais_um(request):
+            for pagamento in Pagamento.objects.all():
+                pagamento.aluno.nome
+            Aluno.objects.first()
+            Aluno.objects.first()
+            return HttpResponse()
+
+        middleware = InstrumentacaoMiddleware(view_com_n_mais_um)
+        with self.assertLogs('alunos.requisicoes', 'INFO') as logs:
+            resposta = middleware(RequestFactory().get('/'))
+        self.assertIn('desc="1 repetidas, 5 similares"', resposta['Server-Timing'])
+        dados = json.loads(logs.records[-1].getMessage())
+        self.assertEqual(dados['consultas'], 8)
+        self.assertEqual(dados['sql_repetido'][0]['vezes'], 5)
+        self.assertIn('alunos_aluno', dados['sql_repetido'][0]['sql'])
+
+
+class DadosSinteticosTests(TestCase):
+    def test_gera_base_consistente(self):
+        hoje = date.today()
+        with self.captureOnCommitCallbacks(execute=True):
+            alunos, pagamentos = gerar_dados(40, anos=2, seed=7, tamanho_lote=15, hoje=hoje)
+        self.assertEqual(Aluno.objects.count(), alunos)
+        self.assertEqual(Pagamento.objects.count(), pagamentos)
+        self.assertGreater(pagamentos, alunos)
+        self.assertFalse(Pagamento.objects.filter(data_pagamento__gt=hoje).exists())
+        self.assertFalse(Aluno.objects.filter(modalidades=None).exists())
+
+        # Índice de busca e resumo mensal reconstruídos depois da carga sem triggers
+        self.assertEqual(len(buscar_alunos('silva', limite=100, apenas_ativos=False)),
+                         Aluno.objects.filter(nome__contains='Silva').count())
+        resumo = list(ResumoMensal.objects.values_list('mes', 'metodo_pagamento', 'pago', 'quantidade', 'total_centavos'))
+        reconstruir_resumo()
+        self.assertEqual(
+            resumo, list(ResumoMensal.objects.values_list('mes', 'metodo_pagamento', 'pago', 'quantidade', 'total_centavos')),
+        )
+        # Situação financeira calculada para todos
+        devedores = Pagamento.objects.vencidos(hoje).values('aluno_id').distinct().count()
+        self.assertEqual(Aluno.objects.filter(faturas_vencidas__gt=0).count(), devedores)
+
+        # Uma segunda carga continua a numeração de CPF sem colidir com a primeira
+        gerar_dados(5, anos=2, seed=7, hoje=hoje)
+        self.assertEqual(Aluno.objects.count(), alunos + 5)
+
+    def test_benchmark_de_todas_as_rotas(self):
+        User.objects.create_superuser('admin', password='senha')
+        gerar_dados(10, anos=1)
+        saida = tempfile.NamedTemporaryFile(suffix='.json', delete=False).name
+        self.addCleanup(lambda: os.remove(saida))
+        call_command('benchmark_views', repeticoes=1, saida=saida, stdout=StringIO())
+        with open(saida, encoding='utf-8') as arquivo:
+            resultado = json.load(arquivo)
+        self.assertEqual(set(resultado['rotas']), set(ORCAMENTO_CONSULTAS))
+        self.assertEqual(resultado['alunos'], 10)
+        self.assertLessEqual(resultado['rotas']['lista_alunos']['consultas'], ORCAMENTO_CONSULTAS['lista_alunos'])
+
+
+class PerfilBancoTests(TestCase):
+    def test_perfil_producao_aplica_pragmas_em_cada_conexao(self):
+        with tempfile.TemporaryDirectory() as diretorio:
+            caminho = os.path.join(diretorio, 'teste.sqlite3')
+            sqlite3.connect(caminho).close()
+            wrapper = abrir_conexao(caminho, 'producao')
+            try:
+                with wrapper.cursor() as cursor:
+                    valores = {}
+                    for pragma in ('journal_mode', 'synchronous', 'busy_timeout', 'cache_size'):
+                        cursor.execute(f'PRAGMA {pragma}')
+                        valores[pragma] = cursor.fetchone()[0]
+            finally:
+                wrapper.close()
+        self.assertEqual(valores, {
+            'journal_mode': 'wal', 'synchronous': 1, 'busy_timeout': banco.BUSY_TIMEOUT_MS, 'cache_size': -32000,
+        })
+        self.assertEqual(wrapper.transaction_mode, 'IMMEDIATE')
+
+    def test_configuracao(self):
+        producao = banco.sqlite('db.sqlite3')
+        self.assertEqual(producao['CONN_MAX_AGE'], 600)
+        self.assertTrue(producao['CONN_HEALTH_CHECKS'])
+        self.assertIn('PRAGMA journal_mode=WAL', producao['OPTIONS']['init_command'])
+        padrao = banco.sqlite('db.sqlite3', 'padrao')
+        self.assertEqual(padrao['CONN_MAX_AGE'], 0)
+        self.assertNotIn('init_command', padrao['OPTIONS'])
+        with self.assertRaises(ValueError):
+            banco.sqlite('db.sqlite3', 'turbo')
+
+    def test_leituras_e_escritas_simultaneas_sem_bloqueio(self):
+        resultado = estressar('producao', leitores=2, escritores=2, duracao=1.0)
+        self.assertEqual(resultado.outros_erros, [])
+        self.assertEqual(resultado.bloqueios, 0)
+        self.assertGreater(resultado.leituras, 0)
+        self.assertGreater(resultado.escritas, 0)
+
+
+class GetCondicionalTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = User.objects.create_user('balcao', password='senha')
+        cls.alunos = criar_alunos(4)
+        criar_pagamentos(cls.alunos, pago=False, data_vencimento=date.today() - timedelta(days=3))
+        atualizar_situacao([aluno.pk for aluno in cls.alunos])
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.usuario)
+
+    def _revalidar(self, url, resposta, **params):
+        return self.client.get(url, params, HTTP_IF_NONE_MATCH=resposta['ETag'])
+
+    def test_304_sem_consulta_da_pagina_nem_template(self):
+        url = reverse('alunos:lista_alunos')
+        primeira = self.client.get(url)
+        self.assertEqual(primeira.status_code, 200)
+        self.assertEqual(primeira['Cache-Control'], 'private, no-cache')
+        self.assertIn('Last-Modified', primeira)
+
+        with CaptureQueriesContext(connection) as ctx:
+            segunda = self._revalidar(url, primeira)
+        self.assertEqual(segunda.status_code, 304)
+        self.assertEqual(segunda.content, b'')
+        self.assertTemplateNotUsed(segunda, 'alunos/lista_alunos.html')
+        # Sessão, usuário e o validador; nada da página
+        self.assertEqual(len(ctx), 3)
+
+        # Só o Last-Modified também basta
+        resposta = self.client.get(url, HTTP_IF_MODIFIED_SINCE=primeira['Last-Modified'])
+        self.assertEqual(resposta.status_code, 304)
+
+    def test_novo_login_nao_reaproveita_formulario_com_token_antigo(self):
+        cliente = Client(enforce_csrf_checks=True)
+        cliente.force_login(self.usuario)
+        url = reverse('alunos:vencimentos_pagamentos')
+        primeira = cliente.get(url)
+        self.assertEqual(primeira.status_code, 200)
+        self.assertEqual(cliente.get(url, HTTP_IF_NONE_MATCH=primeira['ETag']).status_code, 304)
+
+        # O login troca o segredo CSRF: o HTML guardado traz um token que não vale mais
+        cliente.logout()
+        cliente.force_login(self.usuario)
+        segunda = cliente.get(url, HTTP_IF_NONE_MATCH=primeira['ETag'])
+        self.assertEqual(segunda.status_code, 200)
+        token = re.search(r'name="csrfmiddlewaretoken" value="([^"]+)"', segunda.content.decode()).group(1)
+        resposta = cliente.post(reverse('alunos:acoes_lote_pagamentos'), {'csrfmiddlewaretoken': token})
+        self.assertEqual(resposta.status_code, 302)
+
+    def test_alteracao_ou_exclusao_muda_o_etag(self):
+        url = reverse('alunos:lista_alunos')
+        primeira = self.client.get(url)
+        aluno = self.alunos[0]
+        aluno.nome = 'Nome Trocado'
+        aluno.save()
+        segunda = self._revalidar(url, primeira)
+        self.assertEqual(segunda.status_code, 200)
+        self.assertContains(segunda, 'Nome Trocado')
+
+        Aluno.objects.filter(pk=self.alunos[1].pk).delete()
+        self.assertEqual(self._revalidar(url, segunda).status_code, 200)
+
+    def test_filtros_tem_etag_proprio(self):
+        url = reverse('alunos:lista_alunos')
+        todos = self.client.get(url)
+        devedores = self.client.get(url, {'situacao': 'devedores'})
+        self.assertNotEqual(todos['ETag'], devedores['ETag'])
+        self.assertEqual(self._revalidar(url, devedores, situacao='devedores').status_code, 304)
+
+    def test_historico_acompanha_o_nome_do_aluno(self):
+        url = reverse('alunos:historico_pagamentos')
+        primeira = self.client.get(url)
+        self.assertEqual(self._revalidar(url, primeira).status_code, 304)
+        Aluno.objects.filter(pk=self.alunos[0].pk).update(nome='Outro Nome', atualizado_em=timezone.now())
+        self.assertEqual(self._revalidar(url, primeira).status_code, 200)
+
+        # Filtro inválido: sem GET condicional
+        resposta = self.client.get(url, {'data_inicio': 'ontem'})
+        self.assertNotIn('ETag', resposta)
+
+    def test_vencimentos_muda_com_pagamento_e_fila(self):
+        url = reverse('alunos:vencimentos_pagamentos')
+        primeira = self.client.get(url)
+        self.assertEqual(self._revalidar(url, primeira).status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            pagamento = Pagamento.objects.filter(aluno=self.alunos[0]).first()
+            pagamento.pago = True
+            pagamento.save()
+        segunda = self._revalidar(url, primeira)
+        self.assertEqual(segunda.status_code, 200)
+
+        Lembrete.objects.create(aluno=self.alunos[1], ciclo=date.today(), telefone='5574999990000', texto='Oi')
+        self.assertEqual(self._revalidar(url, segunda).status_code, 200)
+
+    def test_mensagem_pendente_e_exibida(self):
+        url = reverse('alunos:vencimentos_pagamentos')
+        primeira = self.client.get(url)
+        # GET na exclusão deixa a mensagem "Ação de exclusão inválida." pendente
+        self.client.get(reverse('alunos:excluir_pagamento', kwargs={'pk': Pagamento.objects.first().pk}))
+        resposta = self._revalidar(url, primeira)
+        self.assertEqual(resposta.status_code, 200)
+        self.assertContains(resposta, 'Ação de exclusão inválida.')
+        self.assertNotIn('ETag', resposta)
+        # Mensagem consumida: volta a responder 304
+        self.assertEqual(self._revalidar(url, primeira).status_code, 304)
+
+    async def test_views_assincronas(self):
+        await self.async_client.aforce_login(self.usuario)
+        url = reverse('alunos:vencimentos_pagamentos_async')
+        primeira = await self.async_client.get(url)
+        self.assertEqual(primeira.status_code, 200)
+        segunda = await self.async_client.get(url, headers={'if-none-match': primeira['ETag']})
+        self.assertEqual(segunda.status_code, 304)
+
+
+class FragmentosListaAlunosTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = User.objects.create_user('secretaria', password='senha')
+        cls.alunos = criar_alunos(3, whatsapp='5574981133855')
+
+    def setUp(self):
+        cache.clear()
+        caches['fragmentos'].clear()
+        self.client.force_login(self.usuario)
+
+    def test_linhas_em_cache_ate_o_aluno_mudar(self):
+        url = reverse('alunos:lista_alunos')
+        resposta = self.client.get(url)
+        self.assertContains(resposta, '(74) 9 8113-3855', count=3)
+        self.assertNotContains(resposta, 'document.write')
+        aluno = self.alunos[0]
+
+        # UPDATE sem mexer em atualizado_em: a linha continua vindo do cache
+        Aluno.objects.filter(pk=aluno.pk).update(nome='Nome Fora do Cache')
+        self.assertNotContains(self.client.get(url), 'Nome Fora do Cache')
+
+        # Alteração normal muda a versão da linha
+        aluno.refresh_from_db()
+        aluno.save()
+        self.assertContains(self.client.get(url), 'Nome Fora do Cache')
+
+    def test_chave_muda_com_o_dia(self):
+        url = reverse('alunos:lista_alunos')
+        self.client.get(url)
+        Aluno.objects.filter(pk=self.alunos[0].pk).update(nome='Amanhã')
+        amanha = date.today() + timedelta(days=1)
+        with mock.patch('alunos.views.date') as data_falsa:
+            data_falsa.today.return_value = amanha
+            self.assertContains(self.client.get(url), 'Amanhã')
+
+
+class ApiJsonTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = User.objects.create_user('aplicativo', password='senha')
+        cls.muay = Modalidade.objects.create(nome='Muay Thai', valor_mensal=Decimal('120.00'))
+        cls.jiu = Modalidade.objects.create(nome='Jiu Jitsu', valor_mensal=Decimal('150.00'))
+        cls.alunos = criar_alunos(7)
+        criar_alunos(2, inicio=50, ativo=False)
+        Matricula = Aluno.modalidades.through
+        Matricula.objects.bulk_create(
+            [Matricula(aluno_id=aluno.pk, modalidade_id=cls.muay.pk) for aluno in cls.alunos]
+            + [Matricula(aluno_id=cls.alunos[0].pk, modalidade_id=cls.jiu.pk)]
+        )
+        criar_pagamentos(cls.alunos, por_aluno=2)
+        criar_pagamentos(cls.alunos[:3], pago=False, data_vencimento=date.today() - timedelta(days=5),
+                         referencia=date.today().replace(day=1))
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.usuario)
+
+    def _json(self, url, params=None, status=200):
+        resposta = self.client.get(url, params or {})
+        self.assertEqual(resposta.status_code, status, resposta.content)
+        self.assertEqual(resposta['Content-Type'], 'application/json')
+        return resposta.json()
+
+    def test_exige_login_sem_redirecionar(self):
+        self.client.logout()
+        resposta = self.client.get(reverse('alunos:api_alunos'))
+        self.assertEqual(resposta.status_code, 401)
+        self.assertEqual(resposta.json(), {'erro': 'Autenticação necessária.'})
+
+    def test_paginacao_por_cursor_percorre_tudo(self):
+        url = reverse('alunos:api_alunos')
+        vistos, params = [], {'limite': 4, 'fields': 'nome'}
+        while True:
+            dados = self._json(url, params)
+            vistos += [linha['id'] for linha in dados['resultados']]
+            if not dados['proximo']:
+                break
+            params['depois'] = dados['proximo']
+        self.assertEqual(vistos, list(Aluno.objects.order_by('pk').values_list('pk', flat=True)))
+
+    def test_campos_escolhidos_e_modalidades(self):
+        dados = self._json(reverse('alunos:api_alunos'), {'fields': 'nome,modalidades', 'limite': 1})
+        self.assertEqual(dados['resultados'], [{
+            'id': self.alunos[0].pk, 'nome': self.alunos[0].nome, 'modalidades': [self.muay.pk, self.jiu.pk],
+        }])
+        erro = self._json(reverse('alunos:api_alunos'), {'fields': 'nome,senha'}, status=400)
+        self.assertEqual(erro['detalhes']['fields'], ['senha'])
+
+    def test_filtros(self):
+        url = reverse('alunos:api_alunos')
+        self.assertEqual(len(self._json(url, {'ativo': 'false'})['resultados']), 2)
+        self.assertEqual(len(self._json(url, {'ativo': 'true', 'modalidade': self.jiu.pk})['resultados']), 1)
+        self.assertEqual(self._json(url, {'matricula_de': 'ontem'}, status=400)['erro'], 'Filtros inválidos.')
+
+        url = reverse('alunos:api_pagamentos')
+        vencidos = self._json(url, {'status': 'VENCIDO', 'fields': 'aluno_nome,status,dias_em_atraso'})
+        self.assertEqual(len(vencidos['resultados']), 3)
+        self.assertEqual({linha['status'] for linha in vencidos['resultados']}, {'VENCIDO'})
+        self.assertEqual({linha['dias_em_atraso'] for linha in vencidos['resultados']}, {5})
+        do_aluno = self._json(url, {'aluno': self.alunos[0].pk, 'pago': 'true'})
+        self.assertEqual(len(do_aluno['resultados']), 2)
+        self.assertEqual(do_aluno['resultados'][0]['aluno_nome'], self.alunos[0].nome)
+
+    def test_consultas_fixas_por_pagina(self):
+        for nome, params in (('api_alunos', {}), ('api_pagamentos', {}), ('api_alunos', {'fields': 'nome'})):
+            url = reverse(f'alunos:{nome}')
+            with CaptureQueriesContext(connection) as poucos:
+                self.client.get(url, {'limite': 2, **params})
+            with CaptureQueriesContext(connection) as muitos:
+                self.client.get(url, {'limite': 200, **params})
+            self.assertEqual(len(poucos), len(muitos), nome)
+        # Sem `modalidades` nos campos, nenhuma consulta às matrículas
+        self.assertNotIn('alunos_aluno_modalidades', muitos.captured_queries[-1]['sql'])
+
+    def test_cadastro_edicao_e_exclusao(self):
+        url = reverse('alunos:api_pagamentos')
+        aluno = self.alunos[4]
+        with self.captureOnCommitCallbacks(execute=True):
+            resposta = self.client.post(url, {
+                'aluno': aluno.pk, 'valor': '99.90', 'data_pagamento': str(date.today()),
+                'data_vencimento': str(date.today() - timedelta(days=2)), 'metodo_pagamento': 'PIX', 'pago': False,
+            }, content_type='application/json')
+        self.assertEqual(resposta.status_code, 201, resposta.content)
+        criado = resposta.json()
+        self.assertEqual((criado['valor'], criado['status']), ('99.90', 'VENCIDO'))
+        # Mesmos sinais das telas: situação do aluno recalculada
+        aluno.refresh_from_db()
+        self.assertEqual(aluno.faturas_vencidas, 1)
+
+        detalhe = reverse('alunos:api_pagamento', kwargs={'pk': criado['id']})
+        with self.captureOnCommitCallbacks(execute=True):
+            resposta = self.client.patch(detalhe, {'pago': True}, content_type='application/json')
+        self.assertEqual(resposta.json()['status'], 'PAGO')
+        aluno.refresh_from_db()
+        self.assertEqual(aluno.faturas_vencidas, 0)
+
+        resposta = self.client.patch(detalhe, {'valor': 'muito'}, content_type='application/json')
+        self.assertEqual(resposta.status_code, 400)
+        self.assertIn('valor', resposta.json()['detalhes'])
+
+        self.assertEqual(self.client.delete(detalhe).status_code, 204)
+        self.assertEqual(self.client.get(detalhe).status_code, 404)
+
+    def test_delete_de_aluno_agenda_a_exclusao(self):
+        aluno = self.alunos[1]
+        url = reverse('alunos:api_aluno', kwargs={'pk': aluno.pk})
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(self.client.delete(url).status_code, 202)
+        # Os pagamentos não são lidos nem apagados na requisição
+        self.assertFalse([q for q in ctx.captured_queries if 'alunos_pagamento' in q['sql']])
+        aluno.refresh_from_db()
+        self.assertFalse(aluno.ativo)
+        self.assertIsNotNone(aluno.exclusao_agendada_em)
+        self.assertTrue(Pagamento.objects.filter(aluno=aluno).exists())
+        tarefa = Tarefa.objects.get(status=TAREFA_PENDENTE)
+        self.assertEqual((tarefa.funcao, tarefa.argumentos), ('alunos.arquivo.excluir_aluno', {'pk': aluno.pk}))
+        self.assertEqual(tarefa.usuario_id, self.usuario.pk)
+
+        tarefas.processar_pendentes()
+        self.assertFalse(Aluno.objects.filter(pk=aluno.pk).exists())
+        self.assertFalse(Pagamento.objects.filter(aluno_id=aluno.pk).exists())
+
+    def test_patch_de_aluno_mantem_modalidades(self):
+        aluno = self.alunos[0]
+        url = reverse('alunos:api_aluno', kwargs={'pk': aluno.pk})
+        resposta = self.client.patch(url, {'bairro': 'Catuaba'}, content_type='application/json')
+        self.assertEqual(resposta.status_code, 200, resposta.content)
+        self.assertEqual(resposta.json()['bairro'], 'Catuaba')
+        self.assertEqual(resposta.json()['modalidades'], [self.muay.pk, self.jiu.pk])
+
+        resposta = self.client.post(reverse('alunos:api_modalidades'), '[1, 2]', content_type='application/json')
+        self.assertEqual(resposta.status_code, 400)
+
+    def test_escrita_exige_csrf(self):
+        cliente = Client(enforce_csrf_checks=True)
+        cliente.force_login(self.usuario)
+        url = reverse('alunos:api_modalidades')
+        self.assertEqual(cliente.post(url, {'nome': 'Boxe'}, content_type='application/json').status_code, 403)
+        token = cliente.get(url).cookies['csrftoken'].value
+        resposta = cliente.post(url, {'nome': 'Boxe'}, content_type='application/json', HTTP_X_CSRFTOKEN=token)
+        self.assertEqual(resposta.status_code, 201)
+        self.assertEqual(resposta.json(), {'id': resposta.json()['id'], 'nome': 'Boxe', 'valor_mensal': None})
+
+
+class AutocompleteAlunoTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = User.objects.create_user('balcao', password='senha')
+        cls.joao = Aluno.objects.create(nome='João Silva', cpf='111.111.111-11', rg='1', data_nascimento=date(1990, 1, 1))
+        cls.joana = Aluno.objects.create(nome='Joana Souza', cpf='222.222.222-22', rg='2', data_nascimento=date(1990, 1, 1))
+        cls.inativo = Aluno.objects.create(nome='Joaquim Lima', cpf='333.333.333-33', rg='3',
+                                           data_nascimento=date(1990, 1, 1), ativo=False)
+        criar_alunos(30)
+
+    def setUp(self):
+        self.client.force_login(self.usuario)
+
+    def _sugestoes(self, q, **params):
+        resposta = self.client.get(reverse('alunos:api_autocomplete_alunos'), {'q': q, **params})
+        self.assertEqual(resposta.status_code, 200)
+        return [linha['nome'] for linha in resposta.json()['resultados']]
+
+    def test_prefixo_sem_acento_e_so_ativos(self):
+        self.assertEqual(self._sugestoes('joa'), ['Joana Souza', 'João Silva'])
+        self.assertEqual(self._sugestoes('JOAO sil'), ['João Silva'])
+        self.assertEqual(self._sugestoes('111'), ['João Silva'])
+        self.assertEqual(self._sugestoes(''), [])
+        self.assertEqual(self._sugestoes('aluno', limite=3), ['Aluno 00000', 'Aluno 00001', 'Aluno 00002'])
+
+    def test_resposta_compacta_e_uma_consulta(self):
+        with self.assertNumQueries(1):
+            sugerir_alunos('aluno', limite=500)
+        resposta = self.client.get(reverse('alunos:api_autocomplete_alunos'), {'q': 'joão'})
+        self.assertEqual(resposta.json(), {'resultados': [{'id': self.joao.pk, 'nome': 'João Silva'}]})
+        self.assertIn('max-age', resposta['Cache-Control'])
+
+    @staticmethod
+    def _opcoes_de_aluno(html):
+        select = re.search(r'<select name="aluno".*?</select>', html, re.S).group()
+        return re.findall(r'<option.*?</option>', select)
+
+    def test_formulario_nao_lista_todos_os_alunos(self):
+        with CaptureQueriesContext(connection) as ctx:
+            html = self.client.get(reverse('alunos:cadastro_pagamento')).content.decode()
+        self.assertNotIn('Aluno 00000', html)
+        self.assertEqual(self._opcoes_de_aluno(html), ['<option value="" selected>Selecione o Aluno</option>'])
+        self.assertIn(f'data-autocomplete-url="{reverse("alunos:api_autocomplete_alunos")}"', html)
+        self.assertFalse([q for q in ctx.captured_queries if 'alunos_aluno' in q['sql']])
+
+        pagamento = criar_pagamentos([self.joana])[0]
+        html = self.client.get(reverse('alunos:editar_pagamento', args=[pagamento.pk])).content.decode()
+        self.assertEqual(self._opcoes_de_aluno(html), [
+            '<option value="">Selecione o Aluno</option>',
+            f'<option value="{self.joana.pk}" selected>Joana Souza</option>',
+        ])
+
+    def test_post_valida_com_uma_consulta_de_aluno(self):
+        dados = {
+            'valor': '120.00', 'data_pagamento': str(date.today()), 'data_vencimento': str(date.today()),
+            'metodo_pagamento': 'PIX', 'pago': 'on',
+        }
+        with CaptureQueriesContext(connection) as ctx:
+            form = PagamentoForm({**dados, 'aluno': self.joao.pk})
+            self.assertTrue(form.is_valid(), form.errors)
+        # O get(pk=...) do campo e a checagem de existência da ForeignKey no modelo
+        self.assertEqual(len(ctx), 2)
+        for consulta in ctx.captured_queries:
+            self.assertIn(f'"alunos_aluno"."id" = {self.joao.pk}', consulta['sql'])
+        self.assertFalse(PagamentoForm({**dados, 'aluno': self.inativo.pk}).is_valid())
+        form = PagamentoForm({**dados, 'aluno': 'abc'})
+        self.assertFalse(form.is_valid())
+        # Valor inválido volta para a tela sem quebrar o widget
+        self.assertIn('Selecione o Aluno', form['aluno'].as_widget())
+
+
+class AcoesLotePagamentosTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = User.objects.create_user('caixa', password='senha')
+        cls.alunos = criar_alunos(8)
+        cls.vencidos = criar_pagamentos(cls.alunos, pago=False, data_vencimento=date.today() - timedelta(days=3))
+        cls.pagos = criar_pagamentos(cls.alunos[:2])
+        atualizar_situacao([aluno.pk for aluno in cls.alunos])
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.usuario)
+
+    def _resumo(self):
+        return {(r.mes, r.metodo_pagamento, r.pago): (r.quantidade, r.total) for r in ResumoMensal.objects.all()}
+
+    def _conferir_resumo(self):
+        incremental = self._resumo()
+        reconstruir_resumo()
+        self.assertEqual(incremental, self._resumo())
+
+    def _pks(self, pagamentos):
+        return [p.pk for p in pagamentos]
+
+    def test_marcar_pagos_em_um_update(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            with CaptureQueriesContext(connection) as poucos:
+                self.assertEqual(acoes_lote.marcar_pagos(self._pks(self.vencidos[:2]), date.today(), 'DINHEIRO'), 2)
+            with CaptureQueriesContext(connection) as muitos:
+                # Os já pagos ficam como estão
+                quantidade = acoes_lote.marcar_pagos(self._pks(self.vencidos[2:] + self.pagos), date.today(), 'DINHEIRO')
+        self.assertEqual(quantidade, 6)
+        self.assertEqual(len(poucos), len(muitos))
+        self.assertEqual(sum(q['sql'].startswith('UPDATE "alunos_pagamento"') for q in muitos.captured_queries), 1)
+        self.assertFalse(Pagamento.objects.filter(pago=False).exists())
+        self.assertEqual(Pagamento.objects.filter(metodo_pagamento='DINHEIRO', data_pagamento=date.today()).count(), 8)
+        self.assertEqual(Pagamento.objects.filter(pk__in=self._pks(self.pagos), metodo_pagamento='PIX').count(), 2)
+        self.assertFalse(Aluno.objects.filter(faturas_vencidas__gt=0).exists())
+        self.assertEqual(Aluno.objects.get(pk=self.alunos[0].pk).ultimo_pagamento, date.today())
+        self._conferir_resumo()
+
+    def test_alterar_vencimento_e_excluir(self):
+        novo = date.today() + timedelta(days=20)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(acoes_lote.alterar_vencimento(self._pks(self.vencidos[:4]), novo), 4)
+        self.assertEqual(
+            list(Aluno.objects.filter(pk__in=self._pks(self.alunos[:4])).values_list('faturas_vencidas', 'proximo_vencimento')),
+            [(0, novo)] * 4,
+        )
+
+        with self.captureOnCommitCallbacks(execute=True):
+            with CaptureQueriesContext(connection) as ctx:
+                self.assertEqual(acoes_lote.excluir_pagamentos(Pagamento.objects.filter(pago=False)), 8)
+        # Um SELECT dos alunos afetados, o DELETE e o UPDATE da situação; sem carregar as linhas
+        self.assertEqual([q['sql'].split()[0] for q in ctx.captured_queries if q['sql'].split()[0] in ('SELECT', 'DELETE', 'UPDATE')],
+                         ['SELECT', 'DELETE', 'UPDATE'])
+        self.assertEqual(Pagamento.objects.count(), 2)
+        self.assertFalse(Aluno.objects.exclude(proximo_vencimento=None).exists())
+        self._conferir_resumo()
+        self.assertEqual(acoes_lote.excluir_pagamentos([]), 0)
+
+    def test_exclusao_direta_em_comandos_limitados(self):
+        pks = [p.pk for p in self.vencidos]
+        with mock.patch.object(exclusao_direta, 'PARAMETROS_POR_COMANDO', 3), \
+                CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(acoes_lote.excluir_pagamentos(pks), 8)
+        # 8 pagamentos em DELETEs de até 3 parâmetros, sem carregar as linhas
+        self.assertEqual(sum(q['sql'].startswith('DELETE') for q in ctx.captured_queries), 3)
+        self.assertFalse(Pagamento.objects.filter(pk__in=pks).exists())
+        self.assertEqual(Pagamento.objects.count(), len(self.pagos))
+        self._conferir_resumo()
+
+    def test_tela_aplica_acao_e_volta_para_a_pagina(self):
+        url_vencidos = reverse('alunos:vencimentos_pagamentos')
+        html = self.client.get(url_vencidos).content.decode()
+        self.assertEqual(html.count('<input type="checkbox" name="pagamentos"'), 8)
+        self.assertEqual(totais_historico(status='VENCIDO')['quantidade'], 8)
+        with self.captureOnCommitCallbacks(execute=True):
+            resposta = self.client.post(reverse('alunos:acoes_lote_pagamentos'), {
+                'acao': 'pagar', 'pagamentos': self._pks(self.vencidos[:3]), 'data_pagamento': str(date.today()),
+                'metodo_pagamento': 'PIX', 'proxima': f'{url_vencidos}?status=VENCIDO',
+            })
+        self.assertRedirects(resposta, f'{url_vencidos}?status=VENCIDO', fetch_redirect_response=False)
+        # Totais em cache invalidados
+        self.assertEqual(totais_historico(status='VENCIDO')['quantidade'], 5)
+        self.assertEqual(Pagamento.objects.filter(pago=True).count(), 5)
+        self.assertContains(self.client.get(resposta.url), '3 pagamento(s) marcado(s) como pago(s).')
+
+    def test_tela_recusa_dados_invalidos(self):
+        url = reverse('alunos:acoes_lote_pagamentos')
+        resposta = self.client.post(url, {'acao': 'pagar', 'pagamentos': self._pks(self.vencidos[:3]),
+                                          'proxima': 'https://exemplo.com/'})
+        self.assertRedirects(resposta, reverse('alunos:historico_pagamentos'), fetch_redirect_response=False)
+        self.assertContains(self.client.get(resposta.url), 'Informe o método de pagamento.')
+        self.assertFalse(Pagamento.objects.filter(pk__in=self._pks(self.vencidos), pago=True).exists())
+
+        resposta = self.client.post(url, {'acao': 'excluir', 'pagamentos': [999999]})
+        self.assertEqual(Pagamento.objects.count(), 10)
+        resposta = self.client.post(url, {'acao': 'vencimento', 'pagamentos': self._pks(self.vencidos[:1])})
+        self.assertContains(self.client.get(resposta.url), 'Informe a nova data de vencimento.')
+
+
+class ArquivoTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = User.objects.create_user('arquivista', password='senha')
+        cls.modalidade = Modalidade.objects.create(nome='Jiu Jitsu', valor_mensal=Decimal('150.00'))
+        cls.antigo = date.today() - timedelta(days=7 * 365)
+        cls.ativo, cls.so_antigo, cls.inativo, cls.devedor = criar_alunos(4)
+        Aluno.objects.filter(pk__in=[cls.inativo.pk, cls.devedor.pk]).update(ativo=False)
+        cls.inativo.modalidades.add(cls.modalidade)
+        Lembrete.objects.create(aluno=cls.inativo, ciclo=cls.antigo, telefone='5574999990000', texto='Oi')
+
+        def pagamento(aluno, data, pago=True):
+            return Pagamento(aluno=aluno, valor=Decimal('100.00'), data_pagamento=data, data_vencimento=data,
+                             metodo_pagamento='PIX', pago=pago)
+        Pagamento.objects.bulk_create(
+            [pagamento(cls.ativo, cls.antigo + timedelta(days=30 * i)) for i in range(5)]
+            + [pagamento(cls.ativo, date.today() - timedelta(days=3)),
+               pagamento(cls.ativo, cls.antigo, pago=False),
+               pagamento(cls.so_antigo, cls.antigo),
+               pagamento(cls.inativo, cls.antigo), pagamento(cls.inativo, cls.antigo + timedelta(days=30)),
+               pagamento(cls.devedor, cls.antigo, pago=False)]
+        )
+        atualizar_situacao(Aluno.objects.all())
+        # Sem alteração desde antes do corte
+        Aluno.objects.filter(ativo=False).update(atualizado_em=timezone.now() - timedelta(days=3 * 365))
+
+    def setUp(self):
+        cache.clear()
+
+    def _conferir_resumo(self):
+        incremental = {(r.mes, r.metodo_pagamento, r.pago): (r.quantidade, r.total) for r in ResumoMensal.objects.all()}
+        reconstruir_resumo()
+        self.assertEqual(incremental, {(r.mes, r.metodo_pagamento, r.pago): (r.quantidade, r.total)
+                                       for r in ResumoMensal.objects.all()})
+
+    def test_arquiva_pagamentos_antigos_em_lotes(self):
+        ultimo = Aluno.objects.get(pk=self.so_antigo.pk).ultimo_pagamento
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(arquivo.arquivar_pagamentos(anos=5, tamanho_lote=2), 6)
+        # Ficam o pagamento recente, o em aberto e o último pagamento quitado de cada aluno
+        self.assertEqual(Pagamento.objects.filter(aluno=self.ativo).count(), 2)
+        self.assertEqual(Pagamento.objects.filter(aluno=self.so_antigo).count(), 1)
+        self.assertEqual(Pagamento.objects.filter(aluno=self.inativo).count(), 1)
+        self.assertEqual(PagamentoArquivado.objects.filter(aluno_id=self.ativo.pk).count(), 5)
+        self.assertEqual(set(PagamentoArquivado.objects.values_list('aluno_nome', flat=True)),
+                         {self.ativo.nome, self.inativo.nome})
+        self.assertEqual(Aluno.objects.get(pk=self.so_antigo.pk).ultimo_pagamento, ultimo)
+        self._conferir_resumo()
+        self.assertEqual(arquivo.arquivar_pagamentos(anos=5), 0)
+
+    def test_arquiva_alunos_inativos_com_tudo(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(arquivo.arquivar_alunos(anos=2), (1, 2))
+        self.assertFalse(Aluno.objects.filter(pk=self.inativo.pk).exists())
+        self.assertFalse(Lembrete.objects.exists())
+        arquivado = AlunoArquivado.objects.get(pk=self.inativo.pk)
+        self.assertEqual((arquivado.nome, arquivado.cpf, arquivado.modalidades),
+                         (self.inativo.nome, self.inativo.cpf, ['Jiu Jitsu']))
+        self.assertEqual(PagamentoArquivado.objects.filter(aluno_id=self.inativo.pk).count(), 2)
+        # Inativo com fatura em aberto fica; o índice de busca esquece o arquivado
+        self.assertTrue(Aluno.objects.filter(pk=self.devedor.pk).exists())
+        self.assertEqual(buscar_alunos(self.inativo.nome, apenas_ativos=False), [])
+        self._conferir_resumo()
+
+    def test_exclusao_direta_cobre_todas_as_relacoes_do_aluno(self):
+        # Sem o Collector, uma ForeignKey nova para Aluno deixaria órfãos: ela precisa entrar em _apagar_alunos
+        self.assertEqual({relacao.related_model for relacao in Aluno._meta.related_objects}, {Pagamento, Lembrete})
+        self.assertEqual([campo.name for campo in Aluno._meta.many_to_many], ['modalidades'])
+
+    def test_historico_com_arquivo(self):
+        arquivo.arquivar(anos_pagamentos=5, anos_alunos=2)
+        hot = list(Pagamento.objects.order_by('-data_pagamento', '-pk').values_list('pk', flat=True))
+        todos = sorted(
+            list(Pagamento.objects.values_list('data_pagamento', 'pk'))
+            + list(PagamentoArquivado.objects.values_list('data_pagamento', 'pk')),
+            reverse=True,
+        )
+        self.assertEqual([p.pk for p in pagina_historico(tamanho=50)], hot)
+
+        # Percorre para frente e volta uma página com o mesmo cursor
+        vistos, depois, paginas = [], None, []
+        while True:
+            pagina = pagina_historico(tamanho=3, depois=depois, incluir_arquivo=True)
+            paginas.append(pagina)
+            vistos += [p.pk for p in pagina]
+            if not pagina.tem_proxima:
+                break
+            depois = pagina.cursor_proximo
+        self.assertEqual(vistos, [pk for _, pk in todos])
+        anterior = pagina_historico(tamanho=3, antes=paginas[2].cursor_anterior, incluir_arquivo=True)
+        self.assertEqual([p.pk for p in anterior], [p.pk for p in paginas[1]])
+
+        periodo = {'data_inicio': self.antigo - timedelta(days=1), 'data_fim': date.today()}
+        so_quentes = totais_historico(**periodo)
+        com_arquivo = totais_historico(**periodo, incluir_arquivo=True)
+        self.assertEqual(com_arquivo['quantidade'], so_quentes['quantidade'] + 7)
+        self.assertEqual(com_arquivo['total'], so_quentes['total'] + Decimal('700.00'))
+        self.assertEqual(sum(m['quantidade'] for m in com_arquivo['meses']), len(todos))
+        self.assertEqual(totais_historico(status='VENCIDO', incluir_arquivo=True)['quantidade'], 2)
+
+        self.client.force_login(self.usuario)
+        resposta = self.client.get(reverse('alunos:historico_pagamentos'), {'arquivo': 'on'})
+        self.assertContains(resposta, 'Arquivado', count=7)
+        self.assertIn('arquivo=on', resposta.context['filtros_querystring'])
+
+    def test_exclusao_em_segundo_plano(self):
+        url = reverse('alunos:excluir_aluno', args=[self.ativo.pk])
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.post(url)
+        # Na requisição: só a marcação, nenhum pagamento lido ou apagado
+        self.assertFalse([q for q in ctx.captured_queries if 'alunos_pagamento' in q['sql']])
+        aluno = Aluno.objects.get(pk=self.ativo.pk)
+        self.assertFalse(aluno.ativo)
+        self.assertIsNotNone(aluno.exclusao_agendada_em)
+        self.assertEqual(Pagamento.objects.filter(aluno=self.ativo).count(), 7)
+
+        # A exclusão foi para a fila na mesma transação da marcação
+        tarefa = Tarefa.objects.get(status=TAREFA_PENDENTE)
+        self.assertEqual(tarefa.funcao, 'alunos.arquivo.excluir_aluno')
+        self.assertEqual(tarefa.argumentos, {'pk': self.ativo.pk})
+
+        tarefas.processar_pendentes()
+        self.assertFalse(Aluno.objects.filter(pk=self.ativo.pk).exists())
+        self.assertFalse(Pagamento.objects.filter(aluno_id=self.ativo.pk).exists())
+        self._conferir_resumo()
+
+    def test_retoma_exclusao_interrompida(self):
+        with self.captureOnCommitCallbacks(execute=False):
+            arquivo.agendar_exclusao(self.inativo)
+        # Parou depois do primeiro lote
+        Pagamento.objects.filter(pk=Pagamento.objects.filter(aluno=self.inativo).first().pk).delete()
+        call_command('arquivar', stdout=(saida := StringIO()))
+        self.assertIn('1 exclusão(ões) pendente(s) concluída(s)', saida.getvalue())
+        self.assertFalse(Aluno.objects.filter(pk=self.inativo.pk).exists())
+        self.assertFalse(AlunoArquivado.objects.filter(pk=self.inativo.pk).exists())
+
+
+class AuditoriaTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = User.objects.create_user('secretaria', password='senha')
+        cls.modalidade = Modalidade.objects.create(nome='Muay Thai', valor_mensal=Decimal('120.00'))
+        cls.alunos = criar_alunos(3)
+        cls.pagamentos = criar_pagamentos(cls.alunos, pago=False)
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.usuario)
+
+    def _registros(self, objeto):
+        return list(RegistroAuditoria.objects.do_objeto(type(objeto), objeto.pk))
+
+    def test_edicao_registra_so_os_campos_alterados(self):
+        pagamento = self.pagamentos[0]
+        dados = {
+            'aluno': pagamento.aluno_id, 'valor': '150.00', 'data_pagamento': '2025-01-10',
+            'data_vencimento': '2025-01-10', 'metodo_pagamento': 'PIX', 'pago': 'on',
+        }
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('alunos:editar_pagamento', args=[pagamento.pk]), dados)
+        [registro] = self._registros(pagamento)
+        self.assertEqual((registro.acao, registro.origem, registro.usuario_id), ('ALTERACAO', '', self.usuario.pk))
+        self.assertEqual(registro.alteracoes, {'valor': ['100.00', '150.00'], 'pago': [False, True]})
+
+        # Salvar sem mudar nada não registra; update_fields limita a comparação
+        pagamento = Pagamento.objects.get(pk=pagamento.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            pagamento.save()
+            pagamento.observacao = 'Pago no balcão'
+            pagamento.valor = Decimal('1.00')
+            pagamento.save(update_fields=['observacao'])
+        registro = self._registros(pagamento)[0]
+        self.assertEqual(registro.alteracoes, {'observacao': ['', 'Pago no balcão']})
+        self.assertIsNone(registro.usuario_id)
+
+    def test_criacao_e_exclusao(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            pagamento = Pagamento.objects.create(
+                aluno=self.alunos[1], valor=Decimal('90.00'), data_vencimento=date(2025, 3, 10),
+                metodo_pagamento='DINHEIRO',
+            )
+            self.client.post(reverse('alunos:excluir_pagamento', args=[pagamento.pk]))
+        exclusao, criacao = self._registros(pagamento)
+        self.assertEqual(criacao.acao, 'CRIACAO')
+        self.assertEqual(criacao.alteracoes['valor'], [None, '90.00'])
+        self.assertEqual(exclusao.acao, 'EXCLUSAO')
+        self.assertEqual(exclusao.usuario_id, self.usuario.pk)
+        self.assertEqual(exclusao.alteracoes['data_vencimento'], ['2025-03-10', None])
+
+    def test_transacao_desfeita_nao_deixa_registro(self):
+        pagamento = Pagamento.objects.get(pk=self.pagamentos[0].pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    pagamento.pago = True
+                    pagamento.save()
+                    raise ValueError
+            except ValueError:
+                pass
+        self.assertFalse(RegistroAuditoria.objects.exists())
+
+    def test_um_insert_por_requisicao(self):
+        def view(request):
+            with self.captureOnCommitCallbacks(execute=True):
+                for pagamento in Pagamento.objects.filter(aluno__in=self.alunos):
+                    pagamento.observacao = 'Conferido'
+                    pagamento.save()
+            return HttpResponse()
+
+        request = RequestFactory().post('/')
+        request.user = self.usuario
+        with CaptureQueriesContext(connection) as ctx:
+            auditoria.AuditoriaMiddleware(view)(request)
+        insercoes = [q for q in ctx.captured_queries if q['sql'].startswith('INSERT INTO "alunos_registroauditoria"')]
+        self.assertEqual(len(insercoes), 1)
+        self.assertEqual(RegistroAuditoria.objects.do_usuario(self.usuario).count(), 3)
+
+    def test_operacoes_em_lote(self):
+        pks = [p.pk for p in self.pagamentos]
+        with self.captureOnCommitCallbacks(execute=True), CaptureQueriesContext(connection) as ctx:
+            acoes_lote.marcar_pagos(pks[:2], date(2025, 2, 1), 'DINHEIRO')
+            acoes_lote.excluir_pagamentos(pks[2:])
+        # Valores anteriores vêm da consulta que a ação em lote já fazia
+        self.assertEqual(sum(q['sql'].startswith('SELECT') for q in ctx.captured_queries), 2)
+        alteracao = self._registros(self.pagamentos[0])[0]
+        self.assertEqual(alteracao.origem, 'lote')
+        self.assertEqual(alteracao.alteracoes, {
+            'pago': [False, True], 'data_pagamento': ['2025-01-10', '2025-02-01'], 'metodo_pagamento': ['PIX', 'DINHEIRO'],
+        })
+        exclusao = self._registros(self.pagamentos[2])[0]
+        self.assertEqual((exclusao.acao, exclusao.alteracoes['aluno_id']), ('EXCLUSAO', [self.alunos[2].pk, None]))
+
+        Aluno.objects.filter(pk=self.alunos[0].pk).update(valor_mensalidade=Decimal('80.00'))
+        with self.captureOnCommitCallbacks(execute=True):
+            gerar_cobrancas(date(2025, 6, 1), alunos=Aluno.objects.filter(pk=self.alunos[0].pk))
+        criacao = RegistroAuditoria.objects.get(origem='cobranca')
+        self.assertEqual(criacao.alteracoes['valor'], [None, '80.00'])
+
+    def test_exclusao_de_aluno_leva_o_usuario(self):
+        aluno = Aluno.objects.get(pk=self.alunos[0].pk)
+        with auditoria.agrupar(self.usuario.pk):
+            with self.captureOnCommitCallbacks(execute=True):
+                arquivo.agendar_exclusao(aluno)
+            with self.captureOnCommitCallbacks(execute=True):
+                arquivo.excluir_em_lotes(aluno.pk)
+        [registro] = self._registros(aluno)
+        self.assertEqual((registro.acao, registro.alteracoes['nome']), ('EXCLUSAO', [aluno.nome, None]))
+        pagamento = self._registros(self.pagamentos[0])[0]
+        self.assertEqual((pagamento.origem, pagamento.usuario_id), ('exclusao', self.usuario.pk))
+
+    def test_consultas_usam_os_indices(self):
+        for consulta, indice in [
+            (RegistroAuditoria.objects.do_objeto(Pagamento, 1), 'auditoria_objeto_idx'),
+            (RegistroAuditoria.objects.do_usuario(self.usuario), 'auditoria_usuario_idx'),
+        ]:
+            with connection.cursor() as cursor:
+                sql, params = consulta.query.sql_with_params()
+                cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+                plano = ' '.join(str(linha[-1]) for linha in cursor.fetchall())
+            self.assertIn(indice, plano)
+
+
+# Funções de módulo para a fila: o trabalhador as encontra pelo caminho (alunos.tests.*)
+EXECUCOES_DE_TESTE = []
+
+
+@tarefas.tarefa
+def tarefa_de_teste(valor):
+    EXECUCOES_DE_TESTE.append(valor)
+    return valor * 2
+
+
+@tarefas.tarefa(max_tentativas=2)
+def tarefa_que_falha():
+    raise RuntimeError('serviço fora do ar')
+
+
+def funcao_sem_marca():
+    pass
+
+
+class TarefasTests(TestCase):
+    def setUp(self):
+        EXECUCOES_DE_TESTE.clear()
+
+    def test_reserva_nunca_entrega_a_mesma_tarefa_duas_vezes(self):
+        for valor in range(3):
+            tarefas.enfileirar(tarefa_de_teste, valor=valor)
+        primeiro = tarefas.reservar('a', 2)
+        segundo = tarefas.reservar('b', 5)
+        self.assertEqual(len(primeiro), 2)
+        self.assertEqual(len(segundo), 1)
+        self.assertFalse({t.pk for t in primeiro} & {t.pk for t in segundo})
+        self.assertEqual(tarefas.reservar('c', 5), [])
+        self.assertTrue(all(t.status == TAREFA_EXECUTANDO and t.tentativas == 1 for t in primeiro + segundo))
+
+    def test_ordem_por_prioridade_e_agendamento(self):
+        normal = tarefas.enfileirar(tarefa_de_teste, valor=1)
+        alta = tarefas.enfileirar(tarefa_de_teste, valor=2, prioridade=tarefas.PRIORIDADE_ALTA)
+        futura = tarefas.enfileirar(tarefa_de_teste, valor=3, prioridade=tarefas.PRIORIDADE_ALTA,
+                                    executar_em=timezone.now() + timedelta(hours=1))
+        self.assertEqual(list(tarefas.fila().values_list('pk', flat=True)), [alta.pk, normal.pk])
+
+        trabalhador = tarefas.processar_pendentes()
+        self.assertEqual(EXECUCOES_DE_TESTE, [2, 1])
+        self.assertEqual(trabalhador.concluidas, 2)
+        self.assertEqual(Tarefa.objects.get(pk=alta.pk).resultado, '4')
+        self.assertEqual(Tarefa.objects.get(pk=futura.pk).status, TAREFA_PENDENTE)
+
+    def test_falha_tenta_de_novo_com_espera_e_depois_desiste(self):
+        pk = tarefas.enfileirar(tarefa_que_falha).pk
+        antes = timezone.now()
+        with self.assertLogs('alunos.tarefas', 'ERROR'):
+            self.assertEqual(tarefas.processar_pendentes().falhas, 1)
+        tarefa = Tarefa.objects.get(pk=pk)
+        self.assertEqual((tarefa.status, tarefa.tentativas), (TAREFA_PENDENTE, 1))
+        self.assertIn('serviço fora do ar', tarefa.erro)
+        self.assertGreaterEqual(tarefa.executar_em, antes + timedelta(seconds=tarefas.espera(1)))
+        self.assertEqual(tarefas.espera(3), 4 * tarefas.ESPERA_BASE)
+
+        # Passada a espera, a segunda falha esgota as tentativas
+        Tarefa.objects.filter(pk=pk).update(executar_em=timezone.now())
+        with self.assertLogs('alunos.tarefas', 'ERROR'):
+            tarefas.processar_pendentes()
+        tarefa.refresh_from_db()
+        self.assertEqual((tarefa.status, tarefa.tentativas), (TAREFA_FALHOU, 2))
+
+        self.assertTrue(tarefas.reexecutar(pk))
+        self.assertFalse(tarefas.reexecutar(pk))
+        tarefa.refresh_from_db()
+        self.assertEqual((tarefa.status, tarefa.tentativas), (TAREFA_PENDENTE, 0))
+
+    def test_reserva_vencida_volta_para_a_fila(self):
+        pk = tarefas.enfileirar(tarefa_de_teste, valor=1).pk
+        tarefas.reservar('trabalhador-morto', 1)
+        self.assertEqual(tarefas.liberar_vencidas(), 0)
+        Tarefa.objects.filter(pk=pk).update(reservada_ate=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(tarefas.liberar_vencidas(), 1)
+        tarefa = Tarefa.objects.get(pk=pk)
+        self.assertEqual((tarefa.status, tarefa.trabalhador), (TAREFA_PENDENTE, ''))
+        self.assertIn('trabalhador-morto', tarefa.erro)
+
+        # O trabalhador antigo não sobrescreve quem pegou a tarefa depois
+        Tarefa.objects.filter(pk=pk).update(executar_em=timezone.now())
+        [nova] = tarefas.reservar('outro', 1)
+        tarefas.concluir(nova, 'trabalhador-morto', 'tarde demais')
+        self.assertEqual(Tarefa.objects.get(pk=pk).status, TAREFA_EXECUTANDO)
+
+    def test_chave_evita_duplicadas_e_execucao_simultanea(self):
+        tarefas.enfileirar(tarefa_de_teste, valor=1, chave='teste')
+        tarefas.enfileirar(tarefa_de_teste, valor=1, chave='teste')
+        self.assertEqual(Tarefa.objects.count(), 1)
+
+        [executando] = tarefas.reservar('a', 5)
+        tarefas.enfileirar(tarefa_de_teste, valor=1, chave='teste')
+        self.assertEqual(Tarefa.objects.filter(status=TAREFA_PENDENTE).count(), 1)
+        # A da fila espera a mesma chave terminar
+        self.assertEqual(tarefas.reservar('b', 5), [])
+        tarefas.concluir(executando, 'a', '')
+        self.assertEqual(len(tarefas.reservar('b', 5)), 1)
+
+    def test_transacao_desfeita_leva_a_tarefa_junto(self):
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            tarefas.enfileirar(tarefa_de_teste, valor=1)
+            raise RuntimeError
+        self.assertFalse(Tarefa.objects.exists())
+
+    def test_so_executa_funcoes_marcadas(self):
+        with self.assertRaises(ValueError):
+            tarefas.enfileirar(funcao_sem_marca)
+        with self.assertRaises(ValueError):
+            tarefas.resolver('alunos.tests.funcao_sem_marca')
+
+    def test_usuario_que_pediu_vai_para_a_auditoria(self):
+        usuario = User.objects.create_user('recepcao', password='senha')
+        with auditoria.agrupar(usuario.pk):
+            tarefa = tarefas.enfileirar(tarefa_de_teste, valor=1)
+        self.assertEqual(Tarefa.objects.get(pk=tarefa.pk).usuario_id, usuario.pk)
+
+    def test_tela_de_tarefas_e_reexecucao(self):
+        usuario = User.objects.create_user('gerencia', password='senha')
+        self.client.force_login(usuario)
+        falha = Tarefa.objects.create(funcao='alunos.tests.tarefa_que_falha', status=TAREFA_FALHOU,
+                                      tentativas=2, erro='RuntimeError: serviço fora do ar')
+        Tarefa.objects.create(funcao='alunos.tests.tarefa_de_teste', status=TAREFA_CONCLUIDA, resultado='42',
+                              concluida_em=timezone.now())
+
+        resposta = self.client.get(reverse('alunos:tarefas'))
+        self.assertContains(resposta, 'serviço fora do ar')
+        self.assertContains(resposta, reverse('alunos:reexecutar_tarefa', args=[falha.pk]))
+
+        resposta = self.client.post(reverse('alunos:reexecutar_tarefa', args=[falha.pk]), follow=True)
+        self.assertContains(resposta, f'Tarefa #{falha.pk} colocada de novo na fila.')
+        falha.refresh_from_db()
+        self.assertEqual(falha.status, TAREFA_PENDENTE)
+
+    def test_aviso_de_tarefas_paradas_sem_trabalhador(self):
+        usuario = User.objects.create_user('gerencia', password='senha')
+        self.client.force_login(usuario)
+        self.assertFalse(self.client.get(reverse('alunos:dashboard')).context['tarefas_paradas'])
+        with self.assertNoLogs('alunos.tarefas', 'WARNING'):
+            tarefas.enfileirar(tarefa_de_teste, valor=1)
+
+        Tarefa.objects.update(executar_em=timezone.now() - timedelta(seconds=tarefas.ATRASO_ALERTA + 1))
+        resposta = self.client.get(reverse('alunos:dashboard'))
+        self.assertContains(resposta, 'Há tarefas paradas na fila')
+        self.assertContains(self.client.get(reverse('alunos:tarefas')), '1 tarefa(s) prontas há mais de 10 minutos')
+        with self.assertLogs('alunos.tarefas', 'WARNING') as logs:
+            tarefas.enfileirar(tarefa_de_teste, valor=2)
+        self.assertIn('processar_tarefas', logs.output[0])
+
+    def test_comando_processar_tarefas(self):
+        tarefas.enfileirar(tarefa_de_teste, valor=5)
+        tarefas.enfileirar(tarefa_que_falha)
+        saida = StringIO()
+        with self.assertLogs('alunos.tarefas', 'ERROR'):
+            call_command('processar_tarefas', '--uma-vez', '--threads', '0', stdout=saida)
+        self.assertEqual(EXECUCOES_DE_TESTE, [5])
+        self.assertIn('1 tarefa(s) concluída(s), 1 com falha', saida.getvalue())
+        self.assertEqual(Tarefa.objects.filter(status=TAREFA_CONCLUIDA).count(), 1)
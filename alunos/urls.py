@@ -1,5 +1,5 @@
 from django.urls import path
-from . import views
+from . import api, views
 
 # Definimos o nome do app para referências futuras
 app_name = 'alunos' 
@@ -11,9 +11,15 @@ urlpatterns = [
     # Acessa a view 'lista_alunos' quando o usuário visita a URL raiz do app ('/')
     path('lista', views.lista_alunos, name='lista_alunos'),
 
+    # Exportação da lista de alunos (csv ou xlsx)
+    path('lista/exportar/<str:formato>/', views.exportar_alunos, name='exportar_alunos'),
+
     # NOVA URL: Mapeia o nome 'cadastro_aluno' para a view que criamos
     path('cadastro/', views.cadastro_aluno, name='cadastro_aluno'),
 
+    # Importação de alunos em massa (CSV)
+    path('importar/', views.importar_alunos_view, name='importar_alunos'),
+
     # NOVO: Página Principal de Gerenciamento de Alunos
     path('gerenciar/', views.aluno_manager, name='aluno_manager'),
 
@@ -35,9 +41,35 @@ urlpatterns = [
     # CORREÇÃO: Apontamos para a view correta: historico_pagamentos_view
     path('pagamentos/historico/', views.historico_pagamentos_view, name='historico_pagamentos'), 
     
+    # Versões assíncronas dos relatórios (servidas por ASGI, ver academia_manager/asgi.py)
+    path('pagamentos/historico/async/', views.historico_pagamentos_async, name='historico_pagamentos_async'),
+    path('pagamentos/vencimentos/async/', views.vencimentos_pagamentos_async, name='vencimentos_pagamentos_async'),
+
+    # Exportação do histórico com os mesmos filtros da tela (csv ou xlsx)
+    path('pagamentos/historico/exportar/<str:formato>/', views.exportar_pagamentos_view, name='exportar_pagamentos'),
+
     # Mantemos o vencimentos apontando para o manager por enquanto
     path('pagamentos/vencimentos/', views.vencimentos_pagamentos_view, name='vencimentos_pagamentos'),
+    # Coloca na fila os lembretes de cobrança dos alunos com pagamentos vencidos
+    path('pagamentos/vencimentos/lembretes/', views.enfileirar_lembretes_view, name='enfileirar_lembretes'),
 
     # NOVO: URL para Excluir Pagamentos
     path('pagamentos/excluir/<int:pk>/', views.excluir_pagamento_view, name='excluir_pagamento'),
+    # Marcar como pagos, alterar vencimento ou excluir vários pagamentos de uma vez
+    path('pagamentos/acoes/', views.acoes_lote_pagamentos_view, name='acoes_lote_pagamentos'),
+
+    # Fila de tarefas em segundo plano (ver alunos/tarefas.py)
+    path('tarefas/', views.tarefas_view, name='tarefas'),
+    path('tarefas/<int:pk>/reexecutar/', views.reexecutar_tarefa_view, name='reexecutar_tarefa'),
+
+    # ==========================================================
+    # API JSON (ver alunos/api.py)
+    # ==========================================================
+    path('api/alunos/', api.lista, {'recurso': 'alunos'}, name='api_alunos'),
+    path('api/alunos/autocomplete/', api.autocomplete_alunos, name='api_autocomplete_alunos'),
+    path('api/alunos/<int:pk>/', api.detalhe, {'recurso': 'alunos'}, name='api_aluno'),
+    path('api/modalidades/', api.lista, {'recurso': 'modalidades'}, name='api_modalidades'),
+    path('api/modalidades/<int:pk>/', api.detalhe, {'recurso': 'modalidades'}, name='api_modalidade'),
+    path('api/pagamentos/', api.lista, {'recurso': 'pagamentos'}, name='api_pagamentos'),
+    path('api/pagamentos/<int:pk>/', api.detalhe, {'recurso': 'pagamentos'}, name='api_pagamento'),
 ]
\ No newline at end of file
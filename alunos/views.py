@@ -1,17 +1,52 @@
 from django.shortcuts import render, redirect, get_object_or_404
-from django.urls import reverse_lazy
-from django.db.models import Q, Sum
+from django.urls import reverse, reverse_lazy
+from django.db.models import Count, Sum
 from django.db import IntegrityError
+from django.http import Http404
+from django.utils.http import url_has_allowed_host_and_scheme
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from datetime import date, timedelta
+from urllib.parse import urlencode
 from django.utils import timezone
-from .forms import AlunoForm, PagamentoForm, CadastroPagamentoForm, FiltroHistoricoForm
-from .models import Aluno, Pagamento
+from .forms import (
+    AcoesLotePagamentosForm, AlunoForm, PagamentoForm, CadastroPagamentoForm, FiltroHistoricoForm,
+    ImportacaoAlunosForm,
+)
+from .models import (
+    Aluno, Lembrete, Pagamento, Tarefa, LEMBRETE_PENDENTE, STATUS_VENCE_EM_BREVE, STATUS_VENCIDO,
+    TAREFA_CONCLUIDA, TAREFA_EXECUTANDO, TAREFA_FALHOU, TAREFA_PENDENTE, TAREFA_STATUS_CHOICES,
+)
+from .acoes_lote import ACAO_EXCLUIR, ACAO_PAGAR, aplicar_acao
+from .arquivo import agendar_exclusao
+from .busca import filtrar_alunos
+from .condicional import pagina_condicional, validador_de
+from .exportacao import COLUNAS_ALUNOS, COLUNAS_PAGAMENTOS, FORMATOS as FORMATOS_EXPORTACAO, resposta_exportacao
+from .historico import (
+    ORDEM_PADRAO, ORDENACOES_HISTORICO, PAGAMENTOS_POR_PAGINA, apagina_historico, atotais_historico,
+    filtrar_arquivo, filtrar_historico, pagina_historico, totais_historico,
+)
+from .importacao import importar_alunos, ler_csv
+from .indicadores import indicadores
+from .lembretes import CHAVE_ENVIO, enfileirar_lembretes, enviar_lembretes
+from .paginacao import apaginar, paginar
+from .tarefas import ATRASO_ALERTA, enfileirar, paradas as tarefas_paradas, reexecutar
+import asyncio
 import logging
 
 logger = logging.getLogger(__name__)
 
+ALUNOS_POR_PAGINA = 25
+# Linhas da lista de alunos em cache de fragmento (a chave já muda com o aluno e com o dia)
+TEMPO_CACHE_LINHAS = 60 * 60 * 24
+ORDENACAO_ALUNOS = ['nome', 'pk']
+# Tarefas listadas em cada quadro da tela de tarefas
+TAREFAS_POR_QUADRO = 20
+# Quem deve mais primeiro
+ORDENACAO_DEVEDORES = ['-total_vencido', '-pk']
+# Situações exibidas na tela de vencimentos
+STATUS_EM_ABERTO = (STATUS_VENCIDO, STATUS_VENCE_EM_BREVE)
+
 # ==========================================================
 # 1. VIEWS DE NAVEGAÇÃO
 # ==========================================================
@@ -21,6 +56,10 @@ def dashboard(request):
     context = {
         'titulo': 'Bem-vindo(a) à Academia Manager',
         'usuario': request.user.username, # Obtém o nome do usuário logado
+        # KPIs vêm do cache; só são recalculados quando alunos/pagamentos mudam
+        'indicadores': indicadores(),
+        # Sem o comando processar_tarefas rodando, exclusões, miniaturas e lembretes ficam parados
+        'tarefas_paradas': tarefas_paradas().exists(),
     }
     return render(request, 'alunos/dashboard.html', context)
 
@@ -31,27 +70,71 @@ def dashboard(request):
 def aluno_manager(request):
     return render(request, 'alunos/aluno_manager.html', {'titulo': 'Gerenciar Alunos'})
 
-@login_required
-def lista_alunos(request):
-    alunos = Aluno.objects.filter(ativo=True).order_by('nome')
-    
+def _alunos_da_lista(request, alunos=None):
+    """Alunos (ativos, se `alunos` não vier) com os filtros da lista: (queryset, ordenação, situação, busca)."""
+    alunos = Aluno.objects.filter(ativo=True) if alunos is None else alunos
+    ordenacao = ORDENACAO_ALUNOS
+
+    situacao = request.GET.get('situacao', '')
+    if situacao == 'devedores':
+        # Situação guardada no próprio aluno: usa o índice aluno_devedor_idx, sem JOIN em pagamentos
+        alunos = alunos.filter(faturas_vencidas__gt=0)
+        ordenacao = ORDENACAO_DEVEDORES
+    else:
+        situacao = ''
+
     search_query = request.GET.get('q', '')
     if search_query:
-        # Busca por nome ou CPF
-        alunos = alunos.filter(
-            Q(nome__icontains=search_query) |
-            Q(cpf__icontains=search_query)
-        )
+        # Busca por prefixo, sem acentos, em nome, CPF, RG, WhatsApp e bairro (índice FTS5)
+        alunos = filtrar_alunos(alunos, search_query)
+    return alunos, ordenacao, situacao, search_query
+
+def _validador_lista_alunos(request):
+    return validador_de(_alunos_da_lista(request)[0])
+
+@login_required
+@pagina_condicional(_validador_lista_alunos)
+def lista_alunos(request):
+    alunos, ordenacao, situacao, search_query = _alunos_da_lista(request)
+
+    # Paginação por cursor sobre (nome, pk): usa o índice aluno_ativo_nome_idx
+    # e nunca OFFSET, então qualquer página custa o mesmo que a primeira.
+    pagina = paginar(
+        alunos,
+        ordenacao,
+        depois=request.GET.get('depois'),
+        antes=request.GET.get('antes'),
+        tamanho=ALUNOS_POR_PAGINA,
+    )
+
+    filtros = {chave: valor for chave, valor in (('q', search_query), ('situacao', situacao)) if valor}
 
     context = {
-        'alunos': alunos,
+        'alunos': pagina,
+        'pagina': pagina,
         'search_query': search_query,
+        'situacao': situacao,
+        'filtros_querystring': urlencode(filtros),
+        'hoje': date.today(),
+        'tempo_cache_linhas': TEMPO_CACHE_LINHAS,
         'active_page': 'alunos',
         'titulo': 'Lista de Alunos'
     }
 
     return render(request, 'alunos/lista_alunos.html', context)
 
+@login_required
+def exportar_alunos(request, formato):
+    """Exporta a lista de alunos (mesmos filtros e ordem da lista) em CSV ou XLSX, por streaming."""
+    if formato not in FORMATOS_EXPORTACAO:
+        raise Http404("Formato de exportação inválido.")
+
+    alunos, ordenacao, _, _ = _alunos_da_lista(
+        request, Aluno.objects.all() if request.GET.get('incluir_inativos') else None,
+    )
+    nome_arquivo = f"alunos_{date.today():%Y-%m-%d}"
+    return resposta_exportacao(formato, nome_arquivo, alunos.order_by(*ordenacao), COLUNAS_ALUNOS)
+
 @login_required
 def cadastro_aluno(request, pk=None):
     aluno = None
@@ -100,13 +183,36 @@ def cadastro_aluno(request, pk=None):
     }
     return render(request, 'alunos/cadastro_aluno.html', context)
 
+@login_required
+def importar_alunos_view(request):
+    """Importa alunos em massa a partir de um CSV e mostra o relatório por linha."""
+    relatorio = None
+    if request.method == 'POST':
+        form = ImportacaoAlunosForm(request.POST, request.FILES)
+        if form.is_valid():
+            relatorio = importar_alunos(ler_csv(form.cleaned_data['arquivo']))
+            if relatorio.criados:
+                messages.success(request, f"{relatorio.criados} aluno(s) importado(s) com sucesso!")
+            if relatorio.erros:
+                messages.error(request, f"{relatorio.recusados} linha(s) recusada(s). Veja os detalhes abaixo.")
+    else:
+        form = ImportacaoAlunosForm()
+
+    context = {
+        'titulo': 'Importar Alunos',
+        'form': form,
+        'relatorio': relatorio,
+    }
+    return render(request, 'alunos/importar_alunos.html', context)
+
 def excluir_aluno(request, pk):
     aluno = get_object_or_404(Aluno, pk=pk)
 
     if request.method == 'POST':
         try:
             nome_aluno = aluno.nome # Salva o nome para a mensagem de feedback
-            aluno.delete()
+            # Desativa agora; os pagamentos são apagados em lotes depois da resposta (ver arquivo.py)
+            agendar_exclusao(aluno)
             
             # Adiciona uma mensagem de sucesso para exibir no dashboard
             messages.success(request, f'Aluno "{nome_aluno}" excluído com sucesso.')
@@ -171,67 +277,196 @@ def cadastro_pagamento_view(request, pk=None):
     }
     return render(request, 'alunos/cadastro_pagamento.html', context)
 
+def _filtros_historico(request, form):
+    """Filtros válidos do histórico (período, ordem, situação e cursores da página)."""
+    if not form.is_valid():
+        return None
+    return {
+        'data_inicio': form.cleaned_data.get('data_inicio'),
+        'data_fim': form.cleaned_data.get('data_fim'),
+        'ordem': form.cleaned_data.get('ordem') or ORDEM_PADRAO,
+        'status': form.cleaned_data.get('status') or None,
+        'incluir_arquivo': form.cleaned_data.get('arquivo', False),
+        'depois': request.GET.get('depois'),
+        'antes': request.GET.get('antes'),
+    }
+
+def _contexto_historico(form, filtros, pagamentos, totais):
+    filtros = filtros or {'ordem': ORDEM_PADRAO}
+    # Mantém os filtros atuais nos links de navegação entre páginas
+    querystring = {
+        chave: filtros.get(chave) for chave in ('data_inicio', 'data_fim', 'ordem', 'status') if filtros.get(chave)
+    }
+    if filtros.get('incluir_arquivo'):
+        querystring['arquivo'] = 'on'
+    return {
+        'titulo': 'Histórico de Pagamentos por Período',
+        'form': form,
+        'pagamentos': pagamentos,
+        'pagina': pagamentos,
+        'filtros_querystring': urlencode(querystring),
+        'data_inicio': filtros.get('data_inicio'),
+        'data_fim': filtros.get('data_fim'),
+        'total_recebido': totais['total'],
+        'quantidade_pagamentos': totais['quantidade'],
+        # Barra de ações em lote sobre os pagamentos marcados na tabela
+        'form_lote': AcoesLotePagamentosForm(),
+        # Últimos 12 meses tocados pelo período (linhas do resumo mensal)
+        'resumo_meses': totais['meses'][-12:],
+    }
+
+def _validador_historico(request):
+    filtros = _filtros_historico(request, FiltroHistoricoForm(request.GET))
+    if not filtros:
+        # Filtro inválido: a tela só mostra os erros do formulário
+        return None
+    periodo = {chave: filtros[chave] for chave in ('data_inicio', 'data_fim', 'status')}
+    # O arquivo só recebe linhas novas (arquivamento): a quantidade basta
+    extras = [filtrar_arquivo(**periodo).count()] if filtros['incluir_arquivo'] else []
+    return validador_de(filtrar_historico(**periodo), relacionados=[Aluno], extras=extras)
+
 @login_required
+@pagina_condicional(_validador_historico, mensagens=True)
 def historico_pagamentos_view(request):
     """
     Exibe o histórico de pagamentos e permite filtrar por período.
+    As linhas vêm paginadas por cursor (uma consulta com JOIN no aluno por página)
+    e o total do período vem do resumo mensal, em cache.
     """
     form = FiltroHistoricoForm(request.GET)
-    pagamentos = Pagamento.objects.all().order_by('-data_pagamento', '-data_vencimento')
-    data_inicio = None
-    data_fim = None
-    total_recebido = 0
-
-    if form.is_valid():
-        data_inicio = form.cleaned_data.get('data_inicio')
-        data_fim = form.cleaned_data.get('data_fim')
-
-        if data_inicio:
-            # Filtra pagamentos onde a data de pagamento é MAIOR ou IGUAL à data de início
-            pagamentos = pagamentos.filter(data_pagamento__gte=data_inicio)
-        
-        if data_fim:
-            # Filtra pagamentos onde a data de pagamento é MENOR ou IGUAL à data de fim
-            pagamentos = pagamentos.filter(data_pagamento__lte=data_fim)
-        
-        # O cálculo do total deve ser feito APÓS o filtro
-        total_recebido = pagamentos.aggregate(Sum('valor'))['valor__sum'] or 0
+    filtros = _filtros_historico(request, form)
+    totais = {'total': 0, 'quantidade': 0, 'meses': []}
+    pagamentos = []
 
-    context = {
-        'titulo': 'Histórico de Pagamentos por Período',
-        'form': form,
-        'pagamentos': pagamentos,
-        'data_inicio': data_inicio,
-        'data_fim': data_fim,
-        'total_recebido': total_recebido,
-    }
+    if filtros:
+        pagamentos = pagina_historico(**filtros)
+        periodo = {chave: filtros[chave] for chave in ('data_inicio', 'data_fim', 'status', 'incluir_arquivo')}
+        # O total não depende da ordenação nem da página: vem do cache por período
+        totais = totais_historico(**periodo)
+
+    context = _contexto_historico(form, filtros, pagamentos, totais)
     return render(request, 'alunos/historico_pagamentos.html', context)
 
 @login_required
+def exportar_pagamentos_view(request, formato):
+    """Exporta o histórico (mesmos filtros da tela) em CSV ou XLSX, por streaming."""
+    if formato not in FORMATOS_EXPORTACAO:
+        raise Http404("Formato de exportação inválido.")
+
+    form = FiltroHistoricoForm(request.GET)
+    if not form.is_valid():
+        messages.error(request, "Filtro inválido para exportação.")
+        return redirect('alunos:historico_pagamentos')
+
+    ordem = form.cleaned_data.get('ordem') or ORDEM_PADRAO
+    pagamentos = filtrar_historico(
+        form.cleaned_data.get('data_inicio'),
+        form.cleaned_data.get('data_fim'),
+        form.cleaned_data.get('status') or None,
+    ).order_by(*ORDENACOES_HISTORICO[ordem])
+
+    nome_arquivo = f"pagamentos_{date.today():%Y-%m-%d}"
+    return resposta_exportacao(formato, nome_arquivo, pagamentos, COLUNAS_PAGAMENTOS)
+
+def _status_vencimentos(request):
+    status = request.GET.get('status')
+    return status if status in STATUS_EM_ABERTO else STATUS_VENCIDO
+
+def _contexto_vencimentos(status, pagina, total_aberto, contagem, lembretes_na_fila, hoje):
+    return {
+        'titulo': 'Pagamentos Vencidos' if status == STATUS_VENCIDO else 'Pagamentos que Vencem em Breve',
+        'pagamentos_vencidos': pagina,
+        'pagina': pagina,
+        'status': status,
+        # Quantidade por situação dos pagamentos em aberto (um único GROUP BY)
+        'contagem': contagem,
+        'total_aberto': total_aberto,
+        # Lembretes aguardando envio (índice parcial dos pendentes)
+        'lembretes_na_fila': lembretes_na_fila,
+        'hoje': hoje,
+        'form_lote': AcoesLotePagamentosForm(),
+    }
+
+def _validador_vencimentos(request):
+    # Todos os pagamentos em aberto: cobre as duas abas e as contagens por situação
+    return validador_de(
+        Pagamento.objects.filter(pago=False), relacionados=[Aluno],
+        extras=[Lembrete.objects.filter(status=LEMBRETE_PENDENTE).count()],
+    )
+
+@login_required
+@pagina_condicional(_validador_vencimentos, mensagens=True)
 def vencimentos_pagamentos_view(request):
     """
-    Exibe a lista de todos os pagamentos vencidos (data_vencimento < hoje E pago=False).
+    Pagamentos em aberto por situação: vencidos (data_vencimento < hoje E pago=False)
+    ou que vencem em breve. Filtro, dias em atraso e contagens são calculados no
+    banco; a lista é paginada por cursor sobre o índice de pagamentos em aberto.
     """
     hoje = date.today()
-    
-    # Filtra pagamentos onde:
-    # 1. data_vencimento é menor que HOJE
-    # 2. pago é False (ou seja, ainda não foi liquidado)
-    pagamentos_vencidos = Pagamento.objects.filter(
-        data_vencimento__lte=hoje, # '__lt' significa "less than" (menor que)
-        pago=False
-    ).select_related('aluno').order_by('data_vencimento') # Ordena pelo mais antigo
+    status = _status_vencimentos(request)
+    pagamentos = Pagamento.objects.com_status(status, hoje)
 
-    # Calcula o total que está em aberto (soma dos valores dos pagamentos vencidos)
-    total_aberto = pagamentos_vencidos.aggregate(Sum('valor'))['valor__sum'] or 0
+    context = _contexto_vencimentos(
+        status,
+        paginar(
+            pagamentos.with_status(hoje).select_related('aluno'),
+            ['data_vencimento', 'pk'],  # Ordena pelo mais antigo
+            depois=request.GET.get('depois'),
+            antes=request.GET.get('antes'),
+            tamanho=PAGAMENTOS_POR_PAGINA,
+        ),
+        # Calcula o total em aberto da situação escolhida (soma no banco)
+        pagamentos.aggregate(Sum('valor'))['valor__sum'] or 0,
+        Pagamento.objects.filter(pago=False).contagem_por_status(hoje),
+        Lembrete.objects.filter(status=LEMBRETE_PENDENTE).count(),
+        hoje,
+    )
+    return render(request, 'alunos/vencimentos_pagamentos.html', context)
+
+@login_required
+def enfileirar_lembretes_view(request):
+    """
+    Coloca na fila um lembrete por aluno com pagamentos vencidos (um só por dia,
+    mesmo clicando de novo). O envio é feito pela fila de tarefas, em lotes.
+    """
+    if request.method == 'POST':
+        resultado = enfileirar_lembretes()
+        if resultado.enfileirados:
+            enfileirar(enviar_lembretes, chave=CHAVE_ENVIO)
+        nivel = messages.warning if resultado.sem_whatsapp else messages.success
+        nivel(request, f"{resultado}.")
+    return redirect('alunos:vencimentos_pagamentos')
 
+@login_required
+def tarefas_view(request):
+    """
+    Situação da fila de tarefas (alunos/tarefas.py): contagem por status, o que
+    está rodando, as próximas da fila e as últimas falhas e conclusões.
+    """
+    contagem = dict(Tarefa.objects.order_by().values_list('status').annotate(Count('pk')))
+    tarefas = Tarefa.objects.select_related('usuario')
     context = {
-        'titulo': 'Pagamentos Vencidos',
-        'pagamentos_vencidos': pagamentos_vencidos,
-        'total_aberto': total_aberto,
-        'hoje': hoje,
+        'titulo': 'Fila de Tarefas',
+        'contagem': [(rotulo, contagem.get(status, 0)) for status, rotulo in TAREFA_STATUS_CHOICES],
+        'executando': tarefas.filter(status=TAREFA_EXECUTANDO).order_by('iniciada_em', 'pk')[:TAREFAS_POR_QUADRO],
+        'proximas': tarefas.filter(status=TAREFA_PENDENTE)
+                           .order_by('-prioridade', 'executar_em', 'pk')[:TAREFAS_POR_QUADRO],
+        'falhas': tarefas.filter(status=TAREFA_FALHOU)[:TAREFAS_POR_QUADRO],
+        'concluidas': tarefas.filter(status=TAREFA_CONCLUIDA)[:TAREFAS_POR_QUADRO],
+        'paradas': tarefas_paradas().count(),
+        'minutos_alerta': ATRASO_ALERTA // 60,
     }
-    return render(request, 'alunos/vencimentos_pagamentos.html', context)
+    return render(request, 'alunos/tarefas.html', context)
+
+@login_required
+def reexecutar_tarefa_view(request, pk):
+    """Coloca de novo na fila uma tarefa que falhou (sempre via POST)."""
+    if request.method == 'POST':
+        if reexecutar(pk):
+            messages.success(request, f'Tarefa #{pk} colocada de novo na fila.')
+        else:
+            messages.warning(request, f'A tarefa #{pk} não pode ser reexecutada (não falhou ou já está na fila).')
+    return redirect('alunos:tarefas')
 
 @login_required
 def excluir_pagamento_view(request, pk):
@@ -254,4 +489,97 @@ def excluir_pagamento_view(request, pk):
         
     # Se for GET, redireciona de volta com uma mensagem de erro (ou apenas redireciona)
     messages.error(request, 'Ação de exclusão inválida.')
-    return redirect('alunos:historico_pagamentos')
\ No newline at end of file
+    return redirect('alunos:historico_pagamentos')
+
+@login_required
+def acoes_lote_pagamentos_view(request):
+    """
+    Ação em lote sobre os pagamentos marcados no histórico ou nos vencimentos:
+    um único UPDATE/DELETE para todo o conjunto (ver acoes_lote.py).
+    """
+    proxima = request.POST.get('proxima')
+    if not url_has_allowed_host_and_scheme(proxima, allowed_hosts={request.get_host()},
+                                           require_https=request.is_secure()):
+        proxima = reverse('alunos:historico_pagamentos')
+
+    if request.method != 'POST':
+        messages.error(request, 'Ação em lote inválida.')
+        return redirect(proxima)
+
+    form = AcoesLotePagamentosForm(request.POST)
+    if not form.is_valid():
+        erros = [erro for lista in form.errors.values() for erro in lista]
+        messages.error(request, f"Ação não aplicada: {' '.join(erros)}")
+        return redirect(proxima)
+
+    dados = form.cleaned_data
+    quantidade = aplicar_acao(
+        dados['acao'], dados['pagamentos'],
+        data_pagamento=dados['data_pagamento'],
+        metodo_pagamento=dados['metodo_pagamento'],
+        data_vencimento=dados['data_vencimento'],
+    )
+    if dados['acao'] == ACAO_EXCLUIR:
+        messages.success(request, f'{quantidade} pagamento(s) excluído(s).')
+    elif dados['acao'] == ACAO_PAGAR:
+        ignorados = len(set(request.POST.getlist('pagamentos'))) - quantidade
+        texto = f'{quantidade} pagamento(s) marcado(s) como pago(s).'
+        if ignorados:
+            texto += f' {ignorados} já estava(m) pago(s).'
+        messages.success(request, texto)
+    else:
+        messages.success(request, f"Vencimento de {quantidade} pagamento(s) alterado para {dados['data_vencimento']:%d/%m/%Y}.")
+    return redirect(proxima)
+
+# ==========================================================
+# RELATÓRIOS ASSÍNCRONOS (ASGI)
+# ==========================================================
+# Mesmas telas do histórico e dos vencimentos, com o ORM assíncrono. As
+# consultas independentes (página, totais, contagens) são disparadas juntas
+# com asyncio.gather. No SQLite o Django ainda executa o SQL de uma
+# requisição em uma única thread, então o ganho está em não prender o
+# servidor enquanto o banco responde: sob um servidor ASGI (uvicorn/daphne
+# com academia_manager.asgi), muitas requisições lentas não ocupam um worker
+# cada. Compare com `python manage.py benchmark_relatorios`.
+
+@login_required
+@pagina_condicional(_validador_historico, mensagens=True)
+async def historico_pagamentos_async(request):
+    """Versão assíncrona de historico_pagamentos_view."""
+    form = FiltroHistoricoForm(request.GET)
+    filtros = _filtros_historico(request, form)
+    totais = {'total': 0, 'quantidade': 0, 'meses': []}
+    pagamentos = []
+
+    if filtros:
+        periodo = {chave: filtros[chave] for chave in ('data_inicio', 'data_fim', 'status', 'incluir_arquivo')}
+        pagamentos, totais = await asyncio.gather(
+            apagina_historico(**filtros),
+            atotais_historico(**periodo),
+        )
+
+    context = _contexto_historico(form, filtros, pagamentos, totais)
+    return render(request, 'alunos/historico_pagamentos.html', context)
+
+@login_required
+@pagina_condicional(_validador_vencimentos, mensagens=True)
+async def vencimentos_pagamentos_async(request):
+    """Versão assíncrona de vencimentos_pagamentos_view."""
+    hoje = date.today()
+    status = _status_vencimentos(request)
+    pagamentos = Pagamento.objects.com_status(status, hoje)
+
+    pagina, soma, contagem, lembretes_na_fila = await asyncio.gather(
+        apaginar(
+            pagamentos.with_status(hoje).select_related('aluno'),
+            ['data_vencimento', 'pk'],
+            depois=request.GET.get('depois'),
+            antes=request.GET.get('antes'),
+            tamanho=PAGAMENTOS_POR_PAGINA,
+        ),
+        pagamentos.aaggregate(Sum('valor')),
+        Pagamento.objects.filter(pago=False).acontagem_por_status(hoje),
+        Lembrete.objects.filter(status=LEMBRETE_PENDENTE).acount(),
+    )
+    context = _contexto_vencimentos(status, pagina, soma['valor__sum'] or 0, contagem, lembretes_na_fila, hoje)
+    return render(request, 'alunos/vencimentos_pagamentos.html', context)